@@ -7,37 +7,87 @@ for the dungeon game, including maps, tiles, assets, and enums.
 Main Classes:
 - MapData: Complete game map with multiple layers
 - MapLayer: Individual layer containing tiles
+- LayerHandle: Pre-resolved layer for tight tile-access loops
+- ChangeJournal: Per-layer version counter, change journal and dirty chunks
+- EditHistory: Undo / redo of tile edits stored as per-chunk deltas
+- MapSnapshot / LayerSnapshot: Copy-on-write frozen views of a map (MapData.snapshot)
+- ColumnarMapLayer: MapLayer variant storing tile state in compact typed columns
+- ChunkedMapLayer: MapLayer variant storing tiles in lazily allocated chunks
+- CompactTile / CompactAssetInstance: slotted variants with lazily allocated collections
+- FlyweightMapLayer: MapLayer variant sharing one prototype tile per tile type and biome
 - Tile: Individual tile entity with properties and state
 - AssetDefinition: Template for assets that can be instantiated
 - AssetInstance: Specific instance of an asset with transform and state
 - AssetManager: Abstract interface for asset management
+- CachingAssetManager: Manifest-backed AssetManager with LRU caches
+- AssetTagIndex: Inverted tag / property index for asset definition queries
+- AssetInstanceIndex: Map-wide instance_id -> layer/position/instance registry
+- GridSpatialIndex / QuadtreeSpatialIndex: rectangle, radius and nearest-k queries over instances
 
 Enums:
 - TileType: Different types of tiles (FLOOR, WALL, DOOR, etc.)
 - BiomeType: Different biomes (DUNGEON, CAVE, FOREST, etc.)
 - LayerType: Different layer types (BACKGROUND, TERRAIN, OBJECTS, etc.)
+- RegionKind: Kinds of regions found by room detection (ROOM, CORRIDOR, DOOR)
+- TerrainType: Terrain classes of the procedural generator (DEEP_WATER, BEACH, FOREST, etc.)
 """
 
-from .enums import TileType, BiomeType, LayerType
+from .enums import TileType, BiomeType, LayerType, RegionKind, TerrainType
 from .assets import AssetDefinition, AssetInstance, AssetManager
+from .asset_manager import CachingAssetManager, CacheStats
+from .tag_index import AssetTagIndex
+from .instance_index import AssetInstanceIndex, InstanceLocation
+from .spatial import SpatialIndex, GridSpatialIndex, QuadtreeSpatialIndex
 from .tile import Tile
-from .map_data import MapData, MapLayer
+from .changes import ChangeJournal
+from .map_data import MapData, MapLayer, LayerHandle
+from .columnar import ColumnarMapLayer, ColumnarTile
+from .chunked import ChunkedMapLayer
+from .compact import CompactTile, CompactAssetInstance
+from .flyweight import FlyweightMapLayer, FlyweightTile
+from .snapshot import MapSnapshot, LayerSnapshot
+from .history import EditHistory, EditStep
 
 __all__ = [
     # Enums
     'TileType',
     'BiomeType', 
     'LayerType',
+    'RegionKind',
+    'TerrainType',
     
     # Asset classes
     'AssetDefinition',
     'AssetInstance',
     'AssetManager',
+    'CachingAssetManager',
+    'CacheStats',
+    'AssetTagIndex',
+    'AssetInstanceIndex',
+    'InstanceLocation',
+    'SpatialIndex',
+    'GridSpatialIndex',
+    'QuadtreeSpatialIndex',
     
     # Core entities
     'Tile',
     'MapData',
     'MapLayer',
+    'LayerHandle',
+    'ChangeJournal',
+    'EditHistory',
+    'EditStep',
+    'MapSnapshot',
+    'LayerSnapshot',
+    
+    # Storage variants
+    'ColumnarMapLayer',
+    'ColumnarTile',
+    'ChunkedMapLayer',
+    'CompactTile',
+    'CompactAssetInstance',
+    'FlyweightMapLayer',
+    'FlyweightTile',
 ]
 
 # Version information
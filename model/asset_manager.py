@@ -0,0 +1,430 @@
+"""
+Caching asset manager for the model layer.
+
+This module defines CachingAssetManager, a concrete AssetManager that
+reads asset definitions from manifest.json-style files (the format of
+public/assets/manifest.json), keeps decoded definitions and resource
+metadata in size-bounded LRU caches, and can load manifests and warm the
+caches in a background thread pool.
+"""
+
+import asyncio
+import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .assets import AssetDefinition, AssetInstance, AssetManager
+from .tag_index import AssetTagIndex
+
+
+# Manifest keys mapped onto AssetDefinition fields; everything else is
+# kept in AssetDefinition.properties
+MANIFEST_FIELDS: Dict[str, str] = {
+    'id': 'id',
+    'name': 'name',
+    'assetType': 'asset_type',
+    'src': 'resource_path',
+    'format': 'resource_format',
+    'width': 'width',
+    'height': 'height',
+    'frameCount': 'frame_count',
+    'frameDuration': 'frame_duration',
+    'loop': 'animation_loop',
+    'tileWidth': 'tile_width',
+    'tileHeight': 'tile_height',
+    'tilesPerRow': 'tiles_per_row',
+    'tags': 'tags',
+}
+
+SOUND_FORMATS = frozenset(('wav', 'ogg', 'mp3', 'flac'))
+
+_SVG_SIZE = re.compile(rb'<svg\b[^>]*?\bwidth="([\d.]+)[^"]*"[^>]*?\bheight="([\d.]+)[^"]*"', re.DOTALL)
+
+
+def manifest_entry_tags(entry: Dict[str, Any]) -> List[str]:
+    """The tags of a manifest entry: its "tags" plus its category."""
+    tags = list(entry.get('tags') or [])
+    category = entry.get('category')
+    if category and category not in tags:
+        tags.append(category)
+    return tags
+
+
+def manifest_entry_properties(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The properties of a manifest entry: its unmapped keys plus its "properties"."""
+    properties = {key: value for key, value in entry.items()
+                  if key not in MANIFEST_FIELDS and key != 'properties'}
+    properties.update(entry.get('properties') or {})
+    return properties
+
+
+def definition_from_manifest_entry(entry: Dict[str, Any]) -> AssetDefinition:
+    """
+    Create an AssetDefinition from one manifest "assets" entry.
+
+    The manifest's category is added to the tags, and unmapped keys
+    (thumb, gridWidth, category, ...) go to properties along with the
+    entry's own "properties" object, if any.
+    """
+    values = {field: entry[key] for key, field in MANIFEST_FIELDS.items() if key in entry}
+    source = values.setdefault('resource_path', '')
+    values.setdefault('name', values['id'])
+    values.setdefault('resource_format', os.path.splitext(source)[1].lstrip('.').lower())
+    values.setdefault('asset_type', 'sound' if values['resource_format'] in SOUND_FORMATS else 'sprite')
+    values['tags'] = manifest_entry_tags(entry)
+    values['properties'] = manifest_entry_properties(entry)
+    return AssetDefinition(**values)
+
+
+def read_resource_info(path: str) -> Dict[str, Any]:
+    """
+    Read a resource file's size and, for PNG, GIF and SVG, its pixel size.
+
+    Returns:
+        Dict with path, size_bytes, width and height (None if unknown)
+    """
+    with open(path, 'rb') as file:
+        head = file.read(2048)
+        size = os.fstat(file.fileno()).st_size
+
+    width = height = None
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        width, height = struct.unpack('>II', head[16:24])
+    elif head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        width, height = struct.unpack('<HH', head[6:10])
+    else:
+        match = _SVG_SIZE.search(head)
+        if match:
+            width, height = float(match.group(1)), float(match.group(2))
+
+    return {"path": path, "size_bytes": size, "width": width, "height": height}
+
+
+@dataclass
+class CacheStats:
+    """Counters for one LRU cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    max_size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded least-recently-used cache.
+
+    Args:
+        max_size: Maximum number of entries; the least recently used
+            entry is evicted when a put would exceed it
+    """
+
+    def __init__(self, max_size: int):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value and mark it as recently used (counts a hit or miss)."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return self._data[key]
+            self._misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry (the counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        """Snapshot of the counters."""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._data), self.max_size)
+
+
+class CachingAssetManager(AssetManager):
+    """
+    An AssetManager backed by manifest files and LRU caches.
+
+    Loading a manifest registers the raw entries of all its assets
+    (cheap: one dict each); AssetDefinition objects are decoded on first
+    get_asset_definition and kept in an LRU cache of max_definitions, and
+    resource metadata (file size, pixel size) read by resource_info is
+    cached the same way. Evicted entries are decoded again on demand, so
+    eviction never loses a definition. Instances are owned state and are
+    never evicted.
+
+    Every registered definition's tags and properties are kept in
+    tag_index (an AssetTagIndex), so find_definitions can filter the
+    whole registry without decoding it.
+
+    Resource paths starting with "/" are resolved against resource_root
+    (by default the parent of the manifest's directory, i.e. the web root
+    for public/assets/manifest.json); other paths against the manifest's
+    directory.
+
+    Args:
+        max_definitions: Capacity of the definition cache
+        max_resources: Capacity of the resource metadata cache
+        max_workers: Threads used for background loading
+        resource_root: Directory that "/" resource paths are relative to
+    """
+
+    def __init__(self, max_definitions: int = 4096, max_resources: int = 1024,
+                 max_workers: int = 4, resource_root: Optional[str] = None):
+        self.resource_root = resource_root
+        self.max_workers = max_workers
+        self._definitions = LRUCache(max_definitions)
+        self._resources = LRUCache(max_resources)
+        self._entries: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        self._instances: Dict[str, AssetInstance] = {}
+        self.tag_index = AssetTagIndex()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self) -> 'CachingAssetManager':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the background loading threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # Loading
+
+    def load_manifest(self, path: str) -> List[str]:
+        """
+        Register every asset of a manifest file.
+
+        Args:
+            path: Path to a manifest ({"assets": [entry, ...]})
+
+        Returns:
+            The IDs of the registered definitions, in manifest order
+        """
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        return self.register_entries(data.get('assets', []), os.path.dirname(os.path.abspath(path)))
+
+    def register_entries(self, entries: Iterable[Dict[str, Any]], base_dir: str = '.') -> List[str]:
+        """
+        Register raw manifest entries (replacing definitions with the same ID).
+
+        Args:
+            entries: Manifest "assets" entries
+            base_dir: Directory their resource paths are relative to
+        """
+        ids = []
+        with self._lock:
+            for entry in entries:
+                asset_id = entry['id']
+                self._entries[asset_id] = (entry, base_dir)
+                self.tag_index.add(asset_id, manifest_entry_tags(entry), manifest_entry_properties(entry))
+                self._definitions.discard(asset_id)
+                self._resources.discard(asset_id)
+                ids.append(asset_id)
+        return ids
+
+    def load_asset_definition(self, asset_path: str) -> AssetDefinition:
+        """Load and register a single manifest entry stored as a JSON file."""
+        with open(asset_path, 'r', encoding='utf-8') as file:
+            entry = json.load(file)
+        asset_id, = self.register_entries([entry], os.path.dirname(os.path.abspath(asset_path)))
+        return self.get_asset_definition(asset_id)
+
+    def load_manifest_async(self, path: str, warm: bool = False) -> 'Future[List[str]]':
+        """
+        Load a manifest in the background thread pool.
+
+        Args:
+            path: Path to the manifest
+            warm: Also decode the definitions and read the resource
+                metadata of the loaded assets (up to the cache sizes)
+
+        Returns:
+            A Future resolving to the registered IDs
+        """
+        def load():
+            ids = self.load_manifest(path)
+            if warm:
+                self._warm(ids)
+            return ids
+
+        return self._pool().submit(load)
+
+    async def aload_manifest(self, path: str, warm: bool = False) -> List[str]:
+        """asyncio variant of load_manifest_async."""
+        return await asyncio.wrap_future(self.load_manifest_async(path, warm))
+
+    def prefetch(self, definition_ids: Iterable[str]) -> 'Future[None]':
+        """Decode definitions and read their resource metadata in the background."""
+        ids = list(definition_ids)
+        return self._pool().submit(self._warm, ids)
+
+    def _warm(self, ids: List[str]) -> None:
+        for asset_id in ids[:self._definitions.max_size]:
+            self.get_asset_definition(asset_id)
+        for asset_id in ids[:self._resources.max_size]:
+            try:
+                self.resource_info(asset_id)
+            except OSError:
+                pass
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='assets')
+            return self._executor
+
+    # Definitions and resources
+
+    def definition_ids(self) -> List[str]:
+        """IDs of every registered definition (cached or not)."""
+        with self._lock:
+            return list(self._entries)
+
+    def has_asset_definition(self, definition_id: str) -> bool:
+        """Check whether a definition is registered, without decoding it."""
+        return definition_id in self._entries
+
+    def get_asset_definition(self, definition_id: str) -> Optional[AssetDefinition]:
+        """Get a definition, decoding it from its manifest entry on a cache miss."""
+        definition = self._definitions.get(definition_id)
+        if definition is not None:
+            return definition
+
+        registered = self._entries.get(definition_id)
+        if registered is None:
+            return None
+        definition = definition_from_manifest_entry(registered[0])
+        self._definitions.put(definition_id, definition)
+        return definition
+
+    def find_definitions(self, tags: Iterable[str] = (), properties: Optional[Dict[str, Any]] = None,
+                         any_tags: Iterable[str] = (), exclude_tags: Iterable[str] = ()) -> List[str]:
+        """
+        Find registered definitions by tags and properties (see AssetTagIndex.query).
+
+        Returns:
+            The matching definition IDs, sorted
+        """
+        with self._lock:
+            return sorted(self.tag_index.query(tags, properties, any_tags, exclude_tags))
+
+    def resource_path(self, definition_id: str) -> Optional[str]:
+        """Resolve a definition's resource to a file path."""
+        registered = self._entries.get(definition_id)
+        if registered is None:
+            return None
+        entry, base_dir = registered
+        source = entry.get('src', '')
+        if source.startswith('/'):
+            root = self.resource_root or os.path.dirname(base_dir)
+            return os.path.join(root, source.lstrip('/'))
+        return os.path.join(base_dir, source)
+
+    def resource_info(self, definition_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a definition's resource metadata (see read_resource_info), cached.
+
+        Returns:
+            The metadata, or None for unknown definitions
+
+        Raises:
+            OSError: If the resource file cannot be read
+        """
+        info = self._resources.get(definition_id)
+        if info is not None:
+            return info
+
+        path = self.resource_path(definition_id)
+        if path is None:
+            return None
+        info = read_resource_info(path)
+        self._resources.put(definition_id, info)
+        return info
+
+    def cache_stats(self) -> Dict[str, CacheStats]:
+        """Hit / miss / eviction counters of the definition and resource caches."""
+        return {"definitions": self._definitions.stats(), "resources": self._resources.stats()}
+
+    # Instances
+
+    def create_asset_instance(self, definition_id: str, **kwargs) -> AssetInstance:
+        """
+        Create and register a new instance of a definition.
+
+        Args:
+            definition_id: ID of a registered definition
+            **kwargs: AssetInstance fields (instance_id is generated if omitted)
+
+        Raises:
+            ValueError: If the definition is not registered
+        """
+        if not self.has_asset_definition(definition_id):
+            raise ValueError(f"Unknown asset definition '{definition_id}'")
+        instance = AssetInstance(instance_id=kwargs.pop('instance_id', ''),
+                                 asset_definition_id=definition_id, **kwargs)
+        with self._lock:
+            self._instances[instance.instance_id] = instance
+        return instance
+
+    def get_asset_instance(self, instance_id: str) -> Optional[AssetInstance]:
+        """Get a registered instance by its ID."""
+        return self._instances.get(instance_id)
+
+    def update_asset_instance(self, instance: AssetInstance) -> bool:
+        """Replace a registered instance with the given one (matched by ID)."""
+        with self._lock:
+            if instance.instance_id not in self._instances:
+                return False
+            self._instances[instance.instance_id] = instance
+            return True
+
+    def remove_asset_instance(self, instance_id: str) -> bool:
+        """Unregister an instance."""
+        with self._lock:
+            return self._instances.pop(instance_id, None) is not None
@@ -6,7 +6,7 @@ providing a rendering-agnostic way to manage game assets.
 """
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from typing import Any, Dict, List, Optional, Union
 import uuid
 
@@ -101,6 +101,19 @@ class AssetInstance:
         
         if not self.instance_id:
             self.instance_id = str(uuid.uuid4())
+    
+    def set_property(self, key: str, value: Any) -> None:
+        """Set an instance-specific property."""
+        self.properties[key] = value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the asset instance to a dictionary for serialization."""
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AssetInstance':
+        """Create an asset instance from a dictionary produced by to_dict."""
+        return cls(**data)
 
 
 class AssetManager(ABC):
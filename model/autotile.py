@@ -0,0 +1,288 @@
+"""
+Bitmask autotiling for the model layer.
+
+This module provides Autotiler, which keeps two uint8 planes per layer so
+renderers and exporters read tile shapes instead of working them out every
+frame:
+
+- signatures: one bit per neighbor in the same connection group (walls
+  joining walls, water joining water), the usual autotile bitmask
+- blends: one bit per neighbor that blends over the cell, following the
+  editor's tileBlending rules (src/services/tileBlending.ts): only
+  blendable tile types blend, higher priority tiles blend into lower ones
+  and ties are broken by type name
+
+Both planes are computed for the whole layer in one pass of big-integer
+operations with one byte lane per cell. Autotiler listens to the layer
+afterwards and only recomputes a changed cell and its 8 neighbors.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Tuple
+
+from .columns import nonzero_mask
+from .enums import TileType
+from .map_data import MapData, MapLayer
+
+
+# Neighbor offsets in bit order: N, E, S, W (the 4-bit signature), then
+# NE, SE, SW, NW
+DIRECTIONS: Tuple[Tuple[int, int], ...] = (
+    (0, -1), (1, 0), (0, 1), (-1, 0),
+    (1, -1), (1, 1), (-1, 1), (-1, -1),
+)
+NORTH, EAST, SOUTH, WEST = 1, 2, 4, 8
+NORTHEAST, SOUTHEAST, SOUTHWEST, NORTHWEST = 16, 32, 64, 128
+
+# Rectangles up to this many cells are updated cell by cell, larger ones
+# trigger a full pass
+_SMALL_REGION = 4096
+
+
+def _blob(signature: int) -> int:
+    """Drop the corner bits whose two adjacent edges are not both set."""
+    for corner, first, second in ((NORTHEAST, NORTH, EAST), (SOUTHEAST, SOUTH, EAST),
+                                  (SOUTHWEST, SOUTH, WEST), (NORTHWEST, NORTH, WEST)):
+        if signature & corner and not (signature & first and signature & second):
+            signature &= ~corner
+    return signature
+
+
+# bytes.translate table reducing 8-bit signatures to the 47 shapes of a
+# "blob" tileset, and one mapping them to a 0-46 tile index
+BLOB_TABLE = bytes(_blob(signature) for signature in range(256))
+BLOB_SIGNATURES = tuple(sorted(set(BLOB_TABLE)))
+BLOB_INDEX = bytes(BLOB_SIGNATURES.index(BLOB_TABLE[signature]) for signature in range(256))
+
+
+@dataclass
+class AutotileRules:
+    """
+    Which tiles connect and blend.
+
+    Attributes:
+        groups: Connection group per tile type; tiles connect to neighbors
+            of the same group (types not listed never connect)
+        blend_priority: Blend priority of the blendable tile types; a
+            neighbor blends over a cell when its priority is higher (or
+            equal with a later type name)
+        diagonal: Compute 8-bit signatures and blends (4-bit otherwise)
+    """
+
+    groups: Dict[TileType, int] = field(default_factory=lambda: {
+        tile_type: tile_type.value for tile_type in TileType
+    })
+    blend_priority: Dict[TileType, int] = field(default_factory=lambda: {
+        TileType.FLOOR: 1,
+        TileType.PIT: 2,
+        TileType.WATER: 3,
+        TileType.LAVA: 4,
+    })
+    diagonal: bool = True
+
+    def group_table(self) -> bytes:
+        """bytes.translate table: tile type code -> connection group (0 = none)."""
+        table = bytearray(256)
+        for tile_type, group in self.groups.items():
+            if not 0 < group < 256:
+                raise ValueError(f"Connection group of {tile_type.name} must be in 1..255")
+            table[tile_type.value] = group
+        return bytes(table)
+
+    def rank_table(self) -> bytes:
+        """
+        bytes.translate table: tile type code -> blend rank (0 = does not blend).
+
+        Ranks order the blendable types by (priority, name), so a neighbor
+        blends over a cell exactly when its rank is higher.
+        """
+        table = bytearray(256)
+        ordered = sorted(self.blend_priority, key=lambda tile_type: (self.blend_priority[tile_type],
+                                                                     tile_type.name))
+        if len(ordered) > 127:
+            raise ValueError("At most 127 tile types can blend")
+        for rank, tile_type in enumerate(ordered, 1):
+            table[tile_type.value] = rank
+        return bytes(table)
+
+
+def _shift(value: int, dx: int, dy: int, width: int, valid: int) -> int:
+    """Move each cell's lane to the cell at (-dx, -dy), i.e. bring neighbors in."""
+    offset = 8 * (dx + dy * width)
+    value = value >> offset if offset > 0 else value << -offset
+    return value & valid
+
+
+def compute_planes(tile_types: bytes, width: int, height: int,
+                   rules: AutotileRules) -> Tuple[bytearray, bytearray]:
+    """
+    Compute the signature and blend planes of a grid in one pass.
+
+    Args:
+        tile_types: Row-major tile type codes (0 = empty)
+        width, height: Size of the grid
+        rules: Connection and blend rules
+
+    Returns:
+        (signatures, blends), one byte per cell
+    """
+    size = width * height
+    if not size:
+        return bytearray(), bytearray()
+    keys = tile_types.translate(rules.group_table())
+    ranks = tile_types.translate(rules.rank_table())
+    key_value = int.from_bytes(keys, 'little')
+    rank_value = int.from_bytes(ranks, 'little')
+    connects = int.from_bytes(nonzero_mask(keys), 'little')
+    blends_into = int.from_bytes(nonzero_mask(ranks), 'little')
+
+    # Lanes a shift may fill from a real neighbor: not the column the
+    # shift wraps around from
+    everything = int.from_bytes(b'\xff' * size, 'little')
+    valid = {
+        -1: int.from_bytes((b'\x00' + b'\xff' * (width - 1)) * height, 'little'),
+        0: everything,
+        1: int.from_bytes((b'\xff' * (width - 1) + b'\x00') * height, 'little'),
+    }
+    high_bits = int.from_bytes(b'\x80' * size, 'little')
+
+    signatures = blends = 0
+    directions = DIRECTIONS if rules.diagonal else DIRECTIONS[:4]
+    for bit, (dx, dy) in enumerate(directions):
+        # Same group: lanes of key ^ neighbor key that are zero
+        neighbor_keys = _shift(key_value, dx, dy, width, valid[dx])
+        different = int.from_bytes(
+            nonzero_mask((key_value ^ neighbor_keys).to_bytes(size, 'little')), 'little'
+        )
+        signatures |= (connects & ~different) << bit
+
+        # Higher neighbor rank: (rank + 128) - neighbor rank keeps the high
+        # bit of a lane only when rank >= neighbor rank (ranks are < 128)
+        neighbor_ranks = _shift(rank_value, dx, dy, width, valid[dx])
+        not_higher = ((rank_value | high_bits) - neighbor_ranks) & high_bits
+        blends |= (((high_bits & ~not_higher) >> 7) & blends_into) << bit
+    return (bytearray(signatures.to_bytes(size, 'little')),
+            bytearray(blends.to_bytes(size, 'little')))
+
+
+class Autotiler:
+    """
+    Autotile signatures and blend masks of one layer of a map.
+
+    The planes are public bytearrays (row-major, width * height) for bulk
+    readers; signature / blend read single cells. Redraw the cells of the
+    layer's dirty regions plus a 1-cell margin after a change.
+    """
+
+    def __init__(self, map_data: MapData, layer_name: str = "Terrain",
+                 rules: Optional[AutotileRules] = None):
+        """
+        Args:
+            map_data: Map to autotile
+            layer_name: Layer whose tiles are autotiled
+            rules: Connection and blend rules (AutotileRules() if omitted)
+        """
+        layer = map_data.get_layer(layer_name)
+        if layer is None:
+            raise ValueError(f"Map has no layer named '{layer_name}'")
+        if layer._bounds()[:2] != (0, 0):
+            raise ValueError(f"Layer '{layer_name}' does not start at (0, 0); "
+                             "Autotiler needs cells 0..width-1 x 0..height-1")
+
+        self.map_data = map_data
+        self.layer = layer
+        self.rules = rules or AutotileRules()
+        self._group_table = self.rules.group_table()
+        self._rank_table = self.rules.rank_table()
+        self._directions = DIRECTIONS if self.rules.diagonal else DIRECTIONS[:4]
+        self._rebuild()
+        layer.add_listener(self._on_layer_changed)
+
+    def close(self) -> None:
+        """Stop listening to the layer."""
+        self.layer.remove_listener(self._on_layer_changed)
+
+    def signature(self, x: int, y: int) -> int:
+        """Connection bitmask of a cell (bits NORTH ... NORTHWEST)."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return 0
+        return self.signatures[y * self.width + x]
+
+    def blend(self, x: int, y: int) -> int:
+        """Bitmask of the neighbors blending over a cell."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return 0
+        return self.blends[y * self.width + x]
+
+    def blob_indices(self) -> bytes:
+        """Per-cell 0-46 tile index into a 47-tile blob tileset."""
+        return bytes(self.signatures).translate(BLOB_INDEX)
+
+    def _rebuild(self) -> None:
+        """Recompute both planes for the whole layer."""
+        self.width, self.height = self.layer.width, self.layer.height
+        tile_types = self.layer.get_column('tile_type')
+        self._keys = bytearray(tile_types.translate(self._group_table))
+        self._ranks = bytearray(tile_types.translate(self._rank_table))
+        self.signatures, self.blends = compute_planes(tile_types, self.width, self.height, self.rules)
+
+    def _on_layer_changed(self, layer: MapLayer, x1: int, y1: int, x2: int, y2: int) -> None:
+        if layer.width != self.width or layer.height != self.height:
+            self._rebuild()
+            return
+        self.invalidate(x1, y1, x2, y2)
+
+    def invalidate(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """
+        Re-read a rectangle of cells and recompute it and its neighbors.
+
+        Called automatically for changes reported by the layer; call it
+        directly after other in-place tile modifications.
+        """
+        width, height = self.width, self.height
+        x1, x2 = max(0, min(x1, x2)), min(width - 1, max(x1, x2))
+        y1, y2 = max(0, min(y1, y2)), min(height - 1, max(y1, y2))
+        if x1 > x2 or y1 > y2:
+            return
+        if (x2 - x1 + 1) * (y2 - y1 + 1) > _SMALL_REGION:
+            self._rebuild()
+            return
+
+        changed = False
+        for index, code in self._tile_codes(x1, y1, x2, y2):
+            key, rank = self._group_table[code], self._rank_table[code]
+            if key != self._keys[index] or rank != self._ranks[index]:
+                self._keys[index], self._ranks[index] = key, rank
+                changed = True
+        if not changed:
+            return
+
+        for y in range(max(0, y1 - 1), min(height - 1, y2 + 1) + 1):
+            for x in range(max(0, x1 - 1), min(width - 1, x2 + 1) + 1):
+                self._update_cell(x, y)
+
+    def _tile_codes(self, x1: int, y1: int, x2: int, y2: int) -> Iterator[Tuple[int, int]]:
+        """(index, tile type code) of the cells of a rectangle."""
+        get_tile, width = self.layer.get_tile, self.width
+        for y in range(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                tile = get_tile(x, y)
+                yield y * width + x, tile.tile_type.value if tile is not None else 0
+
+    def _update_cell(self, x: int, y: int) -> None:
+        """Recompute the signature and blend bits of one cell from the planes."""
+        width, height = self.width, self.height
+        index = y * width + x
+        key, rank = self._keys[index], self._ranks[index]
+        signature = blend = 0
+        for bit, (dx, dy) in enumerate(self._directions):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            neighbor = ny * width + nx
+            if key and self._keys[neighbor] == key:
+                signature |= 1 << bit
+            if rank and self._ranks[neighbor] > rank:
+                blend |= 1 << bit
+        self.signatures[index] = signature
+        self.blends[index] = blend
@@ -0,0 +1,199 @@
+"""
+Automatic walls for the model layer.
+
+This module is the model-side counterpart of the editor's auto-wall tool
+(src/utils/autoWall.ts): empty cells next to a floor become walls, while
+floors, existing tiles and cells occupied on an optional blocker layer
+(objects, assets) are left alone. Neighborhoods are computed for a whole
+grid at once by shifting a big-integer floor mask with one byte lane per
+cell, and the walls are written with one MapLayer.fill_mask call.
+
+AutoWaller keeps a layer walled incrementally: it remembers the layer
+(and blocker layer) versions it last processed and only re-evaluates the
+cells around the changes their journals report since then.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+from .columns import nonzero_mask
+from .enums import TileType, BiomeType
+from .map_data import MapLayer
+
+
+# Inclusive (x1, y1, x2, y2) rectangle of cells
+Rect = Tuple[int, int, int, int]
+
+# Changed areas up to this many cells are re-evaluated tile by tile, larger
+# ones from whole-layer columns
+_SMALL_REGION = 4096
+
+_EMPTY_TABLE = bytes([1]) + bytes(255)
+
+
+def _type_table(tile_types: Iterable[TileType]) -> bytes:
+    """Translate table mapping the given tile type codes to 1, others to 0."""
+    codes = {tile_type.value for tile_type in tile_types}
+    return bytes(1 if code in codes else 0 for code in range(256))
+
+
+def wall_mask(tile_types: bytes, width: int, height: int,
+              floor_types: Iterable[TileType] = (TileType.FLOOR,),
+              diagonal: bool = True, blocked: Optional[bytes] = None) -> bytearray:
+    """
+    Find the cells of a grid that should become walls.
+
+    Args:
+        tile_types: Row-major tile type codes (0 = empty), e.g. a layer's
+            tile_type column
+        width, height: Size of the grid
+        floor_types: Tile types that get walled in
+        diagonal: Wall the 8-neighborhood of floors ('surrounding' in the
+            editor) instead of the 4-neighborhood ('adjacent')
+        blocked: Optional 0/1 mask of cells that must stay empty
+
+    Returns:
+        A 0/1 mask of the empty, unblocked cells next to a floor
+    """
+    size = width * height
+    if not size:
+        return bytearray()
+    floors = int.from_bytes(tile_types.translate(_type_table(floor_types)), 'little')
+    candidates = int.from_bytes(tile_types.translate(_EMPTY_TABLE), 'little')
+    if blocked is not None:
+        candidates &= ~int.from_bytes(nonzero_mask(blocked), 'little')
+
+    # Shifting by one lane moves a floor to its right / left neighbor; the
+    # masks stop it from wrapping into the next row
+    row = 8 * width
+    left_edge = int.from_bytes((b'\x00' + b'\x01' * (width - 1)) * height, 'little')
+    right_edge = int.from_bytes((b'\x01' * (width - 1) + b'\x00') * height, 'little')
+    sideways = ((floors << 8) & left_edge) | ((floors >> 8) & right_edge)
+    if diagonal:
+        across = floors | sideways
+        near = sideways | (across << row) | (across >> row)
+    else:
+        near = sideways | (floors << row) | (floors >> row)
+    return bytearray((near & candidates).to_bytes(size, 'little'))
+
+
+def auto_wall(layer: MapLayer, wall_type: TileType = TileType.WALL,
+              floor_types: Iterable[TileType] = (TileType.FLOOR,), diagonal: bool = True,
+              blockers: Optional[MapLayer] = None,
+              biome_type: BiomeType = BiomeType.DUNGEON) -> int:
+    """
+    Wall in every floor of a layer in one bulk write.
+
+    Args:
+        layer: Layer holding floors and walls
+        wall_type: Type of the placed walls
+        floor_types: Tile types that get walled in
+        diagonal: Wall the 8-neighborhood instead of the 4-neighborhood
+        blockers: Optional layer (e.g. Objects) whose occupied cells stay empty
+        biome_type: Biome of the placed walls
+
+    Returns:
+        Number of walls placed
+    """
+    blocked = blockers.get_column('tile_type') if blockers is not None else None
+    mask = wall_mask(layer.get_column('tile_type'), layer.width, layer.height,
+                     floor_types, diagonal, blocked)
+    return layer.fill_mask(mask, wall_type, biome_type)
+
+
+class AutoWaller:
+    """
+    Keeps the floors of a layer walled in as the layer changes.
+
+    Call update() after edits (e.g. once per brush stroke or frame): it
+    reads the changes since the previous update from the change journals
+    of the layer and of the blocker layer (a cleared blocker can uncover a
+    cell that needs a wall) and only re-evaluates the cells around them,
+    falling back to a full pass when a journal no longer reaches back far
+    enough.
+    """
+
+    def __init__(self, layer: MapLayer, wall_type: TileType = TileType.WALL,
+                 floor_types: Iterable[TileType] = (TileType.FLOOR,), diagonal: bool = True,
+                 blockers: Optional[MapLayer] = None,
+                 biome_type: BiomeType = BiomeType.DUNGEON):
+        """
+        Args:
+            layer: Layer to keep walled
+            wall_type, floor_types, diagonal, blockers, biome_type: As for auto_wall
+
+        Raises:
+            ValueError: If the layer or the blocker layer does not start at (0, 0)
+        """
+        for checked in (layer, blockers):
+            if checked is not None and checked._bounds()[:2] != (0, 0):
+                raise ValueError(f"Layer '{checked.name}' does not start at (0, 0); "
+                                 "AutoWaller needs cells 0..width-1 x 0..height-1")
+        self.layer = layer
+        self.wall_type = wall_type
+        self.floor_types = tuple(floor_types)
+        self.diagonal = diagonal
+        self.blockers = blockers
+        self.biome_type = biome_type
+        self._floor_codes = {tile_type.value for tile_type in self.floor_types}
+        self.version: Optional[int] = None
+        self.blocker_version: Optional[int] = None
+
+    def update(self) -> int:
+        """
+        Wall in the floors changed since the previous update.
+
+        The first update walls the whole layer.
+
+        Returns:
+            Number of walls placed
+        """
+        layer, blockers = self.layer, self.blockers
+        changes = layer.changes_since(self.version) if self.version is not None else None
+        if changes is not None and blockers is not None:
+            blocker_changes = blockers.changes_since(self.blocker_version)
+            changes = None if blocker_changes is None else changes + blocker_changes
+        if changes is None or sum((x2 - x1 + 1) * (y2 - y1 + 1)
+                                  for x1, y1, x2, y2 in changes) > _SMALL_REGION:
+            placed = auto_wall(layer, self.wall_type, self.floor_types, self.diagonal,
+                               blockers, self.biome_type)
+        else:
+            placed = self._update_cells(changes)
+        # Include the walls just written, they need no further work. Reading
+        # the journals here also starts them, so the next update can be
+        # incremental.
+        self.version = layer.version
+        layer.changes_since(self.version)
+        if blockers is not None:
+            self.blocker_version = blockers.version
+            blockers.changes_since(self.blocker_version)
+        return placed
+
+    def _update_cells(self, changes: List[Rect]) -> int:
+        """Wall the empty cells within one cell of each changed rectangle."""
+        width, height = self.layer.width, self.layer.height
+        if self.diagonal:
+            offsets = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+        else:
+            offsets = ((0, -1), (-1, 0), (1, 0), (0, 1))
+        get_tile, floor_codes, blockers = self.layer.get_tile, self._floor_codes, self.blockers
+
+        def is_floor(x: int, y: int) -> bool:
+            tile = get_tile(x, y) if 0 <= x < width and 0 <= y < height else None
+            return tile is not None and tile.tile_type.value in floor_codes
+
+        # One write per rectangle keeps each write's bounding box small
+        # (a brush stroke reports many scattered cells)
+        placed = 0
+        for x1, y1, x2, y2 in changes:
+            walls = []
+            for y in range(max(0, y1 - 1), min(height - 1, y2 + 1) + 1):
+                for x in range(max(0, x1 - 1), min(width - 1, x2 + 1) + 1):
+                    if get_tile(x, y) is not None:
+                        continue
+                    if blockers is not None and blockers.get_tile(x, y) is not None:
+                        continue
+                    if any(is_floor(x + dx, y + dy) for dx, dy in offsets):
+                        walls.append((y, x, x))
+            if walls:
+                placed += self.layer.fill_spans(walls, self.wall_type, self.biome_type)
+        return placed
@@ -0,0 +1,1090 @@
+"""
+Performance benchmarks for the model layer.
+
+Run all benchmarks with ``python -m model.benchmarks`` or pick some by name,
+e.g. ``python -m model.benchmarks storage``. Results are printed as plain
+text; sizes are kept small enough to finish in a few seconds each.
+"""
+
+import sys
+from array import array
+import time
+import tracemalloc
+from typing import Callable, Dict, Tuple
+
+from . import MapData, MapLayer, ColumnarMapLayer, Tile, TileType, BiomeType, LayerType
+from . import codec
+from .columns import FLOAT_TYPECODE, new_columns
+
+
+def _timed(func: Callable, *args, **kwargs):
+    """Run func and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _measured(func: Callable, *args, **kwargs):
+    """Run func and return (result, elapsed seconds, bytes still allocated)."""
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        allocated, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, allocated
+
+
+def _fill_room(layer: MapLayer) -> MapLayer:
+    """Fill a layer with a walled room, one set_tile call per cell."""
+    width, height = layer.width, layer.height
+    for y in range(height):
+        for x in range(width):
+            if x == 0 or y == 0 or x == width - 1 or y == height - 1:
+                tile_type = TileType.WALL
+            else:
+                tile_type = TileType.FLOOR
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type, biome_type=BiomeType.DUNGEON))
+    return layer
+
+
+def _count_walls_by_tiles(layer: MapLayer) -> int:
+    return sum(1 for _x, _y, tile in layer.get_all_tiles()
+               if tile and tile.tile_type == TileType.WALL)
+
+
+def _count_walls_by_column(layer: MapLayer) -> int:
+    return layer.get_column('tile_type').count(TileType.WALL.value)
+
+
+def benchmark_storage(size: int = 512) -> None:
+    """Compare dense and columnar layer storage: fill, memory and scans."""
+    print(f"--- Layer storage ({size}x{size}) ---")
+
+    for layer_class in (MapLayer, ColumnarMapLayer):
+        def build():
+            layer = layer_class(LayerType.TERRAIN, "Terrain", size, size)
+            return _fill_room(layer)
+
+        layer, fill_time, allocated = _measured(build)
+        walls_tiles, scan_time = _timed(_count_walls_by_tiles, layer)
+        walls_column, column_time = _timed(_count_walls_by_column, layer)
+        assert walls_tiles == walls_column
+
+        print(f"{layer_class.__name__:>18}: fill {fill_time:7.3f}s, "
+              f"memory {allocated / 2**20:8.1f} MiB, "
+              f"tile scan {scan_time:6.3f}s, column scan {column_time:8.5f}s")
+
+
+def _room_map(size: int, layer_class=ColumnarMapLayer) -> MapData:
+    """Build a size x size map of walled 16x16 rooms through import_columns."""
+    map_data = MapData(size, size, "benchmark", layer_class=layer_class)
+    columns = new_columns(size * size)
+
+    floor, wall = TileType.FLOOR.value, TileType.WALL.value
+    row = bytes(wall if x % 16 == 0 else floor for x in range(size))
+    wall_row = bytes([wall]) * size
+    columns['tile_type'][:] = b''.join(
+        wall_row if y % 16 == 0 else row for y in range(size)
+    )
+    tile_types = columns['tile_type']
+
+    columns['biome_type'][:] = bytes([BiomeType.DUNGEON.value]) * (size * size)
+    passable = tile_types.replace(bytes([wall]), b'\x00').replace(bytes([floor]), b'\x01')
+    columns['is_passable'][:] = passable
+    columns['is_transparent'][:] = passable
+    columns['movement_cost'][:] = array(FLOAT_TYPECODE, [1.0]) * (size * size)
+
+    map_data.get_layer("Terrain").import_columns(columns)
+    return map_data
+
+
+def benchmark_serialization(size: int = 1024, json_size: int = 256) -> None:
+    """Compare the binary codec against indented JSON from MapData.to_json."""
+    print("--- Serialization ---")
+
+    for layer_class in (ColumnarMapLayer, MapLayer):
+        map_data = _room_map(size, layer_class)
+        data, encode_time = _timed(codec.encode_map, map_data)
+        loaded, decode_time = _timed(codec.decode_map, data, layer_class)
+        assert loaded.get_layer("Terrain").get_column('tile_type') == \
+            map_data.get_layer("Terrain").get_column('tile_type')
+        print(f"binary {layer_class.__name__:>16} {size}x{size}: save {encode_time:6.3f}s, "
+              f"load {decode_time:6.3f}s, {len(data) / 1024:8.1f} KiB")
+
+    map_data = _room_map(json_size, MapLayer)
+    text, encode_time = _timed(map_data.to_json)
+    _loaded, decode_time = _timed(MapData.from_json, text)
+    data, binary_time = _timed(codec.encode_map, map_data)
+    print(f"json   {'MapLayer':>16} {json_size}x{json_size}: save {encode_time:6.3f}s, "
+          f"load {decode_time:6.3f}s, {len(text) / 1024:8.1f} KiB "
+          f"(binary: {len(data) / 1024:.1f} KiB, save {binary_time:.3f}s)")
+
+
+def _editor_json(size: int) -> str:
+    """Render a size x size walled floor in the editor's save format."""
+    floor = ", ".join(f'"{x},{y}": "floor"'
+                      for y in range(1, size - 1) for x in range(1, size - 1))
+    walls = ", ".join(f'"{x},{y}": "wall"' for y in range(size) for x in range(size)
+                      if x in (0, size - 1) or y in (0, size - 1))
+    return ('{"tiles": {"floor": {' + floor + '}, "walls": {' + walls + '}}, '
+            '"assetInstances": [], "version": "1.0.0", "id": "benchmark"}')
+
+
+def benchmark_editor_import(size: int = 1024) -> None:
+    """Compare the streaming editor importer against json.load + set_tile."""
+    import io
+    import json
+    from .editor_format import load_editor_map, tile_type_from_editor
+
+    print(f"--- Editor map import ({size}x{size}) ---")
+    text = _editor_json(size)
+
+    def naive():
+        data = json.load(io.StringIO(text))
+        map_data = MapData(size, size, data["id"], layers=[])
+        for z_index, (name, tiles) in enumerate(data["tiles"].items()):
+            layer = map_data.add_layer(LayerType.TERRAIN, name, z_index)
+            for key, tile_name in tiles.items():
+                x, y = map(int, key.split(","))
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type_from_editor(tile_name)))
+        return map_data
+
+    _map, naive_time = _timed(naive)
+    print(f"{'json.load + set_tile':>28}: {naive_time:6.3f}s")
+    for layer_class in (MapLayer, ColumnarMapLayer):
+        _map, stream_time = _timed(load_editor_map, io.StringIO(text), layer_class)
+        print(f"{'stream -> ' + layer_class.__name__:>28}: {stream_time:6.3f}s")
+
+
+def _ray_march_fov(opaque: bytes, width: int, height: int, x: int, y: int,
+                   radius: int, visible: bytearray) -> None:
+    """Port of the editor's FOWCalculator: march 0.3-cell steps to every cell."""
+    import math
+
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            target_x, target_y = x + dx, y + dy
+            distance = math.sqrt(dx * dx + dy * dy)
+            if distance > radius or not (0 <= target_x < width and 0 <= target_y < height):
+                continue
+            if distance > 0:
+                step_x, step_y = dx / distance, dy / distance
+                step = 0.3
+                blocked = False
+                while step < distance:
+                    check_x = math.floor(x + step_x * step)
+                    check_y = math.floor(y + step_y * step)
+                    if 0 <= check_x < width and 0 <= check_y < height and \
+                            opaque[check_y * width + check_x]:
+                        blocked = True
+                        break
+                    step += 0.3
+                if blocked:
+                    continue
+            visible[target_y * width + target_x] = 1
+
+
+def benchmark_fov(size: int = 256, viewers: int = 20) -> None:
+    """Compare shadowcasting against the editor's ray march at several radii."""
+    import random
+    from .fov import compute_fov
+
+    print(f"--- Field of view ({size}x{size}, {viewers} viewers, 15% pillars) ---")
+    rng = random.Random(42)
+    opaque = bytes(1 if rng.random() < 0.15 else 0 for _ in range(size * size))
+    positions = [(rng.randrange(size), rng.randrange(size)) for _ in range(viewers)]
+
+    for radius in (8, 16, 32):
+        def run(fov):
+            visible = bytearray(size * size)
+            for x, y in positions:
+                fov(opaque, size, size, x, y, radius, visible)
+            return visible
+
+        shadow, shadow_time = _timed(run, compute_fov)
+        marched, march_time = _timed(run, _ray_march_fov)
+        print(f"radius {radius:2}: shadowcast {shadow_time * 1000:8.1f}ms ({sum(shadow)} cells), "
+              f"ray march {march_time * 1000:8.1f}ms ({sum(marched)} cells), "
+              f"{march_time / shadow_time:5.1f}x")
+
+
+def _maze_map(size: int) -> MapData:
+    """Build a size x size map of walls with staggered gaps, for pathfinding."""
+    map_data = MapData(size, size, "maze", layer_class=ColumnarMapLayer)
+    columns = new_columns(size * size)
+
+    floor, wall = TileType.FLOOR.value, TileType.WALL.value
+    tile_types = bytearray([floor]) * (size * size)
+    for x in range(8, size, 8):
+        gap = (x * 7) % size
+        for y in range(size):
+            if abs(y - gap) > 1:
+                tile_types[y * size + x] = wall
+    columns['tile_type'][:] = tile_types
+    columns['biome_type'][:] = bytes([BiomeType.DUNGEON.value]) * (size * size)
+    passable = tile_types.replace(bytes([wall]), b'\x00').replace(bytes([floor]), b'\x01')
+    columns['is_passable'][:] = passable
+    columns['is_transparent'][:] = passable
+    columns['movement_cost'][:] = array(FLOAT_TYPECODE, [1.0]) * (size * size)
+
+    map_data.get_layer("Terrain").import_columns(columns)
+    return map_data
+
+
+def benchmark_pathfinding(size: int = 256, agents: int = 20) -> None:
+    """Compare per-agent A* against one shared flow field, plus a local edit."""
+    import random
+    from .pathfinding import Pathfinder
+
+    print(f"--- Pathfinding ({size}x{size} maze, {agents} agents to one exit) ---")
+    map_data = _maze_map(size)
+    pathfinder, build_time = _timed(Pathfinder, map_data)
+    rng = random.Random(7)
+    exit_point = (size - 2, size // 2)
+    starts = [(rng.randrange(0, 8), rng.randrange(size)) for _ in range(agents)]
+
+    paths, astar_time = _timed(lambda: [pathfinder.find_path(start, exit_point) for start in starts])
+    field, field_time = _timed(pathfinder.flow_field, [exit_point])
+    cached, cached_time = _timed(lambda: [pathfinder.find_path(start, exit_point) for start in starts])
+    assert all(len(a) == len(b) for a, b in zip(paths, cached))
+
+    # An edit far outside the explored area keeps the field; one inside drops it
+    layer = map_data.get_layer("Terrain")
+    x, y = field.bounds[0] + 3, field.bounds[1] + 3
+    _none, edit_time = _timed(layer.set_tile, x, y, Tile(x=x, y=y, tile_type=TileType.WALL))
+
+    print(f"cost grid {build_time * 1000:7.1f}ms, A* x{agents} {astar_time * 1000:8.1f}ms, "
+          f"flow field {field_time * 1000:7.1f}ms, cached paths x{agents} {cached_time * 1000:6.1f}ms, "
+          f"invalidating edit {edit_time * 1000:5.2f}ms")
+
+
+def benchmark_hierarchical(size: int = 512, queries: int = 3) -> None:
+    """Compare HPA* against plain A* for long queries, plus a single-tile edit."""
+    import random
+    from .pathfinding import Pathfinder, HierarchicalPathfinder
+
+    print(f"--- Hierarchical pathfinding ({size}x{size} maze, {queries} long queries) ---")
+    map_data = _maze_map(size)
+    rng = random.Random(11)
+    pairs = [((rng.randrange(0, 8), rng.randrange(size)), (size - 1 - rng.randrange(0, 7), rng.randrange(size)))
+             for _ in range(queries)]
+
+    def run(pathfinder):
+        return [pathfinder.find_path(*pair) for pair in pairs]
+
+    hierarchical, build_time = _timed(HierarchicalPathfinder, map_data)
+    _paths, cold_time = _timed(run, hierarchical)  # Builds cluster edges on demand
+    hpa_paths, warm_time = _timed(run, hierarchical)
+    astar_paths, astar_time = _timed(run, Pathfinder(map_data))
+    ratio = sum(map(len, hpa_paths)) / sum(map(len, astar_paths))
+
+    layer = map_data.get_layer("Terrain")
+    x, y = size // 2 + 1, size // 2
+    _none, edit_time = _timed(layer.set_tile, x, y, Tile(x=x, y=y, tile_type=TileType.WALL))
+    _path, requery_time = _timed(hierarchical.find_path, *pairs[0])
+
+    print(f"entrances {build_time * 1000:6.1f}ms, HPA* cold {cold_time * 1000 / queries:7.1f}ms/query, "
+          f"warm {warm_time * 1000 / queries:6.1f}ms/query, A* {astar_time * 1000 / queries:7.1f}ms/query, "
+          f"path length ratio {ratio:.3f}")
+    print(f"set_tile with both pathfinders listening {edit_time * 1000:.2f}ms, "
+          f"next HPA* query {requery_time * 1000:.1f}ms")
+
+
+def benchmark_chunked(world: int = 1 << 16, dense_size: int = 1024, rooms: int = 16) -> None:
+    """Sparse worlds: scattered rooms in a chunked layer versus a dense grid."""
+    import random
+    from .chunked import ChunkedMapLayer
+
+    print(f"--- Chunked layers ({rooms} 48x48 rooms) ---")
+    rng = random.Random(5)
+    corners = [(rng.randrange(dense_size - 48), rng.randrange(dense_size - 48)) for _ in range(rooms)]
+
+    def build(layer, scale):
+        for corner_x, corner_y in corners:
+            for y in range(corner_y * scale, corner_y * scale + 48):
+                for x in range(corner_x * scale, corner_x * scale + 48):
+                    layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+        return layer
+
+    cases = (
+        (f"MapLayer {dense_size}x{dense_size}", MapLayer(LayerType.TERRAIN, "Terrain", dense_size, dense_size), 1),
+        (f"ChunkedMapLayer {world}x{world}",
+         ChunkedMapLayer(LayerType.TERRAIN, "Terrain", world, world, origin_x=-world // 2, origin_y=-world // 2),
+         world // dense_size // 2),
+    )
+    for label, layer, scale in cases:
+        layer, fill_time, allocated = _measured(build, layer, scale)
+        count, scan_time = _timed(lambda: sum(1 for _x, _y, tile in layer.get_all_tiles() if tile))
+        _none, resize_time = _timed(layer.resize, layer.width // 2, layer.height // 2)
+        print(f"{label:>30}: fill {fill_time:6.3f}s, memory {allocated / 2**20:7.1f} MiB, "
+              f"scan {scan_time:7.3f}s ({count} tiles), halve {resize_time:7.4f}s")
+
+
+def benchmark_mapped(size: int = 16384, edit: int = 256) -> None:
+    """Open and edit a huge memory-mapped map without loading it."""
+    import os
+    import tempfile
+    from .mapped import create_mapped_map, open_mapped_map
+
+    print(f"--- Memory-mapped map ({size}x{size}, 3 layers) ---")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "world.dmmp")
+        created, create_time = _timed(create_mapped_map, path, size, size, "world")
+        created.close()
+
+        mapped, open_time = _timed(open_mapped_map, path)
+        layer = mapped.map_data.get_layer("Terrain")
+
+        def paint():
+            for y in range(size // 2, size // 2 + edit):
+                for x in range(size // 2, size // 2 + edit):
+                    layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+
+        _none, paint_time, allocated = _measured(paint)
+        _none, close_time = _timed(mapped.close)
+        file_size = os.path.getsize(path)
+
+        reopened = open_mapped_map(path, writable=False)
+        tile = reopened.map_data.get_tile(size // 2, size // 2, "Terrain")
+        assert tile is not None and tile.tile_type == TileType.FLOOR
+        reopened.close()
+
+    print(f"create {create_time * 1000:6.1f}ms, open {open_time * 1000:6.1f}ms "
+          f"(file {file_size / 2**30:.1f} GiB), paint {edit}x{edit} {paint_time:6.3f}s "
+          f"(heap {allocated / 2**20:.1f} MiB), close {close_time * 1000:6.1f}ms")
+
+
+def _object_bytes(obj) -> int:
+    """Shallow size of an object plus its non-empty __dict__ and collections, if allocated."""
+    total = sys.getsizeof(obj)
+    instance_dict = getattr(obj, '__dict__', None)
+    if instance_dict:
+        total += sys.getsizeof(instance_dict)
+    for name in ('_properties', '_asset_instances'):
+        if getattr(obj, name, None) is not None:
+            total += sys.getsizeof(getattr(obj, name))
+    if not hasattr(obj, '_properties'):
+        total += sys.getsizeof(obj.properties)
+        if hasattr(obj, 'asset_instances'):
+            total += sys.getsizeof(obj.asset_instances)
+    return total
+
+
+def benchmark_tile_memory(size: int = 512, instances: int = 100000) -> None:
+    """Memory report for a filled layer with plain, compact and columnar tiles."""
+    from .assets import AssetInstance
+    from .compact import CompactTile, CompactAssetInstance
+    from .flyweight import FlyweightMapLayer
+
+    print(f"--- Tile memory ({size}x{size} filled layer) ---")
+    cells = size * size
+
+    for label, layer_class, tile_class in (
+        ("Tile", MapLayer, Tile),
+        ("CompactTile", MapLayer, CompactTile),
+        ("ColumnarMapLayer", ColumnarMapLayer, Tile),
+        ("FlyweightMapLayer", FlyweightMapLayer, Tile),
+    ):
+        def build():
+            layer = layer_class(LayerType.TERRAIN, "Terrain", size, size)
+            for y in range(size):
+                for x in range(size):
+                    layer.set_tile(x, y, tile_class(x=x, y=y, tile_type=TileType.FLOOR))
+            return layer
+
+        layer, _elapsed, allocated = _measured(build)
+        sample = tile_class(x=size - 1, y=size - 1, tile_type=TileType.FLOOR)
+        per_object = f", {_object_bytes(sample)} B/object shallow" if layer_class is MapLayer else ""
+        print(f"{label:>20}: {allocated / 2**20:7.1f} MiB, {allocated / cells:6.1f} B/cell{per_object}")
+
+    for instance_class in (AssetInstance, CompactAssetInstance):
+        created, _elapsed, allocated = _measured(
+            lambda: [instance_class(str(index), "asset") for index in range(instances)])
+        print(f"{instance_class.__name__:>20}: {allocated / len(created):6.1f} B/instance "
+              f"(incl. id string), {_object_bytes(created[0])} B/object shallow")
+
+
+def _scan_for_instance(map_data: MapData, instance_id: str):
+    """Find an asset instance the pre-index way: walk every tile of every layer."""
+    for layer in map_data.layers:
+        for _x, _y, tile in layer.get_all_tiles():
+            if tile is not None:
+                for instance in tile.asset_instances:
+                    if instance.instance_id == instance_id:
+                        return tile
+    return None
+
+
+def benchmark_asset_index(size: int = 256, props: int = 20000, lookups: int = 1000) -> None:
+    """Find, move and delete props through the map-wide instance index."""
+    import random
+    from .assets import AssetInstance
+
+    print(f"--- Asset instance index ({size}x{size}, {props} props) ---")
+    map_data = MapData(width=size, height=size, map_id="bench")
+    layer = _fill_room(map_data.get_layer("Terrain"))
+    rng = random.Random(7)
+    for index in range(props):
+        tile = layer.get_tile(rng.randrange(size), rng.randrange(size))
+        tile.add_asset_instance(AssetInstance(f"prop{index}", "crate"))
+
+    _index, build_time = _timed(lambda: map_data.instance_index)
+    ids = [f"prop{rng.randrange(props)}" for _ in range(lookups)]
+    _found, find_time = _timed(lambda: [map_data.find_asset_instance(item) for item in ids])
+    scans = max(1, lookups // 100)
+    _scanned, scan_time = _timed(lambda: [_scan_for_instance(map_data, item) for item in ids[:scans]])
+
+    def move_and_delete():
+        for item in ids:
+            map_data.move_asset_instance(item, rng.randrange(size), rng.randrange(size))
+        for item in ids[:lookups // 2]:
+            map_data.remove_asset_instance(item)
+
+    _result, edit_time = _timed(move_and_delete)
+    print(f"index build {build_time * 1000:7.1f} ms")
+    print(f"find        {find_time / lookups * 1e6:7.2f} us/lookup (map scan {scan_time / scans * 1000:.1f} ms)")
+    print(f"move/delete {edit_time / (lookups + lookups // 2) * 1e6:7.2f} us/operation")
+
+
+def benchmark_spatial(props: int = 100000, world: float = 2048.0, queries: int = 1000) -> None:
+    """Viewport culling, picking and nearest-k over props with grid and quadtree indexes."""
+    import random
+    from .assets import AssetDefinition, AssetInstance
+    from .spatial import GridSpatialIndex, QuadtreeSpatialIndex
+
+    print(f"--- Spatial index ({props} props in a {world:.0f}x{world:.0f} tile world) ---")
+    rng = random.Random(11)
+    definitions = {
+        "crate": AssetDefinition("crate", "Crate", "sprite", "crate.png", "png", width=32, height=32),
+        "tree": AssetDefinition("tree", "Tree", "sprite", "tree.png", "png", width=48, height=64),
+    }
+    instances = [
+        AssetInstance(f"prop{index}", rng.choice(("crate", "tree")),
+                      x=rng.uniform(0, world), y=rng.uniform(0, world),
+                      rotation=rng.choice((0.0, 0.0, 90.0, 45.0)))
+        for index in range(props)
+    ]
+    viewports = [(x, y, x + 40, y + 25) for x, y in
+                 ((rng.uniform(0, world), rng.uniform(0, world)) for _ in range(queries))]
+    points = [(rng.uniform(0, world), rng.uniform(0, world)) for _ in range(queries)]
+
+    for index in (GridSpatialIndex(cell_size=8.0, definitions=definitions, unit_scale=1 / 32),
+                  QuadtreeSpatialIndex((0.0, 0.0, world, world), definitions=definitions, unit_scale=1 / 32)):
+        _result, build_time = _timed(index.insert_many, instances)
+        culled, cull_time = _timed(lambda: [index.query_rect(*viewport) for viewport in viewports])
+        _picked, pick_time = _timed(lambda: [index.query_radius(x, y, 0.5) for x, y in points])
+        _nearest, nearest_time = _timed(lambda: [index.nearest(x, y, 8) for x, y in points])
+        moved = instances[:queries]
+        for instance in moved:
+            instance.x += 0.25
+
+        _result, update_time = _timed(lambda: [index.update(instance) for instance in moved])
+        print(f"{type(index).__name__:>20}: build {build_time:5.2f}s, "
+              f"viewport {cull_time / queries * 1e6:6.1f} us ({sum(map(len, culled)) / queries:.0f} props), "
+              f"pick {pick_time / queries * 1e6:5.1f} us, nearest-8 {nearest_time / queries * 1e6:6.1f} us, "
+              f"update {update_time / queries * 1e6:4.1f} us")
+
+    scan_index = GridSpatialIndex(definitions=definitions, unit_scale=1 / 32)
+    bounds = [scan_index.bounds_of(instance) for instance in instances]
+    x1, y1, x2, y2 = viewports[0]
+    _result, scan_time = _timed(lambda: [b for b in bounds
+                                         if b[0] <= x2 and x1 <= b[2] and b[1] <= y2 and y1 <= b[3]])
+    print(f"{'full scan':>20}: viewport {scan_time * 1e6:8.1f} us")
+
+
+def benchmark_asset_manager(definitions: int = 10000, cache_size: int = 4096, lookups: int = 50000) -> None:
+    """Manifest loading and cached definition lookups with a skewed access pattern."""
+    import json
+    import os
+    import random
+    import tempfile
+    from .asset_manager import CachingAssetManager
+
+    print(f"--- Asset manager ({definitions} definitions, cache {cache_size}) ---")
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "manifest.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"assets": [
+                {"id": f"asset{index}", "name": f"Asset {index}", "src": f"/assets/objects/asset{index}.png",
+                 "width": 32, "height": 32, "gridWidth": 1, "gridHeight": 1,
+                 "category": rng.choice(("objects", "structures", "characters"))}
+                for index in range(definitions)
+            ]}, file)
+
+        with CachingAssetManager(max_definitions=cache_size) as manager:
+            ids, load_time = _timed(manager.load_manifest, path)
+            _result, async_time = _timed(lambda: manager.load_manifest_async(path, warm=True).result())
+            # Most lookups go to a small set of popular assets
+            popular = ids[:cache_size // 2]
+            keys = [rng.choice(popular) if rng.random() < 0.9 else rng.choice(ids) for _ in range(lookups)]
+            _result, lookup_time = _timed(lambda: [manager.get_asset_definition(key) for key in keys])
+            stats = manager.cache_stats()["definitions"]
+
+    print(f"load manifest {load_time * 1000:7.1f} ms, background load + warm {async_time * 1000:7.1f} ms")
+    print(f"lookups       {lookup_time / lookups * 1e6:7.2f} us each, hit rate {stats.hit_rate:.1%}, "
+          f"{stats.evictions} evictions")
+
+
+def benchmark_tag_index(definitions: int = 50000, queries: int = 200) -> None:
+    """Filter definitions by tags and properties: inverted index vs scan."""
+    import random
+    from .assets import AssetDefinition
+    from .tag_index import AssetTagIndex
+
+    print(f"--- Tag index ({definitions} definitions) ---")
+    rng = random.Random(9)
+    materials = ["stone", "wood", "metal", "bone", "crystal", "moss"]
+    biomes = [biome.name.lower() for biome in BiomeType]
+    kinds = ["wall", "floor", "door", "prop", "decal", "light"]
+    catalog = [
+        AssetDefinition(f"asset{index}", f"Asset {index}", "sprite", f"asset{index}.png", "png",
+                        tags=[rng.choice(materials), rng.choice(biomes), rng.choice(kinds)],
+                        properties={"solid": rng.random() < 0.3, "variant": rng.randrange(8)})
+        for index in range(definitions)
+    ]
+    index = AssetTagIndex()
+    _result, build_time = _timed(lambda: [index.add_definition(definition) for definition in catalog])
+
+    searches = [([rng.choice(materials), rng.choice(biomes)], {"solid": True}) for _ in range(queries)]
+    found, query_time = _timed(lambda: [index.query(tags, properties) for tags, properties in searches])
+
+    def scan(tags, properties):
+        return {definition.id for definition in catalog
+                if all(tag in definition.tags for tag in tags)
+                and all(definition.properties.get(name) == value for name, value in properties.items())}
+
+    scan_count = max(1, queries // 20)
+    scanned, scan_time = _timed(lambda: [scan(tags, properties) for tags, properties in searches[:scan_count]])
+    assert scanned == found[:scan_count]
+    print(f"build {build_time * 1000:7.1f} ms; query {query_time / queries * 1e6:7.1f} us "
+          f"({sum(map(len, found)) / queries:.0f} matches) vs scan {scan_time / scan_count * 1000:.1f} ms")
+
+
+def benchmark_layer_lookup(layers: int = 16, calls: int = 200000) -> None:
+    """Per-call tile access through layer names, a linear scan and a layer handle."""
+    print(f"--- Layer lookup ({layers} layers, {calls} get_tile calls) ---")
+    map_data = MapData(width=64, height=64, map_id="bench")
+    for index in range(layers - len(map_data.layers)):
+        map_data.add_layer(LayerType.EFFECTS, f"Effects{index}")
+    name = map_data.layers[-1].name
+
+    def scan_lookup():
+        for _ in range(calls):
+            for layer in map_data.layers:
+                if layer.name == name:
+                    layer.get_tile(3, 3)
+                    break
+
+    def named():
+        for _ in range(calls):
+            map_data.get_tile(3, 3, name)
+
+    def handle():
+        get_tile = map_data.layer_handle(name).get_tile
+        for _ in range(calls):
+            get_tile(3, 3)
+
+    for label, func in (("linear scan", scan_lookup), ("MapData.get_tile", named), ("layer handle", handle)):
+        _result, elapsed = _timed(func)
+        print(f"{label:>18}: {elapsed / calls * 1e9:6.0f} ns/call")
+
+
+def benchmark_changes(size: int = 1024, brush: int = 48, strokes: int = 20) -> None:
+    """Find what a few brush strokes changed: dirty regions vs a full rescan."""
+    print(f"--- Change tracking ({size}x{size}, {strokes} strokes of {brush}x{brush}) ---")
+    layer = ColumnarMapLayer(name="Terrain", layer_type=LayerType.TERRAIN, width=size, height=size)
+    tile_types = layer._columns['tile_type']
+    snapshot = tile_types[:]
+    since = layer.version
+    layer.dirty_regions(since)  # Starts the change journal
+
+    def paint():
+        for stroke in range(strokes):
+            left = (stroke * 97) % (size - brush)
+            top = (stroke * 53) % (size - brush)
+            for y in range(top, top + brush):
+                for x in range(left, left + brush):
+                    layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+
+    _none, paint_time = _timed(paint)
+
+    def rescan():
+        return sum(1 for old, new in zip(snapshot, tile_types) if old != new)
+
+    def dirty():
+        width = layer.width
+        changed = 0
+        for x1, y1, x2, y2 in layer.dirty_regions(since):
+            for y in range(y1, y2 + 1):
+                row = y * width
+                changed += sum(1 for old, new in zip(snapshot[row + x1:row + x2 + 1], tile_types[row + x1:row + x2 + 1])
+                               if old != new)
+        return changed
+
+    full, rescan_time = _timed(rescan)
+    found, dirty_time = _timed(dirty)
+    assert full == found
+    regions = len(layer.dirty_regions(since))
+    print(f"paint {paint_time / (strokes * brush * brush) * 1e6:5.2f}us/set_tile, "
+          f"version {layer.version}; {found} changed cells")
+    print(f"full rescan {rescan_time * 1000:7.1f}ms, dirty regions ({regions} chunks) "
+          f"{dirty_time * 1000:6.2f}ms")
+
+
+def benchmark_history(size: int = 1024, steps: int = 2000, brush: int = 5) -> None:
+    """Memory and speed of the delta-based undo history against whole-map snapshots."""
+    from .history import EditHistory
+
+    print(f"--- Undo history ({size}x{size}, {steps} steps of {brush}x{brush}) ---")
+    map_data = MapData(width=size, height=size, map_id="bench")
+    layer = map_data.add_layer(LayerType.TERRAIN, "Painted", layer_class=ColumnarMapLayer)
+    history = EditHistory(map_data)
+
+    def paint():
+        for step in range(steps):
+            left, top = (step * 37) % (size - brush), (step * 91) % (size - brush)
+            tile_type = TileType.FLOOR if step % 2 else TileType.WALL
+            with history.transaction("Paint"):
+                for y in range(top, top + brush):
+                    for x in range(left, left + brush):
+                        history.set_tile(layer, x, y, Tile(x=x, y=y, tile_type=tile_type))
+
+    _none, paint_time = _timed(paint)
+
+    def undo_all():
+        while history.undo():
+            pass
+
+    _none, undo_time = _timed(undo_all)
+    snapshot = layer.memory_usage() * steps
+    print(f"record {paint_time / steps * 1000:6.3f}ms/step, undo all {undo_time * 1000:6.1f}ms; "
+          f"history {history.memory_usage() / 2**20:6.2f} MiB vs {snapshot / 2**30:5.1f} GiB "
+          f"of columnar snapshots")
+
+
+def benchmark_snapshot(size: int = 512, edits: int = 2000) -> None:
+    """Copy-on-write MapData.snapshot() against a full tile-by-tile copy."""
+    import random
+
+    print(f"--- Snapshots ({size}x{size} columnar, {edits} scattered edits) ---")
+    map_data = MapData(width=size, height=size, map_id="bench", layer_class=ColumnarMapLayer)
+    terrain = map_data.get_layer("Terrain")
+    _fill_room(terrain)
+
+    def full_copy():
+        copy = MapLayer(name="Copy", layer_type=LayerType.TERRAIN, width=size, height=size)
+        for x, y, tile in terrain.get_all_tiles():
+            if tile is not None:
+                copy.set_tile(x, y, tile.copy())
+        return copy
+
+    snapshot, snapshot_time = _timed(map_data.snapshot)
+
+    rng = random.Random(1)
+    positions = [(rng.randrange(size), rng.randrange(size)) for _ in range(edits)]
+
+    def edit():
+        for x, y in positions:
+            terrain.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.PIT))
+
+    _none, edit_time = _timed(edit)
+    copied = snapshot.get_layer("Terrain").chunks_copied
+    x, y = positions[0]
+    assert snapshot.get_tile(x, y, "Terrain").tile_type != TileType.PIT
+    snapshot.release()
+    # Last: copying ColumnarTile views fills in the layer's extras
+    _copy, copy_time = _timed(full_copy)
+    print(f"full copy {copy_time * 1000:7.1f}ms, snapshot {snapshot_time * 1e6:6.1f}us; "
+          f"{edits} edits {edit_time * 1000:6.1f}ms copying {copied} of "
+          f"{((size + 31) // 32) ** 2} chunks")
+
+
+def benchmark_bulk_fill(size: int = 512) -> None:
+    """Writing a generated room layout: per-cell set_tile against the bulk fills."""
+    from .chunked import ChunkedMapLayer
+    from .flyweight import FlyweightMapLayer
+
+    print(f"--- Bulk fills ({size}x{size} walled room with a pillar grid) ---")
+    pillars = bytes(1 if x % 8 == 4 and y % 8 == 4 else 0 for y in range(size) for x in range(size))
+
+    for layer_class in (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer):
+        def per_cell():
+            layer = _fill_room(layer_class(name="Terrain", layer_type=LayerType.TERRAIN, width=size, height=size))
+            for index, pillar in enumerate(pillars):
+                if pillar:
+                    x, y = index % size, index // size
+                    layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.WALL))
+            return layer
+
+        def bulk():
+            layer = layer_class(name="Terrain", layer_type=LayerType.TERRAIN, width=size, height=size)
+            layer.fill_rect(0, 0, size - 1, size - 1, TileType.WALL)
+            layer.fill_rect(1, 1, size - 2, size - 2, TileType.FLOOR)
+            layer.fill_mask(pillars, TileType.WALL)
+            return layer
+
+        slow, slow_time = _timed(per_cell)
+        fast, fast_time = _timed(bulk)
+        assert bytes(fast.get_column('tile_type')) == bytes(slow.get_column('tile_type'))
+        print(f"{layer_class.__name__:>18}: set_tile {slow_time * 1000:7.1f}ms, "
+              f"fill_rect + fill_mask {fast_time * 1000:7.1f}ms")
+
+
+def _bbox_polygon_fill(polygon) -> list:
+    """Port of the editor's fillPolygon: a ray test per bounding-box cell."""
+    xs, ys = [x for x, _ in polygon], [y for _, y in polygon]
+    points = []
+    for y in range(min(ys), max(ys) + 1):
+        for x in range(min(xs), max(xs) + 1):
+            inside = False
+            j = len(polygon) - 1
+            for i in range(len(polygon)):
+                (xi, yi), (xj, yj) = polygon[i], polygon[j]
+                if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                    inside = not inside
+                j = i
+            if inside:
+                points.append((x, y))
+    return points
+
+
+def benchmark_raster(size: int = 512) -> None:
+    """Scanline polygons against the editor's fill, and stamping spans vs set_tile."""
+    import math
+    from .raster import circle_spans, polygon_spans, spans_to_points
+
+    print(f"--- Rasterization ({size}x{size} layer) ---")
+    center, radius = size // 2, size * 2 // 5
+    for vertices in (8, 32, 128):
+        star = [(center + round(math.cos(i * math.pi / vertices) * radius * (1 if i % 2 else 0.6)),
+                 center + round(math.sin(i * math.pi / vertices) * radius * (1 if i % 2 else 0.6)))
+                for i in range(2 * vertices)]
+        spans, span_time = _timed(polygon_spans, star)
+        points, bbox_time = _timed(_bbox_polygon_fill, star)
+        assert sorted(spans_to_points(spans)) == sorted(points)
+        print(f"{2 * vertices:3}-gon: scanline {span_time * 1000:7.2f}ms ({len(spans)} spans), "
+              f"bbox ray test {bbox_time * 1000:8.1f}ms, {bbox_time / span_time:6.0f}x")
+
+    spans = circle_spans(center, center, radius)
+    for layer_class in (MapLayer, ColumnarMapLayer):
+        def per_cell():
+            layer = layer_class(name="Terrain", layer_type=LayerType.TERRAIN, width=size, height=size)
+            for x, y in spans_to_points(spans):
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+            return layer
+
+        def stamped():
+            layer = layer_class(name="Terrain", layer_type=LayerType.TERRAIN, width=size, height=size)
+            layer.fill_spans(spans, TileType.FLOOR)
+            return layer
+
+        slow, slow_time = _timed(per_cell)
+        fast, fast_time = _timed(stamped)
+        assert bytes(fast.get_column('tile_type')) == bytes(slow.get_column('tile_type'))
+        print(f"{layer_class.__name__:>18}: circle r={radius} set_tile {slow_time * 1000:7.1f}ms, "
+              f"fill_spans {fast_time * 1000:7.1f}ms")
+
+
+def _flood_fill_rooms(layer: MapLayer) -> list:
+    """Port of the editor's detectRooms: string-keyed flood fill over floor cells."""
+    floors, walls = set(), set()
+    for x, y, tile in layer.get_all_tiles():
+        if tile is not None:
+            (floors if tile.is_passable else walls).add(f"{x},{y}")
+    visited, rooms = set(), []
+    for start in floors:
+        if start in visited:
+            continue
+        room, stack = set(), [start]
+        while stack:
+            key = stack.pop()
+            if key in visited or key not in floors:
+                continue
+            visited.add(key)
+            room.add(key)
+            x, y = map(int, key.split(','))
+            for nx, ny in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+                neighbor = f"{nx},{ny}"
+                if neighbor not in walls and neighbor in floors and neighbor not in visited:
+                    stack.append(neighbor)
+        rooms.append(room)
+    return rooms
+
+
+def benchmark_rooms(size: int = 512, edits: int = 200) -> None:
+    """Labelling rooms with union-find against a flood fill, and incremental edits."""
+    import random
+    from .rooms import RoomMap
+
+    print(f"--- Room detection ({size}x{size}, 16x16 rooms joined by doors and corridors) ---")
+    map_data = MapData(size, size, "rooms", layer_class=ColumnarMapLayer)
+    layer = map_data.get_layer("Terrain")
+    layer.fill_rect(0, 0, size - 1, size - 1, TileType.WALL)
+    for top in range(0, size - 15, 16):
+        for left in range(0, size - 15, 16):
+            layer.fill_rect(left + 1, top + 1, left + 11, top + 11, TileType.FLOOR)
+            layer.fill_rect(left + 12, top + 6, left + 16, top + 6, TileType.FLOOR)
+            layer.fill_rect(left + 12, top + 6, left + 12, top + 6, TileType.DOOR)
+
+    flooded, flood_time = _timed(_flood_fill_rooms, layer)
+    rooms, label_time = _timed(RoomMap, map_data)
+    print(f"flood fill {flood_time * 1000:8.1f}ms ({len(flooded)} areas), "
+          f"union-find {label_time * 1000:7.1f}ms ({len(rooms.rooms())} rooms, "
+          f"{len(rooms.corridors())} corridors, {len(rooms.doors())} doors)")
+
+    rng = random.Random(42)
+    cells = [(rng.randrange(1, size - 1), rng.randrange(1, size - 1)) for _ in range(edits)]
+
+    def edit():
+        for x, y in cells:
+            tile = layer.get_tile(x, y)
+            flipped = TileType.FLOOR if tile is not None and tile.tile_type == TileType.WALL else TileType.WALL
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=flipped))
+
+    _, incremental_time = _timed(edit)
+    rooms.close()
+    _, relabel_time = _timed(lambda: [RoomMap(map_data).close() for _ in range(3)])
+    print(f"{edits} set_tile edits: incremental {incremental_time / edits * 1000:6.3f}ms per edit, "
+          f"full relabel {relabel_time / 3 * 1000:7.1f}ms")
+
+
+def _string_key_walls(layer: MapLayer) -> set:
+    """Port of the editor's placeWallsAroundFloors ('surrounding') over string keys."""
+    floors = {f"{x},{y}" for x, y, tile in layer.get_all_tiles()
+              if tile is not None and tile.tile_type == TileType.FLOOR}
+    walls = set()
+    for key in floors:
+        x, y = map(int, key.split(','))
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                neighbor = f"{x + dx},{y + dy}"
+                if (neighbor not in floors and layer.is_valid_position(x + dx, y + dy)
+                        and layer.get_tile(x + dx, y + dy) is None):
+                    walls.add(neighbor)
+    return walls
+
+
+def benchmark_autowall(size: int = 512, strokes: int = 50) -> None:
+    """Walling a generated dungeon: string-keyed neighbor scan, mask shifts, incremental."""
+    import random
+    from .autowall import AutoWaller, auto_wall
+
+    print(f"--- Auto-walling ({size}x{size}, 12x12 rooms and corridors) ---")
+    for layer_class in (MapLayer, ColumnarMapLayer):
+        def dungeon():
+            layer = layer_class(name="Terrain", layer_type=LayerType.TERRAIN, width=size, height=size)
+            for top in range(0, size - 15, 16):
+                for left in range(0, size - 15, 16):
+                    layer.fill_rect(left + 1, top + 1, left + 12, top + 12, TileType.FLOOR)
+                    layer.fill_rect(left + 13, top + 6, left + 16, top + 6, TileType.FLOOR)
+            return layer
+
+        layer = dungeon()
+        keyed, keyed_time = _timed(_string_key_walls, layer)
+        placed, mask_time = _timed(auto_wall, layer)
+        assert placed == len(keyed)
+        print(f"{layer_class.__name__:>18}: string keys {keyed_time * 1000:7.1f}ms, "
+              f"auto_wall {mask_time * 1000:6.1f}ms ({placed} walls)")
+
+        waller = AutoWaller(layer)
+        waller.update()
+        rng = random.Random(42)
+        centers = [(rng.randrange(2, size - 2), rng.randrange(2, size - 2)) for _ in range(strokes)]
+
+        def paint():
+            for x, y in centers:
+                layer.fill_rect(x - 1, y - 1, x + 1, y + 1, TileType.FLOOR)
+                waller.update()
+
+        _, incremental_time = _timed(paint)
+        _, full_time = _timed(auto_wall, layer)
+        print(f"{'':>18}  3x3 brush + update {incremental_time / strokes * 1000:6.3f}ms per stroke, "
+              f"full pass {full_time * 1000:6.1f}ms")
+
+
+def _analyze_blending(layer: MapLayer, priority: Dict[TileType, int]) -> int:
+    """Port of the editor's analyzeTileBlending over string keys; counts blend edges."""
+    tiles = {f"{x},{y}": tile.tile_type.name for x, y, tile in layer.get_all_tiles() if tile is not None}
+    priorities = {tile_type.name: value for tile_type, value in priority.items()}
+    count = 0
+    for key, base in tiles.items():
+        x, y = map(int, key.split(','))
+        for dx, dy in ((0, -1), (0, 1), (1, 0), (-1, 0), (1, -1), (-1, -1), (1, 1), (-1, 1)):
+            neighbor = tiles.get(f"{x + dx},{y + dy}")
+            if neighbor is None or neighbor == base or base not in priorities or neighbor not in priorities:
+                continue
+            if priorities[neighbor] > priorities[base] or (
+                    priorities[neighbor] == priorities[base] and base < neighbor):
+                count += 1
+    return count
+
+
+def benchmark_autotile(size: int = 256, edits: int = 500) -> None:
+    """Blend analysis per cell against the autotile planes, and incremental updates."""
+    import random
+    from .autotile import AutotileRules, Autotiler
+
+    print(f"--- Autotiling ({size}x{size}, floor with water and lava pools and walls) ---")
+    rng = random.Random(42)
+    map_data = MapData(size, size, "autotile", layer_class=ColumnarMapLayer)
+    layer = map_data.get_layer("Terrain")
+    layer.fill_rect(0, 0, size - 1, size - 1, TileType.FLOOR)
+    for _ in range(size // 4):
+        x, y, radius = rng.randrange(size), rng.randrange(size), rng.randrange(2, 8)
+        tile_type = rng.choice((TileType.WATER, TileType.LAVA, TileType.WALL))
+        layer.fill_rect(x - radius, y - radius, x + radius, y + radius, tile_type)
+
+    rules = AutotileRules()
+    blend_count, analyze_time = _timed(_analyze_blending, layer, rules.blend_priority)
+    autotiler, plane_time = _timed(Autotiler, map_data, "Terrain", rules)
+    assert sum(bin(mask).count('1') for mask in autotiler.blends) == blend_count
+    print(f"analyzeTileBlending port {analyze_time * 1000:8.1f}ms, "
+          f"planes {plane_time * 1000:6.1f}ms ({blend_count} blend edges)")
+
+    cells = [(rng.randrange(size), rng.randrange(size)) for _ in range(edits)]
+
+    def edit():
+        for x, y in cells:
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=rng.choice((TileType.FLOOR, TileType.WATER))))
+
+    _, edit_time = _timed(edit)
+    autotiler.close()
+    _, bare_time = _timed(edit)
+    print(f"set_tile with autotiler {edit_time / edits * 1e6:6.1f}us, "
+          f"without {bare_time / edits * 1e6:6.1f}us")
+
+
+def _per_cell_terrain(params) -> bytes:
+    """
+    Port of the editor's per-cell generation loop (generateHeightMap /
+    generateBiomeMap): every cell samples every octave on its own. Uses
+    the generator's fixed-point noise so the results must match exactly.
+    """
+    import math
+    from .enums import TerrainType
+    from .terrain import _fields, _lattice_value, _weight
+
+    def sample(noise_field, x, y):
+        total = 0
+        for weight, octave in zip(noise_field.weights, noise_field.octaves):
+            u, v = x * octave.frequency, y * octave.frequency
+            i, j = math.floor(u), math.floor(v)
+            wx, wy = _weight(u - i), _weight(v - j)
+            salt = octave.salt
+            top = _lattice_value(salt, i, j) * (256 - wx) + _lattice_value(salt, i + 1, j) * wx
+            bottom = _lattice_value(salt, i, j + 1) * (256 - wx) + _lattice_value(salt, i + 1, j + 1) * wx
+            total += weight * ((top * (256 - wy) + bottom * wy) >> 8)
+        return total
+
+    def at_least(noise_field, level):
+        return math.ceil(noise_field.units(level))
+
+    def above(noise_field, level):
+        return math.floor(noise_field.units(level)) + 1
+
+    heights, moisture = _fields(params, 0, params.width)
+    deep, water, beach = (at_least(heights, params.water_level * 0.7),
+                          at_least(heights, params.water_level), at_least(heights, params.beach_level))
+    hill, mountain, snow = (above(heights, params.hill_level), above(heights, params.mountain_level),
+                            above(heights, params.snow_level))
+    dry, wet = at_least(moisture, params.dry_threshold), above(moisture, params.wet_threshold)
+
+    codes = bytearray()
+    for y in range(params.height):
+        for x in range(params.width):
+            h = sample(heights, x, y)
+            if h < water:
+                terrain = TerrainType.DEEP_WATER if h < deep else TerrainType.SHALLOW_WATER
+            elif h < beach:
+                terrain = TerrainType.BEACH
+            elif h >= mountain:
+                terrain = TerrainType.SNOW if h >= snow else TerrainType.MOUNTAIN
+            elif h >= hill:
+                terrain = TerrainType.HILLS
+            else:
+                m = sample(moisture, x, y)
+                terrain = (TerrainType.DESERT if m < dry else
+                           TerrainType.FOREST if m >= wet else TerrainType.GRASSLAND)
+            codes.append(terrain.value)
+    return bytes(codes)
+
+
+def benchmark_terrain(size: int = 256, large_sizes: Tuple[int, ...] = (1024, 4096)) -> None:
+    """Per-cell noise loop against row-vectorized generation, then large worlds."""
+    from .terrain import TerrainParams, classify_area, generate_terrain
+
+    print(f"--- Terrain generation ({size}x{size}, 4 + 3 octaves) ---")
+    params = TerrainParams(width=size, height=size, seed=42)
+    cell_codes, cell_time = _timed(_per_cell_terrain, params)
+    row_codes, row_time = _timed(classify_area, params)
+    assert bytes(row_codes) == cell_codes
+    print(f"per-cell loop {cell_time * 1000:8.1f}ms, packed rows {row_time * 1000:6.1f}ms "
+          f"({cell_time / row_time:.0f}x)")
+
+    for large in large_sizes:
+        params = TerrainParams(width=large, height=large, seed=42)
+        _, classify_time = _timed(classify_area, params)
+        _, generate_time = _timed(generate_terrain, params)
+        print(f"{large}x{large}: classify {classify_time:6.2f}s, "
+              f"MapData with columnar Terrain layer {generate_time:6.2f}s")
+
+
+def benchmark_terrain_parallel(size: int = 2048, worker_counts: Tuple[int, ...] = (1, 2, 4, 8)) -> None:
+    """Scaling of process-pool terrain generation with the number of workers."""
+    import os
+    from .terrain import TerrainParams, classify_area, classify_parallel
+
+    print(f"--- Parallel terrain generation ({size}x{size}, {os.cpu_count()} CPUs) ---")
+    params = TerrainParams(width=size, height=size, seed=42)
+    expected, single_time = _timed(classify_area, params)
+    print(f"single process {single_time:6.2f}s")
+    for workers in worker_counts:
+        codes, pool_time = _timed(classify_parallel, params, workers)
+        assert codes == expected
+        print(f"{workers} workers     {pool_time:6.2f}s ({single_time / pool_time:4.2f}x)")
+
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {
+    'storage': benchmark_storage,
+    'serialization': benchmark_serialization,
+    'editor_import': benchmark_editor_import,
+    'fov': benchmark_fov,
+    'pathfinding': benchmark_pathfinding,
+    'hierarchical': benchmark_hierarchical,
+    'chunked': benchmark_chunked,
+    'mapped': benchmark_mapped,
+    'tile_memory': benchmark_tile_memory,
+    'asset_index': benchmark_asset_index,
+    'spatial': benchmark_spatial,
+    'asset_manager': benchmark_asset_manager,
+    'tag_index': benchmark_tag_index,
+    'layer_lookup': benchmark_layer_lookup,
+    'changes': benchmark_changes,
+    'history': benchmark_history,
+    'snapshot': benchmark_snapshot,
+    'bulk_fill': benchmark_bulk_fill,
+    'raster': benchmark_raster,
+    'rooms': benchmark_rooms,
+    'autowall': benchmark_autowall,
+    'autotile': benchmark_autotile,
+    'terrain': benchmark_terrain,
+    'terrain_parallel': benchmark_terrain_parallel,
+}
+
+
+def main(argv=None) -> None:
+    """Run the benchmarks named in argv (all of them by default)."""
+    names = list(argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            raise SystemExit(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Change tracking for the model layer.
+
+This module defines ChangeJournal, which MapLayer uses to record every
+change it reports to its listeners: a version counter, a bounded journal
+of changed rectangles and the last version that touched each 32x32
+chunk (stored sparsely, so huge chunked worlds cost nothing extra).
+Consumers remember the version they last processed and ask for what
+changed since then, so their work is proportional to the edit instead
+of the layer.
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+# Inclusive (x1, y1, x2, y2) rectangle in layer coordinates
+Rect = Tuple[int, int, int, int]
+ChunkKey = Tuple[int, int]
+
+CHUNK_SHIFT = 5
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+
+# Number of changes kept in the journal; older ones are only reflected in
+# the chunk versions
+JOURNAL_LIMIT = 4096
+
+
+class ChangeJournal:
+    """
+    Version counter, change journal and per-chunk versions for one layer.
+
+    Every recorded change increments version. changes_since(version)
+    lists the rectangles changed after a version as long as the journal
+    still reaches back that far; dirty_regions(version) always works and
+    returns the chunks changed after it.
+
+    Args:
+        limit: Number of changes kept in the journal
+        version: Version to start counting from; changes up to it are
+            unknown, so they count as whole-layer changes
+        bounds: The layer's current inclusive bounds, if known
+    """
+
+    def __init__(self, limit: int = JOURNAL_LIMIT, version: int = 0,
+                 bounds: Optional[Rect] = None):
+        self.version = version
+        self._journal: Deque[Tuple[int, int, int, int, int]] = deque(maxlen=limit)
+        self._bounds: Optional[Rect] = bounds
+        # Last version per chunk (keyed by chunk column / row from the
+        # bounds' top-left); chunks not listed were last changed at
+        # _base_version, so whole-layer changes only reset the dict
+        self._chunk_versions: Dict[ChunkKey, int] = {}
+        self._base_version = version
+
+    def record(self, bounds: Rect, x1: int, y1: int, x2: int, y2: int) -> int:
+        """
+        Record a changed rectangle.
+
+        Args:
+            bounds: The layer's current inclusive bounds; a change of
+                bounds (resize) marks the whole layer as changed
+            x1, y1, x2, y2: Inclusive changed rectangle (clipped to bounds)
+
+        Returns:
+            The new version (unchanged if the rectangle is outside bounds)
+        """
+        if bounds is not self._bounds and bounds != self._bounds:
+            if self._bounds is not None:
+                # Resized: everything counts as changed
+                x1, y1, x2, y2 = bounds
+                self._journal.clear()
+            self._bounds = bounds
+
+        bx1, by1, bx2, by2 = bounds
+        self.version = version = self.version + 1
+        if x1 == x2 and y1 == y2 and bx1 <= x1 <= bx2 and by1 <= y1 <= by2:
+            # Single cell (set_tile, Tile.damage): the common case
+            self._journal.append((version, x1, y1, x1, y1))
+            self._chunk_versions[((x1 - bx1) >> CHUNK_SHIFT, (y1 - by1) >> CHUNK_SHIFT)] = version
+            return version
+
+        x1, y1 = max(x1, bx1), max(y1, by1)
+        x2, y2 = min(x2, bx2), min(y2, by2)
+        if x1 > x2 or y1 > y2:
+            self.version -= 1
+            return self.version
+        self._journal.append((version, x1, y1, x2, y2))
+
+        if (x1, y1, x2, y2) == bounds:
+            self._chunk_versions.clear()
+            self._base_version = version
+            return version
+
+        versions = self._chunk_versions
+        for chunk_y in range((y1 - by1) >> CHUNK_SHIFT, ((y2 - by1) >> CHUNK_SHIFT) + 1):
+            for chunk_x in range((x1 - bx1) >> CHUNK_SHIFT, ((x2 - bx1) >> CHUNK_SHIFT) + 1):
+                versions[(chunk_x, chunk_y)] = version
+        return version
+
+    def changes_since(self, version: int) -> Optional[List[Rect]]:
+        """
+        The rectangles changed after a version, oldest first.
+
+        Returns:
+            The changed rectangles (possibly overlapping), or None if the
+            journal no longer reaches back to that version; fall back to
+            dirty_regions or a full rescan then
+        """
+        if version >= self.version:
+            return []
+        journal = self._journal
+        if not journal or journal[0][0] > version + 1:
+            return None
+
+        changes = []
+        for entry in reversed(journal):
+            if entry[0] <= version:
+                break
+            changes.append(entry[1:])
+        changes.reverse()
+        return changes
+
+    def dirty_regions(self, version: int) -> List[Rect]:
+        """
+        The 32x32 chunks changed after a version, as inclusive rectangles.
+
+        Returns the whole bounds as a single rectangle when the whole
+        layer changed after the version; chunks are listed in row-major
+        order otherwise.
+        """
+        if version >= self.version or self._bounds is None:
+            return []
+        bx1, by1, bx2, by2 = self._bounds
+        if self._base_version > version:
+            return [self._bounds]
+
+        regions = []
+        for chunk_x, chunk_y in sorted((key for key, chunk_version in self._chunk_versions.items()
+                                        if chunk_version > version), key=lambda key: (key[1], key[0])):
+            x1, y1 = bx1 + (chunk_x << CHUNK_SHIFT), by1 + (chunk_y << CHUNK_SHIFT)
+            regions.append((x1, y1, min(x1 + CHUNK_MASK, bx2), min(y1 + CHUNK_MASK, by2)))
+        return regions
@@ -0,0 +1,283 @@
+"""
+Chunked layer storage for the model layer.
+
+This module defines ChunkedMapLayer, a MapLayer that stores tiles in
+fixed-size square chunks allocated on first write. Memory and iteration
+cost grow with the occupied area rather than the layer bounds, so huge
+mostly-empty worlds are cheap, and the bounds may start at negative
+coordinates.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .enums import TileType
+from .tile import Tile
+from .map_data import MapLayer
+from .columns import (
+    Column, Extras, COLUMN_NAMES, COLUMN_ENCODERS, COLUMN_DECODERS, EMPTY_CODE, DOUBLE_TYPECODE,
+    new_column, new_columns, extract_extras, tile_from_columns,
+)
+
+
+# Chunks are CHUNK_SIZE x CHUNK_SIZE cells; a power of two so that chunk
+# keys and offsets are shifts and masks (which also floor negative values)
+CHUNK_SHIFT = 5
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+
+ChunkKey = Tuple[int, int]
+
+
+@dataclass
+class ChunkedMapLayer(MapLayer):
+    """
+    A MapLayer that stores tiles in lazily allocated 32x32 chunks.
+
+    The layer covers origin_x <= x < origin_x + width and origin_y <= y <
+    origin_y + height; the origin may be negative. A chunk is allocated
+    by the first tile written into it and freed when its last tile is
+    cleared, and resize only touches the chunks crossing the new edges.
+
+    get_all_tiles and get_tiles_in_area skip empty chunks and only yield
+    occupied cells, in chunk order rather than row-major order; to_dict
+    sorts them row-major. Columns (get_column, export_columns, ...) are
+    indexed relative to the origin: (y - origin_y) * width + (x - origin_x).
+    """
+
+    # Position of the top-left cell of the layer bounds
+    origin_x: int = 0
+    origin_y: int = 0
+
+    def __post_init__(self):
+        """Set up chunk storage, importing any tiles passed as a grid."""
+        grid, self.tiles = self.tiles, []
+        self._chunks: Dict[ChunkKey, List[Optional[Tile]]] = {}
+        self._counts: Dict[ChunkKey, int] = {}
+
+        for y, row in enumerate(grid[:self.height]):
+            for x, tile in enumerate(row[:self.width]):
+                if tile is not None:
+                    self.set_tile(self.origin_x + x, self.origin_y + y, tile)
+
+    def is_valid_position(self, x: int, y: int) -> bool:
+        """Check if the given coordinates are within the layer bounds."""
+        return (self.origin_x <= x < self.origin_x + self.width
+                and self.origin_y <= y < self.origin_y + self.height)
+
+    def _get(self, x: int, y: int) -> Optional[Tile]:
+        chunk = self._chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            return None
+        return chunk[(y & CHUNK_MASK) << CHUNK_SHIFT | (x & CHUNK_MASK)]
+
+    def _set(self, x: int, y: int, tile: Optional[Tile]) -> None:
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        offset = (y & CHUNK_MASK) << CHUNK_SHIFT | (x & CHUNK_MASK)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            if tile is None:
+                return
+            chunk = self._chunks[key] = [None] * (CHUNK_SIZE * CHUNK_SIZE)
+            self._counts[key] = 0
+
+        previous = chunk[offset]
+        if previous is not None:
+            if previous._layer is self:
+                previous._layer = None
+            self._counts[key] -= 1
+        if tile is not None:
+            if tile._is_view:
+                tile = tile._standalone(x, y)
+            tile._layer = self
+            self._counts[key] += 1
+        chunk[offset] = tile
+
+        if not self._counts[key]:
+            del self._chunks[key]
+            del self._counts[key]
+
+    def _iter_chunk(self, key: ChunkKey, min_x: int, min_y: int,
+                    max_x: int, max_y: int) -> Iterator[Tuple[int, int, Tile]]:
+        """Yield the occupied cells of a chunk inside an inclusive rectangle."""
+        chunk = self._chunks[key]
+        base_x, base_y = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+        x1, x2 = max(min_x, base_x), min(max_x, base_x + CHUNK_MASK)
+        for y in range(max(min_y, base_y), min(max_y, base_y + CHUNK_MASK) + 1):
+            row = (y - base_y) << CHUNK_SHIFT
+            for x in range(x1, x2 + 1):
+                tile = chunk[row + x - base_x]
+                if tile is not None:
+                    yield x, y, tile
+
+    def _bounds(self) -> Tuple[int, int, int, int]:
+        """Inclusive (x1, y1, x2, y2) of the layer bounds."""
+        return (self.origin_x, self.origin_y,
+                self.origin_x + self.width - 1, self.origin_y + self.height - 1)
+
+    def get_tiles_in_area(self, x1: int, y1: int, x2: int, y2: int) -> List[Tuple[int, int, Optional[Tile]]]:
+        """Get the occupied tiles within a rectangular area (empty cells are skipped)."""
+        bx1, by1, bx2, by2 = self._bounds()
+        min_x, max_x = max(bx1, min(x1, x2)), min(bx2, max(x1, x2))
+        min_y, max_y = max(by1, min(y1, y2)), min(by2, max(y1, y2))
+        if min_x > max_x or min_y > max_y:
+            return []
+
+        chunk_x1, chunk_x2 = min_x >> CHUNK_SHIFT, max_x >> CHUNK_SHIFT
+        chunk_y1, chunk_y2 = min_y >> CHUNK_SHIFT, max_y >> CHUNK_SHIFT
+        if (chunk_x2 - chunk_x1 + 1) * (chunk_y2 - chunk_y1 + 1) <= len(self._chunks):
+            keys = [(cx, cy) for cy in range(chunk_y1, chunk_y2 + 1)
+                    for cx in range(chunk_x1, chunk_x2 + 1) if (cx, cy) in self._chunks]
+        else:
+            keys = sorted((key for key in self._chunks
+                           if chunk_x1 <= key[0] <= chunk_x2 and chunk_y1 <= key[1] <= chunk_y2),
+                          key=lambda key: (key[1], key[0]))
+
+        tiles = []
+        for key in keys:
+            tiles.extend(self._iter_chunk(key, min_x, min_y, max_x, max_y))
+        return tiles
+
+    def _snapshot_chunk_keys(self, x1: int, y1: int, x2: int, y2: int) -> List[ChunkKey]:
+        # Only allocated chunks can hold tiles
+        chunk_x1, chunk_x2 = x1 >> CHUNK_SHIFT, x2 >> CHUNK_SHIFT
+        chunk_y1, chunk_y2 = y1 >> CHUNK_SHIFT, y2 >> CHUNK_SHIFT
+        return [key for key in list(self._chunks)
+                if chunk_x1 <= key[0] <= chunk_x2 and chunk_y1 <= key[1] <= chunk_y2]
+
+    def get_all_tiles(self) -> Iterator[Tuple[int, int, Optional[Tile]]]:
+        """Iterate through the occupied cells, chunk by chunk (empty cells are skipped)."""
+        bounds = self._bounds()
+        for key in list(self._chunks):
+            if key in self._chunks:
+                yield from self._iter_chunk(key, *bounds)
+
+    def count_tiles(self, tile_type: Optional[TileType] = None) -> int:
+        """
+        Count occupied cells.
+
+        Args:
+            tile_type: Only count tiles of this type (all tiles if None)
+        """
+        if tile_type is None:
+            return sum(self._counts.values())
+        return sum(1 for _x, _y, tile in self.get_all_tiles() if tile.tile_type == tile_type)
+
+    def chunk_count(self) -> int:
+        """Number of allocated chunks."""
+        return len(self._chunks)
+
+    # Column access, relative to the origin
+
+    def get_column(self, name: str) -> Column:
+        """Get one tile attribute for the whole layer (see MapLayer.get_column)."""
+        column = new_column(name, self.width * self.height)
+        encode = COLUMN_ENCODERS[name]
+        for x, y, tile in self.get_all_tiles():
+            column[(y - self.origin_y) * self.width + x - self.origin_x] = encode(tile)
+        return column
+
+    def set_column(self, name: str, values: Column) -> None:
+        """Set one attribute for every existing tile (see MapLayer.set_column)."""
+        if name == 'tile_type':
+            raise ValueError("tile_type cannot be set as a column; set or clear tiles instead")
+        if len(values) != self.width * self.height:
+            raise ValueError(
+                f"Column size {len(values)} does not match layer size "
+                f"{self.width}x{self.height}"
+            )
+
+        decode = COLUMN_DECODERS[name]
+        changes = []
+        for x, y, tile in self.get_all_tiles():
+            value = decode(values[(y - self.origin_y) * self.width + x - self.origin_x])
+            if getattr(tile, name) != value:
+                changes.append((x, y, value))
+        self._write_changes(name, changes)
+
+    def export_columns(self) -> Tuple[Dict[str, Column], Extras]:
+        """Export the whole layer as columns (see MapLayer.export_columns)."""
+        columns = new_columns(self.width * self.height, DOUBLE_TYPECODE)
+        encoders = [(columns[name], COLUMN_ENCODERS[name]) for name in COLUMN_NAMES]
+        extras = {}
+
+        for x, y, tile in self.get_all_tiles():
+            index = (y - self.origin_y) * self.width + x - self.origin_x
+            for column, encode in encoders:
+                column[index] = encode(tile)
+            tile_extras = extract_extras(tile)
+            if tile_extras:
+                extras[(x, y)] = tile_extras
+
+        return columns, extras
+
+    def import_columns(self, columns: Dict[str, Column], extras: Optional[Extras] = None) -> None:
+        """Replace the whole layer content from columns (see MapLayer.import_columns)."""
+        self._will_replace()
+        extras = extras or {}
+        width = self.width
+        tile_types = columns['tile_type']
+        if len(tile_types) != width * self.height:
+            raise ValueError(
+                f"Column size {len(tile_types)} does not match layer size "
+                f"{width}x{self.height}"
+            )
+
+        self._chunks.clear()
+        self._counts.clear()
+        for index, code in enumerate(tile_types):
+            if code != EMPTY_CODE:
+                x, y = self.origin_x + index % width, self.origin_y + index // width
+                self._set(x, y, tile_from_columns(columns, index, x, y, extras.get((x, y))))
+        self._notify_replaced()
+
+    def to_dict(self, include_tiles: bool = True) -> Dict[str, Any]:
+        """Convert the layer to a dictionary, tiles in row-major order (see MapLayer.to_dict)."""
+        data = super().to_dict(include_tiles)
+        if include_tiles:
+            data["tiles"].sort(key=lambda tile: (tile["y"], tile["x"]))
+        data["origin_x"] = self.origin_x
+        data["origin_y"] = self.origin_y
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChunkedMapLayer':
+        """Create a layer from a dictionary produced by to_dict."""
+        layer = super().from_dict(dict(data, tiles=[]))
+        layer.origin_x = data.get("origin_x", 0)
+        layer.origin_y = data.get("origin_y", 0)
+
+        for tile_data in data.get("tiles", []):
+            layer.set_tile(tile_data["x"], tile_data["y"], Tile.from_dict(tile_data))
+
+        return layer
+
+    def resize(self, new_width: int, new_height: int) -> None:
+        """
+        Resize the layer (keeping the origin) and drop the tiles outside.
+
+        Only chunks crossing or beyond the new right/bottom edges are
+        touched; growing the layer allocates nothing.
+        """
+        self._will_replace()
+        end_x, end_y = self.origin_x + new_width, self.origin_y + new_height
+        for key in list(self._chunks):
+            base_x, base_y = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+            if base_x + CHUNK_SIZE <= end_x and base_y + CHUNK_SIZE <= end_y:
+                continue
+            if base_x >= end_x or base_y >= end_y:
+                for tile in self._chunks[key]:
+                    if tile is not None and tile._layer is self:
+                        tile._layer = None
+                del self._chunks[key]
+                del self._counts[key]
+                continue
+            # Chunk crossing the new edge: clear the cells beyond it
+            for y in range(base_y, base_y + CHUNK_SIZE):
+                for x in range(base_x, base_x + CHUNK_SIZE):
+                    if (x >= end_x or y >= end_y) and key in self._chunks:
+                        self._set(x, y, None)
+
+        self.width = new_width
+        self.height = new_height
+        self._notify_replaced()
@@ -0,0 +1,268 @@
+"""
+Compact binary map format for the model layer.
+
+This module saves and loads MapData in a versioned little-endian binary
+format. Map and layer metadata are stored as JSON; every tile column (see
+model.columns) is stored run-length encoded, and the sparse per-cell extras
+(properties, asset instances, ...) are stored as JSON. Float columns keep
+the precision the layer exported them with (float64 for layers storing
+Tile objects, float32 for column-backed ones), so every layer round-trips
+exactly.
+
+Layout (all integers little-endian)::
+
+    magic "DMAP" | u16 version | u32 header length | header JSON
+    per layer, in header order:
+        per column in COLUMN_NAMES:
+            float columns only: u8 item size (4 = float32, 8 = float64)
+            u32 run count | run values (count * item size) | run lengths (count * u32)
+        u32 extras length | extras JSON
+"""
+
+import json
+import struct
+import sys
+from itertools import accumulate
+from array import array
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from .assets import AssetInstance
+from .columns import Column, Extras, COLUMN_NAMES, BYTE_COLUMNS, FLOAT_TYPECODE, DOUBLE_TYPECODE, float_column
+from .map_data import MapData, MapLayer
+
+
+MAGIC = b'DMAP'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHI')
+_U32 = struct.Struct('<I')
+_U8 = struct.Struct('<B')
+
+# Item size -> array typecode of the stored float columns
+_FLOAT_TYPECODES = {4: FLOAT_TYPECODE, 8: DOUBLE_TYPECODE}
+
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+# Maps every non-zero byte to 1, used to locate run boundaries
+_NONZERO = bytes([0] + [1] * 255)
+
+
+def _little_endian(values: array) -> bytes:
+    """Get the raw bytes of an array in little-endian byte order."""
+    if _BIG_ENDIAN and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _native_array(typecode: str, data: bytes) -> array:
+    """Build an array from little-endian raw bytes."""
+    values = array(typecode)
+    values.frombytes(data)
+    if _BIG_ENDIAN and values.itemsize > 1:
+        values.byteswap()
+    return values
+
+
+def _item_bytes(column: Column) -> Tuple[bytes, int]:
+    """Get a column's raw little-endian bytes and its item size."""
+    if isinstance(column, array):
+        return _little_endian(column), column.itemsize
+    return bytes(column), 1
+
+
+def encode_runs(data: bytes, item_size: int = 1) -> bytes:
+    """
+    Run-length encode a buffer of fixed-size items.
+
+    Args:
+        data: Raw item bytes (length must be a multiple of item_size)
+        item_size: Size of one item in bytes
+
+    Returns:
+        u32 run count, the run values, then the u32 run lengths
+    """
+    count = len(data) // item_size
+    if count == 0:
+        return _U32.pack(0)
+    if data == data[:item_size] * count:
+        # Uniform column (e.g. an empty layer): a single run
+        return _U32.pack(1) + data[:item_size] + _U32.pack(count)
+
+    # XOR every item with its predecessor (as big ints, at C speed); the
+    # non-zero bytes of the result mark the items that start a new run
+    changed = (
+        int.from_bytes(data[item_size:], 'big') ^ int.from_bytes(data[:-item_size], 'big')
+    ).to_bytes(len(data) - item_size, 'big').translate(_NONZERO)
+
+    if item_size > 1:
+        # Fold each item's bytes into its last byte, then keep one per item
+        flags = int.from_bytes(changed, 'big')
+        folded = flags
+        for shift in range(1, item_size):
+            folded |= flags >> (8 * shift)
+        changed = folded.to_bytes(len(changed), 'big')[item_size - 1::item_size]
+
+    # Each gap between two boundaries is one run
+    lengths = array('I', [len(gap) + 1 for gap in changed.split(b'\x01')])
+    starts = accumulate(lengths[:-1], initial=0)
+    if item_size == 1:
+        values = bytes([data[start] for start in starts])
+    else:
+        values = b''.join([data[start * item_size:(start + 1) * item_size] for start in starts])
+
+    return _U32.pack(len(lengths)) + values + _little_endian(lengths)
+
+
+def decode_runs(data: bytes, offset: int, item_size: int = 1) -> Tuple[bytes, int]:
+    """
+    Decode a run-length encoded buffer written by encode_runs.
+
+    Args:
+        data: Encoded data
+        offset: Position of the run count in data
+        item_size: Size of one item in bytes
+
+    Returns:
+        The decoded raw bytes and the offset just past the encoded runs
+    """
+    (count,) = _U32.unpack_from(data, offset)
+    offset += _U32.size
+    values_end = offset + count * item_size
+    lengths_end = values_end + count * 4
+    if lengths_end > len(data):
+        raise ValueError("Truncated run-length data")
+
+    values = data[offset:values_end]
+    lengths = _native_array('I', data[values_end:lengths_end])
+    decoded = b''.join(
+        values[i * item_size:(i + 1) * item_size] * length
+        for i, length in enumerate(lengths)
+    )
+    return decoded, lengths_end
+
+
+def encode_extras(extras: Extras) -> bytes:
+    """Serialize per-cell extras to JSON bytes."""
+    entries = []
+    for (x, y), values in extras.items():
+        entry = dict(values, x=x, y=y)
+        if 'asset_instances' in entry:
+            entry['asset_instances'] = [
+                instance.to_dict() for instance in entry['asset_instances']
+            ]
+        entries.append(entry)
+    return json.dumps(entries, separators=(',', ':')).encode('utf-8')
+
+
+def decode_extras(data: bytes) -> Extras:
+    """Deserialize per-cell extras written by encode_extras."""
+    extras = {}
+    for entry in json.loads(data.decode('utf-8')):
+        position = (entry.pop('x'), entry.pop('y'))
+        if 'asset_instances' in entry:
+            entry['asset_instances'] = [
+                AssetInstance.from_dict(instance) for instance in entry['asset_instances']
+            ]
+        extras[position] = entry
+    return extras
+
+
+def encode_map(map_data: MapData) -> bytes:
+    """
+    Encode a map (including all tiles) into the binary format.
+
+    Args:
+        map_data: Map to encode
+
+    Returns:
+        The encoded bytes
+    """
+    header = json.dumps(map_data.to_dict(include_tiles=False)).encode('utf-8')
+    parts: List[bytes] = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(header)), header]
+
+    for layer in map_data.layers:
+        columns, extras = layer.export_columns()
+        for name in COLUMN_NAMES:
+            column = columns[name]
+            if name not in BYTE_COLUMNS:
+                if getattr(column, 'typecode', None) not in _FLOAT_TYPECODES.values():
+                    column = float_column(column, DOUBLE_TYPECODE)
+                parts.append(_U8.pack(column.itemsize))
+            raw, item_size = _item_bytes(column)
+            parts.append(encode_runs(raw, item_size))
+
+        encoded_extras = encode_extras(extras)
+        parts.append(_U32.pack(len(encoded_extras)))
+        parts.append(encoded_extras)
+
+    return b''.join(parts)
+
+
+def decode_map(data: bytes, layer_class: Optional[Type[MapLayer]] = None) -> MapData:
+    """
+    Decode a map written by encode_map.
+
+    Args:
+        data: Encoded bytes
+        layer_class: Storage implementation for the layers (MapLayer by
+            default; ColumnarMapLayer loads fastest)
+
+    Returns:
+        The decoded map
+
+    Raises:
+        ValueError: If the data is not a supported map file
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Data is too short to be a map file")
+
+    magic, version, header_length = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary map file (bad magic)")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported map format version {version}")
+
+    offset = _HEADER.size
+    header: Dict[str, Any] = json.loads(data[offset:offset + header_length].decode('utf-8'))
+    offset += header_length
+
+    map_data = MapData.from_dict(header, layer_class)
+
+    for layer in map_data.layers:
+        size = layer.width * layer.height
+        columns = {}
+        for name in COLUMN_NAMES:
+            if name in BYTE_COLUMNS:
+                raw, offset = decode_runs(data, offset, 1)
+                column = bytearray(raw)
+            else:
+                (item_size,) = _U8.unpack_from(data, offset)
+                if item_size not in _FLOAT_TYPECODES:
+                    raise ValueError(f"Column '{name}' of layer '{layer.name}' has item size {item_size}")
+                raw, offset = decode_runs(data, offset + _U8.size, item_size)
+                column = _native_array(_FLOAT_TYPECODES[item_size], raw)
+            if len(column) != size:
+                raise ValueError(f"Column '{name}' of layer '{layer.name}' has the wrong size")
+            columns[name] = column
+
+        (extras_length,) = _U32.unpack_from(data, offset)
+        offset += _U32.size
+        extras = decode_extras(data[offset:offset + extras_length])
+        offset += extras_length
+
+        layer.import_columns(columns, extras)
+
+    return map_data
+
+
+def save_map(map_data: MapData, path: str) -> None:
+    """Write a map to a file in the binary format."""
+    with open(path, 'wb') as file:
+        file.write(encode_map(map_data))
+
+
+def load_map(path: str, layer_class: Optional[Type[MapLayer]] = None) -> MapData:
+    """Read a map from a binary format file (see decode_map)."""
+    with open(path, 'rb') as file:
+        return decode_map(file.read(), layer_class)
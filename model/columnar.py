@@ -0,0 +1,524 @@
+"""
+Columnar layer storage for the model layer.
+
+This module defines ColumnarMapLayer, a MapLayer that keeps tile state in
+compact typed buffers (one byte or float32 per cell per attribute) instead
+of one Tile object per cell, and ColumnarTile, the lightweight view that
+get_tile returns for it.
+"""
+
+import copy
+import re
+import uuid
+from array import array
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .enums import TileType, BiomeType
+from .assets import AssetInstance
+from .tile import Tile
+from .map_data import MapLayer
+from .columns import (
+    Column, Extras, COLUMN_NAMES, BYTE_COLUMNS, EMPTY_CODE, KEEP_CODE, FLOAT_TYPECODE,
+    TILE_TYPE_BY_CODE, BIOME_TYPE_BY_CODE, NAN, EXTRA_DEFAULTS,
+    new_columns, decode_optional_float, extract_extras, mask_and, nonzero_mask,
+    default_flag_table, float_column, changed_rect,
+)
+
+
+# bytes.translate table: 0xFF for occupied cells, 0 for empty ones
+_OCCUPIED_BYTE_TABLE = bytes([0] + [0xFF] * 255)
+
+# Runs of empty cells in a code buffer
+_EMPTY_RUN = re.compile(rb'\x00+')
+
+# Read-only stand-ins for the properties / asset_instances of cells without extras
+_EMPTY_PROPERTIES: Mapping[str, Any] = MappingProxyType({})
+_EMPTY_ASSET_INSTANCES: Sequence[AssetInstance] = ()
+
+# Type code -> default flag of a new tile of that type
+_PASSABLE_TABLE = default_flag_table('is_passable')
+_TRANSPARENT_TABLE = default_flag_table('is_transparent')
+
+
+def _flag_property(name: str) -> property:
+    """Create a property that reads/writes a boolean byte column."""
+    def fget(self):
+        return bool(self._layer._columns[name][self._cell()])
+
+    def fset(self, value):
+        self._layer._columns[name][self._cell()] = 1 if value else 0
+
+    return property(fget, fset)
+
+
+def _enum_property(name: str, by_code: Tuple) -> property:
+    """Create a property that reads/writes an enum code column."""
+    def fget(self):
+        return by_code[self._layer._columns[name][self._cell()]]
+
+    def fset(self, value):
+        self._layer._columns[name][self._cell()] = value.value
+
+    return property(fget, fset)
+
+
+def _float_property(name: str, optional: bool) -> property:
+    """Create a property that reads/writes a float32 column."""
+    def fget(self):
+        value = self._layer._columns[name][self._cell()]
+        return decode_optional_float(value) if optional else value
+
+    def fset(self, value):
+        if value is None:
+            value = NAN
+        self._layer._columns[name][self._cell()] = value
+
+    return property(fget, fset)
+
+
+def _extra_property(name: str, empty=None) -> property:
+    """
+    Create a property backed by the layer's sparse per-cell extras.
+
+    A missing mutable field (properties, asset_instances) reads as a
+    shared immutable empty, so reads never grow the extras and in-place
+    writes to it raise instead of being lost; ColumnarTile.set_property /
+    add_asset_instance (or assigning the attribute) store a real one.
+    """
+    def fget(self):
+        extras = self._layer._extras.get((self.x, self.y))
+        if extras is not None and name in extras:
+            return extras[name]
+        if empty is None:
+            return EXTRA_DEFAULTS[name]
+        return empty
+
+    def fset(self, value):
+        self._layer._extras.setdefault((self.x, self.y), {})[name] = value
+
+    return property(fget, fset)
+
+
+class ColumnarTile(Tile):
+    """
+    A Tile view onto one cell of a ColumnarMapLayer.
+
+    Views are created on demand by ColumnarMapLayer.get_tile and hold no
+    tile state of their own: every attribute read or write goes straight
+    to the layer's columns, so all Tile methods (damage, heal, ...) work
+    unchanged. A view follows its x/y, so it always refers to the cell at
+    its current coordinates. properties and asset_instances read as
+    immutable empties until the cell has some, so add to them with
+    set_property / add_asset_instance.
+    """
+
+    tile_type = _enum_property('tile_type', TILE_TYPE_BY_CODE)
+    biome_type = _enum_property('biome_type', BIOME_TYPE_BY_CODE)
+
+    is_passable = _flag_property('is_passable')
+    is_transparent = _flag_property('is_transparent')
+    is_discovered = _flag_property('is_discovered')
+    is_visible = _flag_property('is_visible')
+
+    movement_cost = _float_property('movement_cost', optional=False)
+    max_health = _float_property('max_health', optional=True)
+    current_health = _float_property('current_health', optional=True)
+
+    is_interactive = _extra_property('is_interactive')
+    interaction_range = _extra_property('interaction_range')
+    properties = _extra_property('properties', _EMPTY_PROPERTIES)
+    asset_instances = _extra_property('asset_instances', _EMPTY_ASSET_INSTANCES)
+
+    _is_view = True
+
+    def __init__(self, layer: 'ColumnarMapLayer', x: int, y: int):
+        self._layer = layer
+        self.x = x
+        self.y = y
+
+    def _cell(self) -> int:
+        """Flat column index of the cell this view refers to."""
+        return self.y * self._layer.width + self.x
+
+    def __reduce_ex__(self, protocol):
+        """Pickle / copy a view as a standalone Tile with the cell's state."""
+        return Tile.from_dict, (self.to_dict(),)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the tile to a dictionary for serialization."""
+        data = super().to_dict()
+        data["properties"] = dict(self.properties)
+        return data
+
+    def _stored(self, name: str, factory) -> Any:
+        """The cell's stored properties / asset_instances, created if missing."""
+        extras = self._layer._extras.setdefault((self.x, self.y), {})
+        if name not in extras:
+            extras[name] = factory()
+        return extras[name]
+
+    def set_property(self, key: str, value: Any) -> None:
+        """Set a tile-specific property."""
+        self._stored('properties', dict)
+        super().set_property(key, value)
+
+    def add_asset_instance(self, asset_instance: AssetInstance) -> None:
+        """Add an asset instance to this tile."""
+        self._stored('asset_instances', list)
+        super().add_asset_instance(asset_instance)
+
+
+class ColumnarMapLayer(MapLayer):
+    """
+    A MapLayer that stores tiles column-wise in compact buffers.
+
+    tile_type, biome_type and the boolean flags take one byte per cell;
+    movement_cost and health take a float32 each. The rarely used fields
+    (interaction settings, properties, asset_instances) live in a sparse
+    dict keyed by position. Tile objects are only created as ColumnarTile
+    views when get_tile is called.
+
+    Note that set_tile copies the tile's state into the columns; later
+    changes to the passed Tile object itself are not seen by the layer.
+    Use the view returned by get_tile to modify a stored tile.
+    """
+
+    def __post_init__(self):
+        """Allocate the columns, importing any tiles passed as a grid."""
+        grid, self.tiles = self.tiles, []
+        self._columns: Dict[str, Column] = new_columns(self.width * self.height)
+        self._extras: Dict[Tuple[int, int], Dict[str, Any]] = {}
+
+        for y, row in enumerate(grid[:self.height]):
+            for x, tile in enumerate(row[:self.width]):
+                if tile is not None:
+                    self.set_tile(x, y, tile)
+
+    def _get(self, x: int, y: int) -> Optional[Tile]:
+        if self._columns['tile_type'][y * self.width + x] == EMPTY_CODE:
+            return None
+        return ColumnarTile(self, x, y)
+
+    def _set(self, x: int, y: int, tile: Optional[Tile]) -> None:
+        index = y * self.width + x
+        columns = self._columns
+
+        if tile is None:
+            for name in BYTE_COLUMNS:
+                columns[name][index] = 0
+            columns['movement_cost'][index] = 0.0
+            columns['max_health'][index] = NAN
+            columns['current_health'][index] = NAN
+            self._extras.pop((x, y), None)
+            return
+
+        # Read everything first: tile may be a view of this very cell.
+        # A view of another cell must not share its containers
+        if isinstance(tile, ColumnarTile):
+            source = tile._layer._extras.get((tile.x, tile.y))
+            if not source:
+                extras = {}
+            elif tile._layer is self and (tile.x, tile.y) == (x, y):
+                extras = dict(source)
+            else:
+                extras = copy.deepcopy(source)
+        else:
+            extras = extract_extras(tile)
+
+        columns['tile_type'][index] = tile.tile_type.value
+        columns['biome_type'][index] = tile.biome_type.value
+        columns['is_passable'][index] = 1 if tile.is_passable else 0
+        columns['is_transparent'][index] = 1 if tile.is_transparent else 0
+        columns['is_discovered'][index] = 1 if tile.is_discovered else 0
+        columns['is_visible'][index] = 1 if tile.is_visible else 0
+        columns['movement_cost'][index] = tile.movement_cost
+        columns['max_health'][index] = NAN if tile.max_health is None else tile.max_health
+        columns['current_health'][index] = NAN if tile.current_health is None else tile.current_health
+
+        if extras:
+            self._extras[(x, y)] = extras
+        else:
+            self._extras.pop((x, y), None)
+
+    def get_all_tiles(self) -> Iterator[Tuple[int, int, Optional[Tile]]]:
+        """Iterate through all tile positions in the layer."""
+        tile_types = self._columns['tile_type']
+        width = self.width
+        index = 0
+        for y in range(self.height):
+            for x in range(width):
+                if tile_types[index] == EMPTY_CODE:
+                    yield x, y, None
+                else:
+                    yield x, y, ColumnarTile(self, x, y)
+                index += 1
+
+    def _asset_instances_at(self, x: int, y: int) -> List[AssetInstance]:
+        # Read the extras directly instead of creating a view
+        extras = self._extras.get((x, y))
+        return extras.get('asset_instances', []) if extras else []
+
+    def _iter_asset_instances(self) -> Iterator[Tuple[int, int, AssetInstance]]:
+        for (x, y), extras in list(self._extras.items()):
+            for instance in extras.get('asset_instances', ()):
+                yield x, y, instance
+
+    def _write_codes(self, rect: Tuple[int, int, int, int], codes: bytes, biome_type: BiomeType) -> None:
+        # Derive every column from the codes with translate tables; no
+        # Tile objects are created
+        size = len(codes)
+        keep_table = bytes(range(KEEP_CODE)) + bytes(1)
+        movement_cost = array(FLOAT_TYPECODE, [1.0]) * size
+        for run in _EMPTY_RUN.finditer(codes):
+            start, end = run.span()
+            movement_cost[start:end] = array(FLOAT_TYPECODE, [0.0]) * (end - start)
+        values = {
+            'tile_type': codes.translate(keep_table),
+            'biome_type': codes.translate(bytes([0] + [biome_type.value] * (KEEP_CODE - 1) + [0])),
+            'is_passable': codes.translate(_PASSABLE_TABLE),
+            'is_transparent': codes.translate(_TRANSPARENT_TABLE),
+            'is_discovered': bytes(size),
+            'is_visible': bytes(size),
+            'movement_cost': movement_cost,
+            'max_health': array(FLOAT_TYPECODE, [NAN]) * size,
+            'current_health': array(FLOAT_TYPECODE, [NAN]) * size,
+        }
+        written = None if KEEP_CODE not in codes else codes.translate(bytes([1] * KEEP_CODE + [0]))
+        self._write_rows(rect, values, written, {})
+
+    def _blit(self, source: MapLayer, rect: Tuple[int, int, int, int], dx: int, dy: int,
+              include_empty: bool) -> int:
+        if not isinstance(source, ColumnarMapLayer):
+            return super()._blit(source, rect, dx, dy, include_empty)
+
+        # Slice the source columns row by row
+        x1, y1, x2, y2 = rect
+        sx1, sx2 = x1 - dx, x2 - dx
+        source_width = source.width
+        values = {}
+        for name, column in source._columns.items():
+            view = memoryview(column)
+            copied = bytearray() if name in BYTE_COLUMNS else array(FLOAT_TYPECODE)
+            for sy in range(y1 - dy, y2 - dy + 1):
+                start = sy * source_width
+                if name in BYTE_COLUMNS:
+                    copied += view[start + sx1:start + sx2 + 1]
+                else:
+                    copied.frombytes(view[start + sx1:start + sx2 + 1].cast('B'))
+            values[name] = copied
+
+        extras = {}
+        for (sx, sy), source_extras in source._extras.items():
+            if sx1 <= sx <= sx2 and y1 - dy <= sy <= y2 - dy:
+                copied_extras = copy.deepcopy(source_extras)
+                for instance in copied_extras.get('asset_instances', ()):
+                    instance.instance_id = str(uuid.uuid4())
+                extras[(sx + dx, sy + dy)] = copied_extras
+
+        written = None if include_empty else nonzero_mask(values['tile_type'])
+        self._write_rows(rect, values, written, extras)
+        return len(values['tile_type']) if written is None else written.count(1)
+
+    def _write_rows(self, rect: Tuple[int, int, int, int], values: Dict[str, Column],
+                    written: Optional[bytes], extras: Extras) -> None:
+        """
+        Write rect-sized row-major column values into a rectangle.
+
+        Args:
+            rect: Inclusive, already clipped rectangle
+            values: New value per column for every cell of rect
+            written: 0/1 per cell of rect selecting the cells to write
+                (all cells if None)
+            extras: New extras of the written cells, keyed by position
+        """
+        x1, y1, x2, y2 = rect
+        rect_width = x2 - x1 + 1
+        width = self.width
+        # Rectangles spanning whole rows are contiguous: write them as one
+        # segment instead of row by row
+        if rect_width == width:
+            segments = [(0, len(values['tile_type']), y1 * width)]
+        else:
+            segments = [(row * rect_width, (row + 1) * rect_width, (y1 + row) * width + x1)
+                        for row in range(y2 - y1 + 1)]
+
+        for start, end, dst in segments:
+            length = end - start
+            segment_mask = None if written is None else written[start:end]
+            if segment_mask is not None and 0 not in segment_mask:
+                segment_mask = None
+            elif segment_mask is not None and 1 not in segment_mask:
+                continue
+            float_select = None
+
+            for name, column in self._columns.items():
+                new = values[name][start:end]
+                if segment_mask is None:
+                    column[dst:dst + length] = new
+                elif name in BYTE_COLUMNS:
+                    # Select per cell with big-integer masks: 0xFF where written
+                    select = int.from_bytes(segment_mask.translate(_OCCUPIED_BYTE_TABLE), 'little')
+                    old = int.from_bytes(column[dst:dst + length], 'little')
+                    merged = (old & ~select) | (int.from_bytes(new, 'little') & select)
+                    column[dst:dst + length] = merged.to_bytes(length, 'little')
+                else:
+                    # Same select over the raw float bytes, each mask byte
+                    # widened to the item size
+                    if float_select is None:
+                        byte_select = segment_mask.translate(_OCCUPIED_BYTE_TABLE)
+                        widened = bytearray(length * column.itemsize)
+                        for lane in range(column.itemsize):
+                            widened[lane::column.itemsize] = byte_select
+                        float_select = int.from_bytes(widened, 'little')
+                    old = int.from_bytes(column[dst:dst + length].tobytes(), 'little')
+                    merged = (old & ~float_select) | (int.from_bytes(new.tobytes(), 'little') & float_select)
+                    merged_column = array(FLOAT_TYPECODE)
+                    merged_column.frombytes(merged.to_bytes(len(widened), 'little'))
+                    column[dst:dst + length] = merged_column
+
+        # Written cells lose their old extras
+        cells = (x2 - x1 + 1) * (y2 - y1 + 1)
+        if len(self._extras) <= cells:
+            stale = [position for position in self._extras
+                     if x1 <= position[0] <= x2 and y1 <= position[1] <= y2]
+        else:
+            stale = [(x, y) for y in range(y1, y2 + 1) for x in range(x1, x2 + 1)
+                     if (x, y) in self._extras]
+        for x, y in stale:
+            if written is None or written[(y - y1) * rect_width + (x - x1)]:
+                del self._extras[(x, y)]
+        self._extras.update(extras)
+
+    def get_column(self, name: str) -> Column:
+        """Get a copy of one attribute column (see MapLayer.get_column)."""
+        column = self._columns[name]
+        return column[:]
+
+    def set_column(self, name: str, values: Column) -> None:
+        """Set one attribute for every existing tile (see MapLayer.set_column)."""
+        if name == 'tile_type':
+            raise ValueError("tile_type cannot be set as a column; set or clear tiles instead")
+        size = self.width * self.height
+        if len(values) != size:
+            raise ValueError(
+                f"Column size {len(values)} does not match layer size "
+                f"{self.width}x{self.height}"
+            )
+
+        tile_types = self._columns['tile_type']
+        column = self._columns[name]
+        if name in BYTE_COLUMNS:
+            # Keep empty cells zeroed: AND with a 0xFF-per-occupied-cell mask
+            new = mask_and(values, tile_types.translate(_OCCUPIED_BYTE_TABLE))
+            rect = changed_rect(column, new, self.width)
+            if rect is not None:
+                self.will_change(*rect)
+                column[:] = new
+                self._notify(*rect)
+            return
+
+        changes = []
+        for index, code in enumerate(tile_types):
+            if code != EMPTY_CODE:
+                old, value = column[index], values[index]
+                # NaN (no health) never compares equal
+                if old != value and (old == old or value == value):
+                    changes.append((index % self.width, index // self.width, value))
+        self._write_changes(name, changes)
+
+    def _set_attribute(self, x: int, y: int, name: str, value: Any) -> None:
+        self._columns[name][y * self.width + x] = value
+
+    def export_columns(self) -> Tuple[Dict[str, Column], Extras]:
+        """Export copies of the columns and extras (see MapLayer.export_columns)."""
+        columns = {name: column[:] for name, column in self._columns.items()}
+        extras = {position: dict(values) for position, values in self._extras.items()}
+        return columns, extras
+
+    def import_columns(self, columns: Dict[str, Column], extras: Optional[Extras] = None) -> None:
+        """Replace the layer content from columns (see MapLayer.import_columns)."""
+        self._will_replace()
+        size = self.width * self.height
+        new = new_columns(size)
+        for name in COLUMN_NAMES:
+            if len(columns[name]) != size:
+                raise ValueError(
+                    f"Column '{name}' size {len(columns[name])} does not match "
+                    f"layer size {self.width}x{self.height}"
+                )
+            source = columns[name]
+            new[name][:] = source if name in BYTE_COLUMNS else float_column(source)
+
+        self._columns = new
+        self._extras = {position: dict(values) for position, values in (extras or {}).items()}
+        self._notify_replaced()
+
+    def count_tiles(self, tile_type: Optional[TileType] = None) -> int:
+        """
+        Count occupied cells without creating any Tile objects.
+
+        Args:
+            tile_type: Only count tiles of this type (all tiles if None)
+        """
+        tile_types = self._columns['tile_type']
+        if tile_type is None:
+            return len(tile_types) - tile_types.count(EMPTY_CODE)
+        return tile_types.count(tile_type.value)
+
+    def iter_positions(self, name: str = 'tile_type', value: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Iterate over the positions whose byte column matches a value.
+
+        Args:
+            name: Byte column to scan (e.g. 'tile_type', 'is_passable')
+            value: Stored code to match; by default any non-zero value
+
+        Yields:
+            (x, y) positions in row-major order
+        """
+        column = self._columns[name]
+        width = self.width
+
+        if value is not None:
+            needle = bytes((value,))
+            index = column.find(needle)
+            while index != -1:
+                yield index % width, index // width
+                index = column.find(needle, index + 1)
+            return
+
+        for index, code in enumerate(column):
+            if code:
+                yield index % width, index // width
+
+    def resize(self, new_width: int, new_height: int) -> None:
+        """Resize the layer, keeping the tiles that fit in the new bounds."""
+        self._will_replace()
+        old_width = self.width
+        copy_width = min(old_width, new_width)
+        copy_height = min(self.height, new_height)
+
+        new = new_columns(new_width * new_height)
+        for name in COLUMN_NAMES:
+            old_column, new_column = self._columns[name], new[name]
+            for y in range(copy_height):
+                src = y * old_width
+                dst = y * new_width
+                new_column[dst:dst + copy_width] = old_column[src:src + copy_width]
+
+        self._columns = new
+        self._extras = {
+            position: extras for position, extras in self._extras.items()
+            if position[0] < new_width and position[1] < new_height
+        }
+        self.width = new_width
+        self.height = new_height
+        self._notify_replaced()
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes held by the column buffers."""
+        return sum(
+            len(column) * getattr(column, 'itemsize', 1)
+            for column in self._columns.values()
+        )
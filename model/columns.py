@@ -0,0 +1,303 @@
+"""
+Column encoding helpers for the model layer.
+
+This module defines how per-tile state is flattened into compact, row-major
+typed buffers ("columns"). Columns are used by the columnar layer storage
+and by any code that wants to scan or bulk-process a whole layer without
+touching individual Tile objects.
+"""
+
+from array import array
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from .enums import TileType, BiomeType
+from .tile import Tile
+
+
+# Code 0 is reserved for "no tile"; enum values start at 1 (auto()).
+EMPTY_CODE = 0
+
+# Code used by bulk writes (MapLayer.fill_mask, blit) for "leave the cell
+# unchanged"; never stored
+KEEP_CODE = 0xFF
+
+# Lookup tables from stored code back to enum member (index == enum value)
+TILE_TYPE_BY_CODE: Tuple[Optional[TileType], ...] = tuple(
+    [None] + sorted(TileType, key=lambda member: member.value)
+)
+BIOME_TYPE_BY_CODE: Tuple[Optional[BiomeType], ...] = tuple(
+    [None] + sorted(BiomeType, key=lambda member: member.value)
+)
+
+# One byte per cell: enum codes and boolean flags
+BYTE_COLUMNS = (
+    'tile_type',
+    'biome_type',
+    'is_passable',
+    'is_transparent',
+    'is_discovered',
+    'is_visible',
+)
+
+# One float32 per cell; NaN encodes None for the optional health fields
+FLOAT_COLUMNS = (
+    'movement_cost',
+    'max_health',
+    'current_health',
+)
+
+COLUMN_NAMES = BYTE_COLUMNS + FLOAT_COLUMNS
+
+# array typecode of the float columns (float32)
+FLOAT_TYPECODE = 'f'
+
+# array typecode of the float columns exported from Tile objects and written
+# to map files (float64, so that Tile values round-trip exactly)
+DOUBLE_TYPECODE = 'd'
+
+# Defaults for the rarely used Tile fields that are kept out of the columns
+# (is_interactive, interaction_range, properties, asset_instances)
+EXTRA_DEFAULTS = {
+    'is_interactive': False,
+    'interaction_range': 1.0,
+}
+
+NAN = float('nan')
+
+Column = Union[bytearray, array]
+
+# Sparse per-cell values of the non-column fields, keyed by (x, y)
+Extras = Dict[Tuple[int, int], Dict[str, Any]]
+
+
+def _optional_float(value: Optional[float]) -> float:
+    return NAN if value is None else value
+
+
+# Functions extracting the stored column value from a Tile
+COLUMN_ENCODERS: Dict[str, Callable] = {
+    'tile_type': lambda tile: tile.tile_type.value,
+    'biome_type': lambda tile: tile.biome_type.value,
+    'is_passable': lambda tile: 1 if tile.is_passable else 0,
+    'is_transparent': lambda tile: 1 if tile.is_transparent else 0,
+    'is_discovered': lambda tile: 1 if tile.is_discovered else 0,
+    'is_visible': lambda tile: 1 if tile.is_visible else 0,
+    'movement_cost': lambda tile: tile.movement_cost,
+    'max_health': lambda tile: _optional_float(tile.max_health),
+    'current_health': lambda tile: _optional_float(tile.current_health),
+}
+
+
+# Functions converting a stored column value back to the Tile attribute value
+COLUMN_DECODERS: Dict[str, Callable] = {
+    'tile_type': TILE_TYPE_BY_CODE.__getitem__,
+    'biome_type': BIOME_TYPE_BY_CODE.__getitem__,
+    'is_passable': bool,
+    'is_transparent': bool,
+    'is_discovered': bool,
+    'is_visible': bool,
+    'movement_cost': float,
+    'max_health': lambda value: decode_optional_float(value),
+    'current_health': lambda value: decode_optional_float(value),
+}
+
+
+def new_column(name: str, size: int, float_typecode: str = FLOAT_TYPECODE) -> Column:
+    """
+    Allocate an empty column for the given tile attribute.
+
+    Args:
+        name: Column name (one of COLUMN_NAMES)
+        size: Number of cells
+        float_typecode: array typecode of float columns (float32 by default)
+
+    Returns:
+        A zeroed bytearray for byte columns, or a float array for float
+        columns (NaN-filled for the optional health columns)
+    """
+    if name in BYTE_COLUMNS:
+        return bytearray(size)
+    if name == 'movement_cost':
+        return array(float_typecode, [0.0]) * size
+    if name in FLOAT_COLUMNS:
+        return array(float_typecode, [NAN]) * size
+    raise KeyError(f"Unknown tile column: {name}")
+
+
+def new_columns(size: int, float_typecode: str = FLOAT_TYPECODE) -> Dict[str, Column]:
+    """Allocate one empty column per tile attribute."""
+    return {name: new_column(name, size, float_typecode) for name in COLUMN_NAMES}
+
+
+def float_column(values: Any, typecode: str = FLOAT_TYPECODE) -> array:
+    """Get float column values as an array of the given typecode, copying only if needed."""
+    if isinstance(values, array) and values.typecode == typecode:
+        return values
+    return array(typecode, values)
+
+
+def decode_optional_float(value: float) -> Optional[float]:
+    """Convert a stored float back to an optional value (NaN -> None)."""
+    return None if value != value else value
+
+
+def extract_extras(tile: Tile) -> Dict[str, Any]:
+    """Collect the non-default values of the fields kept out of the columns."""
+    extras = {}
+    if tile.is_interactive:
+        extras['is_interactive'] = True
+    if tile.interaction_range != 1.0:
+        extras['interaction_range'] = tile.interaction_range
+    if tile.properties:
+        extras['properties'] = tile.properties
+    if tile.asset_instances:
+        extras['asset_instances'] = tile.asset_instances
+    return extras
+
+
+def tile_from_columns(columns: Dict[str, Column], index: int, x: int, y: int,
+                      extras: Optional[Dict[str, Any]] = None) -> Tile:
+    """
+    Build a standalone Tile from one cell of a set of columns.
+    
+    Args:
+        columns: Column buffers (as returned by MapLayer.export_columns)
+        index: Flat cell index (y * width + x)
+        x: Tile X position
+        y: Tile Y position
+        extras: Non-column field values for this cell, if any
+    """
+    tile = Tile(
+        x=x,
+        y=y,
+        tile_type=TILE_TYPE_BY_CODE[columns['tile_type'][index]],
+        biome_type=BIOME_TYPE_BY_CODE[columns['biome_type'][index]],
+        movement_cost=columns['movement_cost'][index],
+        is_discovered=bool(columns['is_discovered'][index]),
+        is_visible=bool(columns['is_visible'][index]),
+        max_health=decode_optional_float(columns['max_health'][index]),
+        **(extras or {})
+    )
+    
+    # Stored flags win over the type-derived defaults from __post_init__
+    tile.is_passable = bool(columns['is_passable'][index])
+    tile.is_transparent = bool(columns['is_transparent'][index])
+    tile.current_health = decode_optional_float(columns['current_health'][index])
+    return tile
+
+
+def flat_bytes(values: Any) -> bytes:
+    """
+    Flatten per-cell values into row-major bytes, one byte per cell.
+    
+    Accepts any one-byte-per-item buffer (bytes, bytearray, array('B'),
+    a uint8 or bool NumPy array of any shape), or a flat / nested sequence
+    of ints, bools or enum members (stored as their value).
+    """
+    try:
+        view = memoryview(values)
+    except TypeError:
+        flat = []
+        for value in values:
+            if isinstance(value, (list, tuple, bytes, bytearray)):
+                flat.extend(value)
+            else:
+                flat.append(value)
+        return bytes(value.value if isinstance(value, Enum) else int(value) for value in flat)
+    if view.itemsize != 1:
+        raise ValueError(f"Expected one byte per cell, got item size {view.itemsize}")
+    return view.tobytes()
+
+
+def default_flag_table(name: str) -> bytes:
+    """
+    Build a bytes.translate table from tile_type code to a default flag.
+    
+    The defaults come from Tile.__post_init__ (e.g. walls are neither
+    passable nor transparent), so a whole 'tile_type' column can be turned
+    into a default 'is_passable' / 'is_transparent' column at C speed.
+    Empty cells map to 0.
+    
+    Args:
+        name: 'is_passable' or 'is_transparent'
+    """
+    encode = COLUMN_ENCODERS[name]
+    table = bytearray(256)
+    for tile_type in TileType:
+        table[tile_type.value] = encode(Tile(x=0, y=0, tile_type=tile_type))
+    return bytes(table)
+
+
+# Byte masks: columns holding 0/1 per cell. The helpers below combine
+# whole masks at C speed by treating them as big integers; since every
+# byte is 0 or 1, bitwise operations never carry between cells.
+
+_NONZERO_TABLE = bytes([0] + [1] * 255)
+
+
+def nonzero_mask(column: bytes) -> bytes:
+    """Get a 0/1 mask of the non-zero cells of a byte column."""
+    return column.translate(_NONZERO_TABLE)
+
+
+def mask_and(a: bytes, b: bytes) -> bytearray:
+    """Cell-wise AND of two equally sized byte masks."""
+    return bytearray(
+        (int.from_bytes(a, 'little') & int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+    )
+
+
+def mask_or(a: bytes, b: bytes) -> bytearray:
+    """Cell-wise OR of two equally sized byte masks."""
+    return bytearray(
+        (int.from_bytes(a, 'little') | int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+    )
+
+
+def mask_and_not(a: bytes, b: bytes) -> bytearray:
+    """Cells set in mask a but not in mask b."""
+    return bytearray(
+        (int.from_bytes(a, 'little') & ~int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+    )
+
+
+def changed_rect(old: bytes, new: bytes, width: int,
+                 start: int = 0) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the cells where two equally sized byte columns differ.
+
+    Args:
+        old, new: Row-major byte buffers (or equally sized slices of them)
+        width: Row length of the full column
+        start: Flat cell index of the first byte of the slices
+
+    Returns:
+        The inclusive (x1, y1, x2, y2) rectangle bounding the differing
+        cells, or None if the buffers are equal
+    """
+    diff = int.from_bytes(old, 'little') ^ int.from_bytes(new, 'little')
+    if not diff:
+        return None
+    first = start + (((diff & -diff).bit_length() - 1) >> 3)
+    last = start + ((diff.bit_length() - 1) >> 3)
+    y1, y2 = first // width, last // width
+    if y1 == y2:
+        return first % width, y1, last % width, y2
+
+    # Fold the differing rows onto one to find the column extent
+    changed = diff.to_bytes(len(old), 'little')
+    folded = 0
+    for y in range(y1, y2 + 1):
+        row_start = max(y * width, start)
+        row = changed[row_start - start:min((y + 1) * width, start + len(old)) - start]
+        folded |= int.from_bytes(row, 'little') << (8 * (row_start - y * width))
+    return ((folded & -folded).bit_length() - 1) >> 3, y1, (folded.bit_length() - 1) >> 3, y2
+
+
+def union_rect(a: Optional[Tuple[int, int, int, int]],
+               b: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+    """Smallest rectangle covering two optional inclusive rectangles."""
+    if a is None or b is None:
+        return a or b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
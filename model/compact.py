@@ -0,0 +1,151 @@
+"""
+Compact tile and asset instance variants for the model layer.
+
+This module defines CompactTile and CompactAssetInstance, drop-in
+subclasses of Tile and AssetInstance that keep every field in __slots__
+and do not allocate their optional collections up front: until something
+is added, properties and asset_instances read as shared immutable
+empties. Tile and AssetInstance are not slotted, so the objects still
+carry a __dict__ slot; it stays empty, and is only allocated if an
+undeclared attribute is assigned (or __dict__ is read).
+"""
+
+import copy
+from dataclasses import fields
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from .assets import AssetInstance
+from .enums import TileType
+from .tile import Tile
+
+
+# Shared read-only stand-ins for collections that were never populated
+EMPTY_PROPERTIES: Mapping[str, Any] = MappingProxyType({})
+EMPTY_ASSET_INSTANCES: Sequence[AssetInstance] = ()
+
+
+def _properties_property() -> property:
+    """Create a properties attribute backed by the lazily allocated _properties slot."""
+    def fget(self):
+        return self._properties or EMPTY_PROPERTIES
+
+    def fset(self, value):
+        self._properties = dict(value) if value else None
+
+    return property(fget, fset)
+
+
+class CompactTile(Tile):
+    """
+    A Tile that stores its fields in slots and allocates collections lazily.
+
+    The __dict__ inherited from Tile is unused (see the module docstring).
+
+    properties and asset_instances read as EMPTY_PROPERTIES and
+    EMPTY_ASSET_INSTANCES (which cannot be modified) until the first
+    set_property / add_asset_instance call, or until a non-empty value is
+    assigned. Everything else behaves like Tile.
+    """
+
+    __slots__ = (
+        'x', 'y', 'tile_type', 'biome_type', 'is_passable', 'is_transparent',
+        'movement_cost', 'is_interactive', 'interaction_range', 'is_discovered',
+        'is_visible', 'max_health', 'current_health',
+        '_properties', '_asset_instances', '_layer',
+    )
+
+    properties = _properties_property()
+
+    @property
+    def asset_instances(self) -> Sequence[AssetInstance]:
+        return self._asset_instances or EMPTY_ASSET_INSTANCES
+
+    @asset_instances.setter
+    def asset_instances(self, value: Optional[List[AssetInstance]]) -> None:
+        self._asset_instances = list(value) if value else None
+
+    def __post_init__(self):
+        """Apply the tile-type defaults without allocating any collections."""
+        self._layer = None
+
+        if self.tile_type in [TileType.WALL, TileType.PIT, TileType.LAVA]:
+            self.is_passable = False
+
+        if self.tile_type == TileType.WALL:
+            self.is_transparent = False
+
+        if self.current_health is None and self.max_health is not None:
+            self.current_health = self.max_health
+
+    def set_property(self, key: str, value: Any) -> None:
+        """Set a tile property, allocating the properties dict if needed."""
+        self._before_change()
+        if self._properties is None:
+            self._properties = {}
+        self._properties[key] = value
+        self._notify_layer()
+
+    def add_asset_instance(self, asset_instance: AssetInstance) -> None:
+        """Add an asset instance to this tile."""
+        self._before_change()
+        if self._asset_instances is None:
+            self._asset_instances = []
+        self._asset_instances.append(asset_instance)
+        self._index_added(asset_instance)
+        self._notify_layer()
+
+    def remove_asset_instance(self, instance_id: str) -> bool:
+        """
+        Remove an asset instance by its ID.
+
+        Args:
+            instance_id: ID of the asset instance to remove
+
+        Returns:
+            True if an instance was removed, False otherwise
+        """
+        removed = super().remove_asset_instance(instance_id)
+        if removed and not self._asset_instances:
+            self._asset_instances = None
+        return removed
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the tile to a dictionary for serialization."""
+        data = super().to_dict()
+        data["properties"] = dict(self.properties)
+        return data
+
+
+class CompactAssetInstance(AssetInstance):
+    """
+    An AssetInstance that stores its fields in slots.
+
+    properties reads as EMPTY_PROPERTIES (which cannot be modified) until
+    the first set_property call or non-empty assignment.
+    """
+
+    __slots__ = (
+        'instance_id', 'asset_definition_id', 'x', 'y', 'z', 'rotation',
+        'scale_x', 'scale_y', 'opacity', 'tint_color', 'current_frame',
+        'animation_speed', 'is_playing', 'layer_index', 'z_index', '_properties',
+    )
+
+    properties = _properties_property()
+
+    def __post_init__(self):
+        """Generate an instance ID if needed, without allocating properties."""
+        if not self.instance_id:
+            super().__post_init__()
+
+    def set_property(self, key: str, value: Any) -> None:
+        """Set an instance property, allocating the properties dict if needed."""
+        if self._properties is None:
+            self._properties = {}
+        self._properties[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the asset instance to a dictionary for serialization."""
+        data = {field.name: getattr(self, field.name) for field in fields(self)}
+        data["properties"] = copy.deepcopy(dict(self.properties))
+        return data
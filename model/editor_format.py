@@ -0,0 +1,367 @@
+"""
+Importer for the map editor's save format.
+
+The desktop editor saves maps (see sample-maps/) as sparse per-layer dicts
+keyed by "x,y" strings plus a list of asset instances::
+
+    {
+      "tiles": {"floor": {"1,1": "floor", ...}, "walls": {"0,0": "wall", ...}},
+      "assetInstances": [{"id": "chest-1", "assetId": "chest", "x": 2, "y": 2, ...}],
+      "version": "1.0.0", "id": "...", ...
+    }
+
+This module streams such files into a MapData without loading the whole
+document: the file is read in fixed-size chunks, the tile entries of each
+chunk are parsed with a single regular expression pass, and every layer is
+filled in bulk through MapLayer.import_columns.
+"""
+
+import json
+import re
+from array import array
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple, Type, Union
+
+from .enums import TileType, BiomeType, LayerType
+from .assets import AssetInstance
+from .columns import FLOAT_TYPECODE, new_columns, default_flag_table
+from .map_data import MapData, MapLayer
+
+
+# Layer types for the editor's layer names; unknown layers become OBJECTS
+EDITOR_LAYER_TYPES: Dict[str, LayerType] = {
+    'floor': LayerType.TERRAIN,
+    'walls': LayerType.TERRAIN,
+    'objects': LayerType.OBJECTS,
+    'assets': LayerType.OBJECTS,
+    'fog': LayerType.EFFECTS,
+}
+
+# Tile property holding the editor's tile name when it is not a plain TileType
+EDITOR_TILE_PROPERTY = 'editor_tile'
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'\s*')
+
+# One "x,y": "name" entry; the coordinates come out as separate groups
+_TILE_ENTRY = re.compile(r'"(-?\d+),(-?\d+)"\s*:\s*"([^"\\]*)"')
+
+_DECODER = json.JSONDecoder()
+
+
+def tile_type_from_editor(name: str) -> TileType:
+    """
+    Map an editor tile name to a TileType.
+
+    Exact names ("wall", "stairs-up") map directly; variants map by their
+    prefix ("wall-brick" -> WALL, "floor-wood-planks" -> FLOOR). Anything
+    else (grass, dirt, imported tiles) is treated as FLOOR.
+    """
+    key = name.upper().replace('-', '_')
+    if key in TileType.__members__:
+        return TileType[key]
+
+    prefix = key.split('_', 1)[0]
+    if prefix in TileType.__members__:
+        return TileType[prefix]
+
+    return TileType.FLOOR
+
+
+class _JsonStream:
+    """Minimal pull parser over a text file, refilled chunk by chunk."""
+
+    def __init__(self, file: IO[str], chunk_size: int):
+        self._file = file
+        self._chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk, dropping consumed text. False at end of file."""
+        if self.eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of file)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        """Consume the given structural character."""
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in editor map file")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+                # A value ending at the buffer edge (e.g. a number) may continue
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise ValueError("Malformed JSON in editor map file")
+            self.fill()
+
+    def _members(self, open_char: str, close_char: str) -> Iterator[None]:
+        self.expect(open_char)
+        if self.peek() == close_char:
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == close_char:
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or '{close_char}' in editor map file")
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the keys of an object; the caller consumes each value."""
+        for _ in self._members('{', '}'):
+            key = self.value()
+            self.expect(':')
+            yield key
+
+    def elements(self) -> Iterator[None]:
+        """Iterate over the elements of an array; the caller consumes each one."""
+        return self._members('[', ']')
+
+
+class _LayerEntries:
+    """Tile entries of one editor layer, held in compact arrays."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.xs = array('i')
+        self.ys = array('i')
+        self.codes = array('H')
+        self.palette: Dict[str, int] = {}
+
+    def add(self, entries: List[Tuple[str, str, str]]) -> None:
+        if not entries:
+            return
+        xs, ys, names = zip(*entries)
+        self.xs.extend(map(int, xs))
+        self.ys.extend(map(int, ys))
+
+        palette = self.palette
+        for name in set(names):
+            if name not in palette:
+                palette[name] = len(palette)
+        self.codes.extend(map(palette.__getitem__, names))
+
+
+def _read_tile_entries(stream: _JsonStream, layer: _LayerEntries) -> None:
+    """Read one {"x,y": "name", ...} layer object into layer."""
+    stream.expect('{')
+    while True:
+        buffer, start = stream.buffer, stream.pos
+        end = buffer.find('}', start)
+        if end != -1:
+            cut = end
+        else:
+            # Only parse up to the last complete entry; wait for more text
+            cut = buffer.rfind('",', start)
+            if cut == -1:
+                if not stream.fill():
+                    raise ValueError(f"Unterminated tile layer '{layer.name}'")
+                continue
+            cut += 1
+
+        segment = buffer[start:cut]
+        entries = _TILE_ENTRY.findall(segment)
+        if len(entries) != segment.count(':'):
+            raise ValueError(f"Unsupported tile entry in layer '{layer.name}'")
+        layer.add(entries)
+
+        if end != -1:
+            stream.pos = end + 1
+            return
+        stream.pos = cut
+        stream.fill()
+
+
+def _asset_instance_from_editor(data: Dict[str, Any]) -> AssetInstance:
+    """Convert an editor asset instance (tile coordinates) to an AssetInstance."""
+    return AssetInstance(
+        instance_id=data.get('id', ''),
+        asset_definition_id=data.get('assetId', ''),
+        x=float(data.get('x', 0.0)),
+        y=float(data.get('y', 0.0)),
+        rotation=float(data.get('rotation', 0.0)),
+        scale_x=float(data.get('scaleX', 1.0)),
+        scale_y=float(data.get('scaleY', 1.0)),
+        properties=dict(data.get('properties') or {}),
+    )
+
+
+def _fill_layer(layer: MapLayer, entries: _LayerEntries, origin: Tuple[int, int],
+                biome_type: BiomeType, keep_editor_names: bool) -> None:
+    """Write a layer's entries in bulk through import_columns."""
+    width = layer.width
+    size = width * layer.height
+    origin_x, origin_y = origin
+
+    names = sorted(entries.palette, key=entries.palette.__getitem__)
+    tile_types = [tile_type_from_editor(name) for name in names]
+    type_by_code = bytes(tile_type.value for tile_type in tile_types)
+
+    columns = new_columns(size)
+    tile_type_column = columns['tile_type']
+    for x, y, code in zip(entries.xs, entries.ys, entries.codes):
+        tile_type_column[(y - origin_y) * width + x - origin_x] = type_by_code[code]
+
+    # Derive the other columns from tile_type at C speed
+    occupied = bytes([0] + [1] * 255)
+    columns['biome_type'][:] = tile_type_column.translate(bytes([0] + [biome_type.value] * 255))
+    columns['is_passable'][:] = tile_type_column.translate(default_flag_table('is_passable'))
+    columns['is_transparent'][:] = tile_type_column.translate(default_flag_table('is_transparent'))
+    columns['movement_cost'][:] = array(FLOAT_TYPECODE, list(tile_type_column.translate(occupied)))
+
+    # Keep the editor's name for variants such as "wall-brick"
+    variants = {
+        code for code, (name, tile_type) in enumerate(zip(names, tile_types))
+        if keep_editor_names and name != tile_type.name.lower()
+    }
+    extras = {}
+    if variants:
+        for x, y, code in zip(entries.xs, entries.ys, entries.codes):
+            if code in variants:
+                position = (x - origin_x, y - origin_y)
+                extras[position] = {'properties': {EDITOR_TILE_PROPERTY: names[code]}}
+            else:
+                extras.pop((x - origin_x, y - origin_y), None)
+
+    layer.import_columns(columns, extras)
+
+
+def load_editor_map(source: Union[str, IO[str]],
+                    layer_class: Optional[Type[MapLayer]] = None,
+                    biome_type: BiomeType = BiomeType.DUNGEON,
+                    keep_editor_names: bool = True,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> MapData:
+    """
+    Load a map saved by the editor, streaming the file.
+
+    Every editor layer ("floor", "walls", ...) becomes a MapLayer of the
+    same name. The map is sized to the bounding box of all tiles; if any
+    coordinate is negative, everything is shifted so the map starts at 0
+    and the shift is stored in properties["editor_origin"]. Each asset
+    instance is attached to the topmost tile at its position (instances
+    over empty cells are kept in properties["asset_instances"]).
+
+    Args:
+        source: File path or open text file
+        layer_class: Storage implementation for the layers (MapLayer by
+            default; ColumnarMapLayer is much faster and smaller)
+        biome_type: Biome assigned to every tile
+        keep_editor_names: Store the editor name of variant tiles (e.g.
+            "wall-brick") in properties["editor_tile"]; this costs one
+            properties dict per such tile
+        chunk_size: Number of characters read at a time
+
+    Returns:
+        The loaded map
+
+    Raises:
+        ValueError: If the file is not a valid editor map
+    """
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as file:
+            return load_editor_map(file, layer_class, biome_type, keep_editor_names, chunk_size)
+
+    stream = _JsonStream(source, chunk_size)
+    layers: List[_LayerEntries] = []
+    instances: List[AssetInstance] = []
+    metadata: Dict[str, Any] = {}
+
+    for key in stream.keys():
+        if key == 'tiles':
+            for layer_name in stream.keys():
+                entries = _LayerEntries(layer_name)
+                _read_tile_entries(stream, entries)
+                layers.append(entries)
+        elif key == 'assetInstances':
+            for _ in stream.elements():
+                instances.append(_asset_instance_from_editor(stream.value()))
+        else:
+            metadata[key] = stream.value()
+
+    # Size the map to the bounding box of all tiles
+    occupied_layers = [entries for entries in layers if entries.xs]
+    if occupied_layers:
+        min_x = min(min(entries.xs) for entries in occupied_layers)
+        min_y = min(min(entries.ys) for entries in occupied_layers)
+        max_x = max(max(entries.xs) for entries in occupied_layers)
+        max_y = max(max(entries.ys) for entries in occupied_layers)
+    else:
+        min_x = min_y = 0
+        max_x = max_y = -1
+    origin = (min(min_x, 0), min(min_y, 0))
+    width, height = max_x - origin[0] + 1, max_y - origin[1] + 1
+
+    if layer_class is None:
+        layer_class = MapLayer
+
+    map_layers = [
+        layer_class(
+            layer_type=EDITOR_LAYER_TYPES.get(entries.name, LayerType.OBJECTS),
+            name=entries.name,
+            width=width,
+            height=height,
+            z_index=z_index,
+        )
+        for z_index, entries in enumerate(layers)
+    ]
+    for layer, entries in zip(map_layers, layers):
+        _fill_layer(layer, entries, origin, biome_type, keep_editor_names)
+
+    map_id = str(metadata.pop('id', '') or getattr(source, 'name', 'editor_map'))
+    properties = dict(metadata)
+    if origin != (0, 0):
+        properties['editor_origin'] = list(origin)
+
+    map_data = MapData(
+        width=width,
+        height=height,
+        map_id=map_id,
+        name=map_id,
+        layers=map_layers,
+        default_biome=biome_type,
+        properties=properties,
+        layer_class=layer_class,
+    )
+
+    unplaced = []
+    for instance in instances:
+        x, y = int(instance.x) - origin[0], int(instance.y) - origin[1]
+        for layer in reversed(map_data.layers):
+            tile = layer.get_tile(x, y)
+            if tile is not None:
+                tile.add_asset_instance(instance)
+                break
+        else:
+            unplaced.append(instance.to_dict())
+    if unplaced:
+        map_data.properties['asset_instances'] = unplaced
+
+    return map_data
@@ -57,3 +57,25 @@ class LayerType(Enum):
     ENTITIES = auto()
     EFFECTS = auto()
     UI = auto()
+
+
+class RegionKind(Enum):
+    """Defines the kinds of connected regions found by room detection."""
+    
+    ROOM = auto()
+    CORRIDOR = auto()
+    DOOR = auto()
+
+
+class TerrainType(Enum):
+    """Defines the terrain classes assigned by the procedural terrain generator."""
+    
+    DEEP_WATER = auto()
+    SHALLOW_WATER = auto()
+    BEACH = auto()
+    DESERT = auto()
+    GRASSLAND = auto()
+    FOREST = auto()
+    HILLS = auto()
+    MOUNTAIN = auto()
+    SNOW = auto()
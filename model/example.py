@@ -30,24 +30,12 @@ def create_simple_map():
     # Get the terrain layer
     terrain_layer = map_data.get_layer("Terrain")
     
-    # Fill the map with floor tiles, add walls around the edges
-    for y in range(map_data.height):
-        for x in range(map_data.width):
-            # Determine tile type
-            if x == 0 or x == map_data.width - 1 or y == 0 or y == map_data.height - 1:
-                tile_type = TileType.WALL
-            else:
-                tile_type = TileType.FLOOR
-            
-            # Create and place the tile
-            tile = Tile(
-                x=x,
-                y=y,
-                tile_type=tile_type,
-                biome_type=BiomeType.DUNGEON
-            )
-            
-            terrain_layer.set_tile(x, y, tile)
+    # Fill the map with walls, then carve the floor inside them; bulk
+    # fills write whole rectangles without a set_tile call per cell
+    terrain_layer.fill_rect(0, 0, map_data.width - 1, map_data.height - 1,
+                            TileType.WALL, BiomeType.DUNGEON)
+    terrain_layer.fill_rect(1, 1, map_data.width - 2, map_data.height - 2,
+                            TileType.FLOOR, BiomeType.DUNGEON)
     
     # Add a door in the middle of the south wall
     door_tile = Tile(
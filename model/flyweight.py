@@ -0,0 +1,255 @@
+"""
+Flyweight tile storage for the model layer.
+
+This module defines FlyweightMapLayer, a MapLayer whose cells share one
+immutable prototype tile per (TileType, BiomeType) for as long as they
+hold nothing but the type defaults. A cell only gets its own tile object
+once it gains unique state (damage, discovery, properties, assets, ...),
+which happens copy-on-write through the views returned by get_tile.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from .assets import AssetInstance
+from .enums import TileType, BiomeType
+from .tile import Tile
+from .compact import CompactTile
+from .map_data import MapLayer
+from .columns import KEEP_CODE, TILE_TYPE_BY_CODE
+
+
+# Fields copied from a prototype into a materialized tile (all but x / y)
+TILE_STATE_FIELDS: Tuple[str, ...] = (
+    'tile_type', 'biome_type', 'is_passable', 'is_transparent', 'movement_cost',
+    'is_interactive', 'interaction_range', 'is_discovered', 'is_visible',
+    'max_health', 'current_health',
+)
+
+
+class TilePrototype(CompactTile):
+    """
+    The shared, immutable default tile for one (TileType, BiomeType).
+
+    Get prototypes from tile_prototype; their position is meaningless and
+    every attribute write raises AttributeError.
+    """
+
+    __slots__ = ('_frozen',)
+
+    def __post_init__(self):
+        super().__post_init__()
+        object.__setattr__(self, '_frozen', True)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, '_frozen', False):
+            raise AttributeError("Tile prototypes are shared and immutable")
+        object.__setattr__(self, name, value)
+
+
+_PROTOTYPES: Dict[Tuple[TileType, BiomeType], TilePrototype] = {}
+
+
+def tile_prototype(tile_type: TileType, biome_type: BiomeType = BiomeType.DUNGEON) -> TilePrototype:
+    """Get the shared prototype for a tile type and biome."""
+    key = (tile_type, biome_type)
+    prototype = _PROTOTYPES.get(key)
+    if prototype is None:
+        prototype = _PROTOTYPES[key] = TilePrototype(x=0, y=0, tile_type=tile_type, biome_type=biome_type)
+    return prototype
+
+
+def matches_prototype(tile: Tile) -> bool:
+    """Check whether a tile holds nothing but its type's default state."""
+    if tile.properties or tile.asset_instances:
+        return False
+    prototype = tile_prototype(tile.tile_type, tile.biome_type)
+    return all(getattr(tile, name) == getattr(prototype, name) for name in TILE_STATE_FIELDS)
+
+
+def _copy_tile(tile: Tile, x: int, y: int) -> CompactTile:
+    """Copy a tile's state, properties and asset instances to a new position."""
+    copied = CompactTile(x=x, y=y, tile_type=tile.tile_type, biome_type=tile.biome_type)
+    for name in TILE_STATE_FIELDS:
+        setattr(copied, name, getattr(tile, name))
+    copied.properties = dict(tile.properties)
+    copied.asset_instances = list(tile.asset_instances)
+    return copied
+
+
+def _state_property(name: str) -> property:
+    """Create a property that reads the cell's tile and writes copy-on-write."""
+    def fget(self):
+        return getattr(self._target(), name)
+
+    def fset(self, value):
+        setattr(self._own(), name, value)
+
+    return property(fget, fset)
+
+
+class FlyweightTile(Tile):
+    """
+    A Tile view onto one cell of a FlyweightMapLayer.
+
+    Reads come from the cell's prototype or its own tile. The first write
+    to a prototype cell (setting an attribute, damage, set_property,
+    add_asset_instance, ...) gives the cell its own CompactTile, copied
+    from the prototype, and applies the write to it. properties and
+    asset_instances read as immutable empties on prototype cells, so add
+    to them with set_property / add_asset_instance.
+    """
+
+    tile_type = _state_property('tile_type')
+    biome_type = _state_property('biome_type')
+    is_passable = _state_property('is_passable')
+    is_transparent = _state_property('is_transparent')
+    movement_cost = _state_property('movement_cost')
+    is_interactive = _state_property('is_interactive')
+    interaction_range = _state_property('interaction_range')
+    is_discovered = _state_property('is_discovered')
+    is_visible = _state_property('is_visible')
+    max_health = _state_property('max_health')
+    current_health = _state_property('current_health')
+    properties = _state_property('properties')
+    asset_instances = _state_property('asset_instances')
+
+    _is_view = True
+
+    def __init__(self, layer: 'FlyweightMapLayer', x: int, y: int):
+        self._layer = layer
+        self.x = x
+        self.y = y
+
+    def _target(self) -> Tile:
+        """The prototype or tile currently stored in this view's cell."""
+        return self._layer.tiles[self.y][self.x]
+
+    def _own(self) -> Tile:
+        """The cell's own tile, materialized from the prototype if needed."""
+        return self._layer._materialize(self.x, self.y)
+
+    def is_unique(self) -> bool:
+        """Check whether the cell has its own tile object."""
+        return not isinstance(self._target(), TilePrototype)
+
+    def set_property(self, key: str, value: Any) -> None:
+        """Set a tile property (gives the cell its own tile)."""
+        self._own().set_property(key, value)
+
+    def add_asset_instance(self, asset_instance: AssetInstance) -> None:
+        """Add an asset instance to this tile (gives the cell its own tile)."""
+        self._own().add_asset_instance(asset_instance)
+
+    def remove_asset_instance(self, instance_id: str) -> bool:
+        """Remove an asset instance by its ID."""
+        if not self.is_unique():
+            return False
+        return self._own().remove_asset_instance(instance_id)
+
+    def __reduce_ex__(self, protocol):
+        """Pickle / copy a view as a standalone Tile with the cell's state."""
+        return Tile.from_dict, (self.to_dict(),)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the tile to a dictionary for serialization."""
+        data = self._target().to_dict()
+        data["x"], data["y"] = self.x, self.y
+        return data
+
+
+class FlyweightMapLayer(MapLayer):
+    """
+    A MapLayer that shares one prototype tile per (TileType, BiomeType).
+
+    set_tile stores the shared prototype for tiles in their default state
+    and the passed tile object otherwise. get_tile returns a FlyweightTile
+    view for prototype cells; writing through the view gives the cell its
+    own tile (copy-on-write), and later get_tile calls return that tile.
+
+    Note that set_tile does not keep a reference to default-state tiles,
+    so later changes to the passed object are not seen by the layer; use
+    the object returned by get_tile to modify a stored tile.
+    """
+
+    def _get(self, x: int, y: int) -> Optional[Tile]:
+        tile = self.tiles[y][x]
+        if isinstance(tile, TilePrototype):
+            return FlyweightTile(self, x, y)
+        return tile
+
+    def _set(self, x: int, y: int, tile: Optional[Tile]) -> None:
+        if tile is not None:
+            if isinstance(tile, FlyweightTile):
+                # Store what the view refers to, not the view itself; a
+                # materialized cell stored elsewhere gets its own copy
+                moved = tile._layer is not self or (tile.x, tile.y) != (x, y)
+                tile = tile._target()
+                if moved and not isinstance(tile, TilePrototype):
+                    tile = _copy_tile(tile, x, y)
+            if isinstance(tile, TilePrototype) or matches_prototype(tile):
+                self._set_prototype(x, y, tile_prototype(tile.tile_type, tile.biome_type))
+                return
+        super()._set(x, y, tile)
+
+    def _set_prototype(self, x: int, y: int, prototype: TilePrototype) -> None:
+        previous = self.tiles[y][x]
+        if previous is not None and previous._layer is self:
+            previous._layer = None
+        self.tiles[y][x] = prototype
+
+    def _write_codes(self, rect: Tuple[int, int, int, int], codes: bytes, biome_type: BiomeType) -> None:
+        # New default tiles are the shared prototypes: no Tile objects are created
+        prototypes = [None] + [tile_prototype(tile_type, biome_type) for tile_type in TILE_TYPE_BY_CODE[1:]]
+        x1, y1, x2, y2 = rect
+        rect_width = x2 - x1 + 1
+        for row_index, y in enumerate(range(y1, y2 + 1)):
+            row = self.tiles[y]
+            row_codes = codes[row_index * rect_width:(row_index + 1) * rect_width]
+            for x, code in enumerate(row_codes, x1):
+                if code == KEEP_CODE:
+                    continue
+                previous = row[x]
+                if previous is not None and previous._layer is self:
+                    previous._layer = None
+                row[x] = prototypes[code]
+
+    def _materialize(self, x: int, y: int) -> Tile:
+        """Give a cell its own tile, copied from its prototype if needed."""
+        tile = self.tiles[y][x]
+        if not isinstance(tile, TilePrototype):
+            return tile
+
+        own = _copy_tile(tile, x, y)
+        own._layer = self
+        self.tiles[y][x] = own
+        return own
+
+    def _set_attribute(self, x: int, y: int, name: str, value: Any) -> None:
+        # set_column only gets here for changed cells: they get their own
+        # tile, and cells back at their prototype's state share it again
+        tile = self._materialize(x, y)
+        setattr(tile, name, value)
+        if matches_prototype(tile):
+            self._set_prototype(x, y, tile_prototype(tile.tile_type, tile.biome_type))
+
+    def compact(self) -> int:
+        """
+        Share prototypes again for cells whose own tile is back to its defaults.
+
+        Returns:
+            The number of tile objects released
+        """
+        released = 0
+        for y, row in enumerate(self.tiles):
+            for x, tile in enumerate(row):
+                if tile is not None and not isinstance(tile, TilePrototype) and matches_prototype(tile):
+                    self._set_prototype(x, y, tile_prototype(tile.tile_type, tile.biome_type))
+                    released += 1
+        return released
+
+    def unique_tile_count(self) -> int:
+        """Number of cells that have their own tile object."""
+        return sum(
+            1 for row in self.tiles for tile in row
+            if tile is not None and not isinstance(tile, TilePrototype)
+        )
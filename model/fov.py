@@ -0,0 +1,167 @@
+"""
+Field of view for the model layer.
+
+This module computes which cells are visible from one or more viewers
+using recursive shadowcasting over a layer's opacity (occupied cells whose
+Tile.is_transparent is False block sight). Work per viewer is proportional
+to the number of cells it can see, and results for a whole layer are
+written into the is_visible / is_discovered flags in bulk.
+"""
+
+from typing import Iterable, Optional, Tuple
+
+from .columns import nonzero_mask, mask_and_not, mask_or
+from .map_data import MapLayer
+
+
+# A viewer is an (x, y, radius) triple
+Viewer = Tuple[int, int, int]
+
+# Transforms mapping the first octant onto all eight (xx, xy, yx, yy)
+_OCTANTS = (
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+)
+
+
+def opacity_mask(layer: MapLayer) -> bytearray:
+    """
+    Get a 0/1 mask of the cells that block sight on a layer.
+
+    Empty cells do not block sight; occupied cells block it unless their
+    tile is transparent.
+    """
+    occupied = nonzero_mask(layer.get_column('tile_type'))
+    return mask_and_not(occupied, layer.get_column('is_transparent'))
+
+
+def _cast_light(opaque: bytes, visible: bytearray, width: int, height: int,
+                center_x: int, center_y: int, row: int, start: float, end: float,
+                radius: int, radius_squared: int,
+                xx: int, xy: int, yx: int, yy: int) -> None:
+    """Light one octant from row onward, between the start and end slopes."""
+    if start < end:
+        return
+
+    new_start = start
+    for distance in range(row, radius + 1):
+        dx, dy = -distance - 1, -distance
+        blocked = False
+        while dx <= 0:
+            dx += 1
+            # Slopes of the cell's left and right edges
+            left_slope = (dx - 0.5) / (dy + 0.5)
+            right_slope = (dx + 0.5) / (dy - 0.5)
+            if start < right_slope:
+                continue
+            if end > left_slope:
+                break
+
+            x = center_x + dx * xx + dy * xy
+            y = center_y + dx * yx + dy * yy
+            if 0 <= x < width and 0 <= y < height:
+                index = y * width + x
+                if dx * dx + dy * dy <= radius_squared:
+                    visible[index] = 1
+                is_opaque = opaque[index]
+            else:
+                # Outside the layer counts as solid
+                is_opaque = 1
+
+            if blocked:
+                if is_opaque:
+                    new_start = right_slope
+                else:
+                    blocked = False
+                    start = new_start
+            elif is_opaque and distance < radius:
+                # Start of a blocker: light the part of the next row above it
+                blocked = True
+                _cast_light(opaque, visible, width, height, center_x, center_y,
+                            distance + 1, start, left_slope, radius, radius_squared,
+                            xx, xy, yx, yy)
+                new_start = right_slope
+        if blocked:
+            break
+
+
+def compute_fov(opaque: bytes, width: int, height: int, x: int, y: int, radius: int,
+                visible: Optional[bytearray] = None) -> bytearray:
+    """
+    Compute the cells visible from one position.
+
+    Args:
+        opaque: Row-major 0/1 mask of cells that block sight (see opacity_mask)
+        width: Grid width
+        height: Grid height
+        x: Viewer X position
+        y: Viewer Y position
+        radius: Vision radius in cells (circular, like the editor's fog of war)
+        visible: Mask to add the result to (a new one is created if None)
+
+    Returns:
+        A row-major 0/1 mask of visible cells; blocking cells at the edge of
+        the visible area are included
+    """
+    if visible is None:
+        visible = bytearray(width * height)
+    if not (0 <= x < width and 0 <= y < height):
+        return visible
+
+    visible[y * width + x] = 1
+    radius_squared = radius * radius
+    for xx, xy, yx, yy in _OCTANTS:
+        _cast_light(opaque, visible, width, height, x, y, 1, 1.0, 0.0,
+                    radius, radius_squared, xx, xy, yx, yy)
+    return visible
+
+
+def compute_visibility(layer: MapLayer, viewers: Iterable[Viewer],
+                       opaque: Optional[bytes] = None) -> bytearray:
+    """
+    Compute the union of the cells visible from several viewers.
+
+    Args:
+        layer: Layer whose tiles block sight
+        viewers: (x, y, radius) of every viewer, in layer coordinates
+        opaque: Precomputed opacity_mask(layer), to share between calls
+
+    Returns:
+        A row-major 0/1 mask of cells visible to at least one viewer,
+        indexed like the layer's columns (relative to its origin)
+    """
+    width, height = layer.width, layer.height
+    origin_x, origin_y = layer._bounds()[:2]
+    if opaque is None:
+        opaque = opacity_mask(layer)
+
+    visible = bytearray(width * height)
+    for x, y, radius in viewers:
+        compute_fov(opaque, width, height, x - origin_x, y - origin_y, radius, visible)
+    return visible
+
+
+def update_visibility(layer: MapLayer, viewers: Iterable[Viewer],
+                      reveal: bool = True) -> bytearray:
+    """
+    Recompute fog of war for a layer and store it in the tile flags.
+
+    is_visible is set for exactly the cells some viewer can see; with
+    reveal, those cells are also marked is_discovered (previously
+    discovered cells stay discovered). Both are written with
+    MapLayer.set_column, which only touches the cells whose flag changes
+    and reports just the rectangle around them to listeners.
+
+    Args:
+        layer: Layer to update
+        viewers: (x, y, radius) of every viewer
+        reveal: Whether to also update is_discovered
+
+    Returns:
+        The visibility mask that was written
+    """
+    visible = compute_visibility(layer, viewers)
+    layer.set_column('is_visible', visible)
+    if reveal:
+        layer.set_column('is_discovered', mask_or(layer.get_column('is_discovered'), visible))
+    return visible
@@ -0,0 +1,444 @@
+"""
+Undo / redo history for map edits in the model layer.
+
+This module defines EditHistory, a command history over a MapData that
+stores every edit as a reversible delta instead of a map snapshot. Each
+step keeps, per touched 32x32 chunk, the changed cell offsets and the
+before / after tile states as indexes into a pool of interned states that
+all steps share; untouched chunks cost nothing, and painting thousands of
+identical floor tiles stores one floor state. Consecutive brush strokes
+can be coalesced into a single step, and the history drops its oldest
+steps to stay within a step count and memory budget.
+"""
+
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from .tile import Tile
+from .map_data import MapData, MapLayer
+from .snapshot import TileState, capture_tile_state, tile_from_state
+
+
+CHUNK_SHIFT = 5
+CHUNK_MASK = (1 << CHUNK_SHIFT) - 1
+
+ChunkKey = Tuple[int, int]
+# Cell and chunk keys start with the layer's slot in EditHistory._layers
+# (MapLayer dataclasses are not hashable)
+CellKey = Tuple[int, int, int]
+DeltaKey = Tuple[int, int, int]
+
+# Rough per-entry costs used for the memory budget
+_CHUNK_OVERHEAD = 200
+_CELL_BYTES = 2 + 4 + 4
+_STATE_BYTES = 240
+
+DEFAULT_MAX_STEPS = 10000
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+
+class _StatePool:
+    """
+    Reference-counted pool of tile states shared by all history steps.
+
+    Hashable states are interned, so equal states share one slot; states
+    holding unhashable values (e.g. asset instances) get a slot each.
+    Slot 0 is the empty cell and is never released.
+    """
+
+    def __init__(self):
+        self.states: List[Optional[TileState]] = [None]
+        self.counts: List[int] = [1]
+        self._slots: Dict[TileState, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.states) - len(self._free)
+
+    def acquire(self, state: Optional[TileState]) -> int:
+        """Get the slot of a state, adding a reference."""
+        if state is None:
+            return 0
+        try:
+            slot = self._slots.get(state)
+            hashable = True
+        except TypeError:
+            slot, hashable = None, False
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self.states[slot] = state
+                self.counts[slot] = 0
+            else:
+                slot = len(self.states)
+                self.states.append(state)
+                self.counts.append(0)
+            if hashable:
+                self._slots[state] = slot
+        self.counts[slot] += 1
+        return slot
+
+    def release(self, slot: int) -> None:
+        """Drop a reference to a slot, freeing it when unused."""
+        if not slot:
+            return
+        self.counts[slot] -= 1
+        if not self.counts[slot]:
+            state = self.states[slot]
+            try:
+                if self._slots.get(state) == slot:
+                    del self._slots[state]
+            except TypeError:
+                pass
+            self.states[slot] = None
+            self._free.append(slot)
+
+
+class _ChunkDelta:
+    """The changed cells of one chunk in one step, in parallel arrays."""
+
+    __slots__ = ('offsets', 'before', 'after')
+
+    def __init__(self):
+        self.offsets = array('H')
+        self.before = array('I')
+        self.after = array('I')
+
+    def nbytes(self) -> int:
+        return _CHUNK_OVERHEAD + len(self.offsets) * _CELL_BYTES
+
+
+class EditStep:
+    """
+    One undoable step: a label and the per-chunk deltas of every layer it
+    touched. Created by EditHistory; read label, cell_count and nbytes.
+    """
+
+    __slots__ = ('label', 'merge_key', 'timestamp', 'deltas', 'cell_count', 'nbytes')
+
+    def __init__(self, label: str, merge_key: Optional[str], timestamp: float):
+        self.label = label
+        self.merge_key = merge_key
+        self.timestamp = timestamp
+        self.deltas: Dict[DeltaKey, _ChunkDelta] = {}
+        self.cell_count = 0
+        self.nbytes = 0
+
+    def __repr__(self) -> str:
+        return f"EditStep({self.label!r}, cells={self.cell_count}, bytes={self.nbytes})"
+
+
+class EditHistory:
+    """
+    Undo / redo history of tile edits on a MapData.
+
+    Edits go through the history (set_tile, clear_tile) or are announced
+    with touch before a tile is modified in place (e.g. tile.damage).
+    Edits are grouped into steps with begin / commit or the transaction
+    context manager; an edit outside a transaction is a step of its own.
+
+    Steps committed with the same merge_key within coalesce_window seconds
+    of each other are merged, so the segments of one brush stroke undo
+    together. Only cells are tracked: whole-map operations such as
+    MapData.resize or adding layers are not undoable and should be
+    followed by clear().
+
+    Args:
+        map_data: The map being edited (layer names are resolved on it)
+        max_steps: Maximum number of undo steps kept
+        max_bytes: Approximate memory budget of the whole history
+        coalesce_window: Seconds within which steps with the same
+            merge_key are merged
+    """
+
+    def __init__(self, map_data: MapData, max_steps: int = DEFAULT_MAX_STEPS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, coalesce_window: float = 0.5):
+        self.map_data = map_data
+        self.max_steps = max_steps
+        self.max_bytes = max_bytes
+        self.coalesce_window = coalesce_window
+        self._pool = _StatePool()
+        self._undo: Deque[EditStep] = deque()
+        self._redo: List[EditStep] = []
+        self._steps_bytes = 0
+        # Layers referenced by steps, and their slot by id()
+        self._layers: List[MapLayer] = []
+        self._layer_slots: Dict[int, int] = {}
+        # Open transaction: label, merge key and the before state of every
+        # touched cell
+        self._open: Optional[Tuple[str, Optional[str]]] = None
+        self._depth = 0
+        self._pending: Dict[CellKey, Optional[TileState]] = {}
+
+    # --- Recording -------------------------------------------------------
+
+    def begin(self, label: str = "Edit", merge_key: Optional[str] = None) -> None:
+        """
+        Start a step; nested begin calls join the outermost one.
+
+        Args:
+            label: Description shown for the step (e.g. "Paint")
+            merge_key: Steps with the same key committed within
+                coalesce_window seconds are merged into one
+        """
+        if self._depth == 0:
+            self._open = (label, merge_key)
+            self._pending = {}
+        self._depth += 1
+
+    def commit(self) -> Optional[EditStep]:
+        """
+        Finish the current step.
+
+        Returns:
+            The new (or merged) undo step, or None if nothing changed or
+            a nested transaction is still open
+        """
+        if self._depth == 0:
+            raise RuntimeError("commit() without begin()")
+        self._depth -= 1
+        if self._depth:
+            return None
+        label, merge_key = self._open
+        pending, self._pending, self._open = self._pending, {}, None
+        return self._commit(label, merge_key, pending)
+
+    def cancel(self) -> None:
+        """Abandon the current step, restoring every cell it touched."""
+        if self._depth == 0:
+            raise RuntimeError("cancel() without begin()")
+        pending, self._pending, self._open, self._depth = self._pending, {}, None, 0
+        for (slot, x, y), before in pending.items():
+            self._layers[slot].set_tile(x, y, None if before is None else tile_from_state(before, x, y))
+
+    @contextmanager
+    def transaction(self, label: str = "Edit", merge_key: Optional[str] = None) -> Iterator['EditHistory']:
+        """
+        Group the edits made in a with block into one step (cancelled on error).
+
+        Nested transactions join the outermost one: an error leaving a
+        nested block is passed on, and the outermost block cancels the
+        whole step if the error reaches it.
+        """
+        self.begin(label, merge_key)
+        try:
+            yield self
+        except BaseException:
+            if self._depth > 1:
+                self._depth -= 1
+            elif self._depth == 1:
+                self.cancel()
+            raise
+        if self._depth:
+            self.commit()
+
+    def touch(self, layer: Union[MapLayer, str], x1: int, y1: int,
+              x2: Optional[int] = None, y2: Optional[int] = None) -> None:
+        """
+        Record the current state of a cell or rectangle before changing it.
+
+        Call this before modifying tiles in place (damage, set_property,
+        set_column ...); set_tile and clear_tile call it themselves.
+        """
+        if self._depth == 0:
+            raise RuntimeError("touch() needs an open transaction (begin or transaction)")
+        layer = self._resolve(layer)
+        slot = self._layer_slot(layer)
+        x2 = x1 if x2 is None else x2
+        y2 = y1 if y2 is None else y2
+        pending = self._pending
+        for y in range(min(y1, y2), max(y1, y2) + 1):
+            for x in range(min(x1, x2), max(x1, x2) + 1):
+                key = (slot, x, y)
+                if key not in pending and layer.is_valid_position(x, y):
+                    pending[key] = capture_tile_state(layer.get_tile(x, y))
+
+    def set_tile(self, layer: Union[MapLayer, str], x: int, y: int, tile: Optional[Tile]) -> bool:
+        """Set a tile through the history (see MapLayer.set_tile)."""
+        layer = self._resolve(layer)
+        if not layer.is_valid_position(x, y):
+            return False
+        if self._depth == 0:
+            with self.transaction("Set tile"):
+                return self.set_tile(layer, x, y, tile)
+        key = (self._layer_slot(layer), x, y)
+        if key not in self._pending:
+            self._pending[key] = capture_tile_state(layer.get_tile(x, y))
+        return layer.set_tile(x, y, tile)
+
+    def clear_tile(self, layer: Union[MapLayer, str], x: int, y: int) -> bool:
+        """Clear a tile through the history."""
+        return self.set_tile(layer, x, y, None)
+
+    # --- Undo / redo -----------------------------------------------------
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @property
+    def undo_steps(self) -> List[EditStep]:
+        """The undo stack, oldest first."""
+        return list(self._undo)
+
+    @property
+    def redo_steps(self) -> List[EditStep]:
+        """The redo stack, next redo last."""
+        return list(self._redo)
+
+    def undo(self) -> Optional[EditStep]:
+        """Revert the newest step; returns it, or None if there is none."""
+        self._check_closed()
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._apply(step, before=True)
+        self._redo.append(step)
+        return step
+
+    def redo(self) -> Optional[EditStep]:
+        """Re-apply the last undone step; returns it, or None if there is none."""
+        self._check_closed()
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._apply(step, before=False)
+        self._undo.append(step)
+        return step
+
+    def clear(self) -> None:
+        """Forget every step."""
+        self._check_closed()
+        for step in list(self._undo) + self._redo:
+            self._release(step)
+        self._undo, self._redo = deque(), []
+        self._steps_bytes = 0
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes held by the history."""
+        return self._steps_bytes + len(self._pool) * _STATE_BYTES
+
+    def __len__(self) -> int:
+        return len(self._undo)
+
+    # --- Internals -------------------------------------------------------
+
+    def _resolve(self, layer: Union[MapLayer, str]) -> MapLayer:
+        if isinstance(layer, MapLayer):
+            return layer
+        resolved = self.map_data.get_layer(layer)
+        if resolved is None:
+            raise KeyError(f"No layer named '{layer}'")
+        return resolved
+
+    def _layer_slot(self, layer: MapLayer) -> int:
+        slot = self._layer_slots.get(id(layer))
+        if slot is None:
+            slot = self._layer_slots[id(layer)] = len(self._layers)
+            self._layers.append(layer)
+        return slot
+
+    def _check_closed(self) -> None:
+        if self._depth:
+            raise RuntimeError("Cannot undo, redo or clear inside an open transaction")
+
+    def _commit(self, label: str, merge_key: Optional[str],
+                pending: Dict[CellKey, Optional[TileState]]) -> Optional[EditStep]:
+        pool = self._pool
+        now = time.monotonic()
+        top = self._undo[-1] if self._undo else None
+        merge = (merge_key is not None and top is not None and not self._redo
+                 and top.merge_key == merge_key and now - top.timestamp <= self.coalesce_window)
+        step = top if merge else EditStep(label, merge_key, now)
+        if merge:
+            self._steps_bytes -= step.nbytes
+
+        changed = False
+        layers = self._layers
+        # Offset -> position of the cells already in a merged step's chunks
+        positions: Dict[DeltaKey, Dict[int, int]] = {}
+        for (slot, x, y), before in pending.items():
+            after = capture_tile_state(layers[slot].get_tile(x, y))
+            chunk_key = (slot, x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+            offset = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+            delta = step.deltas.get(chunk_key)
+
+            if merge and delta is not None:
+                # Already in the step: keep its original before state
+                chunk_positions = positions.get(chunk_key)
+                if chunk_positions is None:
+                    chunk_positions = positions[chunk_key] = {
+                        value: index for index, value in enumerate(delta.offsets)
+                    }
+                position = chunk_positions.get(offset)
+                if position is not None:
+                    pool.release(delta.after[position])
+                    delta.after[position] = pool.acquire(after)
+                    changed = True
+                    continue
+
+            if before == after:
+                continue
+            if delta is None:
+                delta = step.deltas[chunk_key] = _ChunkDelta()
+            if chunk_key in positions:
+                positions[chunk_key][offset] = len(delta.offsets)
+            delta.offsets.append(offset)
+            delta.before.append(pool.acquire(before))
+            delta.after.append(pool.acquire(after))
+            step.cell_count += 1
+            changed = True
+
+        if merge:
+            step.timestamp = now
+            step.nbytes = sum(delta.nbytes() for delta in step.deltas.values())
+            self._steps_bytes += step.nbytes
+            self._enforce_limits()
+            return step if changed else None
+        if not changed:
+            return None
+
+        step.nbytes = sum(delta.nbytes() for delta in step.deltas.values())
+        for redone in self._redo:
+            self._release(redone)
+        self._redo = []
+        self._undo.append(step)
+        self._steps_bytes += step.nbytes
+        self._enforce_limits()
+        return step
+
+    def _apply(self, step: EditStep, before: bool) -> None:
+        states = self._pool.states
+        for (slot, chunk_x, chunk_y), delta in step.deltas.items():
+            layer = self._layers[slot]
+            base_x, base_y = chunk_x << CHUNK_SHIFT, chunk_y << CHUNK_SHIFT
+            slots = delta.before if before else delta.after
+            for offset, state_slot in zip(delta.offsets, slots):
+                x = base_x + (offset & CHUNK_MASK)
+                y = base_y + (offset >> CHUNK_SHIFT)
+                state = states[state_slot]
+                layer.set_tile(x, y, None if state is None else tile_from_state(state, x, y))
+
+    def _release(self, step: EditStep) -> None:
+        pool = self._pool
+        for delta in step.deltas.values():
+            for slot in delta.before:
+                pool.release(slot)
+            for slot in delta.after:
+                pool.release(slot)
+        step.deltas = {}
+
+    def _enforce_limits(self) -> None:
+        """Drop the oldest steps until the history fits its budget (keeping the newest)."""
+        while len(self._undo) > 1 and (len(self._undo) > self.max_steps
+                                       or self.memory_usage() > self.max_bytes):
+            step = self._undo.popleft()
+            self._steps_bytes -= step.nbytes
+            self._release(step)
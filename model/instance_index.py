@@ -0,0 +1,118 @@
+"""
+Map-wide asset instance index for the model layer.
+
+This module defines AssetInstanceIndex, a registry from instance_id to
+the layer, cell and AssetInstance holding it. Layers attached to an index
+keep it up to date from set_tile, Tile.add_asset_instance /
+remove_asset_instance and their bulk operations (import_columns, resize),
+so finding, moving or deleting one prop no longer walks the whole map.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional
+
+from .assets import AssetInstance
+from .tile import Tile
+
+if TYPE_CHECKING:
+    from .map_data import MapLayer
+
+
+@dataclass
+class InstanceLocation:
+    """Where an indexed asset instance is stored."""
+
+    layer: 'MapLayer'
+    x: int
+    y: int
+    instance: AssetInstance
+
+    @property
+    def tile(self) -> Optional[Tile]:
+        """The tile currently holding the instance."""
+        return self.layer.get_tile(self.x, self.y)
+
+    def is_at(self, layer: 'MapLayer', x: int, y: int) -> bool:
+        """Check whether this location is the given cell."""
+        return self.layer is layer and self.x == x and self.y == y
+
+
+class AssetInstanceIndex:
+    """
+    Registry of the asset instances stored on a set of layers.
+
+    Lookups by instance_id are O(1). Attached layers report every change
+    to the instances they store: set_tile and the Tile add/remove methods
+    update single entries, and operations replacing the whole layer
+    content re-index that layer. A layer can only be attached to one
+    index at a time, and instance IDs are expected to be unique; for
+    duplicates the most recently indexed location wins.
+    """
+
+    def __init__(self, layers: Iterable['MapLayer'] = ()):
+        self._locations: Dict[str, InstanceLocation] = {}
+        for layer in layers:
+            self.attach(layer)
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, instance_id: str) -> bool:
+        return instance_id in self._locations
+
+    def __iter__(self) -> Iterator[InstanceLocation]:
+        return iter(list(self._locations.values()))
+
+    def get(self, instance_id: str) -> Optional[InstanceLocation]:
+        """Get the location of an instance by its ID."""
+        return self._locations.get(instance_id)
+
+    def attach(self, layer: 'MapLayer') -> None:
+        """Index a layer's instances and keep them up to date."""
+        if layer._instance_index is not None and layer._instance_index is not self:
+            layer._instance_index.detach(layer)
+        layer._instance_index = self
+        self.reindex_layer(layer)
+
+    def detach(self, layer: 'MapLayer') -> None:
+        """Stop tracking a layer and drop its instances from the index."""
+        self._drop_layer(layer)
+        if layer._instance_index is self:
+            layer._instance_index = None
+
+    def reindex_layer(self, layer: 'MapLayer') -> None:
+        """Rebuild the entries of one layer from its current content."""
+        self._drop_layer(layer)
+        for x, y, instance in layer._iter_asset_instances():
+            self.add(layer, x, y, instance)
+
+    def add(self, layer: 'MapLayer', x: int, y: int, instance: AssetInstance) -> None:
+        """Record that an instance is stored in a layer cell."""
+        self._locations[instance.instance_id] = InstanceLocation(layer, x, y, instance)
+
+    def discard(self, layer: 'MapLayer', x: int, y: int, instance_id: str) -> None:
+        """Forget an instance, if the index has it in the given cell."""
+        location = self._locations.get(instance_id)
+        if location is not None and location.is_at(layer, x, y):
+            del self._locations[instance_id]
+
+    def replace_cell(self, layer: 'MapLayer', x: int, y: int,
+                     previous: Iterable[AssetInstance]) -> None:
+        """
+        Update a cell whose tile was replaced.
+
+        Args:
+            layer: Layer holding the cell
+            x, y: Cell position
+            previous: Instances the cell held before the change
+        """
+        for instance in previous:
+            self.discard(layer, x, y, instance.instance_id)
+        for instance in layer._asset_instances_at(x, y):
+            self.add(layer, x, y, instance)
+
+    def _drop_layer(self, layer: 'MapLayer') -> None:
+        stale = [instance_id for instance_id, location in self._locations.items()
+                 if location.layer is layer]
+        for instance_id in stale:
+            del self._locations[instance_id]
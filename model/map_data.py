@@ -6,12 +6,32 @@ with multiple layers, dimensions, and tile management functionality.
 """
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple, Iterator
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple, Iterator, Type
+import copy
 import json
+import weakref
 
-from .enums import LayerType, BiomeType
+from .enums import TileType, LayerType, BiomeType
 from .tile import Tile
 from .assets import AssetInstance
+from .instance_index import AssetInstanceIndex, InstanceLocation
+from .changes import ChangeJournal, Rect
+from .columns import (
+    Column, Extras, COLUMN_NAMES, COLUMN_ENCODERS, COLUMN_DECODERS, EMPTY_CODE, KEEP_CODE, DOUBLE_TYPECODE,
+    TILE_TYPE_BY_CODE, new_column, new_columns, extract_extras, tile_from_columns, flat_bytes,
+)
+
+if TYPE_CHECKING:
+    from .snapshot import MapSnapshot
+
+
+def _copy_for_blit(tile: Tile, x: int, y: int) -> Tile:
+    """An independent copy of a tile whose asset instances get new IDs."""
+    data = copy.deepcopy(tile.to_dict())
+    for instance in data.get("asset_instances", ()):
+        instance["instance_id"] = ""
+    data["x"], data["y"] = x, y
+    return Tile.from_dict(data)
 
 
 @dataclass
@@ -39,6 +59,24 @@ class MapLayer:
     # Metadata
     properties: Dict[str, Any] = field(default_factory=dict)
     
+    # Change listeners (see add_listener); left unannotated so it is not a
+    # dataclass field
+    _listeners = ()
+    
+    # AssetInstanceIndex kept up to date by this layer (see
+    # MapData.instance_index); unannotated for the same reason
+    _instance_index = None
+    
+    # Number of notified changes (see version), and the ChangeJournal
+    # recording them, created by the first changes_since / dirty_regions
+    # call so that layers nobody tracks pay nothing for it
+    _version = 0
+    _journal = None
+    
+    # Weak references to the LayerSnapshots sharing this layer's storage
+    # (see MapData.snapshot); unannotated for the same reason
+    _snapshots = ()
+    
     def __post_init__(self):
         """Initialize the tile grid if not provided."""
         if not self.tiles:
@@ -49,19 +87,178 @@ class MapLayer:
         """Get a tile at the specified coordinates."""
         if not self.is_valid_position(x, y):
             return None
-        return self.tiles[y][x]
+        return self._get(x, y)
     
     def set_tile(self, x: int, y: int, tile: Optional[Tile]) -> bool:
         """Set a tile at the specified coordinates."""
         if not self.is_valid_position(x, y):
             return False
         
-        self.tiles[y][x] = tile
+        index = self._instance_index
+        if index is not None:
+            previous = list(self._asset_instances_at(x, y))
+        if self._snapshots:
+            self._preserve(x, y, x, y)
+        
+        self._set(x, y, tile)
         if tile:
             tile.x = x
             tile.y = y
+        
+        if index is not None:
+            index.replace_cell(self, x, y, previous)
+        self._notify(x, y, x, y)
         return True
     
+    def add_listener(self, listener: Callable[['MapLayer', int, int, int, int], None]) -> None:
+        """
+        Register a callback for tile changes.
+        
+        The listener is called as listener(layer, x1, y1, x2, y2) with the
+        inclusive rectangle that changed, after every set_tile, clear_tile,
+        bulk column write and resize. In-place changes to a tile object are
+        not detected; report them with notify_changed.
+        """
+        self._listeners = self._listeners + (listener,)
+    
+    def remove_listener(self, listener: Callable[['MapLayer', int, int, int, int], None]) -> None:
+        """Unregister a callback added with add_listener."""
+        self._listeners = tuple(item for item in self._listeners if item != listener)
+    
+    def notify_changed(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Tell the listeners that the tiles in a rectangle were modified in place."""
+        self._notify(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+    
+    @property
+    def version(self) -> int:
+        """
+        Change counter of the layer.
+        
+        Incremented by every change reported to the listeners: set_tile,
+        clear_tile, bulk column writes, resize and notify_changed (which
+        Tile.damage, Tile.heal, ... call). Remember it and pass it to
+        changes_since or dirty_regions later.
+        """
+        return self._version
+    
+    def _change_journal(self) -> ChangeJournal:
+        """The layer's ChangeJournal, started at the current version on first use."""
+        if self._journal is None:
+            self._journal = ChangeJournal(version=self._version, bounds=self._bounds())
+        return self._journal
+    
+    def changes_since(self, version: int) -> Optional[List[Rect]]:
+        """
+        Get the rectangles changed after a version, oldest first.
+        
+        The journal is started by the first changes_since / dirty_regions
+        call, so that call cannot list the earlier changes.
+        
+        Returns:
+            Inclusive (x1, y1, x2, y2) rectangles, or None if the change
+            journal does not reach back to that version (use dirty_regions
+            or a full rescan then)
+        """
+        return self._change_journal().changes_since(version)
+    
+    def dirty_regions(self, version: int) -> List[Rect]:
+        """
+        Get the 32x32 chunks changed after a version.
+        
+        Unlike changes_since this always answers, at chunk granularity;
+        the whole layer is returned as one rectangle if it was replaced
+        or resized after the version (or changed before the journal was
+        started).
+        """
+        return self._change_journal().dirty_regions(version)
+    
+    def will_change(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """
+        Announce that the tiles in a rectangle are about to be modified in place.
+        
+        Snapshots sharing this layer copy the affected chunks first. Tile
+        methods (damage, heal, set_property, ...) and the layer's own
+        writes do this themselves; call it before assigning tile
+        attributes directly while a snapshot is alive.
+        """
+        if self._snapshots:
+            self._preserve(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+    
+    def _add_snapshot(self, snapshot) -> Any:
+        """Register a LayerSnapshot; returns the weak reference to pass to _drop_snapshot."""
+        ref = weakref.ref(snapshot, self._drop_snapshot)
+        self._snapshots = self._snapshots + (ref,)
+        return ref
+    
+    def _drop_snapshot(self, ref) -> None:
+        self._snapshots = tuple(item for item in self._snapshots if item is not ref)
+    
+    def _preserve(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Let every live snapshot copy the chunks of a rectangle before a write."""
+        # Chunks captured for one snapshot are shared with the others
+        captured: Dict[Any, Any] = {}
+        for ref in self._snapshots:
+            snapshot = ref()
+            if snapshot is not None:
+                snapshot._preserve(x1, y1, x2, y2, captured)
+    
+    def _will_replace(self) -> None:
+        """Let every live snapshot copy the whole layer before a bulk write or resize."""
+        for ref in self._snapshots:
+            snapshot = ref()
+            if snapshot is not None:
+                snapshot._preserve_all()
+    
+    def _snapshot_chunk_keys(self, x1: int, y1: int, x2: int, y2: int) -> Iterator[Tuple[int, int]]:
+        """Keys (x >> 5, y >> 5) of the 32x32 chunks that may hold tiles in a rectangle."""
+        for chunk_y in range(y1 >> 5, (y2 >> 5) + 1):
+            for chunk_x in range(x1 >> 5, (x2 >> 5) + 1):
+                yield chunk_x, chunk_y
+    
+    def _notify(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        journal = self._journal
+        if journal is None:
+            self._version += 1
+        else:
+            self._version = journal.record(self._bounds(), x1, y1, x2, y2)
+        for listener in self._listeners:
+            listener(self, x1, y1, x2, y2)
+    
+    def _notify_all(self) -> None:
+        self._notify(*self._bounds())
+    
+    def _bounds(self) -> Rect:
+        """Inclusive (x1, y1, x2, y2) of the layer bounds."""
+        return 0, 0, self.width - 1, self.height - 1
+    
+    def _notify_replaced(self) -> None:
+        """Re-index and notify after the whole layer content was replaced."""
+        if self._instance_index is not None:
+            self._instance_index.reindex_layer(self)
+        self._notify_all()
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore a pickled / copied layer, reattaching its tiles (see Tile.__getstate__)."""
+        self.__dict__.update(state)
+        for _x, _y, tile in self.get_all_tiles():
+            if tile is not None:
+                tile._layer = self
+    
+    def _get(self, x: int, y: int) -> Optional[Tile]:
+        """Read a cell from the underlying storage (position already validated)."""
+        return self.tiles[y][x]
+    
+    def _set(self, x: int, y: int, tile: Optional[Tile]) -> None:
+        """Write a cell to the underlying storage (position already validated)."""
+        previous = self.tiles[y][x]
+        if previous is not None and previous._layer is self:
+            previous._layer = None
+        if tile is not None:
+            if tile._is_view:
+                tile = tile._standalone(x, y)
+            tile._layer = self
+        self.tiles[y][x] = tile
+    
     def is_valid_position(self, x: int, y: int) -> bool:
         """Check if the given coordinates are within the layer bounds."""
         return 0 <= x < self.width and 0 <= y < self.height
@@ -70,6 +267,227 @@ class MapLayer:
         """Clear a tile at the specified coordinates."""
         return self.set_tile(x, y, None)
     
+    def fill_rect(self, x1: int, y1: int, x2: int, y2: int, tile_type: Optional[TileType],
+                  biome_type: BiomeType = BiomeType.DUNGEON) -> int:
+        """
+        Fill a rectangle with default tiles of one type in a single call.
+        
+        Args:
+            x1, y1, x2, y2: Inclusive corners (clipped to the layer bounds)
+            tile_type: Type of the new tiles; None clears the rectangle
+            biome_type: Biome of the new tiles
+            
+        Returns:
+            Number of cells written
+        """
+        rect = self._clip(x1, y1, x2, y2)
+        if rect is None:
+            return 0
+        x1, y1, x2, y2 = rect
+        size = (x2 - x1 + 1) * (y2 - y1 + 1)
+        code = EMPTY_CODE if tile_type is None else tile_type.value
+        self._bulk_write(rect, bytes((code,)) * size, biome_type)
+        return size
+    
+    def fill_mask(self, mask: Any, tile_type: Optional[TileType],
+                  biome_type: BiomeType = BiomeType.DUNGEON) -> int:
+        """
+        Fill the cells selected by a mask with default tiles of one type.
+        
+        Args:
+            mask: Row-major per-cell values sized width * height, truthy
+                for the cells to fill (bytes, bool / uint8 NumPy array,
+                nested lists ...); other cells are left unchanged
+            tile_type: Type of the new tiles; None clears the cells
+            biome_type: Biome of the new tiles
+            
+        Returns:
+            Number of cells written
+        """
+        mask = self._check_size(flat_bytes(mask), "Mask")
+        code = EMPTY_CODE if tile_type is None else tile_type.value
+        table = bytes([KEEP_CODE] + [code] * 255)
+        codes = mask.translate(table)
+        written = len(codes) - codes.count(KEEP_CODE)
+        if written:
+            self._bulk_write(self._bounds(), codes, biome_type)
+        return written
+    
+    def fill_spans(self, spans: Iterable[Tuple[int, int, int]], tile_type: Optional[TileType],
+                   biome_type: BiomeType = BiomeType.DUNGEON) -> int:
+        """
+        Fill rows of cells with default tiles of one type in a single call.
+        
+        Only the bounding box of the spans is written, so stamping a shape
+        costs the same on a small layer and a huge chunked one.
+        
+        Args:
+            spans: Inclusive (y, x1, x2) runs of cells, e.g. from the raster
+                module (clipped to the layer bounds; overlaps are fine)
+            tile_type: Type of the new tiles; None clears the cells
+            biome_type: Biome of the new tiles
+            
+        Returns:
+            Number of cells written
+        """
+        bx1, by1, bx2, by2 = self._bounds()
+        clipped = []
+        for y, x1, x2 in spans:
+            x1, x2 = max(x1, bx1), min(x2, bx2)
+            if by1 <= y <= by2 and x1 <= x2:
+                clipped.append((y, x1, x2))
+        if not clipped:
+            return 0
+        
+        rect = (min(span[1] for span in clipped), min(span[0] for span in clipped),
+                max(span[2] for span in clipped), max(span[0] for span in clipped))
+        rx1, ry1, rx2, _ = rect
+        width = rx2 - rx1 + 1
+        codes = bytearray((KEEP_CODE,)) * (width * (rect[3] - ry1 + 1))
+        code = bytes((EMPTY_CODE if tile_type is None else tile_type.value,))
+        for y, x1, x2 in clipped:
+            start = (y - ry1) * width - rx1
+            codes[start + x1:start + x2 + 1] = code * (x2 - x1 + 1)
+        self._bulk_write(rect, bytes(codes), biome_type)
+        return len(codes) - codes.count(KEEP_CODE)
+    
+    def fill_types(self, types: Any, biome_type: BiomeType = BiomeType.DUNGEON) -> None:
+        """
+        Replace every cell with a default tile of the given type.
+        
+        Args:
+            types: Row-major TileType values sized width * height, 0 for an
+                empty cell (bytes, uint8 NumPy array, nested lists of
+                TileType or int ...)
+            biome_type: Biome of the new tiles
+        """
+        codes = self._check_size(flat_bytes(types), "Type array")
+        if KEEP_CODE in codes or max(codes, default=0) >= len(TILE_TYPE_BY_CODE):
+            raise ValueError("Type array holds values that are not TileType values")
+        self._bulk_write(self._bounds(), codes, biome_type)
+    
+    @classmethod
+    def from_type_array(cls, types: Any, name: str, layer_type: LayerType,
+                        width: Optional[int] = None, height: Optional[int] = None,
+                        biome_type: BiomeType = BiomeType.DUNGEON, **kwargs) -> 'MapLayer':
+        """
+        Create a layer from an array of TileType values (see fill_types).
+        
+        Args:
+            types: 2D array / nested rows, or a flat buffer with width given
+            name: Layer name
+            layer_type: Layer type
+            width: Layer width (taken from a 2D array's shape if omitted)
+            height: Layer height (derived from the size if omitted)
+            biome_type: Biome of the new tiles
+            **kwargs: Further layer fields (z_index, ...)
+        """
+        shape = getattr(types, 'shape', None)
+        if width is None:
+            if shape is not None and len(shape) == 2:
+                width = shape[1]
+            elif isinstance(types, (list, tuple)) and types and isinstance(types[0], (list, tuple, bytes, bytearray)):
+                width = len(types[0])
+            else:
+                raise ValueError("width is required for a flat type array")
+        codes = flat_bytes(types)
+        if height is None:
+            height = len(codes) // width if width else 0
+        layer = cls(name=name, layer_type=layer_type, width=width, height=height, **kwargs)
+        layer.fill_types(codes, biome_type)
+        return layer
+    
+    def blit(self, source: 'MapLayer', dx: int = 0, dy: int = 0, include_empty: bool = False) -> int:
+        """
+        Copy the tiles of another layer into this one at an offset.
+        
+        The copies are independent of the source; their asset instances
+        get new instance IDs so that stamping a prefab twice keeps IDs
+        unique.
+        
+        Args:
+            source: Layer to copy from
+            dx, dy: Offset added to source coordinates
+            include_empty: Also clear the cells where the source is empty
+                (by default empty source cells leave this layer unchanged)
+            
+        Returns:
+            Number of cells written
+        """
+        sx1, sy1, sx2, sy2 = source._bounds()
+        rect = self._clip(sx1 + dx, sy1 + dy, sx2 + dx, sy2 + dy)
+        if rect is None:
+            return 0
+        self.will_change(*rect)
+        written = self._blit(source, rect, dx, dy, include_empty)
+        self._bulk_written(rect)
+        return written
+    
+    def _clip(self, x1: int, y1: int, x2: int, y2: int) -> Optional[Rect]:
+        """Order and clip a rectangle to the layer bounds (None if outside)."""
+        bx1, by1, bx2, by2 = self._bounds()
+        x1, x2 = max(bx1, min(x1, x2)), min(bx2, max(x1, x2))
+        y1, y2 = max(by1, min(y1, y2)), min(by2, max(y1, y2))
+        if x1 > x2 or y1 > y2:
+            return None
+        return x1, y1, x2, y2
+    
+    def _check_size(self, values: bytes, what: str) -> bytes:
+        if len(values) != self.width * self.height:
+            raise ValueError(
+                f"{what} size {len(values)} does not match layer size "
+                f"{self.width}x{self.height}"
+            )
+        return values
+    
+    def _bulk_write(self, rect: Rect, codes: bytes, biome_type: BiomeType) -> None:
+        """Write per-cell type codes over a rectangle, then re-index and notify once."""
+        self.will_change(*rect)
+        self._write_codes(rect, codes, biome_type)
+        self._bulk_written(rect)
+    
+    def _bulk_written(self, rect: Rect) -> None:
+        if self._instance_index is not None:
+            self._instance_index.reindex_layer(self)
+        self._notify(*rect)
+    
+    def _write_codes(self, rect: Rect, codes: bytes, biome_type: BiomeType) -> None:
+        """
+        Storage hook of the bulk fills: write default tiles over a rectangle.
+        
+        Args:
+            rect: Inclusive, already clipped rectangle
+            codes: Row-major code per cell of rect: a TileType value,
+                EMPTY_CODE to clear or KEEP_CODE to leave the cell alone
+            biome_type: Biome of the new tiles
+        """
+        x1, y1, x2, y2 = rect
+        index = 0
+        for y in range(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                code = codes[index]
+                index += 1
+                if code == KEEP_CODE:
+                    continue
+                if code == EMPTY_CODE:
+                    self._set(x, y, None)
+                else:
+                    self._set(x, y, Tile(x=x, y=y, tile_type=TILE_TYPE_BY_CODE[code], biome_type=biome_type))
+    
+    def _blit(self, source: 'MapLayer', rect: Rect, dx: int, dy: int, include_empty: bool) -> int:
+        """Storage hook of blit: copy source cells into an already clipped rectangle."""
+        x1, y1, x2, y2 = rect
+        written = 0
+        if include_empty:
+            for y in range(y1, y2 + 1):
+                for x in range(x1, x2 + 1):
+                    self._set(x, y, None)
+        for x, y, tile in source.get_tiles_in_area(x1 - dx, y1 - dy, x2 - dx, y2 - dy):
+            if tile is not None:
+                self._set(x + dx, y + dy, _copy_for_blit(tile, x + dx, y + dy))
+                written += 1
+        return (x2 - x1 + 1) * (y2 - y1 + 1) if include_empty else written
+    
     def get_tiles_in_area(self, x1: int, y1: int, x2: int, y2: int) -> List[Tuple[int, int, Optional[Tile]]]:
         """Get all tiles within the specified rectangular area."""
         tiles = []
@@ -80,7 +498,7 @@ class MapLayer:
         
         for y in range(max(0, min_y), min(self.height, max_y + 1)):
             for x in range(max(0, min_x), min(self.width, max_x + 1)):
-                tiles.append((x, y, self.tiles[y][x]))
+                tiles.append((x, y, self._get(x, y)))
         
         return tiles
     
@@ -88,7 +506,242 @@ class MapLayer:
         """Iterate through all tile positions in the layer."""
         for y in range(self.height):
             for x in range(self.width):
-                yield x, y, self.tiles[y][x]
+                yield x, y, self._get(x, y)
+    
+    def _asset_instances_at(self, x: int, y: int) -> List[AssetInstance]:
+        """The asset instances stored in a cell (position already validated)."""
+        tile = self._get(x, y)
+        return tile.asset_instances if tile is not None else []
+    
+    def _iter_asset_instances(self) -> Iterator[Tuple[int, int, AssetInstance]]:
+        """Iterate through every asset instance stored on the layer."""
+        for x, y, tile in self.get_all_tiles():
+            if tile is not None:
+                for instance in tile.asset_instances:
+                    yield x, y, instance
+    
+    def get_column(self, name: str) -> Column:
+        """
+        Get one tile attribute for the whole layer as a flat buffer.
+        
+        Args:
+            name: Attribute name (see model.columns.COLUMN_NAMES)
+            
+        Returns:
+            A row-major copy (index y * width + x) of the attribute. Empty
+            cells hold 0 (NaN for the optional health columns).
+        """
+        column = new_column(name, self.width * self.height)
+        encode = COLUMN_ENCODERS[name]
+        
+        index = 0
+        for row in self.tiles:
+            for tile in row:
+                if tile is not None:
+                    column[index] = encode(tile)
+                index += 1
+        
+        return column
+    
+    def set_column(self, name: str, values: Column) -> None:
+        """
+        Set one tile attribute for every existing tile in a single call.
+        
+        Empty cells are left empty. This is the bulk counterpart of
+        assigning e.g. tile.is_visible on every tile. Only the cells whose
+        value changes are written, and listeners and the change journal
+        get the rectangle bounding them, so a per-frame update of flags
+        such as is_visible does not look like a whole-layer change.
+        
+        Args:
+            name: Attribute name (see model.columns.COLUMN_NAMES), except
+                'tile_type' which is changed by setting or clearing tiles
+            values: Row-major buffer of stored values, sized width * height
+        """
+        if name == 'tile_type':
+            raise ValueError("tile_type cannot be set as a column; set or clear tiles instead")
+        if len(values) != self.width * self.height:
+            raise ValueError(
+                f"Column size {len(values)} does not match layer size "
+                f"{self.width}x{self.height}"
+            )
+        
+        decode = COLUMN_DECODERS[name]
+        width = self.width
+        changes = []
+        for y, row in enumerate(self.tiles):
+            offset = y * width
+            for x, tile in enumerate(row):
+                if tile is not None:
+                    value = decode(values[offset + x])
+                    if getattr(tile, name) != value:
+                        changes.append((x, y, value))
+        self._write_changes(name, changes)
+    
+    def _write_changes(self, name: str, changes: List[Tuple[int, int, Any]]) -> None:
+        """Assign one attribute of the listed (x, y, value) cells, then notify their bounding box."""
+        if not changes:
+            return
+        xs = [x for x, _y, _value in changes]
+        ys = [y for _x, y, _value in changes]
+        rect = min(xs), min(ys), max(xs), max(ys)
+        self.will_change(*rect)
+        for x, y, value in changes:
+            self._set_attribute(x, y, name, value)
+        self._notify(*rect)
+    
+    def _set_attribute(self, x: int, y: int, name: str, value: Any) -> None:
+        """Storage hook of set_column: assign one attribute of an occupied cell."""
+        setattr(self._get(x, y), name, value)
+    
+    def export_columns(self) -> Tuple[Dict[str, Column], Extras]:
+        """
+        Export the whole layer as columns in a single pass.
+        
+        Returns:
+            A (columns, extras) pair: one row-major buffer per name in
+            COLUMN_NAMES, and the non-default is_interactive,
+            interaction_range, properties and asset_instances keyed by (x, y).
+            Float columns are float64 here, so Tile values survive exactly;
+            column-backed layers export their float32 columns
+        """
+        columns = new_columns(self.width * self.height, DOUBLE_TYPECODE)
+        encoders = [(columns[name], COLUMN_ENCODERS[name]) for name in COLUMN_NAMES]
+        extras = {}
+        
+        index = 0
+        for y, row in enumerate(self.tiles):
+            for x, tile in enumerate(row):
+                if tile is not None:
+                    for column, encode in encoders:
+                        column[index] = encode(tile)
+                    tile_extras = extract_extras(tile)
+                    if tile_extras:
+                        extras[(x, y)] = tile_extras
+                index += 1
+        
+        return columns, extras
+    
+    def import_columns(self, columns: Dict[str, Column], extras: Optional[Extras] = None) -> None:
+        """
+        Replace the whole layer content from columns (see export_columns).
+        
+        Args:
+            columns: One row-major buffer per name in COLUMN_NAMES, sized
+                width * height
+            extras: Non-column field values keyed by (x, y)
+        """
+        self._will_replace()
+        extras = extras or {}
+        width = self.width
+        tile_types = columns['tile_type']
+        if len(tile_types) != width * self.height:
+            raise ValueError(
+                f"Column size {len(tile_types)} does not match layer size "
+                f"{width}x{self.height}"
+            )
+        
+        self.tiles = [[None for _ in range(width)] for _ in range(self.height)]
+        
+        for index, code in enumerate(tile_types):
+            if code != EMPTY_CODE:
+                x, y = index % width, index // width
+                self._set(x, y, tile_from_columns(columns, index, x, y, extras.get((x, y))))
+        self._notify_replaced()
+    
+    def to_dict(self, include_tiles: bool = True) -> Dict[str, Any]:
+        """
+        Convert the layer to a dictionary for serialization.
+        
+        Args:
+            include_tiles: Whether to include the (non-empty) tiles
+        """
+        data = {
+            "layer_type": self.layer_type.name,
+            "name": self.name,
+            "width": self.width,
+            "height": self.height,
+            "is_visible": self.is_visible,
+            "opacity": self.opacity,
+            "z_index": self.z_index,
+            "properties": self.properties,
+        }
+        
+        if include_tiles:
+            data["tiles"] = [
+                tile.to_dict()
+                for _x, _y, tile in self.get_all_tiles()
+                if tile is not None
+            ]
+        
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MapLayer':
+        """Create a layer from a dictionary produced by to_dict."""
+        layer = cls(
+            layer_type=LayerType[data["layer_type"]],
+            name=data["name"],
+            width=data["width"],
+            height=data["height"],
+            is_visible=data.get("is_visible", True),
+            opacity=data.get("opacity", 1.0),
+            z_index=data.get("z_index", 0),
+            properties=dict(data.get("properties", {})),
+        )
+        
+        for tile_data in data.get("tiles", []):
+            layer.set_tile(tile_data["x"], tile_data["y"], Tile.from_dict(tile_data))
+        
+        return layer
+    
+    def resize(self, new_width: int, new_height: int) -> None:
+        """Resize the layer, keeping the tiles that fit in the new bounds."""
+        self._will_replace()
+        # Create new tile grid
+        new_tiles = [[None for _ in range(new_width)] 
+                    for _ in range(new_height)]
+        
+        # Copy existing tiles that fit in the new dimensions
+        copy_width = min(self.width, new_width)
+        copy_height = min(self.height, new_height)
+        
+        for y in range(copy_height):
+            new_tiles[y][:copy_width] = self.tiles[y][:copy_width]
+        
+        self.tiles = new_tiles
+        self.width = new_width
+        self.height = new_height
+        self._notify_replaced()
+
+
+class LayerHandle:
+    """
+    A layer resolved once, for loops that touch many tiles.
+    
+    MapData.get_tile / set_tile look the layer up by name on every call;
+    a handle holds the layer and its bound tile accessors instead:
+    
+        terrain = map_data.layer_handle("Terrain")
+        for x, y in positions:
+            tile = terrain.get_tile(x, y)
+    
+    A handle keeps pointing at the same layer object, also after it is
+    removed from the map.
+    """
+    
+    __slots__ = ('layer', 'get_tile', 'set_tile', 'clear_tile')
+    
+    def __init__(self, layer: MapLayer):
+        self.layer = layer
+        self.get_tile = layer.get_tile
+        self.set_tile = layer.set_tile
+        self.clear_tile = layer.clear_tile
+    
+    @property
+    def name(self) -> str:
+        """Name of the layer."""
+        return self.layer.name
 
 
 @dataclass
@@ -126,6 +779,20 @@ class MapData:
     # Metadata and custom properties
     properties: Dict[str, Any] = field(default_factory=dict)
     
+    # Storage implementation used for new layers (e.g. ColumnarMapLayer)
+    layer_class: Type[MapLayer] = MapLayer
+    
+    # Map-wide AssetInstanceIndex, built on first use (see instance_index);
+    # unannotated so it is not a dataclass field
+    _instance_index = None
+    
+    # Name / type lookup tables over self.layers and the list (and length)
+    # they were built from (see _layer_tables); unannotated for the same reason
+    _layers_by_name = None
+    _layers_by_type = None
+    _indexed_layers = None
+    _indexed_count = 0
+    
     def __post_init__(self):
         """Initialize default layers if none provided."""
         if not self.layers:
@@ -134,12 +801,24 @@ class MapData:
             self.add_layer(LayerType.TERRAIN, "Terrain")
             self.add_layer(LayerType.OBJECTS, "Objects")
     
-    def add_layer(self, layer_type: LayerType, name: str, z_index: Optional[int] = None) -> MapLayer:
-        """Add a new layer to the map."""
+    def add_layer(self, layer_type: LayerType, name: str, z_index: Optional[int] = None,
+                  layer_class: Optional[Type[MapLayer]] = None) -> MapLayer:
+        """
+        Add a new layer to the map.
+        
+        Args:
+            layer_type: Type of the new layer
+            name: Unique layer name
+            z_index: Render order (defaults to the end of the stack)
+            layer_class: Storage implementation (defaults to self.layer_class)
+        """
         if z_index is None:
             z_index = len(self.layers)
         
-        layer = MapLayer(
+        if layer_class is None:
+            layer_class = self.layer_class
+        
+        layer = layer_class(
             layer_type=layer_type,
             name=name,
             width=self.width,
@@ -149,33 +828,141 @@ class MapData:
         
         self.layers.append(layer)
         self._sort_layers()
+        if self._instance_index is not None:
+            self._instance_index.attach(layer)
         return layer
     
     def get_layer(self, name: str) -> Optional[MapLayer]:
         """Get a layer by its name."""
-        for layer in self.layers:
-            if layer.name == name:
-                return layer
-        return None
+        layer = self._layer_tables()[0].get(name)
+        if layer is None or layer.name != name:
+            # Unknown name, or layers were renamed since the last lookup
+            layer = self.reindex_layers()[0].get(name)
+        return layer
     
     def get_layer_by_type(self, layer_type: LayerType) -> Optional[MapLayer]:
         """Get the first layer of the specified type."""
-        for layer in self.layers:
-            if layer.layer_type == layer_type:
-                return layer
-        return None
+        layer = self._layer_tables()[1].get(layer_type)
+        if layer is None or layer.layer_type != layer_type:
+            layer = self.reindex_layers()[1].get(layer_type)
+        return layer
+    
+    def layer_handle(self, name: str) -> Optional['LayerHandle']:
+        """Resolve a layer once for tight loops (see LayerHandle)."""
+        layer = self.get_layer(name)
+        return LayerHandle(layer) if layer is not None else None
     
     def remove_layer(self, name: str) -> bool:
         """Remove a layer by its name."""
-        for i, layer in enumerate(self.layers):
-            if layer.name == name:
-                self.layers.pop(i)
-                return True
-        return False
+        layer = self.get_layer(name)
+        if layer is None:
+            return False
+        
+        # Compare by identity: layer equality compares every tile
+        position = next(i for i, item in enumerate(self.layers) if item is layer)
+        self.layers.pop(position)
+        self.reindex_layers()
+        if self._instance_index is not None:
+            self._instance_index.detach(layer)
+        return True
     
     def _sort_layers(self):
         """Sort layers by their z_index."""
         self.layers.sort(key=lambda layer: layer.z_index)
+        self.reindex_layers()
+    
+    def reindex_layers(self) -> Tuple[Dict[str, MapLayer], Dict[LayerType, MapLayer]]:
+        """
+        Rebuild the name and type lookup tables from self.layers.
+        
+        Lookups notice layers being renamed, and self.layers being replaced
+        or changing length, by themselves; call this after replacing list
+        items in place or changing a layer's type.
+        
+        Returns:
+            The (by name, by type) tables; each maps to the first matching
+            layer in self.layers
+        """
+        by_name: Dict[str, MapLayer] = {}
+        by_type: Dict[LayerType, MapLayer] = {}
+        for layer in self.layers:
+            by_name.setdefault(layer.name, layer)
+            by_type.setdefault(layer.layer_type, layer)
+        
+        self._layers_by_name, self._layers_by_type = by_name, by_type
+        self._indexed_layers, self._indexed_count = self.layers, len(self.layers)
+        return by_name, by_type
+    
+    def _layer_tables(self) -> Tuple[Dict[str, MapLayer], Dict[LayerType, MapLayer]]:
+        """The lookup tables, rebuilt if self.layers was replaced or resized."""
+        if self._indexed_layers is not self.layers or self._indexed_count != len(self.layers):
+            return self.reindex_layers()
+        return self._layers_by_name, self._layers_by_type
+    
+    @property
+    def instance_index(self) -> AssetInstanceIndex:
+        """
+        The map-wide asset instance index, built on first access.
+        
+        Layers added with add_layer and removed with remove_layer are
+        attached and detached automatically; after changing self.layers
+        directly, call instance_index.attach / detach yourself.
+        """
+        if self._instance_index is None:
+            self._instance_index = AssetInstanceIndex(self.layers)
+        return self._instance_index
+    
+    def find_asset_instance(self, instance_id: str) -> Optional[InstanceLocation]:
+        """Get the layer, position and instance for an instance ID."""
+        return self.instance_index.get(instance_id)
+    
+    def get_asset_instance(self, instance_id: str) -> Optional[AssetInstance]:
+        """Get an asset instance anywhere on the map by its ID."""
+        location = self.instance_index.get(instance_id)
+        return location.instance if location is not None else None
+    
+    def remove_asset_instance(self, instance_id: str) -> bool:
+        """
+        Remove an asset instance from whichever tile holds it.
+        
+        Returns:
+            True if an instance was removed, False otherwise
+        """
+        location = self.instance_index.get(instance_id)
+        if location is None:
+            return False
+        tile = location.tile
+        return tile is not None and tile.remove_asset_instance(instance_id)
+    
+    def move_asset_instance(self, instance_id: str, x: int, y: int,
+                            layer_name: Optional[str] = None) -> bool:
+        """
+        Move an asset instance to the tile at another position.
+        
+        The instance's own transform (x, y, ...) is left unchanged.
+        
+        Args:
+            instance_id: ID of the instance to move
+            x, y: Target tile position
+            layer_name: Target layer (defaults to the instance's current layer)
+            
+        Returns:
+            True if the instance was moved, False if it or the target tile
+            does not exist
+        """
+        location = self.instance_index.get(instance_id)
+        if location is None:
+            return False
+        layer = location.layer if layer_name is None else self.get_layer(layer_name)
+        target = layer.get_tile(x, y) if layer is not None else None
+        source = location.tile
+        if target is None or source is None:
+            return False
+        
+        instance = location.instance
+        source.remove_asset_instance(instance_id)
+        target.add_asset_instance(instance)
+        return True
     
     def get_tile(self, x: int, y: int, layer_name: str) -> Optional[Tile]:
         """Get a tile from a specific layer."""
@@ -231,28 +1018,38 @@ class MapData:
     
     def resize(self, new_width: int, new_height: int) -> None:
         """Resize the map and all its layers."""
-        old_width, old_height = self.width, self.height
         self.width, self.height = new_width, new_height
         
         for layer in self.layers:
-            # Create new tile grid
-            new_tiles = [[None for _ in range(new_width)] 
-                        for _ in range(new_height)]
-            
-            # Copy existing tiles that fit in the new dimensions
-            copy_width = min(old_width, new_width)
-            copy_height = min(old_height, new_height)
-            
-            for y in range(copy_height):
-                for x in range(copy_width):
-                    new_tiles[y][x] = layer.tiles[y][x]
-            
-            layer.tiles = new_tiles
-            layer.width = new_width
-            layer.height = new_height
+            layer.resize(new_width, new_height)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert the map data to a dictionary for serialization."""
+    def snapshot(self) -> 'MapSnapshot':
+        """
+        Take a frozen, copy-on-write view of the map.
+        
+        Nothing is copied up front: the snapshot shares the layers'
+        storage, and each layer copies a 32x32 chunk into its snapshots
+        just before first writing it. Release the snapshot (or use it in a
+        with block) when done so the layers stop copying for it.
+        
+        Edit tiles through the layers and Tile methods (set_tile, damage,
+        set_property, ...) while a snapshot is alive: direct attribute
+        assignments on stored tiles need layer.will_change before and
+        layer.notify_changed after, or they leak into the snapshot.
+        
+        Returns:
+            A MapSnapshot (see model.snapshot)
+        """
+        from .snapshot import MapSnapshot
+        return MapSnapshot(self)
+    
+    def to_dict(self, include_tiles: bool = True) -> Dict[str, Any]:
+        """
+        Convert the map data to a dictionary for serialization.
+        
+        Args:
+            include_tiles: Whether to include the tiles of every layer
+        """
         return {
             "map_id": self.map_id,
             "name": self.name,
@@ -265,23 +1062,49 @@ class MapData:
             "spawn_points": self.spawn_points,
             "exit_points": self.exit_points,
             "properties": self.properties,
-            "layers": [
-                {
-                    "layer_type": layer.layer_type.name,
-                    "name": layer.name,
-                    "width": layer.width,
-                    "height": layer.height,
-                    "is_visible": layer.is_visible,
-                    "opacity": layer.opacity,
-                    "z_index": layer.z_index,
-                    "properties": layer.properties,
-                    # Note: Tile serialization would need to be implemented
-                    # based on specific requirements
-                }
-                for layer in self.layers
-            ]
+            "layers": [layer.to_dict(include_tiles) for layer in self.layers]
         }
     
     def to_json(self) -> str:
         """Convert the map data to a JSON string."""
         return json.dumps(self.to_dict(), indent=2)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any],
+                  layer_class: Optional[Type[MapLayer]] = None) -> 'MapData':
+        """
+        Create a map from a dictionary produced by to_dict.
+        
+        Args:
+            data: Serialized map
+            layer_class: Storage implementation for the layers (MapLayer
+                by default)
+        """
+        if layer_class is None:
+            layer_class = MapLayer
+        
+        map_data = cls(
+            width=data["width"],
+            height=data["height"],
+            map_id=data["map_id"],
+            name=data.get("name", "Untitled Map"),
+            description=data.get("description", ""),
+            layers=[layer_class.from_dict(layer) for layer in data.get("layers", [])],
+            default_biome=BiomeType[data.get("default_biome", BiomeType.DUNGEON.name)],
+            tile_width=data.get("tile_width", 32),
+            tile_height=data.get("tile_height", 32),
+            spawn_points=[tuple(point) for point in data.get("spawn_points", [])],
+            exit_points=[tuple(point) for point in data.get("exit_points", [])],
+            properties=dict(data.get("properties", {})),
+            layer_class=layer_class,
+        )
+        if data.get("layers") == []:
+            # A saved map without layers stays without them, instead of
+            # getting the defaults __post_init__ adds
+            map_data.layers = []
+        return map_data
+    
+    @classmethod
+    def from_json(cls, text: str, layer_class: Optional[Type[MapLayer]] = None) -> 'MapData':
+        """Create a map from a JSON string produced by to_json."""
+        return cls.from_dict(json.loads(text), layer_class)
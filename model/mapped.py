@@ -0,0 +1,373 @@
+"""
+Memory-mapped map files for the model layer.
+
+This module stores a map in a file whose tile columns (see model.columns)
+are laid out uncompressed, so the file can be memory-mapped and edited in
+place: opening only reads the metadata, the OS pages in the parts of the
+columns that are actually touched, and writes go straight back to the
+file. Maps far larger than RAM can be opened and edited this way.
+
+Layout (all integers little-endian)::
+
+    magic "DMMP" | u16 version | u16 reserved | u64 metadata offset | u64 metadata length
+    per layer, per column in COLUMN_NAMES, page aligned:
+        width * height cells (1 byte or float32 each), row-major
+    metadata JSON: the map's to_dict(include_tiles=False), the column
+        offsets and each layer's extras (rewritten by flush)
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .enums import TileType, LayerType
+from .map_data import MapData
+from .columnar import ColumnarMapLayer, _OCCUPIED_BYTE_TABLE
+from .codec import encode_extras, decode_extras
+from .columns import (
+    Column, Extras, COLUMN_NAMES, BYTE_COLUMNS, FLOAT_TYPECODE, EMPTY_CODE, mask_and, float_column,
+    changed_rect, union_rect,
+)
+
+
+MAGIC = b'DMMP'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHQQ')
+
+# Column data is aligned so that every column can be mapped on its own
+_ALIGNMENT = mmap.ALLOCATIONGRANULARITY
+
+# Block size for whole-column scans, to bound the memory they use
+_SCAN_BLOCK = 1 << 24
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _column_size(name: str, cells: int) -> int:
+    return cells if name in BYTE_COLUMNS else cells * 4
+
+
+class MappedMapLayer(ColumnarMapLayer):
+    """
+    A ColumnarMapLayer whose columns are views into a memory-mapped file.
+
+    Layers are created by open_mapped_map; every tile read and write goes
+    directly to the mapped file. Whole-column reads return in-memory
+    copies. Mapped layers cannot be resized.
+
+    Files are created sparse, so the health columns of cells that were
+    never written read as 0 rather than NaN (the cells themselves are
+    empty either way).
+    """
+
+    def __post_init__(self):
+        """Start detached; open_mapped_map attaches the mapped columns."""
+        self.tiles = []
+        self._columns: Dict[str, Column] = {}
+        self._extras: Dict[Tuple[int, int], Dict[str, Any]] = {}
+
+    def _attach(self, columns: Dict[str, memoryview], extras: Extras) -> None:
+        self._columns = columns
+        self._extras = extras
+
+    def get_column(self, name: str) -> Column:
+        """Get an in-memory copy of one attribute column (see MapLayer.get_column)."""
+        view = self._columns[name]
+        if name in BYTE_COLUMNS:
+            return bytearray(view)
+        column = array(FLOAT_TYPECODE)
+        column.frombytes(view.cast('B'))
+        return column
+
+    def export_columns(self) -> Tuple[Dict[str, Column], Extras]:
+        """Export copies of the columns and extras (see MapLayer.export_columns)."""
+        columns = {name: self.get_column(name) for name in COLUMN_NAMES}
+        extras = {position: dict(values) for position, values in self._extras.items()}
+        return columns, extras
+
+    def import_columns(self, columns: Dict[str, Column], extras: Optional[Extras] = None) -> None:
+        """Overwrite the mapped columns and the extras (see MapLayer.import_columns)."""
+        self._will_replace()
+        size = self.width * self.height
+        for name in COLUMN_NAMES:
+            if len(columns[name]) != size:
+                raise ValueError(
+                    f"Column '{name}' size {len(columns[name])} does not match "
+                    f"layer size {self.width}x{self.height}"
+                )
+        for name in COLUMN_NAMES:
+            source = columns[name]
+            if name not in BYTE_COLUMNS:
+                source = float_column(source)
+            self._columns[name][:] = memoryview(source).cast('B').cast(self._columns[name].format)
+
+        self._extras = {position: dict(values) for position, values in (extras or {}).items()}
+        self._notify_replaced()
+
+    def set_column(self, name: str, values: Column) -> None:
+        """Set one attribute for every existing tile (see MapLayer.set_column)."""
+        if name == 'tile_type' or name not in BYTE_COLUMNS:
+            super().set_column(name, values)
+            return
+        if len(values) != self.width * self.height:
+            raise ValueError(
+                f"Column size {len(values)} does not match layer size "
+                f"{self.width}x{self.height}"
+            )
+
+        # Only the blocks that change are written back to the file
+        column = self._columns[name]
+        changed, rect = [], None
+        for start, block in self._blocks('tile_type'):
+            end = start + len(block)
+            new = mask_and(values[start:end], block.translate(_OCCUPIED_BYTE_TABLE))
+            block_rect = changed_rect(column[start:end], new, self.width, start)
+            if block_rect is not None:
+                changed.append((start, new))
+                rect = union_rect(rect, block_rect)
+        if rect is None:
+            return
+        self.will_change(*rect)
+        for start, new in changed:
+            column[start:start + len(new)] = new
+        self._notify(*rect)
+
+    def _blocks(self, name: str) -> Iterator[Tuple[int, bytes]]:
+        """Yield (start index, bytes) blocks of a byte column."""
+        view = self._columns[name]
+        for start in range(0, len(view), _SCAN_BLOCK):
+            yield start, bytes(view[start:start + _SCAN_BLOCK])
+
+    def count_tiles(self, tile_type: Optional[TileType] = None) -> int:
+        """Count occupied cells, scanning the mapped column in blocks."""
+        if tile_type is None:
+            empty = sum(block.count(EMPTY_CODE) for _start, block in self._blocks('tile_type'))
+            return self.width * self.height - empty
+        return sum(block.count(tile_type.value) for _start, block in self._blocks('tile_type'))
+
+    def iter_positions(self, name: str = 'tile_type', value: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """Iterate over the positions whose byte column matches a value (see ColumnarMapLayer)."""
+        width = self.width
+        for start, block in self._blocks(name):
+            if value is not None:
+                needle = bytes((value,))
+                index = block.find(needle)
+                while index != -1:
+                    yield (start + index) % width, (start + index) // width
+                    index = block.find(needle, index + 1)
+                continue
+            for index, code in enumerate(block):
+                if code:
+                    yield (start + index) % width, (start + index) // width
+
+    def resize(self, new_width: int, new_height: int) -> None:
+        """Mapped layers have a fixed size."""
+        raise ValueError("Mapped layers cannot be resized; save a resized copy instead")
+
+
+def _column_offsets(map_data: MapData) -> Tuple[List[Dict[str, int]], int]:
+    """Compute every column's file offset, and the end of the column data."""
+    cells = map_data.width * map_data.height
+    offset = _align(_HEADER.size)
+    offsets = []
+    for _layer in map_data.layers:
+        layer_offsets = {}
+        for name in COLUMN_NAMES:
+            layer_offsets[name] = offset
+            offset = _align(offset + _column_size(name, cells))
+        offsets.append(layer_offsets)
+    return offsets, offset
+
+
+def _layer_extras(layer) -> Extras:
+    if isinstance(layer, ColumnarMapLayer):
+        return layer._extras
+    return layer.export_columns()[1]
+
+
+def _metadata(map_data: MapData, offsets: List[Dict[str, int]]) -> bytes:
+    return json.dumps({
+        "map": map_data.to_dict(include_tiles=False),
+        "columns": offsets,
+        "extras": [encode_extras(_layer_extras(layer)).decode('utf-8') for layer in map_data.layers],
+    }).encode('utf-8')
+
+
+def _write_metadata(file, metadata: bytes, data_end: int) -> None:
+    """Write the metadata after the column data and point the header at it."""
+    file.seek(data_end)
+    file.write(metadata)
+    file.truncate()
+    file.seek(0)
+    file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, data_end, len(metadata)))
+
+
+def save_mapped_map(map_data: MapData, path: str) -> None:
+    """
+    Write a map to a memory-mappable file.
+
+    Columns are written one at a time, so only one column of one layer is
+    held in memory at once.
+    """
+    offsets, data_end = _column_offsets(map_data)
+    with open(path, 'w+b') as file:
+        file.truncate(data_end)
+        for layer, layer_offsets in zip(map_data.layers, offsets):
+            for name in COLUMN_NAMES:
+                file.seek(layer_offsets[name])
+                file.write(memoryview(layer.get_column(name)).cast('B'))
+        _write_metadata(file, _metadata(map_data, offsets), data_end)
+
+
+def create_mapped_map(path: str, width: int, height: int, map_id: str,
+                      name: str = "Untitled Map",
+                      layers: Optional[List[Tuple[LayerType, str]]] = None) -> 'MappedMap':
+    """
+    Create an empty memory-mapped map file and open it for writing.
+
+    The column data is allocated as a sparse file, so creation takes no
+    time or disk space proportional to the map size.
+
+    Args:
+        path: File to create (overwritten if it exists)
+        width: Map width
+        height: Map height
+        map_id: Map identifier
+        name: Map name
+        layers: (layer type, name) of each layer; the MapData defaults
+            (Background, Terrain, Objects) if None
+    """
+    map_data = MapData(width, height, map_id, name=name, layer_class=MappedMapLayer)
+    if layers is not None:
+        map_data.layers = []
+        for layer_type, layer_name in layers:
+            map_data.add_layer(layer_type, layer_name)
+
+    offsets, data_end = _column_offsets(map_data)
+    with open(path, 'w+b') as file:
+        file.truncate(data_end)
+        _write_metadata(file, _metadata(map_data, offsets), data_end)
+    return MappedMap(path)
+
+
+class MappedMap:
+    """
+    An open memory-mapped map file.
+
+    map_data is a regular MapData whose layers are MappedMapLayers. Tile
+    edits are written to the file as they happen; call flush (or close)
+    to also store map metadata and per-cell extras (properties, asset
+    instances, ...). Use as a context manager to close automatically.
+    """
+
+    def __init__(self, path: str, writable: bool = True):
+        """
+        Open a file written by save_mapped_map or create_mapped_map.
+
+        Args:
+            path: File to open
+            writable: Whether edits may be made (otherwise the file is
+                mapped read-only and flush is not allowed)
+
+        Raises:
+            ValueError: If the file is not a supported mapped map
+        """
+        if sys.byteorder != 'little':
+            raise ValueError("Mapped maps require a little-endian host")
+
+        self.path = path
+        self.writable = writable
+        self._file = open(path, 'r+b' if writable else 'rb')
+        try:
+            header = self._file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError("File is too short to be a mapped map")
+            magic, version, _reserved, metadata_offset, metadata_length = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError("Not a mapped map file (bad magic)")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported mapped map version {version}")
+
+            self._file.seek(metadata_offset)
+            metadata = json.loads(self._file.read(metadata_length).decode('utf-8'))
+            self._data_end = metadata_offset
+            self._mmap = mmap.mmap(self._file.fileno(), metadata_offset,
+                                   access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        self.map_data = MapData.from_dict(metadata["map"], MappedMapLayer)
+        self._layers = list(self.map_data.layers)
+        # Column offsets by layer identity, as layers may be reordered
+        self._offsets: Dict[int, Dict[str, int]] = {
+            id(layer): offsets for layer, offsets in zip(self._layers, metadata["columns"])
+        }
+
+        self._view = view = memoryview(self._mmap)
+        cells = self.map_data.width * self.map_data.height
+        for layer, layer_offsets, extras in zip(self._layers, metadata["columns"], metadata["extras"]):
+            columns = {}
+            for name in COLUMN_NAMES:
+                offset = layer_offsets[name]
+                column = view[offset:offset + _column_size(name, cells)]
+                columns[name] = column if name in BYTE_COLUMNS else column.cast(FLOAT_TYPECODE)
+            layer._attach(columns, decode_extras(extras.encode('utf-8')))
+
+    def flush(self) -> None:
+        """Write pending tile edits, map metadata and extras to the file."""
+        if not self.writable:
+            raise ValueError("Mapped map was opened read-only")
+        map_data = self.map_data
+        if sorted(map(id, map_data.layers)) != sorted(self._offsets):
+            raise ValueError("Layers cannot be added to or removed from a mapped map")
+
+        self._mmap.flush()
+        offsets = [self._offsets[id(layer)] for layer in map_data.layers]
+        _write_metadata(self._file, _metadata(map_data, offsets), self._data_end)
+        self._file.flush()
+
+    def release_memory(self) -> None:
+        """
+        Write tile edits back and drop the mapped pages from memory.
+
+        Touched pages stay resident until the OS reclaims them; call this
+        periodically during large scattered edits to keep the resident
+        set small. Does nothing where madvise is unavailable.
+        """
+        self._mmap.flush()
+        if hasattr(self._mmap, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+            self._mmap.madvise(mmap.MADV_DONTNEED)
+
+    def close(self) -> None:
+        """Flush (if writable) and unmap the file; the map must not be used afterwards."""
+        if self._mmap.closed:
+            return
+        try:
+            if self.writable:
+                self.flush()
+        finally:
+            for layer in self._layers:
+                for column in layer._columns.values():
+                    column.release()
+                layer._attach({}, {})
+            self._view.release()
+            self._mmap.close()
+            self._file.close()
+
+    def __enter__(self) -> 'MappedMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def open_mapped_map(path: str, writable: bool = True) -> MappedMap:
+    """Open a memory-mapped map file (see MappedMap)."""
+    return MappedMap(path, writable)
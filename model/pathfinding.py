@@ -0,0 +1,735 @@
+"""
+Pathfinding for the model layer.
+
+This module provides a Pathfinder service over a MapData layer. Cells are
+walkable when they hold a passable tile, and entering a cell costs its
+Tile.movement_cost (times sqrt(2) for diagonal steps). Single queries use
+A* with a binary heap and an octile heuristic; many agents heading for the
+same goals (e.g. MapData.exit_points) share a cached Dijkstra flow field.
+
+The pathfinder listens to the layer, so set_tile / clear_tile and bulk
+writes update its cost grid. A cost change only drops the cached flow
+fields whose explored area touches the cell; a cell becoming walkable or
+blocked drops them all, since it can connect areas a field never reached.
+"""
+
+import math
+import re
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from heapq import heappush, heappop
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .columns import nonzero_mask, mask_and
+from .map_data import MapData, MapLayer
+
+
+INFINITY = math.inf
+
+# Neighbor offsets (dx, dy, step length); direction codes are index + 1
+DIRECTIONS: Tuple[Tuple[int, int, float], ...] = (
+    (1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+    (1, 1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (-1, -1, math.sqrt(2)),
+)
+
+# Rectangles up to this many cells are refreshed tile by tile, larger ones
+# from whole-layer columns
+_SMALL_REGION = 4096
+
+Position = Tuple[int, int]
+
+# Inclusive (x1, y1, x2, y2) rectangle of cells
+Rect = Tuple[int, int, int, int]
+
+
+@dataclass
+class FlowField:
+    """
+    Distances and next steps from every reached cell to the nearest goal.
+
+    directions holds, per cell, the DIRECTIONS code (index + 1) of the step
+    to take; 0 means the cell is a goal or was not reached.
+    """
+
+    goals: Tuple[Position, ...]
+    width: int
+    height: int
+    distances: array
+    directions: bytearray
+
+    # Inclusive bounding box (x1, y1, x2, y2) of the reached cells
+    bounds: Rect
+
+    def distance(self, x: int, y: int) -> float:
+        """Cost of the cheapest path from (x, y) to a goal (inf if unreachable)."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return INFINITY
+        return self.distances[y * self.width + x]
+
+    def next_step(self, x: int, y: int) -> Optional[Position]:
+        """The next cell on the way to the nearest goal, or None at a goal or if unreachable."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        code = self.directions[y * self.width + x]
+        if not code:
+            return None
+        dx, dy, _step = DIRECTIONS[code - 1]
+        return x + dx, y + dy
+
+    def path(self, x: int, y: int) -> Optional[List[Position]]:
+        """Full path from (x, y) to the nearest goal (inclusive), or None if unreachable."""
+        if self.distance(x, y) == INFINITY:
+            return None
+        path = [(x, y)]
+        step = self.next_step(x, y)
+        while step is not None:
+            path.append(step)
+            step = self.next_step(*step)
+        return path
+
+
+class Pathfinder:
+    """
+    A* and cached flow-field pathfinding over one layer of a map.
+
+    Diagonal moves are allowed unless disabled, but never cut corners past
+    a blocked orthogonal neighbor.
+    """
+
+    def __init__(self, map_data: MapData, layer_name: str = "Terrain",
+                 allow_diagonal: bool = True, max_flow_fields: int = 16):
+        """
+        Args:
+            map_data: Map to search
+            layer_name: Layer whose tiles define passability and cost
+            allow_diagonal: Whether diagonal steps are allowed
+            max_flow_fields: Number of flow fields kept in the LRU cache
+        """
+        layer = map_data.get_layer(layer_name)
+        if layer is None:
+            raise ValueError(f"Map has no layer named '{layer_name}'")
+        if layer._bounds()[:2] != (0, 0):
+            raise ValueError(f"Layer '{layer_name}' does not start at (0, 0); "
+                             "Pathfinder needs cells 0..width-1 x 0..height-1")
+
+        self.map_data = map_data
+        self.layer = layer
+        self.directions = DIRECTIONS if allow_diagonal else DIRECTIONS[:4]
+        self.max_flow_fields = max_flow_fields
+
+        # Keyed by (sorted goals, max_cost)
+        self._flow_fields: 'OrderedDict[Tuple[Tuple[Position, ...], float], FlowField]' = OrderedDict()
+        self._rebuild()
+        layer.add_listener(self._on_layer_changed)
+
+    def close(self) -> None:
+        """Stop listening to the layer and drop all caches."""
+        self.layer.remove_listener(self._on_layer_changed)
+        self._flow_fields.clear()
+
+    # Cost grid
+
+    def _read_costs(self) -> array:
+        """Build a cost grid from the layer's columns."""
+        layer = self.layer
+        walkable = mask_and(nonzero_mask(layer.get_column('tile_type')),
+                            layer.get_column('is_passable'))
+        costs = array('d', layer.get_column('movement_cost'))
+
+        # Blocked cells come in runs (walls, empty space): fill them by slice
+        for run in re.finditer(b'\x00+', walkable):
+            start, end = run.span()
+            costs[start:end] = array('d', [INFINITY]) * (end - start)
+        return costs
+
+    def _rebuild(self) -> None:
+        """Recompute the whole cost grid and drop every cache."""
+        self.width, self.height = self.layer.width, self.layer.height
+        self.costs = self._read_costs()
+        self._min_cost = min((cost for cost in self.costs if cost != INFINITY), default=1.0)
+        self._flow_fields.clear()
+
+    def _on_layer_changed(self, layer: MapLayer, x1: int, y1: int, x2: int, y2: int) -> None:
+        if layer.width != self.width or layer.height != self.height:
+            self._rebuild()
+            return
+        self.invalidate(x1, y1, x2, y2)
+
+    def invalidate(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """
+        Re-read the costs of a rectangle of cells.
+
+        Called automatically for changes reported by the layer (including
+        Tile.damage / heal on stored tiles); call it directly after other
+        in-place tile modifications.
+        """
+        width = self.width
+        x1, x2 = max(0, min(x1, x2)), min(width - 1, max(x1, x2))
+        y1, y2 = max(0, min(y1, y2)), min(self.height - 1, max(y1, y2))
+        if x1 > x2 or y1 > y2:
+            return
+
+        costs = self.costs
+        changed: List[Position] = []
+        walkability_changed = False
+        if (x2 - x1 + 1) * (y2 - y1 + 1) <= _SMALL_REGION:
+            for y in range(y1, y2 + 1):
+                for x in range(x1, x2 + 1):
+                    tile = self.layer.get_tile(x, y)
+                    cost = tile.movement_cost if tile is not None and tile.is_passable else INFINITY
+                    old_cost = costs[y * width + x]
+                    if cost != old_cost:
+                        walkability_changed = walkability_changed or INFINITY in (cost, old_cost)
+                        costs[y * width + x] = cost
+                        changed.append((x, y))
+        else:
+            new_costs = self._read_costs()
+            for y in range(y1, y2 + 1):
+                row = y * width
+                for index in range(row + x1, row + x2 + 1):
+                    if new_costs[index] != costs[index]:
+                        walkability_changed = walkability_changed or INFINITY in (new_costs[index], costs[index])
+                        costs[index] = new_costs[index]
+                        changed.append((index - row, y))
+
+        if not changed:
+            return
+        self._min_cost = min([self._min_cost] + [
+            costs[y * width + x] for x, y in changed if costs[y * width + x] != INFINITY
+        ])
+        self._costs_changed(changed, walkability_changed)
+
+    def _costs_changed(self, changed: List[Position], walkability_changed: bool) -> None:
+        """
+        Update caches after the costs of some cells changed.
+
+        Forgets every flow field when a cell became walkable or blocked (a
+        newly opened goal or passage can reach cells a field marked
+        unreachable), otherwise the fields whose reached area (plus a
+        1-cell margin) contains a changed cell.
+        """
+        if walkability_changed:
+            self._flow_fields.clear()
+            return
+        for key, field in list(self._flow_fields.items()):
+            bx1, by1, bx2, by2 = field.bounds
+            if any(bx1 - 1 <= x <= bx2 + 1 and by1 - 1 <= y <= by2 + 1 for x, y in changed):
+                del self._flow_fields[key]
+
+    def is_walkable(self, x: int, y: int) -> bool:
+        """Check whether a cell can be entered."""
+        return (0 <= x < self.width and 0 <= y < self.height
+                and self.costs[y * self.width + x] != INFINITY)
+
+    def _neighbors(self, index: int, moves: List[Tuple[int, int, int, float]],
+                   bounds: Optional[Rect] = None) -> List[Tuple[int, float]]:
+        """
+        List (neighbor index, step length) for the moves out of a cell.
+
+        Args:
+            index: Flat index of the cell
+            moves: Allowed moves (see _moves)
+            bounds: Inclusive rectangle the neighbors must lie in (the whole
+                grid if None)
+        """
+        width, costs = self.width, self.costs
+        min_x, min_y, max_x, max_y = bounds or (0, 0, width - 1, self.height - 1)
+        y, x = divmod(index, width)
+        neighbors = []
+        for dx, dy, offset, step in moves:
+            if not (min_x <= x + dx <= max_x and min_y <= y + dy <= max_y):
+                continue
+            neighbor = index + offset
+            if costs[neighbor] == INFINITY:
+                continue
+            # No corner cutting: both orthogonal cells must be open
+            if dx and dy and (costs[index + dx] == INFINITY or costs[neighbor - dx] == INFINITY):
+                continue
+            neighbors.append((neighbor, step))
+        return neighbors
+
+    def _moves(self) -> List[Tuple[int, int, int, float]]:
+        """Get (dx, dy, index offset, step length) for every allowed move."""
+        return [(dx, dy, dy * self.width + dx, step) for dx, dy, step in self.directions]
+
+    # A*
+
+    def find_path(self, start: Position, goal: Position,
+                  max_cost: float = INFINITY) -> Optional[List[Position]]:
+        """
+        Find the cheapest path between two cells.
+
+        Uses a cached unbounded flow field for the goal when one exists,
+        otherwise A*.
+
+        Args:
+            start: Start position
+            goal: Goal position
+            max_cost: Give up on paths more expensive than this
+
+        Returns:
+            The positions from start to goal (inclusive), or None if there
+            is no path within max_cost
+        """
+        if not (self.is_walkable(*start) and self.is_walkable(*goal)):
+            return None
+
+        key = ((goal,), INFINITY)
+        field = self._flow_fields.get(key)
+        if field is not None:
+            self._flow_fields.move_to_end(key)
+            if field.distance(*start) > max_cost:
+                return None
+            return field.path(*start)
+
+        return self._search(start, goal, max_cost)
+
+    def _heuristic(self, goal: Position) -> Callable[[int], float]:
+        """
+        Get an admissible estimate of the cost from a cell index to goal.
+
+        Octile distance (Manhattan without diagonals) scaled by the cheapest
+        movement cost on the map.
+        """
+        width = self.width
+        goal_x, goal_y = goal
+        min_cost = self._min_cost
+        diagonal_extra = (math.sqrt(2) - 2) if len(self.directions) > 4 else 0.0
+
+        def heuristic(index: int) -> float:
+            dx = abs(index % width - goal_x)
+            dy = abs(index // width - goal_y)
+            return min_cost * (dx + dy + diagonal_extra * min(dx, dy))
+
+        return heuristic
+
+    def _search(self, start: Position, goal: Position, max_cost: float = INFINITY,
+                bounds: Optional[Rect] = None) -> Optional[List[Position]]:
+        """A* from start to goal, optionally restricted to a rectangle."""
+        width, costs = self.width, self.costs
+        start_index = start[1] * width + start[0]
+        goal_index = goal[1] * width + goal[0]
+        heuristic = self._heuristic(goal)
+        moves = self._moves()
+        g_scores: Dict[int, float] = {start_index: 0.0}
+        parents: Dict[int, int] = {start_index: -1}
+        heap = [(heuristic(start_index), 0.0, start_index)]
+
+        while heap:
+            _f, g_score, index = heappop(heap)
+            if index == goal_index:
+                path = []
+                while index != -1:
+                    path.append((index % width, index // width))
+                    index = parents[index]
+                path.reverse()
+                return path
+            if g_score > g_scores[index]:
+                continue  # Stale heap entry
+
+            for neighbor, step in self._neighbors(index, moves, bounds):
+                new_score = g_score + costs[neighbor] * step
+                if new_score <= max_cost and new_score < g_scores.get(neighbor, INFINITY):
+                    g_scores[neighbor] = new_score
+                    parents[neighbor] = index
+                    heappush(heap, (new_score + heuristic(neighbor), new_score, neighbor))
+
+        return None
+
+    def _distances(self, source: int, bounds: Rect, reverse: bool = False) -> Dict[int, float]:
+        """
+        Dijkstra from one cell over a rectangle.
+
+        Returns the cost of the cheapest path from source to every reached
+        cell, or with reverse, from every reached cell to source.
+        """
+        costs = self.costs
+        moves = self._moves()
+        distances = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            distance, index = heappop(heap)
+            if distance > distances[index]:
+                continue
+            entry_cost = costs[index]
+            for neighbor, step in self._neighbors(index, moves, bounds):
+                new_distance = distance + (entry_cost if reverse else costs[neighbor]) * step
+                if new_distance < distances.get(neighbor, INFINITY):
+                    distances[neighbor] = new_distance
+                    heappush(heap, (new_distance, neighbor))
+        return distances
+
+    # Flow fields
+
+    def flow_field(self, goals: Iterable[Position], max_cost: float = INFINITY) -> FlowField:
+        """
+        Get the (cached) flow field towards the nearest of some goals.
+
+        Args:
+            goals: Goal positions; unwalkable goals are ignored
+            max_cost: Stop expanding beyond this path cost (limits the
+                field's size and invalidation area; fields with different
+                limits are cached separately)
+        """
+        goals = tuple(sorted(set(goals)))
+        key = (goals, max_cost)
+        field = self._flow_fields.get(key)
+        if field is not None:
+            self._flow_fields.move_to_end(key)
+            return field
+
+        field = self._compute_flow_field(goals, max_cost)
+        self._flow_fields[key] = field
+        while len(self._flow_fields) > self.max_flow_fields:
+            self._flow_fields.popitem(last=False)
+        return field
+
+    def flow_field_to_exits(self) -> FlowField:
+        """Flow field towards the map's nearest exit point."""
+        return self.flow_field(self.map_data.exit_points)
+
+    def flow_field_to_spawns(self) -> FlowField:
+        """Flow field towards the map's nearest spawn point."""
+        return self.flow_field(self.map_data.spawn_points)
+
+    def _compute_flow_field(self, goals: Tuple[Position, ...], max_cost: float) -> FlowField:
+        """Run a multi-source Dijkstra outward from the goals."""
+        width, height, costs = self.width, self.height, self.costs
+        distances = array('d', [INFINITY]) * (width * height)
+        directions = bytearray(width * height)
+        min_x, min_y, max_x, max_y = width, height, -1, -1
+
+        heap = []
+        for x, y in goals:
+            if self.is_walkable(x, y):
+                distances[y * width + x] = 0.0
+                heap.append((0.0, y * width + x))
+        heap.sort()
+
+        # Reverse search: moving from neighbor into index costs costs[index]
+        # * step, and the moves are symmetric, so the neighbors of index are
+        # exactly the cells that can step into it
+        moves = self._moves()
+        direction_codes = {dy * width + dx: code + 1 for code, (dx, dy, _step) in enumerate(DIRECTIONS)}
+        while heap:
+            distance, index = heappop(heap)
+            if distance > distances[index]:
+                continue
+            x, y = index % width, index // width
+            min_x, max_x = min(min_x, x), max(max_x, x)
+            min_y, max_y = min(min_y, y), max(max_y, y)
+
+            entry_cost = costs[index]
+            for neighbor, step in self._neighbors(index, moves):
+                new_distance = distance + entry_cost * step
+                if new_distance <= max_cost and new_distance < distances[neighbor]:
+                    distances[neighbor] = new_distance
+                    directions[neighbor] = direction_codes[index - neighbor]
+                    heappush(heap, (new_distance, neighbor))
+
+        return FlowField(
+            goals=goals,
+            width=width,
+            height=height,
+            distances=distances,
+            directions=directions,
+            bounds=(min_x, min_y, max_x, max_y),
+        )
+
+
+# Border between two clusters: ('E', cx, cy) separates (cx, cy) from
+# (cx + 1, cy), ('S', cx, cy) separates (cx, cy) from (cx, cy + 1)
+BorderKey = Tuple[str, int, int]
+ClusterKey = Tuple[int, int]
+
+# Entrances at least this wide get a transition at each end instead of one
+# in the middle
+WIDE_ENTRANCE = 6
+
+
+class HierarchicalPathfinder(Pathfinder):
+    """
+    Hierarchical A* (HPA*) for large maps.
+
+    The layer is split into cluster_size x cluster_size clusters. Every run
+    of walkable cell pairs along the border of two clusters is an entrance
+    with one or two transitions; the cells of a transition are nodes of an
+    abstract graph. Nodes of the same cluster are linked by their cheapest
+    in-cluster path cost, computed the first time the cluster is searched.
+    Long queries search the abstract graph, then refine each hop with A*
+    inside one cluster; nearby queries use plain A*.
+
+    When tile costs change, only the transitions on borders containing a
+    changed cell are rescanned, and only the changed clusters' internal
+    edges are rebuilt (neighbors just gain or lose the affected nodes).
+    """
+
+    def __init__(self, map_data: MapData, layer_name: str = "Terrain",
+                 cluster_size: int = 16, allow_diagonal: bool = True,
+                 max_flow_fields: int = 16):
+        """
+        Args:
+            map_data: Map to search
+            layer_name: Layer whose tiles define passability and cost
+            cluster_size: Width and height of a cluster in cells
+            allow_diagonal: Whether diagonal steps are allowed
+            max_flow_fields: Number of flow fields kept in the LRU cache
+        """
+        if cluster_size < 2:
+            raise ValueError("cluster_size must be at least 2")
+        self.cluster_size = cluster_size
+        super().__init__(map_data, layer_name, allow_diagonal, max_flow_fields)
+
+    # Abstract graph
+
+    def _rebuild(self) -> None:
+        super()._rebuild()
+        size = self.cluster_size
+        self._clusters_x = -(-self.width // size)
+        self._clusters_y = -(-self.height // size)
+
+        self._transitions: Dict[BorderKey, List[Tuple[int, int]]] = {}
+        self._node_refs: Dict[int, int] = {}
+        self._cluster_nodes: Dict[ClusterKey, Set[int]] = {}
+        self._inter: Dict[int, Dict[int, float]] = {}
+        self._intra: Dict[ClusterKey, Dict[int, Dict[int, float]]] = {}
+
+        for cy in range(self._clusters_y):
+            for cx in range(self._clusters_x):
+                if cx + 1 < self._clusters_x:
+                    self._update_border(('E', cx, cy))
+                if cy + 1 < self._clusters_y:
+                    self._update_border(('S', cx, cy))
+
+    def _cluster_of(self, index: int) -> ClusterKey:
+        y, x = divmod(index, self.width)
+        return x // self.cluster_size, y // self.cluster_size
+
+    def _cluster_bounds(self, cluster: ClusterKey) -> Rect:
+        size = self.cluster_size
+        x1, y1 = cluster[0] * size, cluster[1] * size
+        return x1, y1, min(x1 + size, self.width) - 1, min(y1 + size, self.height) - 1
+
+    def _scan_border(self, border: BorderKey) -> List[Tuple[int, int]]:
+        """Find the transitions (cell in first cluster, cell in second) on a border."""
+        kind, cx, cy = border
+        width, size, costs = self.width, self.cluster_size, self.costs
+        x1, y1, x2, y2 = self._cluster_bounds((cx, cy))
+        if kind == 'E':
+            pairs = [(y * width + x2, y * width + x2 + 1) for y in range(y1, y2 + 1)]
+        else:
+            pairs = [(y2 * width + x, (y2 + 1) * width + x) for x in range(x1, x2 + 1)]
+
+        transitions = []
+        run: List[Tuple[int, int]] = []
+        for pair in pairs + [None]:
+            if pair is not None and costs[pair[0]] != INFINITY and costs[pair[1]] != INFINITY:
+                run.append(pair)
+                continue
+            if len(run) >= WIDE_ENTRANCE:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+        return transitions
+
+    def _add_node(self, node: int, changed: Set[int]) -> None:
+        count = self._node_refs.get(node, 0)
+        self._node_refs[node] = count + 1
+        if count == 0:
+            self._cluster_nodes.setdefault(self._cluster_of(node), set()).add(node)
+            changed.add(node)
+
+    def _remove_node(self, node: int, changed: Set[int]) -> None:
+        count = self._node_refs[node] - 1
+        if count:
+            self._node_refs[node] = count
+            return
+        del self._node_refs[node]
+        self._cluster_nodes[self._cluster_of(node)].discard(node)
+        changed.add(node)
+
+    def _update_border(self, border: BorderKey, changed: Optional[Set[int]] = None) -> None:
+        """Rescan a border and replace its transitions and inter-cluster edges."""
+        changed = set() if changed is None else changed
+        costs, inter = self.costs, self._inter
+        for a, b in self._transitions.pop(border, ()):
+            inter[a].pop(b, None)
+            inter[b].pop(a, None)
+            self._remove_node(a, changed)
+            self._remove_node(b, changed)
+
+        transitions = self._scan_border(border)
+        if transitions:
+            self._transitions[border] = transitions
+        for a, b in transitions:
+            inter.setdefault(a, {})[b] = costs[b]
+            inter.setdefault(b, {})[a] = costs[a]
+            self._add_node(a, changed)
+            self._add_node(b, changed)
+
+    def _cluster_edges(self, cluster: ClusterKey) -> Dict[int, Dict[int, float]]:
+        """Get (building them if needed) the in-cluster edges between a cluster's nodes."""
+        edges = self._intra.get(cluster)
+        if edges is None:
+            edges = {}
+            bounds = self._cluster_bounds(cluster)
+            nodes = self._cluster_nodes.get(cluster, ())
+            for node in nodes:
+                distances = self._distances(node, bounds)
+                edges[node] = {other: distances[other] for other in nodes
+                               if other != node and other in distances}
+            self._intra[cluster] = edges
+        return edges
+
+    def build_all(self) -> None:
+        """Precompute the in-cluster edges of every cluster."""
+        for cy in range(self._clusters_y):
+            for cx in range(self._clusters_x):
+                self._cluster_edges((cx, cy))
+
+    def _costs_changed(self, changed: List[Position], walkability_changed: bool) -> None:
+        super()._costs_changed(changed, walkability_changed)
+        size = self.cluster_size
+        clusters = set()
+        borders = set()
+        for x, y in changed:
+            cx, cy = x // size, y // size
+            clusters.add((cx, cy))
+            local_x, local_y = x % size, y % size
+            if local_x == size - 1 and cx + 1 < self._clusters_x:
+                borders.add(('E', cx, cy))
+            if local_x == 0 and cx > 0:
+                borders.add(('E', cx - 1, cy))
+            if local_y == size - 1 and cy + 1 < self._clusters_y:
+                borders.add(('S', cx, cy))
+            if local_y == 0 and cy > 0:
+                borders.add(('S', cx, cy - 1))
+
+        changed_nodes: Set[int] = set()
+        for border in borders:
+            self._update_border(border, changed_nodes)
+
+        # Changed clusters are rebuilt on next use; their neighbors only
+        # gain or lose the nodes on the shared border
+        for cluster in clusters:
+            self._intra.pop(cluster, None)
+        for node in changed_nodes:
+            cluster = self._cluster_of(node)
+            edges = self._intra.get(cluster)
+            if edges is None:
+                continue
+            if node in self._node_refs:
+                self._link_node(cluster, node, edges)
+            else:
+                edges.pop(node, None)
+                for targets in edges.values():
+                    targets.pop(node, None)
+
+    def _link_node(self, cluster: ClusterKey, node: int, edges: Dict[int, Dict[int, float]]) -> None:
+        """Add the in-cluster edges from and to a new node of an already built cluster."""
+        bounds = self._cluster_bounds(cluster)
+        outgoing = self._distances(node, bounds)
+        incoming = self._distances(node, bounds, reverse=True)
+        edges[node] = {}
+        for other in self._cluster_nodes[cluster]:
+            if other == node:
+                continue
+            if other in outgoing:
+                edges[node][other] = outgoing[other]
+            if other in incoming and other in edges:
+                edges[other][node] = incoming[other]
+
+    # Queries
+
+    def find_path(self, start: Position, goal: Position,
+                  max_cost: float = INFINITY) -> Optional[List[Position]]:
+        """
+        Find a near-optimal path between two cells.
+
+        Queries within one cluster size of each other (or towards a goal
+        with a cached flow field) are answered by Pathfinder.find_path;
+        others search the abstract graph and refine each hop locally.
+
+        Args:
+            start: Start position
+            goal: Goal position
+            max_cost: Give up on paths more expensive than this
+
+        Returns:
+            The positions from start to goal (inclusive), or None if there
+            is no path within max_cost
+        """
+        if not (self.is_walkable(*start) and self.is_walkable(*goal)):
+            return None
+        if (max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) <= self.cluster_size
+                or ((goal,), INFINITY) in self._flow_fields):
+            return super().find_path(start, goal, max_cost)
+
+        width = self.width
+        hops = self._abstract_path(start[1] * width + start[0], goal[1] * width + goal[0], max_cost)
+        if hops is None:
+            return None
+
+        path = [start]
+        for source, target in zip(hops, hops[1:]):
+            target_position = (target % width, target // width)
+            source_cluster = self._cluster_of(source)
+            if source_cluster != self._cluster_of(target):
+                path.append(target_position)  # Inter-cluster step
+                continue
+            segment = self._search((source % width, source // width), target_position,
+                                   bounds=self._cluster_bounds(source_cluster))
+            path.extend(segment[1:])
+        return path
+
+    def _abstract_path(self, start: int, goal: int, max_cost: float) -> Optional[List[int]]:
+        """A* over the abstract graph, with start and goal linked into their clusters."""
+        width = self.width
+        start_cluster, goal_cluster = self._cluster_of(start), self._cluster_of(goal)
+
+        reached = self._distances(start, self._cluster_bounds(start_cluster))
+        start_edges = {node: reached[node]
+                       for node in self._cluster_nodes.get(start_cluster, ()) if node in reached}
+        if goal in reached:
+            start_edges[goal] = reached[goal]
+        reached = self._distances(goal, self._cluster_bounds(goal_cluster), reverse=True)
+        goal_edges = {node: reached[node]
+                      for node in self._cluster_nodes.get(goal_cluster, ()) if node in reached}
+
+        heuristic = self._heuristic((goal % width, goal // width))
+        g_scores: Dict[int, float] = {start: 0.0}
+        parents: Dict[int, int] = {start: -1}
+        heap = [(heuristic(start), 0.0, start)]
+
+        while heap:
+            _f, g_score, node = heappop(heap)
+            if node == goal:
+                hops = []
+                while node != -1:
+                    hops.append(node)
+                    node = parents[node]
+                hops.reverse()
+                return hops
+            if g_score > g_scores[node]:
+                continue
+
+            edges = []
+            if node == start:
+                edges.append(start_edges)
+            if node in self._node_refs:
+                edges.append(self._cluster_edges(self._cluster_of(node)).get(node, {}))
+                edges.append(self._inter.get(node, {}))
+            if node in goal_edges:
+                edges.append({goal: goal_edges[node]})
+
+            for targets in edges:
+                for target, cost in targets.items():
+                    new_score = g_score + cost
+                    if new_score <= max_cost and new_score < g_scores.get(target, INFINITY):
+                        g_scores[target] = new_score
+                        parents[target] = node
+                        heappush(heap, (new_score + heuristic(target), new_score, target))
+
+        return None
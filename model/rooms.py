@@ -0,0 +1,502 @@
+"""
+Room detection for the model layer.
+
+This module provides RoomMap, a connected-component labelling of a layer
+into rooms, corridors and door portals. Open cells (occupied, passable,
+not doors) that lie in some fully open 2x2 block are room cells, the other
+open cells are corridors, and TileType.DOOR cells are portals; 4-connected
+cells of the same kind form one region. Every cell's region ID is kept in
+a flat array, so room queries from AI and fog code are a lookup.
+
+The initial labelling is a two-pass union-find over row runs (classes are
+computed for the whole layer at once with big-integer masks). RoomMap
+listens to the layer afterwards: a tile edit only merges the regions it
+joins (relabelling the smaller ones) or, when it removes cells, searches
+from the cut simultaneously in every direction so that a split costs the
+size of the pieces broken off rather than a relabel of the map.
+"""
+
+import re
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from .columns import nonzero_mask, mask_and, mask_and_not
+from .enums import TileType, RegionKind
+from .map_data import MapData, MapLayer
+
+
+Position = Tuple[int, int]
+
+# Inclusive (x1, y1, x2, y2) rectangle of cells
+Rect = Tuple[int, int, int, int]
+
+# Per-cell class codes (0 = blocked)
+ROOM_CLASS = 1
+CORRIDOR_CLASS = 2
+DOOR_CLASS = 3
+KIND_BY_CLASS = (None, RegionKind.ROOM, RegionKind.CORRIDOR, RegionKind.DOOR)
+
+# Rectangles up to this many cells are updated incrementally, larger ones
+# trigger a full relabel
+_SMALL_REGION = 4096
+
+_RUN = re.compile(rb'([\x01-\x03])\1*')
+_DOOR_TABLE = bytes(1 if code == TileType.DOOR.value else 0 for code in range(256))
+
+
+@dataclass
+class Region:
+    """A connected region of one kind."""
+
+    id: int
+    kind: RegionKind
+    # Number of cells
+    size: int
+    # Inclusive bounding box (x1, y1, x2, y2)
+    bounds: Rect
+
+
+def classify(layer: MapLayer) -> bytearray:
+    """
+    Get the per-cell class codes of a layer (row-major).
+
+    Returns:
+        ROOM_CLASS, CORRIDOR_CLASS or DOOR_CLASS per cell, 0 for blocked
+        and empty cells
+    """
+    width, height = layer.width, layer.height
+    size = width * height
+    tile_types = layer.get_column('tile_type')
+    doors = tile_types.translate(_DOOR_TABLE)
+    open_cells = int.from_bytes(
+        mask_and_not(mask_and(nonzero_mask(tile_types), layer.get_column('is_passable')), doors),
+        'little',
+    )
+
+    # One byte lane per cell: a room cell is an open cell covered by an
+    # open 2x2 block, found from the blocks' top-left corners
+    if width > 1 and height > 1:
+        not_last_column = int.from_bytes((b'\x01' * (width - 1) + b'\x00') * height, 'little')
+        pairs = open_cells & (open_cells >> 8) & not_last_column
+        blocks = pairs & (pairs >> (8 * width))
+        row = 8 * width
+        rooms = blocks | (blocks << 8) | (blocks << row) | (blocks << (row + 8))
+    else:
+        rooms = 0
+    classes = rooms + ((open_cells ^ rooms) << 1) + 3 * int.from_bytes(doors, 'little')
+    return bytearray(classes.to_bytes(size, 'little'))
+
+
+class RoomMap:
+    """
+    Rooms, corridors and door portals of one layer of a map.
+
+    Region IDs are stable across incremental updates: merged regions keep
+    the ID of the largest one and pieces split off get new IDs. A change
+    of more than _SMALL_REGION cells (or a resize) relabels the layer and
+    renumbers the regions.
+    """
+
+    def __init__(self, map_data: MapData, layer_name: str = "Terrain"):
+        """
+        Args:
+            map_data: Map to label
+            layer_name: Layer whose tiles define the regions
+        """
+        layer = map_data.get_layer(layer_name)
+        if layer is None:
+            raise ValueError(f"Map has no layer named '{layer_name}'")
+        if layer._bounds()[:2] != (0, 0):
+            raise ValueError(f"Layer '{layer_name}' does not start at (0, 0); "
+                             "RoomMap needs cells 0..width-1 x 0..height-1")
+
+        self.map_data = map_data
+        self.layer = layer
+        self._rebuild()
+        layer.add_listener(self._on_layer_changed)
+
+    def close(self) -> None:
+        """Stop listening to the layer."""
+        self.layer.remove_listener(self._on_layer_changed)
+
+    # Queries
+
+    def region_id_at(self, x: int, y: int) -> int:
+        """ID of the region containing a cell (0 for blocked or outside cells)."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return 0
+        return self.labels[y * self.width + x]
+
+    def region_at(self, x: int, y: int) -> Optional[Region]:
+        """The region containing a cell, or None."""
+        region_id = self.region_id_at(x, y)
+        return self.region(region_id) if region_id else None
+
+    def region(self, region_id: int) -> Optional[Region]:
+        """Get a region by ID."""
+        region = self._regions.get(region_id)
+        if region is not None and region_id in self._stale_bounds:
+            self._stale_bounds.discard(region_id)
+            region.bounds = self._scan_bounds(region)
+        return region
+
+    def regions(self, kind: Optional[RegionKind] = None) -> List[Region]:
+        """All regions (of one kind), in ID order."""
+        return [self.region(region_id) for region_id in sorted(self._regions)
+                if kind is None or self._regions[region_id].kind == kind]
+
+    def rooms(self) -> List[Region]:
+        return self.regions(RegionKind.ROOM)
+
+    def corridors(self) -> List[Region]:
+        return self.regions(RegionKind.CORRIDOR)
+
+    def doors(self) -> List[Region]:
+        return self.regions(RegionKind.DOOR)
+
+    def same_region(self, a: Position, b: Position) -> bool:
+        """Check whether two cells belong to the same region."""
+        region_id = self.region_id_at(*a)
+        return region_id != 0 and region_id == self.region_id_at(*b)
+
+    def cells(self, region_id: int) -> List[Position]:
+        """The cells of a region, in row-major order."""
+        region = self.region(region_id)
+        if region is None:
+            return []
+        return list(self._iter_cells(region_id, region.bounds))
+
+    def neighbors(self, region_id: int) -> Set[int]:
+        """IDs of the regions 4-adjacent to a region (e.g. a room's doors)."""
+        cached = self._neighbors.get(region_id)
+        if cached is not None:
+            return set(cached)
+        region = self.region(region_id)
+        if region is None:
+            return set()
+
+        labels, width, height = self.labels, self.width, self.height
+        found = set()
+        for x, y in self._iter_cells(region_id, region.bounds):
+            index = y * width + x
+            if x > 0:
+                found.add(labels[index - 1])
+            if x < width - 1:
+                found.add(labels[index + 1])
+            if y > 0:
+                found.add(labels[index - width])
+            if y < height - 1:
+                found.add(labels[index + width])
+        found.discard(0)
+        found.discard(region_id)
+        self._neighbors[region_id] = found
+        return set(found)
+
+    def doors_of(self, region_id: int) -> List[Region]:
+        """The door portals adjacent to a room or corridor."""
+        return [self.region(other) for other in sorted(self.neighbors(region_id))
+                if self._regions[other].kind == RegionKind.DOOR]
+
+    # Full labelling
+
+    def _rebuild(self) -> None:
+        """Classify and label the whole layer, renumbering the regions."""
+        self.width, self.height = width, height = self.layer.width, self.layer.height
+        self.classes = classes = classify(self.layer)
+        self.labels = labels = array('I', bytes(4 * width * height))
+        self._regions: Dict[int, Region] = {}
+        self._stale_bounds: Set[int] = set()
+        self._neighbors: Dict[int, Set[int]] = {}
+
+        # Pass 1: union runs with the overlapping runs of the row above
+        runs: List[Tuple[int, int, int, int]] = []
+        parent: List[int] = []
+
+        def find(run: int) -> int:
+            while parent[run] != run:
+                parent[run] = parent[parent[run]]
+                run = parent[run]
+            return run
+
+        previous: List[int] = []
+        for y in range(height):
+            start = y * width
+            current = []
+            above = 0
+            for match in _RUN.finditer(classes, start, start + width):
+                x1, x2, code = match.start() - start, match.end() - start, classes[match.start()]
+                run = len(runs)
+                runs.append((y, x1, x2, code))
+                parent.append(run)
+                current.append(run)
+                # Runs above that end left of this one cannot touch later runs
+                while above < len(previous) and runs[previous[above]][2] <= x1:
+                    above += 1
+                index = above
+                while index < len(previous):
+                    _, px1, px2, pcode = runs[previous[index]]
+                    if px1 >= x2:
+                        break
+                    if pcode == code:
+                        root_a, root_b = find(run), find(previous[index])
+                        if root_a != root_b:
+                            parent[max(root_a, root_b)] = min(root_a, root_b)
+                    index += 1
+            previous = current
+
+        # Pass 2: number the roots in raster order and fill the labels
+        region_ids: Dict[int, int] = {}
+        regions = self._regions
+        for run, (y, x1, x2, code) in enumerate(runs):
+            root = find(run)
+            region_id = region_ids.get(root)
+            if region_id is None:
+                region_id = region_ids[root] = len(region_ids) + 1
+                regions[region_id] = Region(region_id, KIND_BY_CLASS[code], 0, (x1, y, x2 - 1, y))
+            region = regions[region_id]
+            region.size += x2 - x1
+            bx1, by1, bx2, _ = region.bounds
+            region.bounds = (min(bx1, x1), by1, max(bx2, x2 - 1), y)
+            start = y * width
+            labels[start + x1:start + x2] = array('I', [region_id]) * (x2 - x1)
+        self._next_id = len(region_ids) + 1
+
+    # Incremental updates
+
+    def _on_layer_changed(self, layer: MapLayer, x1: int, y1: int, x2: int, y2: int) -> None:
+        if layer.width != self.width or layer.height != self.height:
+            self._rebuild()
+            return
+        self.invalidate(x1, y1, x2, y2)
+
+    def invalidate(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """
+        Re-read a rectangle of cells and update the regions.
+
+        Called automatically for changes reported by the layer; call it
+        directly after other in-place tile modifications.
+        """
+        width, height = self.width, self.height
+        x1, x2 = max(0, min(x1, x2)), min(width - 1, max(x1, x2))
+        y1, y2 = max(0, min(y1, y2)), min(height - 1, max(y1, y2))
+        if x1 > x2 or y1 > y2:
+            return
+        if (x2 - x1 + 1) * (y2 - y1 + 1) > _SMALL_REGION:
+            self._rebuild()
+            return
+
+        # A cell's class depends on the 2x2 blocks around it, so the
+        # classes can change one cell beyond the rectangle
+        x1, y1 = max(0, x1 - 1), max(0, y1 - 1)
+        x2, y2 = min(width - 1, x2 + 1), min(height - 1, y2 + 1)
+        changed = [(index, code) for index, code in self._classify_window(x1, y1, x2, y2)
+                   if self.classes[index] != code]
+        if not changed:
+            return
+        self._neighbors.clear()
+
+        # Take the changed cells out of their regions, then check whether
+        # the regions that lost cells fell apart
+        labels, classes = self.labels, self.classes
+        cut: Dict[int, List[int]] = {}
+        for index, code in changed:
+            region_id = labels[index]
+            if region_id:
+                labels[index] = 0
+                self._regions[region_id].size -= 1
+                self._stale_bounds.add(region_id)
+                cut.setdefault(region_id, []).append(index)
+            classes[index] = code
+        for region_id, removed in cut.items():
+            if self._regions[region_id].size == 0:
+                del self._regions[region_id]
+                self._stale_bounds.discard(region_id)
+            else:
+                self._split(region_id, removed)
+
+        # Put the cells back in with their new classes, merging the
+        # regions they join
+        for index, code in changed:
+            if code:
+                self._add_cell(index, code)
+
+    def _classify_window(self, x1: int, y1: int, x2: int, y2: int) -> Iterator[Tuple[int, int]]:
+        """New (index, class) of the cells of a rectangle, read tile by tile."""
+        width, height = self.width, self.height
+        ox1, oy1 = max(0, x1 - 1), max(0, y1 - 1)
+        ox2, oy2 = min(width - 1, x2 + 1), min(height - 1, y2 + 1)
+        is_open: Dict[Position, bool] = {}
+        is_door: Dict[Position, bool] = {}
+        for y in range(oy1, oy2 + 1):
+            for x in range(ox1, ox2 + 1):
+                tile = self.layer.get_tile(x, y)
+                door = tile is not None and tile.tile_type == TileType.DOOR
+                is_door[(x, y)] = door
+                is_open[(x, y)] = tile is not None and tile.is_passable and not door
+
+        def block(x: int, y: int) -> bool:
+            return (is_open.get((x, y), False) and is_open.get((x + 1, y), False)
+                    and is_open.get((x, y + 1), False) and is_open.get((x + 1, y + 1), False))
+
+        for y in range(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                if is_door[(x, y)]:
+                    code = DOOR_CLASS
+                elif not is_open[(x, y)]:
+                    code = 0
+                elif block(x, y) or block(x - 1, y) or block(x, y - 1) or block(x - 1, y - 1):
+                    code = ROOM_CLASS
+                else:
+                    code = CORRIDOR_CLASS
+                yield y * width + x, code
+
+    def _adjacent(self, index: int) -> Iterator[int]:
+        """Indices of the 4-neighbors of a cell."""
+        width = self.width
+        x = index % width
+        if x > 0:
+            yield index - 1
+        if x < width - 1:
+            yield index + 1
+        if index >= width:
+            yield index - width
+        if index + width < len(self.labels):
+            yield index + width
+
+    def _add_cell(self, index: int, code: int) -> None:
+        """Label a newly open cell, merging the regions of its class around it."""
+        labels, classes, regions = self.labels, self.classes, self._regions
+        joined = {labels[other] for other in self._adjacent(index)
+                  if labels[other] and classes[other] == code}
+        x, y = index % self.width, index // self.width
+        if not joined:
+            region_id = self._next_id
+            self._next_id += 1
+            regions[region_id] = Region(region_id, KIND_BY_CLASS[code], 0, (x, y, x, y))
+        else:
+            region_id = max(joined, key=lambda joined_id: regions[joined_id].size)
+            for other in joined:
+                if other != region_id:
+                    self._merge(other, region_id)
+
+        region = regions[region_id]
+        labels[index] = region_id
+        region.size += 1
+        bx1, by1, bx2, by2 = region.bounds
+        region.bounds = (min(bx1, x), min(by1, y), max(bx2, x), max(by2, y))
+
+    def _merge(self, source_id: int, target_id: int) -> None:
+        """Relabel every cell of one region into another."""
+        source = self._regions.pop(source_id)
+        if source_id in self._stale_bounds:
+            self._stale_bounds.discard(source_id)
+            self._stale_bounds.add(target_id)
+        labels, width = self.labels, self.width
+        for x, y in list(self._iter_cells(source_id, source.bounds)):
+            labels[y * width + x] = target_id
+
+        target = self._regions[target_id]
+        target.size += source.size
+        (ax1, ay1, ax2, ay2), (bx1, by1, bx2, by2) = target.bounds, source.bounds
+        target.bounds = (min(ax1, bx1), min(ay1, by1), max(ax2, bx2), max(ay2, by2))
+
+    def _split(self, region_id: int, removed: List[int]) -> None:
+        """
+        Give new IDs to the pieces a region broke into after losing cells.
+
+        Searches breadth-first from every remaining cell next to the cut,
+        one step per search in turn, joining searches that meet; once at
+        most one search is still running, every finished search has
+        enumerated a complete piece. The piece still being searched (or the
+        largest one) keeps the region's ID.
+        """
+        labels = self.labels
+        seeds = list(dict.fromkeys(other for index in removed for other in self._adjacent(index)
+                                   if labels[other] == region_id))
+        if len(seeds) < 2:
+            return
+
+        owner = {seed: group for group, seed in enumerate(seeds)}
+        parent = list(range(len(seeds)))
+        queues: List[Deque[int]] = [deque([seed]) for seed in seeds]
+        members = [[seed] for seed in seeds]
+
+        def find(group: int) -> int:
+            while parent[group] != group:
+                parent[group] = parent[parent[group]]
+                group = parent[group]
+            return group
+
+        active = list(range(len(seeds)))
+        while True:
+            active = [group for group in active if parent[group] == group]
+            running = [group for group in active if queues[group]]
+            if len(active) < 2 or len(running) < 2:
+                break
+            for group in running:
+                group = find(group)
+                if not queues[group]:
+                    continue
+                index = queues[group].popleft()
+                for other in self._adjacent(index):
+                    if labels[other] != region_id:
+                        continue
+                    other_group = owner.get(other)
+                    if other_group is None:
+                        owner[other] = group
+                        queues[group].append(other)
+                        members[group].append(other)
+                        continue
+                    other_group = find(other_group)
+                    if other_group != group:
+                        # The searches met: keep the larger one's lists
+                        if len(members[other_group]) > len(members[group]):
+                            group, other_group = other_group, group
+                        parent[other_group] = group
+                        members[group].extend(members[other_group])
+                        queues[group].extend(queues[other_group])
+                        members[other_group] = []
+                        queues[other_group] = deque()
+        if len(active) < 2:
+            return
+
+        unfinished = [group for group in active if queues[group]]
+        keep = unfinished[0] if unfinished else max(active, key=lambda group: len(members[group]))
+        region = self._regions[region_id]
+        width = self.width
+        for group in active:
+            if group == keep:
+                continue
+            piece_id = self._next_id
+            self._next_id += 1
+            cells = members[group]
+            xs = [index % width for index in cells]
+            ys = [index // width for index in cells]
+            for index in cells:
+                labels[index] = piece_id
+            self._regions[piece_id] = Region(piece_id, region.kind, len(cells),
+                                             (min(xs), min(ys), max(xs), max(ys)))
+            region.size -= len(cells)
+
+    def _iter_cells(self, region_id: int, bounds: Rect) -> Iterator[Position]:
+        """Cells labelled region_id within a rectangle."""
+        labels, width = self.labels, self.width
+        x1, y1, x2, y2 = bounds
+        for y in range(y1, y2 + 1):
+            start = y * width
+            row = labels[start + x1:start + x2 + 1]
+            if region_id not in row:
+                continue
+            for offset, label in enumerate(row):
+                if label == region_id:
+                    yield x1 + offset, y
+
+    def _scan_bounds(self, region: Region) -> Rect:
+        """Exact bounds of a region that lost cells (within its old bounds)."""
+        xs, ys = [], []
+        for x, y in self._iter_cells(region.id, region.bounds):
+            xs.append(x)
+            ys.append(y)
+        return min(xs), min(ys), max(xs), max(ys)
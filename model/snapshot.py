@@ -0,0 +1,407 @@
+"""
+Copy-on-write map snapshots for the model layer.
+
+This module defines MapSnapshot and LayerSnapshot, frozen views of a
+MapData returned by MapData.snapshot(). Taking a snapshot copies nothing:
+it shares the live layers' storage, and a layer copies a 32x32 chunk into
+its snapshots only just before the chunk is first written after the
+snapshot was taken. Bulk writes and resizes copy the whole layer (a buffer
+copy for columnar layers). Autosave, AI planning or network diffing can
+read a snapshot, also from another thread, while the editor keeps editing.
+
+Tiles read from a snapshot are detached copies; changing them affects
+neither the snapshot nor the map.
+
+Copy-on-write is triggered by the layer's writes and by the Tile methods
+(damage, heal, set_property, add_asset_instance, ...). Assigning a stored
+tile's attributes directly (tile.is_discovered = True) is not seen: it
+would leak into the snapshot and leave the layer version unchanged, so
+wrap such assignments in layer.will_change / layer.notify_changed.
+"""
+
+import copy
+import threading
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from .assets import AssetInstance
+from .tile import Tile
+from .map_data import MapData, MapLayer
+from .columnar import ColumnarMapLayer, ColumnarTile
+from .columns import (
+    Column, BYTE_COLUMNS, EMPTY_CODE, FLOAT_TYPECODE, extract_extras, tile_from_columns,
+)
+
+
+CHUNK_SHIFT = 5
+CHUNK_MASK = (1 << CHUNK_SHIFT) - 1
+
+# Immutable snapshot of one tile (see capture_tile_state); None is the
+# empty cell
+TileState = Tuple[Any, ...]
+ChunkKey = Tuple[int, int]
+
+
+
+def capture_tile_state(tile: Optional[Tile]) -> Optional[TileState]:
+    """
+    Snapshot a tile's state as a hashable-where-possible tuple.
+
+    Properties and asset instances are deep-copied, so later in-place
+    changes to the tile don't leak into the state. Returns None for an
+    empty cell.
+    """
+    if tile is None:
+        return None
+    if isinstance(tile, ColumnarTile):
+        # Read the extras directly: the view's properties would create them
+        extras = tile._layer._extras.get((tile.x, tile.y)) or {}
+    else:
+        extras = extract_extras(tile)
+    properties = extras.get('properties')
+    instances = extras.get('asset_instances')
+    return (
+        tile.tile_type, tile.biome_type, tile.is_passable, tile.is_transparent,
+        tile.movement_cost, extras.get('is_interactive', False),
+        extras.get('interaction_range', 1.0), tile.is_discovered, tile.is_visible,
+        tile.max_health, tile.current_health,
+        tuple(copy.deepcopy(properties).items()) if properties else None,
+        tuple(instance.to_dict() for instance in instances) if instances else None,
+    )
+
+
+def tile_from_state(state: TileState, x: int, y: int) -> Tile:
+    """Build a new Tile from a state captured by capture_tile_state."""
+    (tile_type, biome_type, is_passable, is_transparent, movement_cost, is_interactive,
+     interaction_range, is_discovered, is_visible, max_health, current_health,
+     properties, instances) = state
+    tile = Tile(
+        x=x,
+        y=y,
+        tile_type=tile_type,
+        biome_type=biome_type,
+        movement_cost=movement_cost,
+        is_interactive=is_interactive,
+        interaction_range=interaction_range,
+        is_discovered=is_discovered,
+        is_visible=is_visible,
+        max_health=max_health,
+        properties=copy.deepcopy(dict(properties)) if properties else {},
+        asset_instances=[AssetInstance.from_dict(copy.deepcopy(data)) for data in instances] if instances else [],
+    )
+    # Stored values win over the type-derived defaults from __post_init__
+    tile.is_passable = is_passable
+    tile.is_transparent = is_transparent
+    tile.current_health = current_health
+    return tile
+
+
+class _StateChunk:
+    """A copied chunk of any layer: the captured state of each occupied cell."""
+
+    __slots__ = ('states',)
+
+    def __init__(self, layer: MapLayer, x1: int, y1: int, x2: int, y2: int):
+        self.states: Dict[Tuple[int, int], TileState] = {}
+        for x, y, tile in layer.get_tiles_in_area(x1, y1, x2, y2):
+            if tile is not None:
+                self.states[(x, y)] = capture_tile_state(tile)
+
+    def get_tile(self, x: int, y: int) -> Optional[Tile]:
+        state = self.states.get((x, y))
+        return None if state is None else tile_from_state(state, x, y)
+
+    def tiles(self) -> List[Tuple[int, int, Tile]]:
+        return [(x, y, tile_from_state(state, x, y))
+                for (x, y), state in sorted(self.states.items(), key=lambda item: (item[0][1], item[0][0]))]
+
+
+class _ColumnChunk:
+    """A copied rectangle of a columnar layer: slices of its columns plus its extras."""
+
+    __slots__ = ('x1', 'y1', 'width', 'height', 'columns', 'extras')
+
+    def __init__(self, layer: ColumnarMapLayer, x1: int, y1: int, x2: int, y2: int):
+        self.x1, self.y1 = x1, y1
+        self.width, self.height = x2 - x1 + 1, y2 - y1 + 1
+        layer_width = layer.width
+        rows = ([(y1 * layer_width, (y2 + 1) * layer_width)] if self.width == layer_width
+                else [(y * layer_width + x1, y * layer_width + x2 + 1) for y in range(y1, y2 + 1)])
+
+        self.columns: Dict[str, Column] = {}
+        for name, column in layer._columns.items():
+            # memoryview slices work for in-memory and memory-mapped columns
+            view = memoryview(column)
+            if name in BYTE_COLUMNS:
+                copied = bytearray()
+                for start, end in rows:
+                    copied += view[start:end]
+            else:
+                copied = array(FLOAT_TYPECODE)
+                for start, end in rows:
+                    copied.frombytes(view[start:end].cast('B'))
+            self.columns[name] = copied
+
+        extras = layer._extras
+        if len(extras) <= self.width * self.height:
+            positions = [position for position in extras
+                         if x1 <= position[0] <= x2 and y1 <= position[1] <= y2]
+        else:
+            positions = [(x, y) for y in range(y1, y2 + 1) for x in range(x1, x2 + 1)
+                         if (x, y) in extras]
+        self.extras = {position: copy.deepcopy(extras[position]) for position in positions}
+
+    def get_tile(self, x: int, y: int) -> Optional[Tile]:
+        index = (y - self.y1) * self.width + (x - self.x1)
+        if self.columns['tile_type'][index] == EMPTY_CODE:
+            return None
+        return tile_from_columns(self.columns, index, x, y, copy.deepcopy(self.extras.get((x, y))))
+
+    def tiles(self) -> List[Tuple[int, int, Tile]]:
+        tile_types = self.columns['tile_type']
+        width = self.width
+        tiles = []
+        for index, code in enumerate(tile_types):
+            if code != EMPTY_CODE:
+                x, y = self.x1 + index % width, self.y1 + index // width
+                tiles.append((x, y, tile_from_columns(self.columns, index, x, y,
+                                                      copy.deepcopy(self.extras.get((x, y))))))
+        return tiles
+
+
+def _copy_area(layer: MapLayer, x1: int, y1: int, x2: int, y2: int):
+    """Copy a rectangle of a layer in the cheapest form its storage allows."""
+    if isinstance(layer, ColumnarMapLayer):
+        return _ColumnChunk(layer, x1, y1, x2, y2)
+    return _StateChunk(layer, x1, y1, x2, y2)
+
+
+class LayerSnapshot:
+    """
+    A frozen view of one MapLayer (see MapData.snapshot).
+
+    Reads of chunks the live layer has not written since the snapshot go
+    to the live layer; written chunks were copied into the snapshot just
+    before the write. Direct attribute assignments on stored tiles are not
+    writes the layer can see (see the module docstring).
+    """
+
+    def __init__(self, layer: MapLayer):
+        self.layer = layer
+        self.version = layer.version
+        self.bounds = layer._bounds()
+        self.width = layer.width
+        self.height = layer.height
+        self._metadata = copy.deepcopy(layer.to_dict(include_tiles=False))
+        self._lock = threading.Lock()
+        self._chunks: Dict[ChunkKey, Any] = {}
+        # After a bulk write or release nothing is read from the live layer
+        # any more: chunks not copied are read from _whole (a copy of the
+        # whole layer, if one was made) or are empty
+        self._detached = False
+        self._whole = None
+        self._ref = layer._add_snapshot(self)
+
+    @property
+    def name(self) -> str:
+        return self._metadata["name"]
+
+    @property
+    def chunks_copied(self) -> int:
+        """Number of chunks copied out of the live layer so far."""
+        return len(self._chunks)
+
+    @property
+    def is_detached(self) -> bool:
+        """Whether the snapshot no longer reads from the live layer."""
+        return self._detached
+
+    def release(self) -> None:
+        """Stop sharing storage with the live layer and drop the copies; reads fail afterwards."""
+        if self._ref is None:
+            return
+        self.layer._drop_snapshot(self._ref)
+        self._ref = None
+        with self._lock:
+            self._chunks, self._whole, self._detached = {}, None, True
+
+    def is_valid_position(self, x: int, y: int) -> bool:
+        x1, y1, x2, y2 = self.bounds
+        return x1 <= x <= x2 and y1 <= y <= y2
+
+    def get_tile(self, x: int, y: int) -> Optional[Tile]:
+        """Get a copy of the tile at a position as it was when the snapshot was taken."""
+        self._check_alive()
+        if not self.is_valid_position(x, y):
+            return None
+        with self._lock:
+            chunk = self._chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+            if chunk is not None:
+                return chunk.get_tile(x, y)
+            if self._whole is not None:
+                return self._whole.get_tile(x, y)
+            if self._detached:
+                return None
+            state = capture_tile_state(self.layer.get_tile(x, y))
+        return None if state is None else tile_from_state(state, x, y)
+
+    def get_all_tiles(self) -> Iterator[Tuple[int, int, Tile]]:
+        """Iterate over copies of the occupied cells, chunk by chunk."""
+        self._check_alive()
+        for key in self._chunk_keys():
+            with self._lock:
+                chunk = self._chunks.get(key)
+                if chunk is None and self._whole is None and not self._detached:
+                    # Unchanged so far: read it from the live layer
+                    chunk = self._copy_chunk(key)
+                tiles = chunk.tiles() if chunk is not None else self._whole_tiles(key)
+            yield from tiles
+
+    def to_dict(self, include_tiles: bool = True) -> Dict[str, Any]:
+        """Serialize like MapLayer.to_dict (tiles in row-major order), as of the snapshot."""
+        data = copy.deepcopy(self._metadata)
+        if include_tiles:
+            tiles = sorted(self.get_all_tiles(), key=lambda item: (item[1], item[0]))
+            data["tiles"] = [tile.to_dict() for _x, _y, tile in tiles]
+        return data
+
+    # --- Copy on write (called by the live layer) ------------------------
+
+    def _preserve(self, x1: int, y1: int, x2: int, y2: int, captured: Dict[Any, Any]) -> None:
+        """Copy the chunks of a rectangle that are still read from the live layer."""
+        if self._detached:
+            return
+        bx1, by1, bx2, by2 = self.bounds
+        x1, y1, x2, y2 = max(x1, bx1), max(y1, by1), min(x2, bx2), min(y2, by2)
+        if x1 > x2 or y1 > y2:
+            return
+        with self._lock:
+            for chunk_y in range(y1 >> CHUNK_SHIFT, (y2 >> CHUNK_SHIFT) + 1):
+                for chunk_x in range(x1 >> CHUNK_SHIFT, (x2 >> CHUNK_SHIFT) + 1):
+                    key = (chunk_x, chunk_y)
+                    if key in self._chunks:
+                        continue
+                    # Copies are immutable, so snapshots with the same
+                    # bounds share them
+                    shared = captured.get((key, self.bounds))
+                    if shared is None:
+                        shared = captured[(key, self.bounds)] = self._copy_chunk(key)
+                    self._chunks[key] = shared
+
+    def _preserve_all(self) -> None:
+        """Copy everything still read from the live layer (before a bulk write or resize)."""
+        if self._detached:
+            return
+        with self._lock:
+            layer = self.layer
+            if isinstance(layer, ColumnarMapLayer):
+                # One buffer copy beats copying chunk by chunk
+                self._whole = _ColumnChunk(layer, *self.bounds)
+            else:
+                for key in layer._snapshot_chunk_keys(*self.bounds):
+                    if key not in self._chunks:
+                        self._chunks[key] = self._copy_chunk(key)
+            self._detached = True
+
+    # --- Internals -------------------------------------------------------
+
+    def _check_alive(self) -> None:
+        if self._ref is None:
+            raise RuntimeError(f"Snapshot of layer '{self.name}' was released")
+
+    def _chunk_rect(self, key: ChunkKey) -> Tuple[int, int, int, int]:
+        """Inclusive rectangle of a chunk, clipped to the snapshot bounds."""
+        bx1, by1, bx2, by2 = self.bounds
+        base_x, base_y = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+        return (max(base_x, bx1), max(base_y, by1),
+                min(base_x + CHUNK_MASK, bx2), min(base_y + CHUNK_MASK, by2))
+
+    def _copy_chunk(self, key: ChunkKey):
+        return _copy_area(self.layer, *self._chunk_rect(key))
+
+    def _whole_tiles(self, key: ChunkKey) -> List[Tuple[int, int, Tile]]:
+        """Tiles of one chunk from the whole-layer copy (empty without one)."""
+        if self._whole is None:
+            return []
+        x1, y1, x2, y2 = self._chunk_rect(key)
+        tiles = []
+        for y in range(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                tile = self._whole.get_tile(x, y)
+                if tile is not None:
+                    tiles.append((x, y, tile))
+        return tiles
+
+    def _chunk_keys(self) -> List[ChunkKey]:
+        """Keys of the chunks that may hold tiles, in row-major chunk order."""
+        with self._lock:
+            keys = set(self._chunks)
+            if self._whole is not None or not self._detached:
+                keys.update(self.layer._snapshot_chunk_keys(*self.bounds))
+        return sorted(keys, key=lambda key: (key[1], key[0]))
+
+
+class MapSnapshot:
+    """
+    A frozen, copy-on-write view of a MapData (see MapData.snapshot).
+
+    Holds the map metadata and layer order as of the snapshot and one
+    LayerSnapshot per layer. Release it (or use it as a context manager)
+    when done, so the live layers stop copying chunks for it; dropping
+    the last reference does the same.
+    """
+
+    def __init__(self, map_data: MapData):
+        metadata = map_data.to_dict(include_tiles=False)
+        del metadata["layers"]
+        self._metadata = copy.deepcopy(metadata)
+        self.layers: List[LayerSnapshot] = [LayerSnapshot(layer) for layer in map_data.layers]
+        self._layers_by_name = {}
+        for layer in self.layers:
+            self._layers_by_name.setdefault(layer.name, layer)
+
+    @property
+    def map_id(self) -> str:
+        return self._metadata["map_id"]
+
+    @property
+    def name(self) -> str:
+        return self._metadata["name"]
+
+    @property
+    def width(self) -> int:
+        return self._metadata["width"]
+
+    @property
+    def height(self) -> int:
+        return self._metadata["height"]
+
+    def get_layer(self, name: str) -> Optional[LayerSnapshot]:
+        """Get a layer snapshot by name."""
+        return self._layers_by_name.get(name)
+
+    def get_tile(self, x: int, y: int, layer_name: str) -> Optional[Tile]:
+        """Get a copy of a tile on a named layer as of the snapshot."""
+        layer = self.get_layer(layer_name)
+        return layer.get_tile(x, y) if layer is not None else None
+
+    def release(self) -> None:
+        """Stop sharing storage with the live map; reads fail afterwards."""
+        for layer in self.layers:
+            layer.release()
+
+    def __enter__(self) -> 'MapSnapshot':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    def to_dict(self, include_tiles: bool = True) -> Dict[str, Any]:
+        """Serialize like MapData.to_dict, as of the snapshot."""
+        data = copy.deepcopy(self._metadata)
+        data["layers"] = [layer.to_dict(include_tiles) for layer in self.layers]
+        return data
+
+    def to_map_data(self, layer_class: Optional[Type[MapLayer]] = None) -> MapData:
+        """Build an independent, editable MapData from the snapshot."""
+        return MapData.from_dict(self.to_dict(), layer_class)
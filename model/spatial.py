@@ -0,0 +1,450 @@
+"""
+Spatial indexes over asset instance positions for the model layer.
+
+This module defines GridSpatialIndex (a uniform grid hash) and
+QuadtreeSpatialIndex, two interchangeable indexes answering rectangle,
+radius and nearest-k queries over AssetInstances. Queries use each
+instance's axis-aligned bounds, computed from its position, rotation and
+scale and its AssetDefinition's width/height, so picking and viewport
+culling only look at the instances near the query.
+"""
+
+import heapq
+import math
+from abc import ABC, abstractmethod
+from itertools import count
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .assets import AssetDefinition, AssetInstance
+
+
+# Axis-aligned bounds: (min_x, min_y, max_x, max_y), inclusive
+Bounds = Tuple[float, float, float, float]
+CellKey = Tuple[int, int]
+
+
+def instance_bounds(instance: AssetInstance, width: float, height: float) -> Bounds:
+    """
+    Axis-aligned bounds of an instance's footprint.
+
+    As in the editor, (instance.x, instance.y) is the top-left corner of
+    the unrotated width x height footprint; scale and rotation (degrees)
+    apply around its center.
+
+    Args:
+        instance: The asset instance
+        width, height: Unscaled footprint size, in the instance's units
+
+    Returns:
+        The (min_x, min_y, max_x, max_y) bounds
+    """
+    center_x = instance.x + width / 2
+    center_y = instance.y + height / 2
+    half_width = abs(instance.scale_x) * width / 2
+    half_height = abs(instance.scale_y) * height / 2
+    if instance.rotation % 360:
+        angle = math.radians(instance.rotation)
+        cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+        half_width, half_height = (cos * half_width + sin * half_height,
+                                   sin * half_width + cos * half_height)
+    return (center_x - half_width, center_y - half_height,
+            center_x + half_width, center_y + half_height)
+
+
+def _contains(outer: Bounds, inner: Bounds) -> bool:
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and inner[2] <= outer[2] and inner[3] <= outer[3])
+
+
+def _distance(x: float, y: float, bounds: Bounds) -> float:
+    """Distance from a point to bounds (0 inside)."""
+    dx = max(bounds[0] - x, 0.0, x - bounds[2])
+    dy = max(bounds[1] - y, 0.0, y - bounds[3])
+    return math.hypot(dx, dy)
+
+
+class SpatialIndex(ABC):
+    """
+    Abstract base class for the asset instance spatial indexes.
+
+    Instances are tracked by instance_id. Their bounds are computed when
+    they are inserted; after moving, rotating or scaling an instance, call
+    update(instance) to refresh its entry.
+
+    Args:
+        definitions: Asset definitions by ID, used for footprint sizes
+        unit_scale: Factor converting definition width/height (pixels)
+            to instance units, e.g. 1 / 32 for tile coordinates
+        default_size: Footprint (width, height) in instance units for
+            instances without a sized definition
+    """
+
+    def __init__(self, definitions: Optional[Mapping[str, AssetDefinition]] = None,
+                 unit_scale: float = 1.0, default_size: Tuple[float, float] = (0.0, 0.0)):
+        self.definitions = definitions if definitions is not None else {}
+        self.unit_scale = unit_scale
+        self.default_size = default_size
+        self._entries: Dict[str, Tuple[Bounds, AssetInstance]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, instance_id: str) -> bool:
+        return instance_id in self._entries
+
+    def bounds_of(self, instance: AssetInstance) -> Bounds:
+        """Compute the bounds of an instance from its definition's size."""
+        definition = self.definitions.get(instance.asset_definition_id)
+        if definition is not None and definition.width is not None and definition.height is not None:
+            width = definition.width * self.unit_scale
+            height = definition.height * self.unit_scale
+        else:
+            width, height = self.default_size
+        return instance_bounds(instance, width, height)
+
+    def get_bounds(self, instance_id: str) -> Optional[Bounds]:
+        """Get the indexed bounds of an instance."""
+        entry = self._entries.get(instance_id)
+        return entry[0] if entry is not None else None
+
+    def insert(self, instance: AssetInstance) -> None:
+        """Add an instance (or refresh it, if already indexed)."""
+        if instance.instance_id in self._entries:
+            self.update(instance)
+            return
+        bounds = self.bounds_of(instance)
+        self._entries[instance.instance_id] = (bounds, instance)
+        self._add(instance.instance_id, bounds)
+
+    def insert_many(self, instances: Iterable[AssetInstance]) -> None:
+        """Add several instances."""
+        for instance in instances:
+            self.insert(instance)
+
+    def update(self, instance: AssetInstance) -> None:
+        """Refresh an instance's bounds after it moved, rotated or scaled."""
+        entry = self._entries.get(instance.instance_id)
+        if entry is None:
+            self.insert(instance)
+            return
+        bounds = self.bounds_of(instance)
+        self._entries[instance.instance_id] = (bounds, instance)
+        if bounds != entry[0]:
+            self._move(instance.instance_id, entry[0], bounds)
+
+    def remove(self, instance_id: str) -> bool:
+        """
+        Remove an instance by its ID.
+
+        Returns:
+            True if the instance was indexed, False otherwise
+        """
+        entry = self._entries.pop(instance_id, None)
+        if entry is None:
+            return False
+        self._discard(instance_id, entry[0])
+        return True
+
+    def clear(self) -> None:
+        """Remove every instance."""
+        for instance_id in list(self._entries):
+            self.remove(instance_id)
+
+    def query_rect(self, x1: float, y1: float, x2: float, y2: float) -> List[AssetInstance]:
+        """Get the instances whose bounds intersect a rectangle."""
+        query = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        return [self._entries[instance_id][1] for instance_id in self._query(query)]
+
+    def query_radius(self, x: float, y: float, radius: float) -> List[AssetInstance]:
+        """Get the instances whose bounds come within radius of a point."""
+        entries = self._entries
+        return [
+            entries[instance_id][1]
+            for instance_id in self._query((x - radius, y - radius, x + radius, y + radius))
+            if _distance(x, y, entries[instance_id][0]) <= radius
+        ]
+
+    def nearest(self, x: float, y: float, k: int = 1) -> List[AssetInstance]:
+        """
+        Get the k instances closest to a point, nearest first.
+
+        Distance is measured to an instance's bounds, so every instance
+        covering the point is at distance 0.
+        """
+        if k <= 0 or not self._entries:
+            return []
+        return [self._entries[instance_id][1] for instance_id in self._nearest(x, y, k)]
+
+    def _scan_nearest(self, x: float, y: float, k: int) -> List[str]:
+        """Nearest-k by checking every entry."""
+        return heapq.nsmallest(k, self._entries,
+                               key=lambda instance_id: _distance(x, y, self._entries[instance_id][0]))
+
+    # Storage hooks for the concrete indexes
+
+    @abstractmethod
+    def _add(self, instance_id: str, bounds: Bounds) -> None:
+        """Store an entry."""
+        pass
+
+    @abstractmethod
+    def _discard(self, instance_id: str, bounds: Bounds) -> None:
+        """Remove a stored entry."""
+        pass
+
+    def _move(self, instance_id: str, old: Bounds, new: Bounds) -> None:
+        self._discard(instance_id, old)
+        self._add(instance_id, new)
+
+    @abstractmethod
+    def _query(self, query: Bounds) -> List[str]:
+        """IDs of the instances whose bounds intersect query, each once."""
+        pass
+
+    def _nearest(self, x: float, y: float, k: int) -> List[str]:
+        return self._scan_nearest(x, y, k)
+
+
+class GridSpatialIndex(SpatialIndex):
+    """
+    A spatial index hashing instance bounds into square grid cells.
+
+    Each instance is listed in every cell its bounds overlap, so pick
+    cell_size around the typical footprint or query size. Only occupied
+    cells are stored, and the world has no fixed extent.
+    """
+
+    def __init__(self, cell_size: float = 8.0, **kwargs):
+        super().__init__(**kwargs)
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self._cells: Dict[CellKey, Set[str]] = {}
+
+    def _cell_range(self, bounds: Bounds) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return (math.floor(bounds[0] / size), math.floor(bounds[1] / size),
+                math.floor(bounds[2] / size), math.floor(bounds[3] / size))
+
+    def _add(self, instance_id: str, bounds: Bounds) -> None:
+        cx1, cy1, cx2, cy2 = self._cell_range(bounds)
+        cells = self._cells
+        for cy in range(cy1, cy2 + 1):
+            for cx in range(cx1, cx2 + 1):
+                ids = cells.get((cx, cy))
+                if ids is None:
+                    ids = cells[(cx, cy)] = set()
+                ids.add(instance_id)
+
+    def _discard(self, instance_id: str, bounds: Bounds) -> None:
+        cx1, cy1, cx2, cy2 = self._cell_range(bounds)
+        cells = self._cells
+        for cy in range(cy1, cy2 + 1):
+            for cx in range(cx1, cx2 + 1):
+                ids = cells[(cx, cy)]
+                ids.discard(instance_id)
+                if not ids:
+                    del cells[(cx, cy)]
+
+    def _move(self, instance_id: str, old: Bounds, new: Bounds) -> None:
+        # Most moves stay inside the same cells
+        if self._cell_range(old) != self._cell_range(new):
+            super()._move(instance_id, old, new)
+
+    def _query(self, query: Bounds) -> List[str]:
+        qx1, qy1, qx2, qy2 = self._cell_range(query)
+        cells = self._cells
+        if (qx2 - qx1 + 1) * (qy2 - qy1 + 1) <= len(cells):
+            keys = [(cx, cy) for cy in range(qy1, qy2 + 1) for cx in range(qx1, qx2 + 1)
+                    if (cx, cy) in cells]
+        else:
+            keys = [key for key in cells if qx1 <= key[0] <= qx2 and qy1 <= key[1] <= qy2]
+
+        entries = self._entries
+        size = self.cell_size
+        floor = math.floor
+        min_x, min_y, max_x, max_y = query
+        found = []
+        for key in keys:
+            cx, cy = key
+            for instance_id in cells[key]:
+                bounds = entries[instance_id][0]
+                if bounds[0] > max_x or bounds[2] < min_x or bounds[1] > max_y or bounds[3] < min_y:
+                    continue
+                # Report an instance spanning several cells only from the
+                # first cell where it overlaps the query
+                if ((cx == qx1 or floor(bounds[0] / size) == cx)
+                        and (cy == qy1 or floor(bounds[1] / size) == cy)):
+                    found.append(instance_id)
+        return found
+
+    def _nearest(self, x: float, y: float, k: int) -> List[str]:
+        # Search rings of cells around the point's cell. Anything outside
+        # the (2r + 1)^2 block searched so far is at least r cells away.
+        cells = self._cells
+        entries = self._entries
+        center_x, center_y = math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+        best: List[Tuple[float, int, str]] = []  # max-heap of (-distance, tiebreak, id)
+        seen: Set[str] = set()
+        tiebreak = count()
+
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 > 4 * len(cells):
+                # Sparse neighbourhood: the rings would mostly be empty
+                return self._scan_nearest(x, y, k)
+
+            for cx, cy in _ring(center_x, center_y, ring):
+                for instance_id in cells.get((cx, cy), ()):
+                    if instance_id in seen:
+                        continue
+                    seen.add(instance_id)
+                    item = (-_distance(x, y, entries[instance_id][0]), next(tiebreak), instance_id)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+
+            if len(best) == k and -best[0][0] <= ring * self.cell_size:
+                break
+            if len(seen) == len(entries):
+                break
+            ring += 1
+
+        return [instance_id for _distance_key, _tiebreak, instance_id in sorted(best, reverse=True)]
+
+
+def _ring(center_x: int, center_y: int, ring: int) -> Iterable[CellKey]:
+    """Cells at Chebyshev distance ring from a center cell."""
+    if ring == 0:
+        yield center_x, center_y
+        return
+    for cx in range(center_x - ring, center_x + ring + 1):
+        yield cx, center_y - ring
+        yield cx, center_y + ring
+    for cy in range(center_y - ring + 1, center_y + ring):
+        yield center_x - ring, cy
+        yield center_x + ring, cy
+
+
+class _QuadNode:
+    """
+    A loose quadtree node.
+
+    bounds is the node's quadrant; loose is the quadrant grown by half its
+    size on every side. An instance belongs to the child whose quadrant
+    contains its center, if its bounds fit in that child's loose bounds,
+    so small instances on a split line do not pile up in the parent.
+    """
+
+    __slots__ = ('bounds', 'loose', 'depth', 'items', 'children')
+
+    def __init__(self, bounds: Bounds, depth: int):
+        x1, y1, x2, y2 = bounds
+        grow_x, grow_y = (x2 - x1) / 2, (y2 - y1) / 2
+        self.bounds = bounds
+        self.loose = (x1 - grow_x, y1 - grow_y, x2 + grow_x, y2 + grow_y)
+        self.depth = depth
+        self.items: Set[str] = set()
+        self.children: Optional[Tuple['_QuadNode', ...]] = None
+
+    def split(self) -> None:
+        x1, y1, x2, y2 = self.bounds
+        mid_x, mid_y = (x1 + x2) / 2, (y1 + y2) / 2
+        depth = self.depth + 1
+        self.children = (
+            _QuadNode((x1, y1, mid_x, mid_y), depth),
+            _QuadNode((mid_x, y1, x2, mid_y), depth),
+            _QuadNode((x1, mid_y, mid_x, y2), depth),
+            _QuadNode((mid_x, mid_y, x2, y2), depth),
+        )
+
+    def child_for(self, bounds: Bounds) -> Optional['_QuadNode']:
+        """The child an instance with these bounds belongs to, if any."""
+        x1, y1, x2, y2 = self.bounds
+        center_x, center_y = (bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2
+        index = (center_x >= (x1 + x2) / 2) + 2 * (center_y >= (y1 + y2) / 2)
+        child = self.children[index]
+        return child if _contains(child.loose, bounds) else None
+
+
+class QuadtreeSpatialIndex(SpatialIndex):
+    """
+    A spatial index storing instances in a region quadtree.
+
+    The tree is loose (see _QuadNode): an instance sits in the deepest
+    node holding its center whose loosened bounds still contain it, and a
+    node splits once it holds more than max_items. Instances that do not
+    fit in the loosened world_bounds are kept at the root, so the world
+    bounds only need to cover where most instances are. Adapts to clustered props
+    better than the grid, at a higher constant cost per query.
+    """
+
+    def __init__(self, world_bounds: Bounds, max_items: int = 16, max_depth: int = 12, **kwargs):
+        super().__init__(**kwargs)
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self._root = _QuadNode(world_bounds, 0)
+        self._nodes: Dict[str, _QuadNode] = {}
+
+    def _add(self, instance_id: str, bounds: Bounds) -> None:
+        node = self._root
+        while node.children is not None:
+            child = node.child_for(bounds)
+            if child is None:
+                break
+            node = child
+        node.items.add(instance_id)
+        self._nodes[instance_id] = node
+
+        if node.children is None and len(node.items) > self.max_items and node.depth < self.max_depth:
+            self._split(node)
+
+    def _split(self, node: _QuadNode) -> None:
+        node.split()
+        items, node.items = node.items, set()
+        for instance_id in items:
+            bounds = self._entries[instance_id][0]
+            target = node.child_for(bounds) or node
+            target.items.add(instance_id)
+            self._nodes[instance_id] = target
+
+    def _discard(self, instance_id: str, bounds: Bounds) -> None:
+        self._nodes.pop(instance_id).items.discard(instance_id)
+
+    def _query(self, query: Bounds) -> List[str]:
+        entries = self._entries
+        min_x, min_y, max_x, max_y = query
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for instance_id in node.items:
+                bounds = entries[instance_id][0]
+                if bounds[0] <= max_x and min_x <= bounds[2] and bounds[1] <= max_y and min_y <= bounds[3]:
+                    found.append(instance_id)
+            if node.children is not None:
+                for child in node.children:
+                    loose = child.loose
+                    if loose[0] <= max_x and min_x <= loose[2] and loose[1] <= max_y and min_y <= loose[3]:
+                        stack.append(child)
+        return found
+
+    def _nearest(self, x: float, y: float, k: int) -> List[str]:
+        # Best-first search: pop nodes and instances by distance to their bounds
+        entries = self._entries
+        tiebreak = count()
+        heap: List[Tuple[float, int, object]] = [(0.0, next(tiebreak), self._root)]
+        found: List[str] = []
+        while heap and len(found) < k:
+            _distance_key, _tiebreak, item = heapq.heappop(heap)
+            if isinstance(item, str):
+                found.append(item)
+                continue
+            for instance_id in item.items:
+                heapq.heappush(heap, (_distance(x, y, entries[instance_id][0]), next(tiebreak), instance_id))
+            if item.children is not None:
+                for child in item.children:
+                    if child.items or child.children is not None:
+                        heapq.heappush(heap, (_distance(x, y, child.loose), next(tiebreak), child))
+        return found
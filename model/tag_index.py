@@ -0,0 +1,132 @@
+"""
+Tag and property index for asset definitions in the model layer.
+
+This module defines AssetTagIndex, an inverted index from tags and
+(property, value) pairs to asset definition IDs. Queries such as "tagged
+stone and dungeon with solid=True" intersect the posting lists, smallest
+first, instead of scanning every definition.
+"""
+
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .assets import AssetDefinition
+
+
+PropertyKey = Tuple[str, type, Hashable]
+
+
+def _property_key(name: str, value: Any) -> Optional[PropertyKey]:
+    """Posting key for a property value (None if the value is unhashable)."""
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    # Keep the type so that e.g. True and 1 stay distinct
+    return name, type(value), value
+
+
+class AssetTagIndex:
+    """
+    An inverted index over definition tags and property values.
+
+    Every tag and every hashable property value has a posting set of the
+    definition IDs carrying it. Unhashable property values (lists,
+    dicts) are not indexed, so queries on them match nothing.
+    """
+
+    def __init__(self):
+        self._tags: Dict[str, Set[str]] = {}
+        self._properties: Dict[PropertyKey, Set[str]] = {}
+        self._terms: Dict[str, Tuple[Tuple[str, ...], Tuple[PropertyKey, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, definition_id: str) -> bool:
+        return definition_id in self._terms
+
+    def add(self, definition_id: str, tags: Iterable[str] = (),
+            properties: Optional[Mapping[str, Any]] = None) -> None:
+        """Index a definition's tags and properties (replacing earlier ones)."""
+        self.remove(definition_id)
+        tag_terms = tuple(dict.fromkeys(tags))
+        property_terms = tuple(
+            key for key in (_property_key(name, value) for name, value in (properties or {}).items())
+            if key is not None
+        )
+        for tag in tag_terms:
+            self._tags.setdefault(tag, set()).add(definition_id)
+        for key in property_terms:
+            self._properties.setdefault(key, set()).add(definition_id)
+        self._terms[definition_id] = (tag_terms, property_terms)
+
+    def add_definition(self, definition: AssetDefinition) -> None:
+        """Index an AssetDefinition."""
+        self.add(definition.id, definition.tags, definition.properties)
+
+    def remove(self, definition_id: str) -> bool:
+        """
+        Drop a definition from the index.
+
+        Returns:
+            True if the definition was indexed, False otherwise
+        """
+        terms = self._terms.pop(definition_id, None)
+        if terms is None:
+            return False
+        for postings, keys in ((self._tags, terms[0]), (self._properties, terms[1])):
+            for key in keys:
+                ids = postings[key]
+                ids.discard(definition_id)
+                if not ids:
+                    del postings[key]
+        return True
+
+    def tags(self) -> Dict[str, int]:
+        """Every indexed tag with the number of definitions carrying it."""
+        return {tag: len(ids) for tag, ids in self._tags.items()}
+
+    def with_tag(self, tag: str) -> Set[str]:
+        """IDs of the definitions carrying a tag."""
+        return set(self._tags.get(tag, ()))
+
+    def query(self, tags: Iterable[str] = (), properties: Optional[Mapping[str, Any]] = None,
+              any_tags: Iterable[str] = (), exclude_tags: Iterable[str] = ()) -> Set[str]:
+        """
+        Find definitions by tags and property values.
+
+        Args:
+            tags: Tags that must all be present
+            properties: Property values that must all match
+            any_tags: Tags of which at least one must be present
+            exclude_tags: Tags that must not be present
+
+        Returns:
+            The matching definition IDs (every indexed ID when no
+            positive condition is given)
+        """
+        required: List[Set[str]] = [self._tags.get(tag, set()) for tag in tags]
+        for name, value in (properties or {}).items():
+            key = _property_key(name, value)
+            required.append(self._properties.get(key, set()) if key is not None else set())
+
+        any_tags = list(any_tags)
+        if any_tags:
+            required.append(set().union(*(self._tags.get(tag, ()) for tag in any_tags)))
+
+        if required:
+            # Intersect smallest first so the working set only shrinks
+            required.sort(key=len)
+            result = set(required[0])
+            for ids in required[1:]:
+                if not result:
+                    break
+                result &= ids
+        else:
+            result = set(self._terms)
+
+        for tag in exclude_tags:
+            if not result:
+                break
+            result -= self._tags.get(tag, set())
+        return result
@@ -0,0 +1,408 @@
+"""
+Procedural terrain generation for the model layer.
+
+This module is the Python counterpart of the editor's generator
+(src/generation/noise.ts): a multi-octave heightmap and moisture map are
+thresholded into TerrainType classes, which become BiomeType-tagged tiles
+of a MapData written with bulk layer fills.
+
+Noise is seeded value noise in integer fixed point, evaluated a whole row
+at a time: each octave interpolates two lattice rows horizontally once,
+and every output row is then a few big-integer operations on packed
+32-bit lanes (one lane per cell) for the vertical interpolation, the
+octave sum and the thresholds. No per-cell Python work is done for rows
+between lattice rows, and the result only depends on the seed and the
+cell's world coordinates, so any rectangle of a world can be generated
+on its own with bit-identical output. classify_parallel relies on this to
+generate bands of a large world in a process pool, collecting the
+terrain classes in shared memory.
+"""
+
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Type
+
+from .enums import TileType, BiomeType, TerrainType
+from .map_data import MapData, MapLayer
+from .columnar import ColumnarMapLayer
+
+
+# Fixed point: lattice values have 12 bits, interpolation weights 8 bits,
+# so one octave sample is below 2^20 and an octave sum (weights totalling
+# at most 2^11) below 2^31 - every value fits a 32-bit lane with the top
+# bit free for comparisons
+_VALUE_BITS = 12
+_WEIGHT_ONE = 256
+_OCTAVE_ONE = 1 << (_VALUE_BITS + 8)
+_AMPLITUDE_TOTAL = 1 << 11
+_SIGN_BIT = 1 << 31
+
+_MASK64 = (1 << 64) - 1
+
+# Seed offset of the moisture noise (as in the editor)
+MOISTURE_SEED_OFFSET = 12345
+
+# Default tile for each terrain class
+TERRAIN_TILES: Dict[TerrainType, Tuple[TileType, BiomeType]] = {
+    TerrainType.DEEP_WATER: (TileType.WATER, BiomeType.UNDERWATER),
+    TerrainType.SHALLOW_WATER: (TileType.WATER, BiomeType.SWAMP),
+    TerrainType.BEACH: (TileType.FLOOR, BiomeType.DESERT),
+    TerrainType.DESERT: (TileType.FLOOR, BiomeType.DESERT),
+    TerrainType.GRASSLAND: (TileType.FLOOR, BiomeType.FOREST),
+    TerrainType.FOREST: (TileType.FLOOR, BiomeType.FOREST),
+    TerrainType.HILLS: (TileType.WALL, BiomeType.CAVE),
+    TerrainType.MOUNTAIN: (TileType.WALL, BiomeType.CAVE),
+    TerrainType.SNOW: (TileType.WALL, BiomeType.ICE),
+}
+
+
+@dataclass
+class TerrainParams:
+    """
+    Terrain generation parameters (defaults as in the editor).
+
+    Heights and moisture are in 0..1; the levels split them into terrain
+    classes and must be ascending (water_level * 0.7 < water_level <=
+    beach_level <= hill_level <= mountain_level <= snow_level).
+    """
+
+    width: int = 100
+    height: int = 100
+    seed: int = 0
+
+    height_octaves: int = 4
+    height_frequency: float = 0.02
+    height_amplitude: float = 1.0
+    height_persistence: float = 0.5
+
+    moisture_octaves: int = 3
+    moisture_frequency: float = 0.015
+    moisture_amplitude: float = 1.0
+    moisture_persistence: float = 0.6
+
+    water_level: float = 0.3
+    beach_level: float = 0.35
+    hill_level: float = 0.6
+    mountain_level: float = 0.8
+    snow_level: float = 0.9
+
+    dry_threshold: float = 0.3
+    wet_threshold: float = 0.7
+
+    def __post_init__(self):
+        levels = [self.water_level * 0.7, self.water_level, self.beach_level,
+                  self.hill_level, self.mountain_level, self.snow_level]
+        if levels != sorted(levels) or self.dry_threshold > self.wet_threshold:
+            raise ValueError("Terrain levels and moisture thresholds must be ascending")
+        if self.height_octaves < 1 or self.moisture_octaves < 1:
+            raise ValueError("At least one octave is required")
+
+
+def _lattice_value(salt: int, i: int, j: int) -> int:
+    """Hash a lattice point to a _VALUE_BITS-bit value (splitmix64 finalizer)."""
+    h = (salt ^ ((i & 0xFFFFFFFF) * 0x9E3779B97F4A7C15) ^ ((j & 0xFFFFFFFF) * 0xC2B2AE3D27D4EB4F)) & _MASK64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (h ^ (h >> 31)) >> (64 - _VALUE_BITS)
+
+
+def _weight(t: float) -> int:
+    """Smoothstep interpolation weight of a fraction, in 0.._WEIGHT_ONE."""
+    return int(_WEIGHT_ONE * t * t * (3 - 2 * t) + 0.5)
+
+
+class _Octave:
+    """One noise octave over a fixed column range, producing packed rows."""
+
+    def __init__(self, seed: int, index: int, frequency: float, x1: int, width: int):
+        self.frequency = frequency
+        self.salt = ((seed & _MASK64) * 0xD6E8FEB86659FD93 + index * 0xA0761D6478BD642F) & _MASK64
+        positions = [x * frequency for x in range(x1, x1 + width)]
+        self.first = math.floor(positions[0])
+        self.span = math.floor(positions[-1]) - self.first + 2
+        self.columns = [(math.floor(u) - self.first, _weight(u - math.floor(u))) for u in positions]
+        self._row: Optional[int] = None
+        self._rows: Tuple[int, int] = (0, 0)
+
+    def _lattice_row(self, j: int) -> int:
+        """Lattice row j interpolated horizontally, packed one lane per cell."""
+        salt, first = self.salt, self.first
+        values = [_lattice_value(salt, first + offset, j) for offset in range(self.span)]
+        samples = array('I', [values[column] * (_WEIGHT_ONE - weight) + values[column + 1] * weight
+                              for column, weight in self.columns])
+        return int.from_bytes(samples.tobytes(), 'little')
+
+    def row(self, y: int, low_lanes: int) -> int:
+        """Packed octave samples of row y (each below _OCTAVE_ONE)."""
+        v = y * self.frequency
+        j = math.floor(v)
+        if j != self._row:
+            if self._row is not None and j == self._row + 1:
+                self._rows = (self._rows[1], self._lattice_row(j + 1))
+            else:
+                self._rows = (self._lattice_row(j), self._lattice_row(j + 1))
+            self._row = j
+        weight = _weight(v - j)
+        top, bottom = self._rows
+        if weight == 0:
+            return top
+        # Lanes stay below 2^28 before the shift; the mask drops the bits
+        # shifted in from the next lane
+        return ((top * (_WEIGHT_ONE - weight) + bottom * weight) >> 8) & low_lanes
+
+
+class _NoiseField:
+    """Multi-octave noise normalized like the editor's, thresholded per packed row."""
+
+    def __init__(self, seed: int, octaves: int, frequency: float, amplitude: float,
+                 persistence: float, x1: int, width: int):
+        amplitudes = [amplitude * persistence ** octave for octave in range(octaves)]
+        self.amplitude_sum = sum(amplitudes)
+        self.weights = [int(_AMPLITUDE_TOTAL * value / self.amplitude_sum) for value in amplitudes]
+        self.octaves = [_Octave(seed, octave, frequency * 2 ** octave, x1, width)
+                        for octave in range(octaves)]
+
+    def units(self, value: float) -> float:
+        """
+        Octave-sum units of a normalized field value.
+
+        The editor maps the amplitude-weighted sum of signed noise to
+        (sum + 1) / 2; with noise n in 0..1 standing for 2n - 1 that is
+        sum(a * n) - A / 2 + 1 / 2 for amplitude total A.
+        """
+        raw = value + self.amplitude_sum / 2 - 0.5
+        return raw * _AMPLITUDE_TOTAL * _OCTAVE_ONE / self.amplitude_sum
+
+    def value(self, units: int) -> float:
+        """Normalized 0..1 field value of an octave sum."""
+        raw = units * self.amplitude_sum / (_AMPLITUDE_TOTAL * _OCTAVE_ONE)
+        return min(1.0, max(0.0, raw - self.amplitude_sum / 2 + 0.5))
+
+    def row(self, y: int, low_lanes: int) -> int:
+        total = 0
+        for weight, octave in zip(self.weights, self.octaves):
+            total += weight * octave.row(y, low_lanes)
+        return total
+
+
+class _Threshold:
+    """Packed 0/1 lane test of a noise field against one level."""
+
+    def __init__(self, field: _NoiseField, level: float, strict: bool, ones: int):
+        units = field.units(level)
+        # Integer sums: s > u  <=>  s >= floor(u) + 1,  s >= u  <=>  s >= ceil(u)
+        bound = math.floor(units) + 1 if strict else math.ceil(units)
+        bound = min(max(bound, 0), _SIGN_BIT)
+        # (s + 2^31 - bound) has its lane's top bit set exactly when s >= bound
+        self.offset = ones * (_SIGN_BIT - bound)
+        self.ones = ones
+
+    def test(self, row: int) -> int:
+        return ((row + self.offset) >> 31) & self.ones
+
+
+def _fields(params: TerrainParams, x1: int, width: int) -> Tuple[_NoiseField, _NoiseField]:
+    heights = _NoiseField(params.seed, params.height_octaves, params.height_frequency,
+                          params.height_amplitude, params.height_persistence, x1, width)
+    moisture = _NoiseField(params.seed + MOISTURE_SEED_OFFSET, params.moisture_octaves,
+                           params.moisture_frequency, params.moisture_amplitude,
+                           params.moisture_persistence, x1, width)
+    return heights, moisture
+
+
+# Terrain class by height band * 3 + moisture band
+_TERRAIN_BY_BANDS = bytes(
+    (TerrainType.DEEP_WATER, TerrainType.SHALLOW_WATER, TerrainType.BEACH,
+     (TerrainType.DESERT, TerrainType.GRASSLAND, TerrainType.FOREST)[moisture_band],
+     TerrainType.HILLS, TerrainType.MOUNTAIN, TerrainType.SNOW)[height_band].value
+    for height_band in range(7) for moisture_band in range(3)
+) + bytes(256 - 21)
+
+
+def classify_area(params: TerrainParams, x1: int = 0, y1: int = 0,
+                  width: Optional[int] = None, height: Optional[int] = None) -> bytearray:
+    """
+    Terrain classes of a rectangle of the world.
+
+    Args:
+        params: Generation parameters
+        x1, y1: World coordinates of the rectangle's top-left cell
+        width, height: Size of the rectangle (the world's if omitted)
+
+    Returns:
+        Row-major TerrainType values; identical to the same cells of any
+        other rectangle generated with the same parameters
+    """
+    width = params.width if width is None else width
+    height = params.height if height is None else height
+    codes = bytearray(width * height)
+    if not width or not height:
+        return codes
+
+    ones = int.from_bytes(b'\x01\x00\x00\x00' * width, 'little')
+    low_lanes = ones * 0x00FFFFFF
+    heights, moisture = _fields(params, x1, width)
+    height_levels = [
+        _Threshold(heights, params.water_level * 0.7, False, ones),
+        _Threshold(heights, params.water_level, False, ones),
+        _Threshold(heights, params.beach_level, False, ones),
+        _Threshold(heights, params.hill_level, True, ones),
+        _Threshold(heights, params.mountain_level, True, ones),
+        _Threshold(heights, params.snow_level, True, ones),
+    ]
+    moisture_levels = [
+        _Threshold(moisture, params.dry_threshold, False, ones),
+        _Threshold(moisture, params.wet_threshold, True, ones),
+    ]
+
+    for row in range(height):
+        y = y1 + row
+        height_row = heights.row(y, low_lanes)
+        moisture_row = moisture.row(y, low_lanes)
+        bands = 0
+        for level in height_levels:
+            bands += level.test(height_row)
+        bands *= 3
+        for level in moisture_levels:
+            bands += level.test(moisture_row)
+        # Every lane holds its band index in the low byte
+        start = row * width
+        codes[start:start + width] = bands.to_bytes(4 * width, 'little')[::4]
+    return codes.translate(_TERRAIN_BY_BANDS)
+
+
+def _classify_into(name: str, params: TerrainParams, y1: int, rows: int) -> None:
+    """Pool worker: classify a band of rows into the shared terrain buffer."""
+    shared = shared_memory.SharedMemory(name=name)
+    try:
+        start = y1 * params.width
+        shared.buf[start:start + rows * params.width] = classify_area(params, 0, y1, params.width, rows)
+    finally:
+        shared.close()
+
+
+def classify_parallel(params: TerrainParams, workers: Optional[int] = None,
+                      chunk_rows: int = 256) -> bytearray:
+    """
+    Terrain classes of the whole world, generated in a process pool.
+
+    The world is split into bands of full-width rows (rows are the unit
+    the noise is vectorized over). Workers write their band's classes
+    straight into one shared-memory buffer, so results are never pickled.
+    No per-chunk seed stream is needed: lattice values are hashed from
+    the seed, the octave and world coordinates, so every band computes
+    exactly the cells a single-process run would.
+
+    Args:
+        params: Generation parameters
+        workers: Worker processes (os.cpu_count() if omitted)
+        chunk_rows: Rows per band
+
+    Returns:
+        Row-major TerrainType values, identical to classify_area(params)
+    """
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be positive")
+    width, height = params.width, params.height
+    size = width * height
+    if not size:
+        return bytearray()
+
+    shared = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_classify_into, shared.name, params, y1, min(chunk_rows, height - y1))
+                       for y1 in range(0, height, chunk_rows)]
+            for future in futures:
+                future.result()
+        return bytearray(shared.buf[:size])
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+def _field_area(params: TerrainParams, moisture: bool, x1: int, y1: int,
+                width: Optional[int], height: Optional[int]) -> array:
+    width = params.width if width is None else width
+    height = params.height if height is None else height
+    values = array('f')
+    if not width or not height:
+        return values
+    low_lanes = int.from_bytes(b'\x01\x00\x00\x00' * width, 'little') * 0x00FFFFFF
+    field = _fields(params, x1, width)[1 if moisture else 0]
+    for row in range(height):
+        sums = array('I')
+        sums.frombytes(field.row(y1 + row, low_lanes).to_bytes(4 * width, 'little'))
+        values.extend(field.value(units) for units in sums)
+    return values
+
+
+def height_map(params: TerrainParams, x1: int = 0, y1: int = 0,
+               width: Optional[int] = None, height: Optional[int] = None) -> array:
+    """Row-major 0..1 heights of a rectangle (converted per cell: for inspection)."""
+    return _field_area(params, False, x1, y1, width, height)
+
+
+def moisture_map(params: TerrainParams, x1: int = 0, y1: int = 0,
+                 width: Optional[int] = None, height: Optional[int] = None) -> array:
+    """Row-major 0..1 moisture of a rectangle (converted per cell: for inspection)."""
+    return _field_area(params, True, x1, y1, width, height)
+
+
+def terrain_tables(tiles: Optional[Dict[TerrainType, Tuple[TileType, BiomeType]]] = None
+                   ) -> Tuple[bytes, bytes]:
+    """bytes.translate tables: TerrainType value -> tile type code / biome code."""
+    tiles = TERRAIN_TILES if tiles is None else tiles
+    tile_table, biome_table = bytearray(256), bytearray(256)
+    for terrain, (tile_type, biome_type) in tiles.items():
+        tile_table[terrain.value] = tile_type.value
+        biome_table[terrain.value] = biome_type.value
+    return bytes(tile_table), bytes(biome_table)
+
+
+def write_terrain(layer: MapLayer, codes: bytes,
+                  tiles: Optional[Dict[TerrainType, Tuple[TileType, BiomeType]]] = None) -> None:
+    """
+    Replace every cell of a layer with the tile of its terrain class.
+
+    Args:
+        layer: Layer sized like codes
+        codes: Row-major TerrainType values (e.g. from classify_area)
+        tiles: Tile type and biome per terrain class (TERRAIN_TILES if omitted)
+    """
+    tile_table, biome_table = terrain_tables(tiles)
+    layer.fill_types(codes.translate(tile_table))
+    layer.set_column('biome_type', codes.translate(biome_table))
+
+
+def generate_terrain(params: TerrainParams, map_id: Optional[str] = None,
+                     layer_class: Type[MapLayer] = ColumnarMapLayer,
+                     tiles: Optional[Dict[TerrainType, Tuple[TileType, BiomeType]]] = None,
+                     workers: int = 1, chunk_rows: int = 256) -> MapData:
+    """
+    Generate a map whose Terrain layer holds the generated world.
+
+    Args:
+        params: Generation parameters
+        map_id: Map ID (derived from the seed if omitted)
+        layer_class: Layer storage; the columnar default keeps large
+            worlds compact and is written without per-cell Tile objects
+        tiles: Tile type and biome per terrain class (TERRAIN_TILES if omitted)
+        workers: Worker processes; above 1 the terrain classes are
+            generated with classify_parallel (same result)
+        chunk_rows: Rows per band for classify_parallel
+
+    Returns:
+        The generated map
+    """
+    map_data = MapData(params.width, params.height, map_id or f"terrain-{params.seed}",
+                       name=f"Terrain {params.seed}", layer_class=layer_class)
+    if workers > 1:
+        codes = classify_parallel(params, workers, chunk_rows)
+    else:
+        codes = classify_area(params)
+    write_terrain(map_data.get_layer("Terrain"), codes, tiles)
+    return map_data
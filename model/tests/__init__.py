@@ -0,0 +1 @@
+"""Regression tests for the model package (python -m unittest discover model/tests)."""
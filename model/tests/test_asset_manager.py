@@ -0,0 +1,151 @@
+"""Regression tests for the caching asset manager."""
+
+import asyncio
+import json
+import os
+import random
+import struct
+import tempfile
+import unittest
+
+from model.asset_manager import CachingAssetManager, LRUCache, definition_from_manifest_entry, read_resource_info
+
+
+def _write(path, data):
+    """Write a file, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_matches_a_reference(self):
+        rng = random.Random(13)
+        cache, reference = LRUCache(8), []
+        hits = misses = evictions = 0
+        for _ in range(2000):
+            key = rng.randrange(20)
+            if rng.random() < 0.5:
+                value = cache.get(key)
+                if key in reference:
+                    hits += 1
+                    reference.remove(key)
+                    reference.append(key)
+                    self.assertEqual(value, key * 10)
+                else:
+                    misses += 1
+                    self.assertIsNone(value)
+            else:
+                cache.put(key, key * 10)
+                if key in reference:
+                    reference.remove(key)
+                reference.append(key)
+                if len(reference) > 8:
+                    reference.pop(0)
+                    evictions += 1
+            self.assertEqual(sorted(reference), sorted(k for k in range(20) if k in cache))
+
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.evictions, stats.size, stats.max_size),
+                         (hits, misses, evictions, len(reference), 8))
+        self.assertAlmostEqual(stats.hit_rate, hits / (hits + misses))
+
+    def test_rejects_empty_capacity(self):
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+
+class CachingAssetManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        root = self._directory.name
+        self.manifest = os.path.join(root, "assets", "manifest.json")
+        entries = [
+            {"id": f"prop-{i}", "name": f"Prop {i}", "src": f"/assets/props/prop-{i}.png",
+             "category": "props", "tags": ["wood"] if i % 2 else [], "gridWidth": 1 + i % 3}
+            for i in range(40)
+        ]
+        entries.append({"id": "banner", "src": "banner.svg", "width": 16, "height": 48})
+        entries.append({"id": "drip", "src": "sounds/drip.ogg"})
+        _write(self.manifest, json.dumps({"assets": entries}).encode())
+        for i in range(40):
+            _write(os.path.join(root, "assets", "props", f"prop-{i}.png"),
+                   b'\x89PNG\r\n\x1a\n' + bytes(8) + struct.pack('>II', 32 + i, 64) + bytes(20))
+        _write(os.path.join(root, "assets", "banner.svg"),
+               b'<svg xmlns="http://www.w3.org/2000/svg" width="16px" height="48.5">')
+        self.entries = entries
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_definitions_survive_eviction(self):
+        with CachingAssetManager(max_definitions=5, max_resources=5) as manager:
+            ids = manager.load_manifest(self.manifest)
+            self.assertEqual(ids, [entry["id"] for entry in self.entries])
+            rng = random.Random(3)
+            for _ in range(200):
+                entry = rng.choice(self.entries)
+                definition = manager.get_asset_definition(entry["id"])
+                self.assertEqual(definition, definition_from_manifest_entry(entry))
+            stats = manager.cache_stats()["definitions"]
+            self.assertEqual(stats.size, 5)
+            self.assertGreater(stats.evictions, 0)
+            self.assertEqual(stats.hits + stats.misses, 200)
+            self.assertIsNone(manager.get_asset_definition("missing"))
+
+    def test_manifest_entries_are_mapped(self):
+        definition = definition_from_manifest_entry(self.entries[3])
+        self.assertEqual((definition.name, definition.resource_format, definition.asset_type),
+                         ("Prop 3", "png", "sprite"))
+        self.assertEqual(definition.tags, ["wood", "props"])
+        self.assertEqual(definition.properties, {"category": "props", "gridWidth": 1})
+        sound = definition_from_manifest_entry(self.entries[-1])
+        self.assertEqual((sound.name, sound.asset_type, sound.resource_format), ("drip", "sound", "ogg"))
+
+    def test_resource_info(self):
+        manager = CachingAssetManager()
+        manager.load_manifest(self.manifest)
+        info = manager.resource_info("prop-7")
+        self.assertEqual((info["width"], info["height"], info["size_bytes"]), (39, 64, 44))
+        self.assertIs(manager.resource_info("prop-7"), info)
+        self.assertEqual(read_resource_info(manager.resource_path("banner"))["height"], 48.5)
+        self.assertIsNone(manager.resource_info("missing"))
+        with self.assertRaises(OSError):
+            manager.resource_info("drip")
+
+    def test_background_loading(self):
+        with CachingAssetManager(max_workers=2) as manager:
+            ids = manager.load_manifest_async(self.manifest, warm=True).result()
+            self.assertEqual(len(ids), len(self.entries))
+            self.assertEqual(manager.cache_stats()["resources"].size, 41)
+            manager.prefetch(["prop-1", "drip"]).result()
+
+        manager = CachingAssetManager()
+        try:
+            ids = asyncio.run(manager.aload_manifest(self.manifest))
+            self.assertEqual(sorted(manager.definition_ids()), sorted(ids))
+        finally:
+            manager.close()
+
+    def test_instances(self):
+        manager = CachingAssetManager()
+        manager.register_entries(self.entries[:2])
+        with self.assertRaises(ValueError):
+            manager.create_asset_instance("missing")
+        instance = manager.create_asset_instance("prop-1", x=2.0, y=3.0)
+        self.assertTrue(instance.instance_id)
+        self.assertIs(manager.get_asset_instance(instance.instance_id), instance)
+
+        replacement = manager.create_asset_instance("prop-0", instance_id="other")
+        replacement.instance_id = instance.instance_id
+        self.assertTrue(manager.update_asset_instance(replacement))
+        self.assertIs(manager.get_asset_instance(instance.instance_id), replacement)
+        self.assertTrue(manager.remove_asset_instance(instance.instance_id))
+        self.assertFalse(manager.remove_asset_instance(instance.instance_id))
+        self.assertFalse(manager.update_asset_instance(replacement))
+
+
+if __name__ == "__main__":
+    unittest.main()
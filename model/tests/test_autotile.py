@@ -0,0 +1,144 @@
+"""Regression tests for the autotile signature and blend planes."""
+
+import random
+import unittest
+
+from model.autotile import (
+    BLOB_INDEX, BLOB_SIGNATURES, DIRECTIONS, NORTH, NORTHEAST, EAST, AutotileRules, Autotiler, compute_planes,
+)
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import LayerType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+TILE_TYPES = [TileType.FLOOR, TileType.WALL, TileType.WATER, TileType.LAVA, TileType.PIT, TileType.DOOR]
+
+
+def _brute_planes(tile_types, width, height, rules):
+    """Reference compute_planes: compare every cell with its neighbors."""
+    by_code = {tile_type.value: tile_type for tile_type in TileType}
+
+    def group(code):
+        return rules.groups.get(by_code.get(code), 0)
+
+    def rank(code):
+        tile_type = by_code.get(code)
+        if tile_type not in rules.blend_priority:
+            return None
+        return rules.blend_priority[tile_type], tile_type.name
+
+    signatures, blends = bytearray(width * height), bytearray(width * height)
+    directions = DIRECTIONS if rules.diagonal else DIRECTIONS[:4]
+    for y in range(height):
+        for x in range(width):
+            code = tile_types[y * width + x]
+            for bit, (dx, dy) in enumerate(directions):
+                if not (0 <= x + dx < width and 0 <= y + dy < height):
+                    continue
+                other = tile_types[(y + dy) * width + x + dx]
+                if group(code) and group(other) == group(code):
+                    signatures[y * width + x] |= 1 << bit
+                if rank(code) is not None and rank(other) is not None and rank(other) > rank(code):
+                    blends[y * width + x] |= 1 << bit
+    return signatures, blends
+
+
+def _random_rules(rng):
+    """Rules with merged connection groups and tied blend priorities."""
+    groups = {tile_type: rng.randrange(1, 4) for tile_type in rng.sample(TILE_TYPES, 4)}
+    priorities = {tile_type: rng.randrange(3) for tile_type in rng.sample(TILE_TYPES, 4)}
+    return AutotileRules(groups=groups, blend_priority=priorities, diagonal=rng.random() < 0.5)
+
+
+class ComputePlanesTest(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(23)
+        for _ in range(200):
+            width, height = rng.randrange(1, 12), rng.randrange(1, 12)
+            tile_types = bytes(rng.choice([0] + [tile_type.value for tile_type in TILE_TYPES])
+                               for _ in range(width * height))
+            rules = rng.choice([AutotileRules(), _random_rules(rng)])
+            self.assertEqual(compute_planes(tile_types, width, height, rules),
+                             _brute_planes(tile_types, width, height, rules))
+
+    def test_blob_tileset(self):
+        self.assertEqual(len(BLOB_SIGNATURES), 47)
+        self.assertEqual(max(BLOB_INDEX), 46)
+        # A corner only counts with both adjacent edges
+        self.assertEqual(BLOB_INDEX[NORTH | NORTHEAST], BLOB_INDEX[NORTH])
+        self.assertNotEqual(BLOB_INDEX[NORTH | EAST | NORTHEAST], BLOB_INDEX[NORTH | EAST])
+
+    def test_invalid_rules(self):
+        with self.assertRaises(ValueError):
+            AutotileRules(groups={TileType.WALL: 0}).group_table()
+
+
+class AutotilerTest(unittest.TestCase):
+
+    def test_incremental_updates_match_a_rebuild(self):
+        for layer_class in (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer):
+            with self.subTest(layer_class=layer_class.__name__):
+                rng = random.Random(3)
+                map_data = MapData(36, 28, "autotile", layer_class=layer_class)
+                layer = map_data.get_layer("Terrain")
+                rules = _random_rules(rng)
+                autotiler = Autotiler(map_data, rules=rules)
+                for step in range(300):
+                    x, y = rng.randrange(layer.width), rng.randrange(layer.height)
+                    operation = rng.random()
+                    if operation < 0.6:
+                        layer.set_tile(x, y, Tile(x=x, y=y, tile_type=rng.choice(TILE_TYPES)))
+                    elif operation < 0.8:
+                        layer.clear_tile(x, y)
+                    elif operation < 0.97:
+                        layer.fill_rect(x, y, x + rng.randrange(5), y + rng.randrange(5),
+                                        rng.choice(TILE_TYPES + [None]))
+                    else:
+                        layer.resize(layer.width + rng.choice([-3, 4]), layer.height + rng.choice([-2, 3]))
+
+                    if step % 10:
+                        continue
+                    rebuilt = Autotiler(map_data, rules=rules)
+                    self.assertEqual((autotiler.width, autotiler.height), (layer.width, layer.height))
+                    self.assertEqual(autotiler.signatures, rebuilt.signatures)
+                    self.assertEqual(autotiler.blends, rebuilt.blends)
+                    self.assertEqual(autotiler.blob_indices(), rebuilt.blob_indices())
+                    rebuilt.close()
+                autotiler.close()
+
+    def test_cell_queries(self):
+        map_data = MapData(5, 5, "autotile")
+        layer = map_data.get_layer("Terrain")
+        layer.fill_rect(0, 0, 4, 4, TileType.FLOOR)
+        autotiler = Autotiler(map_data)
+        self.assertEqual(autotiler.signature(2, 2), 0xFF)
+        self.assertEqual(autotiler.signature(0, 0), 0b00100110)
+        self.assertEqual(autotiler.signature(-1, 0), 0)
+
+        # Water has the higher priority, so it blends over the floor around it
+        layer.set_tile(2, 2, Tile(x=2, y=2, tile_type=TileType.WATER))
+        self.assertEqual(autotiler.signature(2, 2), 0)
+        self.assertEqual(autotiler.blend(2, 2), 0)
+        self.assertEqual(autotiler.blend(2, 1), 1 << DIRECTIONS.index((0, 1)))
+        self.assertEqual(autotiler.blend(5, 5), 0)
+        autotiler.close()
+
+        layer.set_tile(2, 2, Tile(x=2, y=2, tile_type=TileType.FLOOR))
+        self.assertNotEqual(autotiler.signature(2, 2), 0xFF)
+
+    def test_autotiler_rejects_offset_layer(self):
+        layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 10, 10, origin_x=-10, origin_y=-5)
+        map_data = MapData(10, 10, "origin")
+        map_data.layers = [layer]
+        with self.assertRaises(ValueError):
+            Autotiler(map_data)
+        with self.assertRaises(ValueError):
+            Autotiler(map_data, "Missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
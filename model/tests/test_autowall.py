@@ -0,0 +1,125 @@
+"""Regression tests for incremental auto-walling."""
+
+import random
+import unittest
+
+from model.autowall import AutoWaller, auto_wall, wall_mask
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import LayerType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapLayer
+from model.tile import Tile
+
+
+def _brute_wall_mask(tile_types, width, height, floor_types, diagonal, blocked):
+    """Reference wall_mask: check the neighbors of every cell."""
+    floors = {tile_type.value for tile_type in floor_types}
+    if diagonal:
+        offsets = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy]
+    else:
+        offsets = [(0, -1), (-1, 0), (1, 0), (0, 1)]
+    mask = bytearray(width * height)
+    for y in range(height):
+        for x in range(width):
+            index = y * width + x
+            if tile_types[index] or (blocked is not None and blocked[index]):
+                continue
+            mask[index] = any(0 <= x + dx < width and 0 <= y + dy < height
+                              and tile_types[(y + dy) * width + x + dx] in floors for dx, dy in offsets)
+    return mask
+
+
+def _layers():
+    """A 20x20 terrain layer with one floor room and an empty objects layer."""
+    terrain = MapLayer(LayerType.TERRAIN, "Terrain", 20, 20)
+    terrain.fill_rect(5, 5, 9, 9, TileType.FLOOR)
+    objects = MapLayer(LayerType.OBJECTS, "Objects", 20, 20)
+    return terrain, objects
+
+
+class WallMaskTest(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(22)
+        codes = [0, 0, 0, TileType.FLOOR.value, TileType.WALL.value, TileType.WATER.value]
+        for _ in range(300):
+            width, height = rng.randrange(1, 14), rng.randrange(1, 14)
+            tile_types = bytes(rng.choice(codes) for _ in range(width * height))
+            floor_types = rng.choice([(TileType.FLOOR,), (TileType.FLOOR, TileType.WATER)])
+            diagonal = rng.random() < 0.5
+            blocked = bytes(rng.random() < 0.2 for _ in range(width * height)) if rng.random() < 0.5 else None
+            self.assertEqual(wall_mask(tile_types, width, height, floor_types, diagonal, blocked),
+                             _brute_wall_mask(tile_types, width, height, floor_types, diagonal, blocked))
+        self.assertEqual(wall_mask(b'', 0, 0), bytearray())
+
+
+class AutoWallerTest(unittest.TestCase):
+
+    def test_incremental_updates_match_full_passes(self):
+        for layer_class in (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer):
+            with self.subTest(layer_class=layer_class.__name__):
+                rng = random.Random(8)
+                terrain = layer_class(LayerType.TERRAIN, "Terrain", 40, 30)
+                objects = layer_class(LayerType.OBJECTS, "Objects", 40, 30)
+                reference = MapLayer(LayerType.TERRAIN, "Terrain", 40, 30)
+                waller = AutoWaller(terrain, blockers=objects, diagonal=rng.random() < 0.5)
+                for _ in range(120):
+                    for _ in range(rng.randrange(1, 10)):
+                        x, y = rng.randrange(40), rng.randrange(30)
+                        operation = rng.random()
+                        if operation < 0.5:
+                            tile_type = rng.choice([TileType.FLOOR, TileType.FLOOR, TileType.WATER])
+                            for layer in (terrain, reference):
+                                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type))
+                        elif operation < 0.7:
+                            terrain.clear_tile(x, y)
+                            reference.clear_tile(x, y)
+                        elif operation < 0.85:
+                            objects.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.DOOR))
+                        elif operation < 0.97:
+                            objects.clear_tile(x, y)
+                        else:
+                            # Large edits take the full pass
+                            terrain.fill_rect(0, y, 39, y + 5, None)
+                            reference.fill_rect(0, y, 39, y + 5, None)
+                    placed = waller.update()
+                    self.assertEqual(placed, auto_wall(reference, diagonal=waller.diagonal, blockers=objects))
+                    self.assertEqual(bytes(terrain.get_column('tile_type')), bytes(reference.get_column('tile_type')))
+                    self.assertEqual(waller.update(), 0)
+
+    def test_rejects_offset_layer(self):
+        layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 10, 10, origin_x=-10, origin_y=0)
+        with self.assertRaises(ValueError):
+            AutoWaller(layer)
+        with self.assertRaises(ValueError):
+            AutoWaller(MapLayer(LayerType.TERRAIN, "Terrain", 10, 10), blockers=layer)
+
+    def test_cleared_blocker_gets_walled(self):
+        terrain, objects = _layers()
+        objects.set_tile(4, 4, Tile(x=4, y=4, tile_type=TileType.DOOR))
+        waller = AutoWaller(terrain, blockers=objects)
+        self.assertEqual(waller.update(), 23)
+        self.assertIsNone(terrain.get_tile(4, 4))
+
+        objects.clear_tile(4, 4)
+        self.assertEqual(waller.update(), 1)
+        self.assertEqual(terrain.get_tile(4, 4).tile_type, TileType.WALL)
+
+    def test_updates_after_first_pass_are_incremental(self):
+        terrain, objects = _layers()
+        waller = AutoWaller(terrain, blockers=objects)
+        waller.update()
+        terrain.fill_rect(14, 14, 14, 14, TileType.FLOOR)
+        self.assertIsNotNone(terrain.changes_since(waller.version))
+        self.assertIsNotNone(objects.changes_since(waller.blocker_version))
+        self.assertEqual(waller.update(), 8)
+
+        expected, _objects = _layers()
+        expected.fill_rect(14, 14, 14, 14, TileType.FLOOR)
+        auto_wall(expected)
+        self.assertEqual(terrain.get_column('tile_type'), expected.get_column('tile_type'))
+
+
+if __name__ == "__main__":
+    unittest.main()
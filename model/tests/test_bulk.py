@@ -0,0 +1,174 @@
+"""Regression tests for the bulk fills and blit of every layer class."""
+
+import os
+import random
+import tempfile
+import unittest
+
+from model.assets import AssetInstance
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.columns import COLUMN_NAMES
+from model.enums import BiomeType, LayerType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapLayer
+from model.mapped import create_mapped_map
+from model.tile import Tile
+
+
+WIDTH, HEIGHT = 45, 37
+TILE_TYPES = [None, TileType.FLOOR, TileType.WALL, TileType.DOOR, TileType.WATER]
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer)
+
+
+def _cells(layer):
+    """{(x, y): tile dict} of every occupied cell, without asset instance IDs."""
+    cells = {}
+    for x, y, tile in layer.get_all_tiles():
+        if tile is not None:
+            data = tile.to_dict()
+            for instance in data["asset_instances"]:
+                instance.pop("instance_id")
+            cells[(x, y)] = data
+    return cells
+
+
+def _reference_fill(layer, cells, tile_type, biome_type):
+    """Write default tiles cell by cell, the way the bulk fills are specified."""
+    for x, y in cells:
+        if tile_type is None:
+            layer.clear_tile(x, y)
+        else:
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type, biome_type=biome_type))
+
+
+def _prefab(rng):
+    """A small source layer with a few decorated tiles."""
+    source = MapLayer(LayerType.OBJECTS, "Prefab", 7, 5)
+    for _ in range(15):
+        x, y = rng.randrange(7), rng.randrange(5)
+        tile = Tile(x=x, y=y, tile_type=rng.choice(TILE_TYPES[1:]), max_health=rng.choice([None, 5.0]))
+        if rng.random() < 0.3:
+            tile.set_property("loot", rng.randrange(5))
+            tile.add_asset_instance(AssetInstance(instance_id=f"p{x}-{y}", asset_definition_id="chest"))
+        source.set_tile(x, y, tile)
+    return source
+
+
+class BulkFillTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._mapped = create_mapped_map(os.path.join(self._directory.name, "bulk.dmmp"),
+                                         WIDTH, HEIGHT, "bulk", layers=[(LayerType.TERRAIN, "Terrain")])
+
+    def tearDown(self):
+        self._mapped.close()
+        self._directory.cleanup()
+
+    def _layers(self):
+        layers = [layer_class(LayerType.TERRAIN, "Terrain", WIDTH, HEIGHT) for layer_class in LAYER_CLASSES]
+        return layers + [self._mapped.map_data.get_layer("Terrain")]
+
+    def test_bulk_writes_match_cell_by_cell_writes(self):
+        rng = random.Random(19)
+        layers = self._layers()
+        reference = MapLayer(LayerType.TERRAIN, "Terrain", WIDTH, HEIGHT)
+        for _ in range(60):
+            tile_type = rng.choice(TILE_TYPES)
+            biome_type = rng.choice([BiomeType.DUNGEON, BiomeType.CAVE])
+            operation = rng.randrange(5)
+            if operation == 0:
+                x1, x2 = rng.randrange(-5, WIDTH + 5), rng.randrange(-5, WIDTH + 5)
+                y1, y2 = rng.randrange(-5, HEIGHT + 5), rng.randrange(-5, HEIGHT + 5)
+                if rng.random() < 0.3:
+                    x1, x2 = -1, WIDTH
+                cells = [(x, y) for y in range(max(min(y1, y2), 0), min(max(y1, y2), HEIGHT - 1) + 1)
+                         for x in range(max(min(x1, x2), 0), min(max(x1, x2), WIDTH - 1) + 1)]
+                results = [layer.fill_rect(x1, y1, x2, y2, tile_type, biome_type) for layer in layers]
+            elif operation == 1:
+                mask = bytes(rng.random() < 0.2 for _ in range(WIDTH * HEIGHT))
+                cells = [(i % WIDTH, i // WIDTH) for i, flag in enumerate(mask) if flag]
+                rows = [list(mask[y * WIDTH:(y + 1) * WIDTH]) for y in range(HEIGHT)]
+                results = [layer.fill_mask(rng.choice([mask, rows]), tile_type, biome_type) for layer in layers]
+            elif operation == 2:
+                types = [rng.choice(TILE_TYPES) for _ in range(WIDTH * HEIGHT)]
+                codes = bytes(0 if tile_type is None else tile_type.value for tile_type in types)
+                for layer in layers:
+                    layer.fill_types(codes, biome_type)
+                for i, cell_type in enumerate(types):
+                    _reference_fill(reference, [(i % WIDTH, i // WIDTH)], cell_type, biome_type)
+                cells, results = [], [None] * len(layers)
+            elif operation == 3:
+                source = _prefab(rng)
+                dx, dy = rng.randrange(-4, WIDTH), rng.randrange(-3, HEIGHT)
+                include_empty = rng.random() < 0.5
+                results = [layer.blit(source, dx, dy, include_empty) for layer in layers]
+                expected = reference.blit(source, dx, dy, include_empty)
+                self.assertEqual(results, [expected] * len(layers))
+                cells = []
+            else:
+                # In-place edits between the bulk writes
+                x, y = rng.randrange(WIDTH), rng.randrange(HEIGHT)
+                for layer in layers + [reference]:
+                    if layer.get_tile(x, y) is not None:
+                        layer.get_tile(x, y).damage(1.0)
+                cells, results = [], [None] * len(layers)
+
+            if operation in (0, 1):
+                _reference_fill(reference, cells, tile_type, biome_type)
+                self.assertEqual(results, [len(cells)] * len(layers))
+            expected = _cells(reference)
+            for layer in layers:
+                self.assertEqual(_cells(layer), expected, type(layer).__name__)
+
+        for layer in layers:
+            for name in COLUMN_NAMES:
+                self.assertEqual(bytes(layer.get_column(name)), bytes(reference.get_column(name)), name)
+
+    def test_from_type_array(self):
+        rows = [[TileType.FLOOR, 0, TileType.WALL], [0, TileType.DOOR, TileType.FLOOR]]
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                layer = layer_class.from_type_array(rows, "Terrain", LayerType.TERRAIN, z_index=2)
+                self.assertIsInstance(layer, layer_class)
+                self.assertEqual((layer.width, layer.height, layer.z_index), (3, 2, 2))
+                self.assertEqual(bytes(layer.get_column("tile_type")), bytes([1, 0, 2, 0, 3, 1]))
+                flat = layer_class.from_type_array(bytes([1, 0, 2, 0, 3, 1]), "Terrain", LayerType.TERRAIN, width=3)
+                self.assertEqual(_cells(flat), _cells(layer))
+                with self.assertRaises(ValueError):
+                    layer_class.from_type_array(bytes(6), "Terrain", LayerType.TERRAIN)
+                with self.assertRaises(ValueError):
+                    layer.fill_types(bytes([200] * 6))
+                with self.assertRaises(ValueError):
+                    layer.fill_mask(bytes(5), TileType.FLOOR)
+
+    def test_blit_gives_instances_new_ids(self):
+        source = MapLayer(LayerType.OBJECTS, "Prefab", 2, 2)
+        tile = Tile(x=0, y=0, tile_type=TileType.FLOOR)
+        tile.add_asset_instance(AssetInstance(instance_id="chest", asset_definition_id="chest"))
+        source.set_tile(0, 0, tile)
+        for layer in self._layers():
+            with self.subTest(layer_class=type(layer).__name__):
+                self.assertEqual(layer.blit(source, 3, 4), 1)
+                self.assertEqual(layer.blit(source, 6, 4), 1)
+                ids = {layer.get_tile(3, 4).asset_instances[0].instance_id,
+                       layer.get_tile(6, 4).asset_instances[0].instance_id}
+                self.assertEqual(len(ids), 2)
+                self.assertNotIn("chest", ids)
+                layer.get_tile(3, 4).set_property("changed", True)
+                self.assertEqual(source.get_tile(0, 0).properties, {})
+
+    def test_one_notification_per_bulk_write(self):
+        for layer in self._layers():
+            with self.subTest(layer_class=type(layer).__name__):
+                reported = []
+                layer.add_listener(lambda _layer, *rect: reported.append(rect))
+                layer.fill_rect(30, 2, 5, 9, TileType.FLOOR)
+                layer.fill_mask(bytes(WIDTH * HEIGHT), TileType.WALL)
+                self.assertEqual(reported[0], (5, 2, 30, 9))
+                self.assertTrue(all(rect == (0, 0, WIDTH - 1, HEIGHT - 1) for rect in reported[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Regression tests for layer versions and the lazily started change journal."""
+
+import random
+import unittest
+
+from model.assets import AssetInstance
+from model.changes import ChangeJournal
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.compact import CompactTile
+from model.enums import LayerType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer)
+
+
+def _cells(layer):
+    """{(x, y): tile dict} of every occupied cell."""
+    return {(x, y): tile.to_dict() for x, y, tile in layer.get_all_tiles() if tile is not None}
+
+
+def _covered(x, y, rects):
+    """Whether a cell lies in one of the inclusive rectangles."""
+    return any(x1 <= x <= x2 and y1 <= y <= y2 for x1, y1, x2, y2 in rects)
+
+
+class ChangeJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.map_data = MapData(64, 64, "changes")
+        self.layer = self.map_data.get_layer("Terrain")
+
+    def test_journal_starts_on_first_query(self):
+        layer = self.layer
+        layer.set_tile(1, 1, Tile(x=1, y=1, tile_type=TileType.FLOOR))
+        self.assertIsNone(layer._journal)
+        self.assertEqual(layer.version, 1)
+
+        # Changes before the journal existed are unknown
+        self.assertIsNone(layer.changes_since(0))
+        self.assertEqual(layer.dirty_regions(0), [(0, 0, 63, 63)])
+
+        since = layer.version
+        layer.set_tile(40, 2, Tile(x=40, y=2, tile_type=TileType.FLOOR))
+        self.assertEqual(layer.changes_since(since), [(40, 2, 40, 2)])
+        self.assertEqual(layer.dirty_regions(since), [(32, 0, 63, 31)])
+
+    def test_tile_methods_notify(self):
+        for layer_class, tile_class in ((MapLayer, Tile), (MapLayer, CompactTile), (ColumnarMapLayer, Tile)):
+            with self.subTest(layer_class=layer_class.__name__, tile_class=tile_class.__name__):
+                map_data = MapData(8, 8, "notify", layer_class=layer_class)
+                layer = map_data.get_layer("Terrain")
+                layer.set_tile(2, 3, tile_class(x=2, y=3, tile_type=TileType.FLOOR))
+                changed = []
+                layer.add_listener(lambda _layer, *rect: changed.append(rect))
+                tile = layer.get_tile(2, 3)
+
+                tile.set_property("key", 1)
+                instance = AssetInstance(instance_id="torch-1", asset_definition_id="torch")
+                tile.add_asset_instance(instance)
+                tile.remove_asset_instance("torch-1")
+                self.assertEqual(changed, [(2, 3, 2, 3)] * 3)
+                self.assertEqual(layer.version, 4)
+
+
+class ChangeCoverageTest(unittest.TestCase):
+
+    def test_reported_changes_cover_every_changed_cell(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                rng = random.Random(16)
+                layer = layer_class(LayerType.TERRAIN, "Terrain", 70, 40)
+                layer.dirty_regions(0)  # Starts the change journal
+                for _ in range(30):
+                    since, before = layer.version, _cells(layer)
+                    for _ in range(rng.randrange(1, 6)):
+                        x, y = rng.randrange(70), rng.randrange(40)
+                        operation = rng.randrange(5)
+                        tile = layer.get_tile(x, y)
+                        if operation == 0:
+                            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=rng.choice([TileType.FLOOR, TileType.WALL]),
+                                                      max_health=3.0))
+                        elif operation == 1:
+                            layer.clear_tile(x, y)
+                        elif operation == 2 and tile is not None:
+                            tile.damage(1.0)
+                        elif operation == 3 and tile is not None:
+                            tile.set_property("mark", rng.randrange(3))
+                        elif operation == 4:
+                            values = layer.get_column("is_visible")
+                            for _ in range(rng.randrange(4)):
+                                values[rng.randrange(len(values))] = rng.randrange(2)
+                            layer.set_column("is_visible", values)
+
+                    after = _cells(layer)
+                    changed = {cell for cell in set(before) | set(after) if before.get(cell) != after.get(cell)}
+                    rects = layer.changes_since(since)
+                    regions = layer.dirty_regions(since)
+                    self.assertEqual(len(rects), layer.version - since)
+                    for x, y in changed:
+                        self.assertTrue(_covered(x, y, rects), (x, y))
+                        self.assertTrue(_covered(x, y, regions), (x, y))
+                    for x1, y1, x2, y2 in regions:
+                        self.assertEqual((x1 % 32, y1 % 32), (0, 0))
+
+                # A resize marks the whole layer
+                since = layer.version
+                layer.resize(50, 50)
+                self.assertEqual(layer.dirty_regions(since), [(0, 0, 49, 49)])
+
+    def test_bounded_journal(self):
+        journal = ChangeJournal(limit=3, bounds=(0, 0, 99, 99))
+        for i in range(5):
+            journal.record((0, 0, 99, 99), i, i, i, i)
+        self.assertEqual(journal.version, 5)
+        self.assertEqual(journal.changes_since(2), [(2, 2, 2, 2), (3, 3, 3, 3), (4, 4, 4, 4)])
+        self.assertIsNone(journal.changes_since(1))
+        self.assertEqual(journal.dirty_regions(1), [(0, 0, 31, 31)])
+        self.assertEqual(journal.changes_since(5), [])
+
+        # Rectangles outside the bounds are not changes
+        self.assertEqual(journal.record((0, 0, 99, 99), 200, 200, 210, 210), 5)
+        journal.record((0, 0, 99, 99), 20, 20, 40, 70)
+        self.assertEqual(journal.dirty_regions(5), [(0, 0, 31, 31), (32, 0, 63, 31), (0, 32, 31, 63),
+                                                    (32, 32, 63, 63), (0, 64, 31, 95), (32, 64, 63, 95)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""Regression tests for ChunkedMapLayer and analysis on layers with an origin."""
+
+import random
+import unittest
+
+from model.chunked import CHUNK_SIZE, ChunkedMapLayer
+from model.columns import COLUMN_NAMES
+from model.enums import BiomeType, LayerType, TileType
+from model.fov import compute_visibility
+from model.map_data import MapData, MapLayer
+from model.pathfinding import Pathfinder
+from model.tile import Tile
+
+
+TILE_TYPES = [TileType.FLOOR, TileType.WALL, TileType.DOOR, TileType.WATER]
+
+
+def _random_tile(rng, x, y):
+    """A tile with random type, biome, flags and costs."""
+    tile = Tile(x=x, y=y, tile_type=rng.choice(TILE_TYPES), biome_type=rng.choice(list(BiomeType)),
+                movement_cost=rng.choice([1.0, 2.5]), max_health=rng.choice([100.0, 7.0]))
+    tile.is_discovered = rng.random() < 0.5
+    if rng.random() < 0.2:
+        tile.properties = {"note": rng.randrange(10)}
+    return tile
+
+
+def _offset_map() -> MapData:
+    """A map whose Terrain layer is a floor room covering -10..-1 x -5..4."""
+    layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 10, 10, origin_x=-10, origin_y=-5)
+    for y in range(-5, 5):
+        for x in range(-10, 0):
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+    map_data = MapData(10, 10, "origin")
+    map_data.layers = [layer]
+    return map_data
+
+
+class ChunkedStorageTest(unittest.TestCase):
+
+    def test_random_edits_match_a_reference(self):
+        rng = random.Random(4)
+        for _ in range(15):
+            origin_x, origin_y = rng.randrange(-80, 40), rng.randrange(-80, 40)
+            width, height = rng.randrange(1, 100), rng.randrange(1, 100)
+            layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", width, height,
+                                    origin_x=origin_x, origin_y=origin_y)
+            expected = {}
+            for _ in range(300):
+                x = rng.randrange(origin_x - 3, origin_x + width + 3)
+                y = rng.randrange(origin_y - 3, origin_y + height + 3)
+                inside = layer.is_valid_position(x, y)
+                if rng.random() < 0.3:
+                    self.assertEqual(layer.clear_tile(x, y), inside)
+                    expected.pop((x, y), None)
+                else:
+                    tile = _random_tile(rng, x, y)
+                    self.assertEqual(layer.set_tile(x, y, tile), inside)
+                    if inside:
+                        expected[(x, y)] = tile.to_dict()
+
+            stored = {(x, y): tile.to_dict() for x, y, tile in layer.get_all_tiles()}
+            self.assertEqual(stored, expected)
+            self.assertEqual(layer.count_tiles(), len(expected))
+            self.assertEqual(layer.count_tiles(TileType.WALL),
+                             sum(1 for tile in expected.values() if tile["tile_type"] == "WALL"))
+
+            x1, y1 = rng.randrange(origin_x - 5, origin_x + width), rng.randrange(origin_y - 5, origin_y + height)
+            x2, y2 = x1 + rng.randrange(0, 40), y1 + rng.randrange(0, 40)
+            area = {(x, y) for x, y, _tile in layer.get_tiles_in_area(x1, y1, x2, y2)}
+            self.assertEqual(area, {(x, y) for x, y in expected if x1 <= x <= x2 and y1 <= y <= y2})
+
+            chunks = {(x // CHUNK_SIZE, y // CHUNK_SIZE) for x, y in expected}
+            self.assertEqual(layer.chunk_count(), len(chunks))
+
+    def test_columns_match_map_layer(self):
+        rng = random.Random(6)
+        dense = MapLayer(LayerType.TERRAIN, "Terrain", 70, 45)
+        chunked = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 70, 45, origin_x=-33, origin_y=12)
+        for _ in range(500):
+            x, y = rng.randrange(70), rng.randrange(45)
+            tile = _random_tile(rng, x, y)
+            dense.set_tile(x, y, tile)
+            chunked.set_tile(x - 33, y + 12, Tile.from_dict(dict(tile.to_dict(), x=x - 33, y=y + 12)))
+
+        for name in COLUMN_NAMES:
+            self.assertEqual(bytes(chunked.get_column(name)), bytes(dense.get_column(name)), name)
+
+        costs = dense.get_column("movement_cost")
+        for index in range(len(costs)):
+            costs[index] += 1
+        reported = []
+        chunked.add_listener(lambda _layer, *rect: reported.append(rect))
+        dense.set_column("movement_cost", costs)
+        chunked.set_column("movement_cost", costs)
+        self.assertEqual(bytes(chunked.get_column("movement_cost")), bytes(dense.get_column("movement_cost")))
+        x1, y1, x2, y2 = reported[-1]
+        self.assertTrue(-33 <= x1 <= x2 < 37 and 12 <= y1 <= y2 < 57)
+
+        columns, extras = chunked.export_columns()
+        copied = ChunkedMapLayer(LayerType.TERRAIN, "Copy", 70, 45, origin_x=-33, origin_y=12)
+        copied.import_columns(columns, extras)
+        self.assertEqual([tile.to_dict() for _x, _y, tile in sorted(copied.get_all_tiles(), key=lambda c: c[:2])],
+                         [tile.to_dict() for _x, _y, tile in sorted(chunked.get_all_tiles(), key=lambda c: c[:2])])
+
+    def test_to_dict_round_trip_is_row_major(self):
+        layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 100, 100, origin_x=-40, origin_y=-40)
+        for x, y in ((50, -40), (-40, 10), (0, 0), (-1, -1), (59, 59)):
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+        data = layer.to_dict()
+        positions = [(tile["y"], tile["x"]) for tile in data["tiles"]]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(len(positions), 5)
+
+        restored = ChunkedMapLayer.from_dict(data)
+        self.assertEqual((restored.origin_x, restored.origin_y), (-40, -40))
+        self.assertEqual(restored.to_dict(), data)
+
+    def test_resize_drops_tiles_and_frees_chunks(self):
+        layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 200, 200, origin_x=-50, origin_y=-50)
+        for x, y in ((-50, -50), (10, 10), (20, 149), (149, 0)):
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.WALL))
+        layer.resize(80, 80)
+        self.assertEqual(sorted((x, y) for x, y, _tile in layer.get_all_tiles()), [(-50, -50), (10, 10)])
+        self.assertEqual(layer.chunk_count(), 2)
+        self.assertFalse(layer.is_valid_position(30, 0))
+
+    def test_sparse_world_allocates_only_used_chunks(self):
+        layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 1 << 16, 1 << 16, origin_x=-(1 << 15))
+        layer.set_tile(-30000, 5, Tile(x=-30000, y=5, tile_type=TileType.FLOOR))
+        layer.set_tile(30000, 60000, Tile(x=30000, y=60000, tile_type=TileType.FLOOR))
+        self.assertEqual(layer.chunk_count(), 2)
+        layer.clear_tile(-30000, 5)
+        self.assertEqual(layer.chunk_count(), 1)
+
+
+class OriginTest(unittest.TestCase):
+
+    def test_fov_uses_layer_coordinates(self):
+        layer = _offset_map().get_layer("Terrain")
+        visible = compute_visibility(layer, [(-5, 0, 3)])
+        self.assertEqual(visible[5 * 10 + 5], 1)
+        self.assertGreater(sum(visible), 1)
+
+    def test_pathfinder_rejects_offset_layer(self):
+        with self.assertRaises(ValueError):
+            Pathfinder(_offset_map())
+
+
+if __name__ == "__main__":
+    unittest.main()
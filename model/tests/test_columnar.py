@@ -0,0 +1,179 @@
+"""Regression tests for ColumnarMapLayer storage, ColumnarTile views and sparse extras."""
+
+import math
+import random
+import unittest
+from dataclasses import fields
+
+from model.assets import AssetInstance
+from model.columnar import ColumnarMapLayer
+from model.columns import COLUMN_NAMES
+from model.enums import BiomeType, LayerType, TileType
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+def tile_state(tile):
+    """All dataclass fields of a tile (None for an empty cell)."""
+    if tile is None:
+        return None
+    state = {field.name: getattr(tile, field.name) for field in fields(Tile)}
+    state['properties'] = dict(state['properties'])
+    state['asset_instances'] = list(state['asset_instances'])
+    return state
+
+
+def random_tile(rng, x, y):
+    """A tile with float32-exact values in every column."""
+    max_health = rng.choice([None, 10.0, 2.5])
+    return Tile(
+        x=x, y=y,
+        tile_type=rng.choice(list(TileType)),
+        biome_type=rng.choice(list(BiomeType)),
+        movement_cost=rng.choice([0.5, 1.0, 3.0]),
+        is_discovered=rng.random() < 0.5,
+        is_visible=rng.random() < 0.5,
+        max_health=max_health,
+        current_health=None if max_health is None else max_health / 2,
+    )
+
+
+def same_column(a, b):
+    """Compare two columns, treating NaN as equal to NaN."""
+    return len(a) == len(b) and all(
+        x == y or (isinstance(x, float) and math.isnan(x) and math.isnan(y))
+        for x, y in zip(a, b)
+    )
+
+
+class ColumnarStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.plain = MapLayer(LayerType.TERRAIN, "plain", 9, 6)
+        self.columnar = ColumnarMapLayer(LayerType.TERRAIN, "columnar", 9, 6)
+        for _ in range(40):
+            x, y = rng.randrange(9), rng.randrange(6)
+            tile = random_tile(rng, x, y) if rng.random() < 0.8 else None
+            self.plain.set_tile(x, y, tile)
+            self.columnar.set_tile(x, y, tile and tile.copy())
+
+    def assert_same_layers(self):
+        self.assertEqual((self.plain.width, self.plain.height),
+                         (self.columnar.width, self.columnar.height))
+        for (x, y, a), (_, _, b) in zip(self.plain.get_all_tiles(), self.columnar.get_all_tiles()):
+            self.assertEqual(tile_state(a), tile_state(b), (x, y))
+        for name in COLUMN_NAMES:
+            self.assertTrue(same_column(self.plain.get_column(name), self.columnar.get_column(name)), name)
+
+    def test_matches_object_storage(self):
+        self.assert_same_layers()
+
+    def test_views_write_through(self):
+        self.plain.set_tile(4, 4, Tile(x=4, y=4, tile_type=TileType.WALL, max_health=10.0))
+        self.columnar.set_tile(4, 4, Tile(x=4, y=4, tile_type=TileType.WALL, max_health=10.0))
+        for layer in (self.plain, self.columnar):
+            tile = layer.get_tile(4, 4)
+            tile.damage(4.0)
+            tile.is_discovered = True
+            tile.biome_type = BiomeType.CAVE
+        self.assert_same_layers()
+        self.assertEqual(self.columnar.get_tile(4, 4).current_health, 6.0)
+
+        for layer in (self.plain, self.columnar):
+            layer.get_tile(4, 4).damage(6.0)
+        self.assertTrue(self.columnar.get_tile(4, 4).is_passable)
+        self.assert_same_layers()
+
+    def test_clear_and_resize(self):
+        for layer in (self.plain, self.columnar):
+            layer.clear_tile(0, 0)
+            layer.resize(5, 8)
+        self.assertIsNone(self.columnar.get_tile(0, 0))
+        self.assert_same_layers()
+
+        for layer in (self.plain, self.columnar):
+            layer.resize(12, 3)
+        self.assert_same_layers()
+
+    def test_count_and_positions(self):
+        occupied = [(x, y) for x, y, tile in self.plain.get_all_tiles() if tile is not None]
+        self.assertEqual(self.columnar.count_tiles(), len(occupied))
+        self.assertEqual(list(self.columnar.iter_positions()), occupied)
+        walls = [(x, y) for x, y, tile in self.plain.get_all_tiles()
+                 if tile is not None and tile.tile_type == TileType.WALL]
+        self.assertEqual(self.columnar.count_tiles(TileType.WALL), len(walls))
+        self.assertEqual(list(self.columnar.iter_positions('tile_type', TileType.WALL.value)), walls)
+
+    def test_layer_class_per_map(self):
+        map_data = MapData(4, 3, "columnar", layer_class=ColumnarMapLayer)
+        self.assertTrue(all(isinstance(layer, ColumnarMapLayer) for layer in map_data.layers))
+        plain = map_data.add_layer(LayerType.EFFECTS, "Effects", layer_class=MapLayer)
+        self.assertIs(type(plain), MapLayer)
+
+
+class ColumnarExtrasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.map_data = MapData(4, 4, "columnar", layer_class=ColumnarMapLayer)
+        self.layer = self.map_data.get_layer("Terrain")
+        for y in range(4):
+            for x in range(4):
+                self.layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+
+    def test_reading_does_not_store_extras(self):
+        tile = self.layer.get_tile(1, 1)
+        self.assertEqual(tile.properties, {})
+        self.assertEqual(list(tile.asset_instances), [])
+        self.assertFalse(tile.is_interactive)
+        self.assertEqual(tile.interaction_range, 1.0)
+        repr(tile)
+        self.assertEqual(self.layer._extras, {})
+
+    def test_writing_into_missing_properties_raises(self):
+        with self.assertRaises(TypeError):
+            self.layer.get_tile(1, 1).properties["key"] = 1
+        self.assertEqual(self.layer.get_tile(1, 1).properties, {})
+
+    def test_appending_to_missing_asset_instances_raises(self):
+        instance = AssetInstance(instance_id="torch-1", asset_definition_id="torch")
+        with self.assertRaises(AttributeError):
+            self.layer.get_tile(1, 1).asset_instances.append(instance)
+        self.layer.get_tile(1, 1).add_asset_instance(instance)
+        self.assertEqual(self.layer.get_tile(1, 1).asset_instances, [instance])
+
+    def test_assigned_properties_are_stored(self):
+        self.layer.get_tile(1, 1).properties = {"loot": 3}
+        self.layer.get_tile(1, 1).properties["trap"] = True
+        self.assertEqual(self.layer.get_tile(1, 1).properties, {"loot": 3, "trap": True})
+
+    def test_set_property_stores_properties(self):
+        self.layer.get_tile(1, 1).set_property("loot", 3)
+        self.assertEqual(self.layer.get_tile(1, 1).properties, {"loot": 3})
+        self.assertEqual(self.layer.get_tile(0, 0).properties, {})
+
+    def test_copied_view_does_not_share_containers(self):
+        self.layer.get_tile(0, 0).properties = {"key": [1]}
+        self.layer.set_tile(2, 2, self.layer.get_tile(0, 0))
+        self.layer.get_tile(2, 2).properties["other"] = True
+        self.layer.get_tile(2, 2).properties["key"].append(2)
+
+        self.assertEqual(self.layer.get_tile(0, 0).properties, {"key": [1]})
+        self.assertEqual(self.layer.get_tile(2, 2).properties, {"key": [1, 2], "other": True})
+
+    def test_view_set_onto_its_own_cell(self):
+        self.layer.get_tile(0, 0).properties = {"key": 1}
+        self.layer.set_tile(0, 0, self.layer.get_tile(0, 0))
+        self.assertEqual(self.layer.get_tile(0, 0).properties, {"key": 1})
+        self.layer.set_tile(1, 0, Tile(x=1, y=0, tile_type=TileType.WALL))
+        self.assertEqual(self.layer.get_tile(1, 0).properties, {})
+
+    def test_clearing_drops_extras(self):
+        self.layer.set_tile(3, 3, Tile(x=3, y=3, tile_type=TileType.DOOR, is_interactive=True))
+        self.assertTrue(self.layer.get_tile(3, 3).is_interactive)
+        self.layer.clear_tile(3, 3)
+        self.assertEqual(self.layer._extras, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Regression tests for the slotted CompactTile and CompactAssetInstance."""
+
+import random
+import unittest
+
+from model.assets import AssetInstance
+from model.compact import CompactAssetInstance, CompactTile
+from model.enums import BiomeType, TileType
+from model.map_data import MapData
+from model.tile import Tile
+
+
+class CompactTileTest(unittest.TestCase):
+
+    def test_behaves_like_tile(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            kwargs = dict(x=rng.randrange(50), y=rng.randrange(50),
+                          tile_type=rng.choice(list(TileType)), biome_type=rng.choice(list(BiomeType)),
+                          movement_cost=rng.choice([1.0, 2.0]), max_health=rng.choice([None, 4.0, 9.0]))
+            tile, compact = Tile(**kwargs), CompactTile(**kwargs)
+            for _ in range(rng.randrange(4)):
+                operation = rng.randrange(4)
+                if operation == 0:
+                    amount = rng.choice([1.0, 5.0])
+                    self.assertEqual(compact.damage(amount), tile.damage(amount))
+                elif operation == 1:
+                    tile.heal(2.0)
+                    compact.heal(2.0)
+                elif operation == 2:
+                    key, value = rng.choice("ab"), rng.randrange(5)
+                    tile.set_property(key, value)
+                    compact.set_property(key, value)
+                else:
+                    instance_id = rng.choice(["i1", "i2"])
+                    for target in (tile, compact):
+                        target.add_asset_instance(AssetInstance(instance_id=instance_id,
+                                                                asset_definition_id="torch"))
+            self.assertEqual(compact.to_dict(), tile.to_dict())
+            self.assertEqual(Tile.from_dict(compact.to_dict()).to_dict(), tile.to_dict())
+
+    def test_empties_are_shared_and_read_only(self):
+        first = CompactTile(x=0, y=0, tile_type=TileType.FLOOR)
+        second = CompactTile(x=1, y=0, tile_type=TileType.FLOOR)
+        self.assertIs(first.properties, second.properties)
+        self.assertIs(first.asset_instances, second.asset_instances)
+        with self.assertRaises(TypeError):
+            first.properties["key"] = 1
+        with self.assertRaises(AttributeError):
+            first.asset_instances.append(AssetInstance(instance_id="a", asset_definition_id="torch"))
+
+        first.set_property("key", 1)
+        self.assertEqual((first.properties, second.properties), ({"key": 1}, {}))
+
+    def test_collections_return_to_shared_empties(self):
+        tile = CompactTile(x=0, y=0, tile_type=TileType.FLOOR, properties={"key": 1})
+        self.assertEqual(tile.properties, {"key": 1})
+        tile.properties = {}
+        self.assertIsNone(tile._properties)
+
+        tile.add_asset_instance(AssetInstance(instance_id="a", asset_definition_id="torch"))
+        self.assertTrue(tile.remove_asset_instance("a"))
+        self.assertIsNone(tile._asset_instances)
+        self.assertFalse(tile.remove_asset_instance("a"))
+
+    def test_stored_in_layers(self):
+        map_data = MapData(8, 8, "compact")
+        layer = map_data.get_layer("Terrain")
+        for y in range(8):
+            for x in range(8):
+                layer.set_tile(x, y, CompactTile(x=x, y=y, tile_type=TileType.WALL, max_health=2.0))
+        reported = []
+        layer.add_listener(lambda _layer, *rect: reported.append(rect))
+        self.assertTrue(layer.get_tile(3, 4).damage(2.0))
+        self.assertEqual(reported, [(3, 4, 3, 4)])
+        self.assertTrue(layer.get_tile(3, 4).is_passable)
+        self.assertEqual(MapData.from_dict(map_data.to_dict()).get_tile(3, 4, "Terrain").to_dict(),
+                         layer.get_tile(3, 4).to_dict())
+
+
+class CompactAssetInstanceTest(unittest.TestCase):
+
+    def test_behaves_like_asset_instance(self):
+        kwargs = dict(instance_id="chest-1", asset_definition_id="chest", x=3.5, y=2.0, rotation=90.0)
+        instance, compact = AssetInstance(**kwargs), CompactAssetInstance(**kwargs)
+        self.assertEqual(compact.to_dict(), instance.to_dict())
+        instance.set_property("loot", ["gold"])
+        compact.set_property("loot", ["gold"])
+        self.assertEqual(compact.to_dict(), instance.to_dict())
+        self.assertEqual(vars(compact), {})
+
+        # to_dict copies the properties
+        compact.to_dict()["properties"]["loot"].append("gem")
+        self.assertEqual(compact.properties, {"loot": ["gold"]})
+
+    def test_generates_ids_without_properties(self):
+        first = CompactAssetInstance(instance_id="", asset_definition_id="torch")
+        second = CompactAssetInstance(instance_id="", asset_definition_id="torch")
+        self.assertTrue(first.instance_id)
+        self.assertNotEqual(first.instance_id, second.instance_id)
+        self.assertIsNone(first._properties)
+        with self.assertRaises(TypeError):
+            first.properties["key"] = 1
+
+
+if __name__ == "__main__":
+    unittest.main()
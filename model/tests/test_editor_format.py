@@ -0,0 +1,131 @@
+"""Regression tests for the streaming editor save file importer."""
+
+import io
+import json
+import os
+import random
+import unittest
+
+from model.columnar import ColumnarMapLayer
+from model.editor_format import EDITOR_TILE_PROPERTY, load_editor_map, tile_type_from_editor
+from model.enums import TileType
+from model.map_data import MapLayer
+
+
+SAMPLE_MAPS = os.path.join(os.path.dirname(__file__), "..", "..", "sample-maps")
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer)
+
+EDITOR_NAMES = ["floor", "wall", "wall-brick", "door", "grass", "floor-wood-planks", "stairs-up"]
+
+
+def _random_document(rng):
+    """An editor save document with random sparse layers and asset instances."""
+    tiles = {}
+    for layer_name in ("floor", "walls", "objects"):
+        cells = {}
+        for _ in range(rng.randrange(0, 60)):
+            cells[f"{rng.randrange(-5, 20)},{rng.randrange(-3, 15)}"] = rng.choice(EDITOR_NAMES)
+        tiles[layer_name] = cells
+    instances = [
+        {"id": f"asset-{i}", "assetId": "chest", "x": rng.randrange(-5, 20),
+         "y": rng.randrange(-3, 15), "rotation": 90, "properties": {"n": i}}
+        for i in range(rng.randrange(0, 8))
+    ]
+    return {"tiles": tiles, "assetInstances": instances, "version": "1.0.0", "id": "random"}
+
+
+def _expected_cells(document):
+    """Reference {(layer, x, y): editor name} decoded with json.load."""
+    return {
+        (layer_name, int(key.split(",")[0]), int(key.split(",")[1])): name
+        for layer_name, cells in document["tiles"].items()
+        for key, name in cells.items()
+    }
+
+
+class EditorFormatTest(unittest.TestCase):
+
+    def test_tile_type_from_editor(self):
+        self.assertEqual(tile_type_from_editor("wall"), TileType.WALL)
+        self.assertEqual(tile_type_from_editor("stairs-up"), TileType.STAIRS_UP)
+        self.assertEqual(tile_type_from_editor("wall-brick"), TileType.WALL)
+        self.assertEqual(tile_type_from_editor("grass"), TileType.FLOOR)
+
+    def test_matches_json_load(self):
+        rng = random.Random(11)
+        for _ in range(20):
+            document = _random_document(rng)
+            text = json.dumps(document, indent=rng.choice([None, 2]))
+            expected = _expected_cells(document)
+            xs = [x for _, x, _ in expected] or [0]
+            ys = [y for _, _, y in expected] or [0]
+            origin = (min(min(xs), 0), min(min(ys), 0))
+
+            for layer_class in LAYER_CLASSES:
+                for chunk_size in (7, 64, 1 << 20):
+                    map_data = load_editor_map(io.StringIO(text), layer_class, chunk_size=chunk_size)
+                    self.assertEqual([layer.name for layer in map_data.layers], ["floor", "walls", "objects"])
+                    if expected:
+                        self.assertEqual((map_data.width, map_data.height),
+                                         (max(xs) - origin[0] + 1, max(ys) - origin[1] + 1))
+
+                    cells = {}
+                    for layer in map_data.layers:
+                        for x, y, tile in layer.get_all_tiles():
+                            if tile is not None:
+                                cells[(layer.name, x + origin[0], y + origin[1])] = tile
+                    self.assertEqual(set(cells), set(expected))
+                    for key, tile in cells.items():
+                        name = expected[key]
+                        self.assertEqual(tile.tile_type, tile_type_from_editor(name))
+                        variant = name != tile.tile_type.name.lower()
+                        self.assertEqual(tile.properties.get(EDITOR_TILE_PROPERTY), name if variant else None)
+
+    def test_asset_instances_go_to_the_topmost_tile(self):
+        document = {
+            "tiles": {"floor": {"0,0": "floor", "1,0": "floor"}, "walls": {"1,0": "wall"}},
+            "assetInstances": [
+                {"id": "a", "assetId": "torch", "x": 0, "y": 0},
+                {"id": "b", "assetId": "torch", "x": 1, "y": 0},
+                {"id": "c", "assetId": "torch", "x": 5, "y": 5},
+            ],
+        }
+        for layer_class in LAYER_CLASSES:
+            map_data = load_editor_map(io.StringIO(json.dumps(document)), layer_class)
+            floor, walls = map_data.get_layer("floor"), map_data.get_layer("walls")
+            self.assertEqual([i.instance_id for i in floor.get_tile(0, 0).asset_instances], ["a"])
+            self.assertEqual(list(floor.get_tile(1, 0).asset_instances), [])
+            self.assertEqual([i.instance_id for i in walls.get_tile(1, 0).asset_instances], ["b"])
+            self.assertEqual([i["instance_id"] for i in map_data.properties["asset_instances"]], ["c"])
+
+    def test_negative_coordinates_shift_the_map(self):
+        document = {"tiles": {"floor": {"-2,-1": "floor", "1,1": "wall"}}}
+        map_data = load_editor_map(io.StringIO(json.dumps(document)))
+        self.assertEqual(map_data.properties["editor_origin"], [-2, -1])
+        self.assertEqual((map_data.width, map_data.height), (4, 3))
+        self.assertEqual(map_data.get_tile(0, 0, "floor").tile_type, TileType.FLOOR)
+        self.assertEqual(map_data.get_tile(3, 2, "floor").tile_type, TileType.WALL)
+
+    def test_sample_maps(self):
+        for name in ("simple-room.json", "complex-dungeon.json"):
+            path = os.path.join(SAMPLE_MAPS, name)
+            with open(path, encoding="utf-8") as file:
+                expected = _expected_cells(json.load(file))
+            map_data = load_editor_map(path, ColumnarMapLayer, chunk_size=256)
+            origin = map_data.properties.get("editor_origin", [0, 0])
+            loaded = {
+                (layer.name, x + origin[0], y + origin[1])
+                for layer in map_data.layers
+                for x, y in layer.iter_positions()
+            }
+            self.assertEqual(loaded, set(expected))
+
+    def test_rejects_malformed_files(self):
+        for text in ('[]', '{"tiles": {"floor": {"0,0": "floor"', '{"tiles": {"floor": {"0,0": 3}}}'):
+            with self.assertRaises(ValueError):
+                load_editor_map(io.StringIO(text))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""Regression tests for FlyweightMapLayer and its shared tile prototypes."""
+
+import random
+import unittest
+
+from model.enums import BiomeType, LayerType, TileType
+from model.flyweight import FlyweightMapLayer, FlyweightTile, TilePrototype, tile_prototype
+from model.fov import update_visibility
+from model.map_data import MapLayer
+from model.tile import Tile
+
+
+TILE_TYPES = [TileType.FLOOR, TileType.WALL, TileType.DOOR, TileType.WATER]
+
+
+def _cells(layer):
+    """{(x, y): tile dict} of every occupied cell."""
+    return {(x, y): tile.to_dict() for x, y, tile in layer.get_all_tiles() if tile is not None}
+
+
+def _filled(layer_class, width=12, height=10):
+    """A layer of default-state floor tiles."""
+    layer = layer_class(LayerType.TERRAIN, "Terrain", width, height)
+    for y in range(height):
+        for x in range(width):
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+    return layer
+
+
+class FlyweightLayerTest(unittest.TestCase):
+
+    def test_random_edits_match_map_layer(self):
+        rng = random.Random(10)
+        reference, layer = _filled(MapLayer), _filled(FlyweightMapLayer)
+        for _ in range(600):
+            x, y = rng.randrange(12), rng.randrange(10)
+            operation = rng.randrange(6)
+            if operation == 0:
+                tile_type = rng.choice(TILE_TYPES)
+                biome_type = rng.choice([BiomeType.DUNGEON, BiomeType.FOREST])
+                max_health = rng.choice([None, 3.0])
+                for target in (reference, layer):
+                    target.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type, biome_type=biome_type,
+                                               max_health=max_health))
+            elif operation == 1:
+                reference.clear_tile(x, y)
+                layer.clear_tile(x, y)
+            elif operation == 2 and reference.get_tile(x, y) is not None:
+                amount = rng.choice([1.0, 3.0])
+                self.assertEqual(layer.get_tile(x, y).damage(amount), reference.get_tile(x, y).damage(amount))
+            elif operation == 3 and reference.get_tile(x, y) is not None:
+                key, value = rng.choice("ab"), rng.randrange(3)
+                reference.get_tile(x, y).set_property(key, value)
+                layer.get_tile(x, y).set_property(key, value)
+            elif operation == 4 and reference.get_tile(x, y) is not None:
+                flag = rng.random() < 0.5
+                reference.get_tile(x, y).is_discovered = flag
+                layer.get_tile(x, y).is_discovered = flag
+            elif operation == 5:
+                # Copy a prototype view somewhere else
+                sx, sy = rng.randrange(12), rng.randrange(10)
+                view = layer.get_tile(sx, sy)
+                if isinstance(view, FlyweightTile):
+                    source = reference.get_tile(sx, sy)
+                    reference.set_tile(x, y, Tile.from_dict(dict(source.to_dict(), x=x, y=y)))
+                    layer.set_tile(x, y, view)
+            self.assertEqual(_cells(layer), _cells(reference))
+
+        unique = layer.unique_tile_count()
+        released = layer.compact()
+        self.assertEqual(layer.unique_tile_count(), unique - released)
+        self.assertEqual(_cells(layer), _cells(reference))
+        for name in ("tile_type", "is_passable", "movement_cost", "current_health"):
+            self.assertEqual(bytes(layer.get_column(name)), bytes(reference.get_column(name)), name)
+
+    def test_default_cells_share_prototypes(self):
+        layer = _filled(FlyweightMapLayer)
+        self.assertEqual(layer.unique_tile_count(), 0)
+        self.assertTrue(all(tile is tile_prototype(TileType.FLOOR) for row in layer.tiles for tile in row))
+
+        view = layer.get_tile(3, 4)
+        self.assertIsInstance(view, FlyweightTile)
+        self.assertFalse(view.is_unique())
+        view.is_discovered = True
+        self.assertTrue(view.is_unique())
+        self.assertEqual(layer.unique_tile_count(), 1)
+        self.assertFalse(layer.get_tile(4, 4).is_discovered)
+        self.assertFalse(tile_prototype(TileType.FLOOR).is_discovered)
+
+        view.is_discovered = False
+        self.assertEqual(layer.compact(), 1)
+        self.assertIs(layer.tiles[4][3], tile_prototype(TileType.FLOOR))
+
+    def test_stale_view_copies_the_materialized_tile(self):
+        layer = _filled(FlyweightMapLayer)
+        view = layer.get_tile(3, 4)
+        view.set_property("key", 1)
+        layer.set_tile(0, 0, view)
+        self.assertEqual(layer.unique_tile_count(), 2)
+        self.assertIsNot(layer.get_tile(0, 0), layer.get_tile(3, 4))
+        self.assertEqual((layer.get_tile(0, 0).x, layer.get_tile(3, 4).x), (0, 3))
+        layer.get_tile(0, 0).set_property("key", 2)
+        self.assertEqual(layer.get_tile(3, 4).properties, {"key": 1})
+
+    def test_prototypes_are_immutable(self):
+        prototype = tile_prototype(TileType.WALL, BiomeType.CAVE)
+        self.assertIs(prototype, tile_prototype(TileType.WALL, BiomeType.CAVE))
+        self.assertIsInstance(prototype, TilePrototype)
+        with self.assertRaises(AttributeError):
+            prototype.is_passable = True
+        with self.assertRaises(TypeError):
+            prototype.properties["key"] = 1
+
+    def test_set_column_materializes_only_changed_cells(self):
+        layer = _filled(FlyweightMapLayer)
+        reported = []
+        layer.add_listener(lambda _layer, *rect: reported.append(rect))
+        layer.set_column("is_discovered", layer.get_column("is_discovered"))
+        self.assertEqual((layer.unique_tile_count(), reported), (0, []))
+
+        values = layer.get_column("is_discovered")
+        values[2 * 12 + 5] = values[7 * 12 + 1] = 1
+        layer.set_column("is_discovered", values)
+        self.assertEqual(layer.unique_tile_count(), 2)
+        self.assertEqual(reported, [(1, 2, 5, 7)])
+
+        values[2 * 12 + 5] = 0
+        layer.set_column("is_discovered", values)
+        self.assertEqual(layer.unique_tile_count(), 1)
+
+    def test_visibility_updates_keep_most_cells_shared(self):
+        layer = _filled(FlyweightMapLayer, 40, 40)
+        update_visibility(layer, [(10, 10, 3)])
+        discovered = sum(layer.get_column("is_discovered"))
+        self.assertGreater(discovered, 0)
+        self.assertLessEqual(layer.unique_tile_count(), discovered)
+        update_visibility(layer, [])
+        self.assertEqual(layer.unique_tile_count(), discovered)
+
+
+if __name__ == "__main__":
+    unittest.main()
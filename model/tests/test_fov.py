@@ -0,0 +1,130 @@
+"""Regression tests for shadowcasting field of view."""
+
+import random
+import unittest
+
+from model.columnar import ColumnarMapLayer
+from model.enums import LayerType, TileType
+from model.fov import compute_fov, compute_visibility, opacity_mask, update_visibility
+from model.map_data import MapLayer
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer)
+
+
+def _segment_hits_cell(x0, y0, x1, y1, cx, cy):
+    """Whether the segment between two cell centers touches the square of cell (cx, cy)."""
+    t0, t1 = 0.0, 1.0
+    dx, dy = x1 - x0, y1 - y0
+    for p, q in ((-dx, x0 - cx + 0.5), (dx, cx + 0.5 - x0), (-dy, y0 - cy + 0.5), (dy, cy + 0.5 - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+    return t0 <= t1
+
+
+def _room(layer_class, width, height, walls=()):
+    """A layer filled with floor, with walls at the given positions."""
+    layer = layer_class(LayerType.TERRAIN, "Terrain", width, height)
+    for y in range(height):
+        for x in range(width):
+            tile_type = TileType.WALL if (x, y) in walls else TileType.FLOOR
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type))
+    return layer
+
+
+class ComputeFovTest(unittest.TestCase):
+
+    def test_open_grid_sees_the_whole_circle(self):
+        width, height, radius = 21, 17, 6
+        visible = compute_fov(bytes(width * height), width, height, 10, 8, radius)
+        for y in range(height):
+            for x in range(width):
+                inside = (x - 10) ** 2 + (y - 8) ** 2 <= radius * radius
+                self.assertEqual(visible[y * width + x], 1 if inside else 0, (x, y))
+
+    def test_random_grids(self):
+        rng = random.Random(1)
+        for _ in range(150):
+            width, height = rng.randrange(3, 14), rng.randrange(3, 14)
+            opaque = bytes(1 if rng.random() < 0.25 else 0 for _ in range(width * height))
+            vx, vy, radius = rng.randrange(width), rng.randrange(height), rng.randrange(1, 9)
+            visible = compute_fov(opaque, width, height, vx, vy, radius)
+            wider = compute_fov(opaque, width, height, vx, vy, radius + 1)
+            self.assertEqual(visible[vy * width + vx], 1)
+
+            for y in range(height):
+                for x in range(width):
+                    index = y * width + x
+                    within = (x - vx) ** 2 + (y - vy) ** 2 <= radius * radius
+                    if visible[index]:
+                        self.assertTrue(within)
+                        self.assertTrue(wider[index])
+                    elif within:
+                        # A cell within the radius is only hidden behind an opaque cell
+                        self.assertTrue(any(
+                            opaque[by * width + bx] and (bx, by) != (x, y)
+                            and _segment_hits_cell(vx, vy, x, y, bx, by)
+                            for by in range(height) for bx in range(width)
+                        ), (x, y))
+
+    def test_wall_blocks_sight(self):
+        layer = _room(MapLayer, 9, 9, walls={(x, 4) for x in range(9)})
+        visible = compute_visibility(layer, [(4, 1, 8)])
+        self.assertTrue(all(visible[4 * 9 + x] for x in range(9)))
+        self.assertFalse(any(visible[y * 9 + x] for y in range(5, 9) for x in range(9)))
+
+    def test_viewer_outside_the_layer_sees_nothing(self):
+        self.assertEqual(sum(compute_fov(bytes(16), 4, 4, 7, 1, 3)), 0)
+
+    def test_empty_cells_do_not_block(self):
+        layer = MapLayer(LayerType.TERRAIN, "Terrain", 3, 1)
+        layer.set_tile(1, 0, Tile(x=1, y=0, tile_type=TileType.WALL))
+        self.assertEqual(bytes(opacity_mask(layer)), b'\x00\x01\x00')
+
+
+class UpdateVisibilityTest(unittest.TestCase):
+
+    def test_union_of_viewers(self):
+        layer = _room(MapLayer, 12, 8, walls={(6, y) for y in range(8)})
+        opaque = opacity_mask(layer)
+        left = compute_fov(opaque, 12, 8, 2, 3, 4)
+        right = compute_fov(opaque, 12, 8, 9, 5, 3)
+        both = compute_visibility(layer, [(2, 3, 4), (9, 5, 3)])
+        self.assertEqual(bytes(both), bytes(a | b for a, b in zip(left, right)))
+
+    def test_flags_match_across_storage(self):
+        walls = {(3, y) for y in range(1, 6)} | {(7, 2), (8, 2)}
+        layers = []
+        for layer_class in LAYER_CLASSES:
+            layer = _room(layer_class, 10, 7, walls)
+            layer.clear_tile(0, 0)
+            layers.append(layer)
+
+        for viewers in ([(1, 3, 5)], [(5, 3, 4), (9, 6, 2)], []):
+            masks = [update_visibility(layer, viewers) for layer in layers]
+            self.assertEqual(bytes(masks[0]), bytes(masks[1]))
+            for name in ('is_visible', 'is_discovered'):
+                self.assertEqual(bytes(layers[0].get_column(name)), bytes(layers[1].get_column(name)))
+
+        for layer in layers:
+            # Everything seen stays discovered, nothing is visible without viewers
+            self.assertEqual(sum(layer.get_column('is_visible')), 0)
+            self.assertGreater(sum(layer.get_column('is_discovered')), 0)
+            self.assertIsNone(layer.get_tile(0, 0))
+            self.assertTrue(layer.get_tile(1, 3).is_discovered)
+
+    def test_without_reveal(self):
+        layer = _room(ColumnarMapLayer, 6, 6)
+        visible = update_visibility(layer, [(0, 0, 2)], reveal=False)
+        self.assertEqual(bytes(layer.get_column('is_visible')), bytes(visible))
+        self.assertEqual(sum(layer.get_column('is_discovered')), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""Regression tests for EditHistory transactions and coalescing."""
+
+import random
+import unittest
+
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import TileType
+from model.flyweight import FlyweightMapLayer
+from model.history import EditHistory
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer)
+
+
+def _floor(x: int, y: int, tile_type: TileType = TileType.FLOOR) -> Tile:
+    return Tile(x=x, y=y, tile_type=tile_type)
+
+
+def _state(map_data):
+    """{(layer name, x, y): tile dict} of every occupied cell of the map."""
+    return {(layer.name, x, y): tile.to_dict()
+            for layer in map_data.layers for x, y, tile in layer.get_all_tiles() if tile is not None}
+
+
+class UndoRedoTest(unittest.TestCase):
+
+    def test_undo_and_redo_restore_recorded_states(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                rng = random.Random(17)
+                map_data = MapData(40, 40, "history", layer_class=layer_class)
+                history = EditHistory(map_data, coalesce_window=0)
+                # states[i] is the map after i undoable steps
+                states = [_state(map_data)]
+                for _ in range(150):
+                    operation = rng.random()
+                    if operation < 0.6:
+                        position = len(history)
+                        with history.transaction("Edit"):
+                            for _ in range(rng.randrange(1, 8)):
+                                layer = rng.choice(map_data.layers)
+                                x, y = rng.randrange(40), rng.randrange(40)
+                                tile = layer.get_tile(x, y)
+                                choice = rng.randrange(3)
+                                if choice == 0:
+                                    history.set_tile(layer, x, y, _floor(x, y, rng.choice([TileType.FLOOR,
+                                                                                            TileType.WALL])))
+                                elif choice == 1:
+                                    history.clear_tile(layer.name, x, y)
+                                elif tile is not None:
+                                    history.touch(layer, x, y)
+                                    tile.set_property("mark", rng.randrange(3))
+                                    tile.is_discovered = True
+                        if len(history) > position:
+                            # A new step drops the redo states
+                            del states[position + 1:]
+                            states.append(_state(map_data))
+                        self.assertEqual(_state(map_data), states[len(history)])
+                    elif operation < 0.85:
+                        if history.undo() is not None:
+                            self.assertEqual(_state(map_data), states[len(history)])
+                        else:
+                            self.assertEqual(len(history), 0)
+                    else:
+                        if history.redo() is not None:
+                            self.assertEqual(_state(map_data), states[len(history)])
+                    self.assertEqual(history.can_undo, len(history) > 0)
+
+                while history.undo():
+                    pass
+                self.assertEqual(_state(map_data), states[0])
+                self.assertEqual(_state(map_data), {})
+
+
+class TransactionNestingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.map_data = MapData(8, 8, "history")
+        self.layer = self.map_data.get_layer("Terrain")
+        self.history = EditHistory(self.map_data)
+
+    def test_inner_error_propagates_and_cancels_outer(self):
+        with self.assertRaises(KeyError):
+            with self.history.transaction("Outer"):
+                self.history.set_tile(self.layer, 0, 0, _floor(0, 0))
+                with self.history.transaction("Inner"):
+                    self.history.set_tile(self.layer, 1, 0, _floor(1, 0))
+                    raise KeyError("boom")
+        self.assertIsNone(self.layer.get_tile(0, 0))
+        self.assertIsNone(self.layer.get_tile(1, 0))
+        self.assertEqual(len(self.history), 0)
+
+        # The history is usable again
+        with self.history.transaction("Next"):
+            self.history.set_tile(self.layer, 2, 0, _floor(2, 0))
+        self.assertEqual(len(self.history), 1)
+
+    def test_inner_error_handled_by_outer_block(self):
+        with self.history.transaction("Outer"):
+            self.history.set_tile(self.layer, 0, 0, _floor(0, 0))
+            try:
+                with self.history.transaction("Inner"):
+                    raise ValueError("handled")
+            except ValueError:
+                pass
+            self.history.set_tile(self.layer, 1, 0, _floor(1, 0))
+        self.assertEqual(len(self.history), 1)
+        self.history.undo()
+        self.assertIsNone(self.layer.get_tile(0, 0))
+        self.assertIsNone(self.layer.get_tile(1, 0))
+
+
+class CoalescingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.map_data = MapData(64, 64, "history")
+        self.layer = self.map_data.get_layer("Terrain")
+
+    def _stroke(self, history: EditHistory, y: int, x1: int, x2: int) -> None:
+        with history.transaction("Paint", merge_key="brush"):
+            for x in range(x1, x2):
+                history.set_tile(self.layer, x, y, _floor(x, y))
+
+    def test_segments_merge_into_one_step(self):
+        history = EditHistory(self.map_data, coalesce_window=60)
+        self._stroke(history, 0, 0, 4)
+        self._stroke(history, 0, 2, 8)
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history.undo_steps[0].cell_count, 8)
+
+        history.undo()
+        self.assertTrue(all(self.layer.get_tile(x, 0) is None for x in range(8)))
+        history.redo()
+        self.assertTrue(all(self.layer.get_tile(x, 0) is not None for x in range(8)))
+
+    def test_merged_step_respects_memory_limit(self):
+        history = EditHistory(self.map_data, coalesce_window=60)
+        for y in range(4):
+            history.set_tile(self.layer, 63, y, _floor(63, y, TileType.WALL))
+        self.assertEqual(len(history), 4)
+
+        history.max_bytes = history.memory_usage() + 1000
+        for y in range(0, 64, 4):
+            self._stroke(history, y, 0, 32)
+        # The growing stroke pushes the older steps out (the newest step
+        # is always kept)
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history.undo_steps[0].label, "Paint")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Regression tests for hierarchical (HPA*) pathfinding."""
+
+import math
+import random
+import unittest
+
+from model.columnar import ColumnarMapLayer
+from model.enums import TileType
+from model.map_data import MapData, MapLayer
+from model.pathfinding import HierarchicalPathfinder, Pathfinder
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer)
+
+
+def _random_map(rng, layer_class, width=41, height=37) -> MapData:
+    """A map of floor with random destructible walls and movement costs."""
+    map_data = MapData(width, height, "hpa", layer_class=layer_class)
+    layer = map_data.get_layer("Terrain")
+    for y in range(height):
+        for x in range(width):
+            if rng.random() < 0.25:
+                tile = Tile(x=x, y=y, tile_type=TileType.WALL, max_health=5.0)
+            else:
+                tile = Tile(x=x, y=y, tile_type=TileType.FLOOR, movement_cost=rng.choice([1.0, 1.0, 2.0]))
+            layer.set_tile(x, y, tile)
+    return map_data
+
+
+def _path_cost(pathfinder, path):
+    """Cost of walking a path over the pathfinder's cost grid."""
+    width, costs = pathfinder.width, pathfinder.costs
+    return sum(costs[y2 * width + x2] * math.hypot(x2 - x1, y2 - y1)
+               for (x1, y1), (x2, y2) in zip(path, path[1:]))
+
+
+class HierarchicalPathfinderTest(unittest.TestCase):
+
+    def _check_path(self, pathfinder, path, start, goal):
+        self.assertEqual((path[0], path[-1]), (start, goal))
+        for (x1, y1), (x2, y2) in zip(path, path[1:]):
+            self.assertEqual(max(abs(x2 - x1), abs(y2 - y1)), 1)
+            self.assertTrue(pathfinder.is_walkable(x2, y2))
+            if x1 != x2 and y1 != y2:
+                self.assertTrue(pathfinder.is_walkable(x2, y1) and pathfinder.is_walkable(x1, y2))
+
+    def _check_graph_matches_rebuild(self, pathfinder, map_data):
+        fresh = HierarchicalPathfinder(map_data, cluster_size=pathfinder.cluster_size)
+        self.assertEqual(list(pathfinder.costs), list(fresh.costs))
+        self.assertEqual(pathfinder._transitions, fresh._transitions)
+        for cluster, edges in pathfinder._intra.items():
+            expected = fresh._cluster_edges(cluster)
+            self.assertEqual(set(edges), set(expected))
+            for node, targets in edges.items():
+                self.assertEqual(set(targets), set(expected[node]))
+                for target, cost in targets.items():
+                    self.assertAlmostEqual(cost, expected[node][target])
+
+    def test_finds_a_path_exactly_when_one_exists(self):
+        for layer_class in LAYER_CLASSES:
+            rng = random.Random(3)
+            map_data = _random_map(rng, layer_class)
+            exact = Pathfinder(map_data)
+            hierarchical = HierarchicalPathfinder(map_data, cluster_size=8)
+            for _ in range(60):
+                start = (rng.randrange(41), rng.randrange(37))
+                goal = (rng.randrange(41), rng.randrange(37))
+                expected = exact.find_path(start, goal)
+                path = hierarchical.find_path(start, goal)
+                self.assertEqual(path is None, expected is None, (start, goal))
+                if path is not None:
+                    self._check_path(hierarchical, path, start, goal)
+                    # Near-optimal, never cheaper than the optimum
+                    optimum = _path_cost(exact, expected)
+                    self.assertGreaterEqual(_path_cost(hierarchical, path), optimum - 1e-9)
+                    self.assertLessEqual(_path_cost(hierarchical, path), optimum * 1.5 + 1e-9)
+
+    def test_edits_match_a_rebuild(self):
+        for layer_class in LAYER_CLASSES:
+            rng = random.Random(9)
+            map_data = _random_map(rng, layer_class)
+            layer = map_data.get_layer("Terrain")
+            exact = Pathfinder(map_data)
+            hierarchical = HierarchicalPathfinder(map_data, cluster_size=8)
+            hierarchical.build_all()
+            for _ in range(40):
+                x, y = rng.randrange(41), rng.randrange(37)
+                tile = layer.get_tile(x, y)
+                if tile.tile_type == TileType.WALL and rng.random() < 0.5:
+                    # Destroyed in place: reported by the tile itself
+                    tile.damage(10)
+                else:
+                    tile_type = rng.choice([TileType.WALL, TileType.FLOOR])
+                    layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type))
+
+                start = (rng.randrange(41), rng.randrange(37))
+                goal = (rng.randrange(41), rng.randrange(37))
+                self.assertEqual(hierarchical.find_path(start, goal) is None,
+                                 exact.find_path(start, goal) is None)
+            self._check_graph_matches_rebuild(hierarchical, map_data)
+
+    def test_destroyed_wall_opens_a_path(self):
+        map_data = MapData(20, 3, "wall")
+        layer = map_data.get_layer("Terrain")
+        for y in range(3):
+            for x in range(20):
+                tile_type = TileType.WALL if x == 10 else TileType.FLOOR
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type, max_health=3.0))
+        pathfinder = HierarchicalPathfinder(map_data, cluster_size=4)
+        self.assertIsNone(pathfinder.find_path((0, 1), (19, 1)))
+
+        self.assertTrue(layer.get_tile(10, 1).damage(3.0))
+        path = pathfinder.find_path((0, 1), (19, 1))
+        self.assertIsNotNone(path)
+        self.assertIn((10, 1), path)
+
+    def test_rejects_tiny_clusters(self):
+        with self.assertRaises(ValueError):
+            HierarchicalPathfinder(MapData(8, 8, "tiny"), cluster_size=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Regression tests for the map-wide asset instance index."""
+
+import random
+import unittest
+
+from model.assets import AssetInstance
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import LayerType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer)
+
+
+def _scan(map_data):
+    """Reference {instance_id: (layer name, x, y)} found by walking every tile."""
+    found = {}
+    for layer in map_data.layers:
+        for x, y, tile in layer.get_all_tiles():
+            if tile is not None:
+                for instance in tile.asset_instances:
+                    found[instance.instance_id] = (layer.name, x, y)
+    return found
+
+
+def _indexed(map_data):
+    """{instance_id: (layer name, x, y)} according to the index."""
+    return {location.instance.instance_id: (location.layer.name, location.x, location.y)
+            for location in map_data.instance_index}
+
+
+def _filled_map(layer_class, width=10, height=8):
+    """A map whose layers are all filled with floor tiles."""
+    map_data = MapData(width, height, "index", layer_class=layer_class)
+    for layer in map_data.layers:
+        for y in range(height):
+            for x in range(width):
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+    return map_data
+
+
+class InstanceIndexTest(unittest.TestCase):
+
+    def test_random_edits_match_a_scan(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                rng = random.Random(12)
+                map_data = _filled_map(layer_class)
+                self.assertEqual(len(map_data.instance_index), 0)
+                next_id = 0
+                for _ in range(400):
+                    layer = rng.choice(map_data.layers)
+                    x, y = rng.randrange(map_data.width), rng.randrange(map_data.height)
+                    operation = rng.randrange(6)
+                    if operation == 0 and layer.get_tile(x, y) is not None:
+                        next_id += 1
+                        layer.get_tile(x, y).add_asset_instance(
+                            AssetInstance(instance_id=f"i{next_id}", asset_definition_id="torch"))
+                    elif operation == 1 and next_id:
+                        instance_id = f"i{rng.randrange(1, next_id + 1)}"
+                        expected = instance_id in _scan(map_data)
+                        self.assertEqual(map_data.remove_asset_instance(instance_id), expected)
+                    elif operation == 2 and next_id:
+                        instance_id = f"i{rng.randrange(1, next_id + 1)}"
+                        expected = instance_id in _scan(map_data) and layer.get_tile(x, y) is not None
+                        self.assertEqual(map_data.move_asset_instance(instance_id, x, y, layer.name), expected)
+                    elif operation == 3:
+                        # Replace the tile, possibly carrying new instances
+                        tile = Tile(x=x, y=y, tile_type=TileType.FLOOR)
+                        if rng.random() < 0.5:
+                            next_id += 1
+                            tile.add_asset_instance(AssetInstance(instance_id=f"i{next_id}",
+                                                                  asset_definition_id="chest"))
+                        layer.set_tile(x, y, tile)
+                    elif operation == 4:
+                        layer.clear_tile(x, y)
+                    elif operation == 5 and rng.random() < 0.1:
+                        columns, extras = layer.export_columns()
+                        layer.import_columns(columns, extras)
+                    self.assertEqual(_indexed(map_data), _scan(map_data))
+
+                for instance_id, (layer_name, x, y) in _scan(map_data).items():
+                    location = map_data.find_asset_instance(instance_id)
+                    self.assertTrue(location.is_at(map_data.get_layer(layer_name), x, y))
+                    self.assertIs(map_data.get_asset_instance(instance_id), location.instance)
+                    self.assertIs(location.tile.get_asset_instance(instance_id), location.instance)
+
+    def test_resize_drops_instances_outside(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                map_data = _filled_map(layer_class)
+                terrain = map_data.get_layer("Terrain")
+                terrain.get_tile(1, 1).add_asset_instance(AssetInstance(instance_id="in", asset_definition_id="a"))
+                terrain.get_tile(9, 7).add_asset_instance(AssetInstance(instance_id="out", asset_definition_id="a"))
+                self.assertEqual(len(map_data.instance_index), 2)
+                map_data.resize(5, 5)
+                self.assertIn("in", map_data.instance_index)
+                self.assertNotIn("out", map_data.instance_index)
+
+    def test_layers_are_attached_and_detached(self):
+        map_data = _filled_map(MapLayer)
+        index = map_data.instance_index
+        layer = map_data.add_layer(LayerType.EFFECTS, "Effects")
+        layer.set_tile(2, 3, Tile(x=2, y=3, tile_type=TileType.FLOOR))
+        layer.get_tile(2, 3).add_asset_instance(AssetInstance(instance_id="fx", asset_definition_id="spark"))
+        self.assertEqual(index.get("fx").layer, layer)
+
+        self.assertTrue(map_data.remove_layer("Effects"))
+        self.assertNotIn("fx", index)
+        self.assertIsNone(layer._instance_index)
+        self.assertIsNone(map_data.get_asset_instance("fx"))
+
+    def test_move_to_missing_tile_keeps_the_instance(self):
+        map_data = _filled_map(MapLayer)
+        terrain = map_data.get_layer("Terrain")
+        instance = AssetInstance(instance_id="chest", asset_definition_id="chest")
+        terrain.get_tile(0, 0).add_asset_instance(instance)
+        terrain.clear_tile(4, 4)
+        self.assertFalse(map_data.move_asset_instance("chest", 4, 4))
+        self.assertFalse(map_data.move_asset_instance("chest", 1, 1, "Missing"))
+        self.assertFalse(map_data.move_asset_instance("nothing", 1, 1))
+        self.assertTrue(map_data.find_asset_instance("chest").is_at(terrain, 0, 0))
+
+        self.assertTrue(map_data.move_asset_instance("chest", 3, 2, "Objects"))
+        self.assertTrue(map_data.find_asset_instance("chest").is_at(map_data.get_layer("Objects"), 3, 2))
+        self.assertEqual(list(terrain.get_tile(0, 0).asset_instances), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Regression tests for MapData layer lookup and layer handles."""
+
+import random
+import unittest
+
+from model.enums import LayerType, TileType
+from model.map_data import LayerHandle, MapData, MapLayer
+from model.tile import Tile
+
+
+LAYER_TYPES = list(LayerType)
+
+
+def _scan_name(map_data, name):
+    """Reference get_layer: the first layer with that name."""
+    return next((layer for layer in map_data.layers if layer.name == name), None)
+
+
+def _scan_type(map_data, layer_type):
+    """Reference get_layer_by_type: the first layer of that type."""
+    return next((layer for layer in map_data.layers if layer.layer_type == layer_type), None)
+
+
+class LayerLookupTest(unittest.TestCase):
+
+    def test_lookups_match_a_scan(self):
+        rng = random.Random(15)
+        map_data = MapData(4, 4, "layers")
+        names = [f"L{i}" for i in range(12)] + ["Terrain", "Objects"]
+        for _ in range(1500):
+            operation = rng.randrange(7)
+            name = rng.choice(names)
+            # Layer names are unique, so only unused names are added or renamed to
+            unused = _scan_name(map_data, name) is None
+            if operation == 0 and unused:
+                map_data.add_layer(rng.choice(LAYER_TYPES), name, z_index=rng.randrange(10))
+            elif operation == 1:
+                expected = _scan_name(map_data, name) is not None
+                self.assertEqual(map_data.remove_layer(name), expected)
+            elif operation == 2 and map_data.layers and unused:
+                # Renames are noticed by the next lookup
+                rng.choice(map_data.layers).name = name
+            elif operation == 3 and map_data.layers:
+                # Replacing the list, or changing its length, is noticed too
+                layers = list(map_data.layers)
+                rng.shuffle(layers)
+                map_data.layers = layers
+            elif operation == 4 and map_data.layers:
+                map_data.layers.pop(rng.randrange(len(map_data.layers)))
+            elif operation == 5 and map_data.layers and unused:
+                # In-place replacements and type changes need reindex_layers
+                position = rng.randrange(len(map_data.layers))
+                map_data.layers[position] = MapLayer(rng.choice(LAYER_TYPES), name, 4, 4)
+                rng.choice(map_data.layers).layer_type = rng.choice(LAYER_TYPES)
+                map_data.reindex_layers()
+
+            for lookup in names:
+                self.assertIs(map_data.get_layer(lookup), _scan_name(map_data, lookup))
+            for layer_type in LAYER_TYPES:
+                self.assertIs(map_data.get_layer_by_type(layer_type), _scan_type(map_data, layer_type))
+
+    def test_remove_layer_compares_by_identity(self):
+        map_data = MapData(3, 3, "layers")
+        first = map_data.add_layer(LayerType.EFFECTS, "A", z_index=9)
+        second = map_data.add_layer(LayerType.EFFECTS, "B", z_index=9)
+        second.name = "C"
+        first.name = "C"
+        self.assertEqual(first, second)
+        self.assertTrue(map_data.remove_layer("C"))
+        self.assertIs(map_data.layers[-1], second)
+        self.assertIs(map_data.get_layer("C"), second)
+
+
+class LayerHandleTest(unittest.TestCase):
+
+    def test_handle_reads_and_writes_the_layer(self):
+        map_data = MapData(5, 5, "handles")
+        handle = map_data.layer_handle("Terrain")
+        self.assertIsInstance(handle, LayerHandle)
+        self.assertEqual(handle.name, "Terrain")
+        self.assertIsNone(map_data.layer_handle("Missing"))
+
+        handle.set_tile(2, 3, Tile(x=2, y=3, tile_type=TileType.WALL))
+        self.assertIs(map_data.get_tile(2, 3, "Terrain"), handle.get_tile(2, 3))
+        handle.clear_tile(2, 3)
+        self.assertIsNone(map_data.get_tile(2, 3, "Terrain"))
+
+        # The handle keeps its layer after the layer is removed
+        layer = handle.layer
+        self.assertTrue(map_data.remove_layer("Terrain"))
+        handle.set_tile(0, 0, Tile(x=0, y=0, tile_type=TileType.FLOOR))
+        self.assertIsNotNone(layer.get_tile(0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Regression tests for MapData serialization."""
+
+import os
+import random
+import struct
+import tempfile
+import unittest
+
+from model.assets import AssetInstance
+from model.codec import decode_map, decode_runs, encode_map, encode_runs, load_map, save_map
+from model.columnar import ColumnarMapLayer
+from model.enums import BiomeType, TileType
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer)
+
+
+def _detailed_map(layer_class) -> MapData:
+    """A map with non-integer costs and health, properties and asset instances."""
+    map_data = MapData(6, 5, "detailed", layer_class=layer_class)
+    terrain = map_data.get_layer("Terrain")
+    for y in range(5):
+        for x in range(6):
+            terrain.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR, biome_type=BiomeType.FOREST))
+    terrain.set_tile(2, 1, Tile(x=2, y=1, tile_type=TileType.WALL, movement_cost=1.1,
+                                max_health=10.3, is_interactive=True, interaction_range=2.5))
+    wall = terrain.get_tile(2, 1)
+    wall.damage(2.9)
+    wall.properties = {"loot": {"gold": 3, "items": ["key"]}}
+    instance = AssetInstance(instance_id="torch-1", asset_definition_id="torch", x=2.25, y=1.5)
+    instance.properties["lit"] = True
+    wall.add_asset_instance(instance)
+    terrain.get_tile(4, 3).is_discovered = True
+    map_data.get_layer("Objects").set_tile(
+        0, 4, Tile(x=0, y=4, tile_type=TileType.DOOR, movement_cost=0.3))
+    map_data.add_spawn_point(1, 1)
+    map_data.properties["author"] = "test"
+    return map_data
+
+
+class MapDataSerializationTest(unittest.TestCase):
+
+    def _empty_map(self) -> MapData:
+        map_data = MapData(8, 6, "empty")
+        map_data.layers = []
+        return map_data
+
+    def test_from_dict_keeps_empty_layer_list(self):
+        map_data = MapData.from_dict(self._empty_map().to_dict())
+        self.assertEqual(map_data.layers, [])
+
+    def test_codec_keeps_empty_layer_list(self):
+        self.assertEqual(decode_map(encode_map(self._empty_map())).layers, [])
+
+    def test_codec_round_trips_tiles(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                map_data = _detailed_map(layer_class)
+                decoded = decode_map(encode_map(map_data), layer_class)
+                self.assertEqual(decoded.to_dict(), map_data.to_dict())
+                wall = decoded.get_layer("Terrain").get_tile(2, 1)
+                if layer_class is not ColumnarMapLayer:
+                    self.assertEqual((wall.movement_cost, wall.max_health), (1.1, 10.3))
+                self.assertEqual(wall.get_asset_instance("torch-1").properties, {"lit": True})
+
+    def test_codec_converts_between_layer_classes(self):
+        map_data = _detailed_map(MapLayer)
+        decoded = decode_map(encode_map(map_data), ColumnarMapLayer)
+        again = decode_map(encode_map(decoded), MapLayer)
+        self.assertEqual(again.to_dict(), decoded.to_dict())
+        self.assertEqual(again.get_layer("Terrain").get_tile(2, 1).properties,
+                         {"loot": {"gold": 3, "items": ["key"]}})
+
+    def test_json_round_trips_tiles(self):
+        map_data = _detailed_map(MapLayer)
+        self.assertEqual(MapData.from_json(map_data.to_json()).to_dict(), map_data.to_dict())
+
+    def test_missing_layers_get_defaults(self):
+        data = self._empty_map().to_dict()
+        del data["layers"]
+        names = [layer.name for layer in MapData.from_dict(data).layers]
+        self.assertEqual(names, ["Background", "Terrain", "Objects"])
+
+    def test_save_and_load_file(self):
+        map_data = _detailed_map(ColumnarMapLayer)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "map.dmap")
+            save_map(map_data, path)
+            self.assertEqual(load_map(path, ColumnarMapLayer).to_dict(), map_data.to_dict())
+
+
+class CodecFormatTest(unittest.TestCase):
+
+    def test_runs_round_trip(self):
+        rng = random.Random(3)
+        for item_size in (1, 4, 8):
+            for _ in range(50):
+                items = [bytes(rng.choice([0, 0, 1, 255]) for _ in range(item_size))
+                         for _ in range(rng.randrange(0, 40))]
+                data = b''.join(items)
+                encoded = encode_runs(data, item_size)
+                decoded, offset = decode_runs(encoded + b'tail', 0, item_size)
+                self.assertEqual(decoded, data)
+                self.assertEqual(offset, len(encoded))
+
+                # One run per maximal group of equal items
+                runs = sum(1 for i, item in enumerate(items) if i == 0 or item != items[i - 1])
+                self.assertEqual(struct.unpack_from('<I', encoded)[0], runs)
+
+    def test_rejects_bad_data(self):
+        data = encode_map(_detailed_map(MapLayer))
+        with self.assertRaises(ValueError):
+            decode_map(b'XMAP' + data[4:])
+        with self.assertRaises(ValueError):
+            decode_map(data[:4] + b'\xff' + data[5:])
+        with self.assertRaises(ValueError):
+            decode_map(data[:3])
+
+
+if __name__ == "__main__":
+    unittest.main()
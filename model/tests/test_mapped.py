@@ -0,0 +1,142 @@
+"""Regression tests for memory-mapped map files."""
+
+import os
+import random
+import tempfile
+import unittest
+
+from model.columnar import ColumnarMapLayer
+from model.columns import COLUMN_NAMES
+from model.enums import BiomeType, LayerType, TileType
+from model.map_data import MapData
+from model.mapped import MappedMapLayer, create_mapped_map, open_mapped_map, save_mapped_map
+from model.tile import Tile
+
+
+TILE_TYPES = [TileType.FLOOR, TileType.WALL, TileType.DOOR, TileType.WATER]
+
+
+def _random_map(rng, width=37, height=29) -> MapData:
+    """A columnar map with random tiles, some with properties."""
+    map_data = MapData(width, height, "mapped", layer_class=ColumnarMapLayer)
+    for layer in map_data.layers:
+        for _ in range(width * height // 2):
+            x, y = rng.randrange(width), rng.randrange(height)
+            tile = Tile(x=x, y=y, tile_type=rng.choice(TILE_TYPES), biome_type=rng.choice(list(BiomeType)),
+                        movement_cost=rng.choice([1.0, 0.1, 3.5]), max_health=rng.choice([None, 12.5]))
+            if rng.random() < 0.05:
+                tile.properties = {"note": rng.randrange(100)}
+            layer.set_tile(x, y, tile)
+    return map_data
+
+
+def _layer_state(layer):
+    """Every column as bytes, plus the tile dicts of cells with extras."""
+    columns = {name: bytes(layer.get_column(name)) for name in COLUMN_NAMES}
+    tiles = {(x, y): tile.to_dict() for x, y, tile in layer.get_all_tiles()
+             if tile is not None and tile.properties}
+    return columns, tiles
+
+
+class MappedMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, "map.dmmp")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_save_and_open_round_trip(self):
+        map_data = _random_map(random.Random(1))
+        save_mapped_map(map_data, self.path)
+        with open_mapped_map(self.path, writable=False) as mapped:
+            self.assertEqual([layer.name for layer in mapped.map_data.layers],
+                             [layer.name for layer in map_data.layers])
+            for original, layer in zip(map_data.layers, mapped.map_data.layers):
+                self.assertIsInstance(layer, MappedMapLayer)
+                self.assertEqual(_layer_state(layer), _layer_state(original))
+                self.assertEqual(layer.count_tiles(), original.count_tiles())
+                self.assertEqual(list(layer.iter_positions()), list(original.iter_positions()))
+
+    def test_edits_persist_after_reopening(self):
+        rng = random.Random(2)
+        reference = _random_map(rng)
+        save_mapped_map(reference, self.path)
+
+        with open_mapped_map(self.path) as mapped:
+            for _ in range(300):
+                layer_index = rng.randrange(len(reference.layers))
+                x, y = rng.randrange(reference.width), rng.randrange(reference.height)
+                if rng.random() < 0.3:
+                    tile = None
+                else:
+                    tile = Tile(x=x, y=y, tile_type=rng.choice(TILE_TYPES),
+                                movement_cost=rng.choice([1.0, 2.0]))
+                    if rng.random() < 0.1:
+                        tile.properties = {"edit": rng.randrange(10)}
+                for target in (reference.layers[layer_index], mapped.map_data.layers[layer_index]):
+                    target.set_tile(x, y, tile and Tile.from_dict(tile.to_dict()))
+            mapped.map_data.name = "Edited"
+            mapped.release_memory()
+
+        with open_mapped_map(self.path, writable=False) as mapped:
+            self.assertEqual(mapped.map_data.name, "Edited")
+            for original, layer in zip(reference.layers, mapped.map_data.layers):
+                self.assertEqual(_layer_state(layer), _layer_state(original))
+
+    def test_set_column_notifies_only_changed_cells(self):
+        map_data = _random_map(random.Random(3), 300, 200)
+        save_mapped_map(map_data, self.path)
+        with open_mapped_map(self.path) as mapped:
+            layer = mapped.map_data.get_layer("Terrain")
+            reported = []
+            layer.add_listener(lambda _layer, *rect: reported.append(rect))
+
+            layer.set_column("is_discovered", layer.get_column("is_discovered"))
+            self.assertEqual(reported, [])
+
+            for x, y in ((40, 70), (150, 120)):
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+            values = layer.get_column("is_discovered")
+            for x, y in ((40, 70), (150, 120)):
+                values[y * 300 + x] = 1
+            layer.set_column("is_discovered", values)
+            self.assertEqual(reported[-1], (40, 70, 150, 120))
+            self.assertEqual(bytes(layer.get_column("is_discovered")), bytes(values))
+
+    def test_create_sparse_map(self):
+        layers = [(LayerType.TERRAIN, "Terrain"), (LayerType.OBJECTS, "Objects")]
+        with create_mapped_map(self.path, 4096, 2048, "big", layers=layers) as mapped:
+            terrain = mapped.map_data.get_layer("Terrain")
+            self.assertEqual(terrain.count_tiles(), 0)
+            terrain.set_tile(4000, 2000, Tile(x=4000, y=2000, tile_type=TileType.WALL))
+
+        with open_mapped_map(self.path, writable=False) as mapped:
+            self.assertEqual([layer.name for layer in mapped.map_data.layers], ["Terrain", "Objects"])
+            self.assertEqual(list(mapped.map_data.get_layer("Terrain").iter_positions()), [(4000, 2000)])
+            self.assertEqual(mapped.map_data.get_tile(4000, 2000, "Terrain").tile_type, TileType.WALL)
+
+    def test_read_only_and_layer_changes_are_rejected(self):
+        save_mapped_map(_random_map(random.Random(4)), self.path)
+        with open_mapped_map(self.path, writable=False) as mapped:
+            with self.assertRaises(ValueError):
+                mapped.flush()
+
+        mapped = open_mapped_map(self.path)
+        mapped.map_data.add_layer(LayerType.EFFECTS, "Extra")
+        with self.assertRaises(ValueError):
+            mapped.flush()
+        mapped.map_data.remove_layer("Extra")
+        mapped.close()
+
+    def test_rejects_other_files(self):
+        for data in (b"", b"DMMX" + bytes(20)):
+            with open(self.path, "wb") as file:
+                file.write(data)
+            with self.assertRaises(ValueError):
+                open_mapped_map(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,260 @@
+"""Regression tests for Pathfinder search, flow fields and their caching."""
+
+import math
+import random
+import unittest
+from heapq import heappop, heappush
+
+from model.columnar import ColumnarMapLayer
+from model.columns import changed_rect
+from model.enums import TileType
+from model.fov import update_visibility
+from model.map_data import MapData, MapLayer
+from model.pathfinding import INFINITY, Pathfinder
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer)
+
+
+def _fill(layer, tile_type=TileType.FLOOR):
+    """Fill a whole layer with tiles of one type."""
+    for y in range(layer.height):
+        for x in range(layer.width):
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type))
+
+
+def _corridor(width: int = 12) -> MapData:
+    """A 1-row floor corridor."""
+    map_data = MapData(width, 1, "corridor")
+    _fill(map_data.get_layer("Terrain"))
+    return map_data
+
+
+def _random_map(rng, layer_class=MapLayer) -> MapData:
+    """A map with random walls, pits and movement costs."""
+    width, height = rng.randrange(4, 14), rng.randrange(4, 14)
+    map_data = MapData(width, height, "random", layer_class=layer_class)
+    layer = map_data.get_layer("Terrain")
+    for y in range(height):
+        for x in range(width):
+            roll = rng.random()
+            if roll < 0.2:
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.WALL))
+            elif roll < 0.25:
+                continue
+            else:
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR,
+                                          movement_cost=rng.choice([1.0, 1.0, 2.0, 4.0])))
+    return map_data
+
+
+def _reference_costs(layer, start):
+    """Cheapest cost from start to every cell, by plain Dijkstra over the tiles."""
+    def cost(x, y):
+        tile = layer.get_tile(x, y)
+        return tile.movement_cost if tile is not None and tile.is_passable else None
+
+    best = {start: 0.0}
+    heap = [(0.0, start)]
+    while heap:
+        distance, (x, y) = heappop(heap)
+        if distance > best[(x, y)]:
+            continue
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                nx, ny = x + dx, y + dy
+                if (dx, dy) == (0, 0) or cost(nx, ny) is None:
+                    continue
+                if dx and dy and (cost(x + dx, y) is None or cost(x, y + dy) is None):
+                    continue
+                new = distance + cost(nx, ny) * math.hypot(dx, dy)
+                if new < best.get((nx, ny), INFINITY) - 1e-9:
+                    best[(nx, ny)] = new
+                    heappush(heap, (new, (nx, ny)))
+    return best
+
+
+def _path_cost(layer, path):
+    """Cost of walking a path: each entered cell's cost times the step length."""
+    return sum(layer.get_tile(x2, y2).movement_cost * math.hypot(x2 - x1, y2 - y1)
+               for (x1, y1), (x2, y2) in zip(path, path[1:]))
+
+
+class SearchTest(unittest.TestCase):
+
+    def test_find_path_is_optimal(self):
+        rng = random.Random(5)
+        for _ in range(40):
+            map_data = _random_map(rng, rng.choice(LAYER_CLASSES))
+            layer = map_data.get_layer("Terrain")
+            pathfinder = Pathfinder(map_data)
+            open_cells = [(x, y) for y in range(layer.height) for x in range(layer.width)
+                          if pathfinder.is_walkable(x, y)]
+            if len(open_cells) < 2:
+                continue
+            start, goal = rng.sample(open_cells, 2)
+            expected = _reference_costs(layer, start).get(goal)
+
+            path = pathfinder.find_path(start, goal)
+            if expected is None:
+                self.assertIsNone(path)
+                continue
+            self.assertEqual((path[0], path[-1]), (start, goal))
+            self.assertTrue(all(max(abs(x2 - x1), abs(y2 - y1)) == 1
+                                for (x1, y1), (x2, y2) in zip(path, path[1:])))
+            self.assertAlmostEqual(_path_cost(layer, path), expected)
+
+    def test_flow_field_is_optimal(self):
+        rng = random.Random(8)
+        for _ in range(25):
+            map_data = _random_map(rng)
+            layer = map_data.get_layer("Terrain")
+            pathfinder = Pathfinder(map_data)
+            open_cells = [(x, y) for y in range(layer.height) for x in range(layer.width)
+                          if pathfinder.is_walkable(x, y)]
+            if not open_cells:
+                continue
+            goal = rng.choice(open_cells)
+            field = pathfinder.flow_field([goal])
+            for start in open_cells:
+                expected = _reference_costs(layer, start).get(goal)
+                path = field.path(*start)
+                if expected is None:
+                    self.assertIsNone(path)
+                else:
+                    self.assertEqual((path[0], path[-1]), (start, goal))
+                    self.assertAlmostEqual(_path_cost(layer, path), expected)
+
+    def test_edits_match_a_fresh_pathfinder(self):
+        rng = random.Random(13)
+        for _ in range(20):
+            map_data = _random_map(rng, rng.choice(LAYER_CLASSES))
+            layer = map_data.get_layer("Terrain")
+            pathfinder = Pathfinder(map_data)
+            pathfinder.flow_field([(0, 0)])
+            for _ in range(10):
+                x, y = rng.randrange(layer.width), rng.randrange(layer.height)
+                tile_type = rng.choice([TileType.FLOOR, TileType.WALL, None])
+                layer.set_tile(x, y, tile_type and Tile(x=x, y=y, tile_type=tile_type,
+                                                        movement_cost=rng.choice([1.0, 3.0])))
+            fresh = Pathfinder(map_data)
+            self.assertEqual(list(pathfinder.costs), list(fresh.costs))
+            field, expected = pathfinder.flow_field([(0, 0)]), fresh.flow_field([(0, 0)])
+            self.assertEqual(list(field.distances), list(expected.distances))
+
+    def test_notify_changed_after_direct_edit(self):
+        map_data = _corridor()
+        layer = map_data.get_layer("Terrain")
+        pathfinder = Pathfinder(map_data)
+        layer.get_tile(5, 0).is_passable = False
+        self.assertIsNotNone(pathfinder.find_path((0, 0), (10, 0)))
+        layer.notify_changed(5, 0, 5, 0)
+        self.assertIsNone(pathfinder.find_path((0, 0), (10, 0)))
+
+    def test_no_diagonal_corner_cutting(self):
+        map_data = MapData(2, 2, "corner")
+        layer = map_data.get_layer("Terrain")
+        _fill(layer)
+        layer.set_tile(1, 0, Tile(x=1, y=0, tile_type=TileType.WALL))
+        path = Pathfinder(map_data).find_path((0, 0), (1, 1))
+        self.assertEqual(path, [(0, 0), (0, 1), (1, 1)])
+
+
+class FlowFieldCacheTest(unittest.TestCase):
+
+    def test_bounded_field_is_not_reused_unbounded(self):
+        pathfinder = Pathfinder(_corridor())
+        bounded = pathfinder.flow_field([(0, 0)], max_cost=3)
+        self.assertIsNone(bounded.path(10, 0))
+
+        unbounded = pathfinder.flow_field([(0, 0)])
+        self.assertIsNot(unbounded, bounded)
+        self.assertEqual(len(unbounded.path(10, 0)), 11)
+
+    def test_find_path_ignores_bounded_field(self):
+        pathfinder = Pathfinder(_corridor())
+        pathfinder.flow_field([(0, 0)], max_cost=3)
+        path = pathfinder.find_path((10, 0), (0, 0))
+        self.assertIsNotNone(path)
+        self.assertEqual(path[0], (10, 0))
+        self.assertEqual(path[-1], (0, 0))
+
+    def test_field_dropped_when_blocked_goal_opens(self):
+        map_data = _corridor()
+        layer = map_data.get_layer("Terrain")
+        layer.set_tile(0, 0, Tile(x=0, y=0, tile_type=TileType.WALL))
+        pathfinder = Pathfinder(map_data)
+        self.assertIsNone(pathfinder.flow_field([(0, 0)]).path(5, 0))
+
+        layer.set_tile(0, 0, Tile(x=0, y=0, tile_type=TileType.FLOOR))
+        self.assertIsNotNone(pathfinder.flow_field([(0, 0)]).path(5, 0))
+
+    def test_field_dropped_when_passage_opens(self):
+        map_data = _corridor()
+        layer = map_data.get_layer("Terrain")
+        layer.set_tile(6, 0, Tile(x=6, y=0, tile_type=TileType.WALL))
+        pathfinder = Pathfinder(map_data)
+        self.assertIsNone(pathfinder.flow_field([(0, 0)]).path(10, 0))
+
+        layer.set_tile(6, 0, Tile(x=6, y=0, tile_type=TileType.FLOOR))
+        self.assertIsNotNone(pathfinder.flow_field([(0, 0)]).path(10, 0))
+
+    def test_distant_cost_change_keeps_field(self):
+        map_data = _corridor(30)
+        layer = map_data.get_layer("Terrain")
+        pathfinder = Pathfinder(map_data)
+        field = pathfinder.flow_field([(0, 0)], max_cost=5)
+        layer.set_tile(25, 0, Tile(x=25, y=0, tile_type=TileType.FLOOR, movement_cost=2.0))
+        self.assertIs(pathfinder.flow_field([(0, 0)], max_cost=5), field)
+        layer.set_tile(2, 0, Tile(x=2, y=0, tile_type=TileType.FLOOR, movement_cost=2.0))
+        self.assertIsNot(pathfinder.flow_field([(0, 0)], max_cost=5), field)
+
+
+class VisibilityUpdateTest(unittest.TestCase):
+
+    def test_changed_rect_matches_brute_force(self):
+        rng = random.Random(2)
+        for _ in range(300):
+            width, height = rng.randrange(1, 12), rng.randrange(1, 12)
+            old = bytes(rng.randrange(2) for _ in range(width * height))
+            new = bytearray(old)
+            for _ in range(rng.randrange(0, 4)):
+                new[rng.randrange(len(new))] ^= 1
+            start = rng.randrange(len(old) + 1)
+            end = rng.randrange(start, len(old) + 1)
+
+            cells = [(index % width, index // width) for index in range(start, end)
+                     if old[index] != new[index]]
+            expected = None
+            if cells:
+                xs, ys = [x for x, _ in cells], [y for _, y in cells]
+                expected = (min(xs), min(ys), max(xs), max(ys))
+            self.assertEqual(changed_rect(old[start:end], bytes(new[start:end]), width, start), expected)
+
+    def test_visibility_update_does_not_rescan_costs(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                map_data = MapData(96, 96, "fov", layer_class=layer_class)
+                layer = map_data.get_layer("Terrain")
+                _fill(layer)
+                pathfinder = Pathfinder(map_data)
+                rescans = []
+                pathfinder._read_costs = lambda: rescans.append(1)
+                reported = []
+                layer.add_listener(lambda _layer, *rect: reported.append(rect))
+
+                update_visibility(layer, [(20, 20, 6)])
+                update_visibility(layer, [(21, 20, 6)])
+                self.assertEqual(rescans, [])
+                self.assertTrue(reported)
+                for x1, y1, x2, y2 in reported:
+                    self.assertLessEqual((x2 - x1 + 1) * (y2 - y1 + 1), 13 * 14)
+
+                reported.clear()
+                update_visibility(layer, [(21, 20, 6)])
+                self.assertEqual(reported, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
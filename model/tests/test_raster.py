@@ -0,0 +1,130 @@
+"""Regression tests for the span-based rasterization module."""
+
+import random
+import unittest
+from fractions import Fraction
+
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import LayerType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapLayer
+from model.raster import (
+    circle_outline_points, circle_outline_spans, circle_spans, line_points, line_spans,
+    points_to_spans, polygon_outline_spans, polygon_spans, spans_bounds, spans_to_mask, spans_to_points,
+)
+
+
+def _editor_inside(x, y, vertices):
+    """The editor's even-odd ray test (isPointInPolygon) for the point (x, y), in exact arithmetic."""
+    inside = False
+    j = len(vertices) - 1
+    for i in range(len(vertices)):
+        (xi, yi), (xj, yj) = vertices[i], vertices[j]
+        if (yi > y) != (yj > y) and x < Fraction((xj - xi) * (y - yi), yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _random_polygon(rng):
+    """A random, possibly self-intersecting polygon with repeated and collinear vertices."""
+    vertices = [(rng.randrange(-8, 30), rng.randrange(-8, 30)) for _ in range(rng.randrange(3, 9))]
+    if rng.random() < 0.3:
+        vertices.insert(rng.randrange(len(vertices)), vertices[0])
+    return vertices
+
+
+def _span_cells(spans):
+    """Cells of spans, checking that they do not overlap."""
+    points = spans_to_points(spans)
+    assert len(points) == len(set(points)), "overlapping spans"
+    return set(points)
+
+
+class PolygonTest(unittest.TestCase):
+
+    def test_polygon_spans_match_the_editor_test(self):
+        rng = random.Random(20)
+        for _ in range(150):
+            vertices = _random_polygon(rng)
+            expected = {(x, y) for y in range(-10, 33) for x in range(-10, 33)
+                        if _editor_inside(x, y, vertices)}
+            spans = polygon_spans(vertices)
+            self.assertEqual(_span_cells(spans), expected, vertices)
+            self.assertEqual([span[0] for span in spans], sorted(span[0] for span in spans))
+
+    def test_degenerate_polygons(self):
+        self.assertEqual(polygon_spans([(0, 0), (5, 5)]), [])
+        self.assertEqual(polygon_spans([(0, 3), (4, 3), (9, 3)]), [])
+        self.assertEqual(polygon_spans([(0, 0), (4, 0), (4, 2), (0, 2)]), [(0, 0, 3), (1, 0, 3)])
+
+    def test_outline_joins_the_vertices(self):
+        vertices = [(0, 0), (6, 2), (3, 7)]
+        cells = _span_cells(polygon_outline_spans(vertices))
+        expected = set(line_points(3, 7, 0, 0)) | set(line_points(0, 0, 6, 2)) | set(line_points(6, 2, 3, 7))
+        self.assertEqual(cells, expected)
+
+
+class LineAndCircleTest(unittest.TestCase):
+
+    def test_lines_are_connected(self):
+        rng = random.Random(2)
+        for _ in range(200):
+            x0, y0, x1, y1 = (rng.randrange(-20, 20) for _ in range(4))
+            points = line_points(x0, y0, x1, y1)
+            self.assertEqual((points[0], points[-1]), ((x0, y0), (x1, y1)))
+            self.assertEqual(len(points), max(abs(x1 - x0), abs(y1 - y0)) + 1)
+            for (ax, ay), (bx, by) in zip(points, points[1:]):
+                self.assertEqual(max(abs(ax - bx), abs(ay - by)), 1)
+            self.assertEqual(_span_cells(line_spans(x0, y0, x1, y1)), set(points))
+
+    def test_circles(self):
+        for radius in range(0, 12):
+            cells = _span_cells(circle_spans(5, -3, radius))
+            expected = {(x, y) for y in range(-20, 20) for x in range(-20, 30)
+                        if (x - 5) ** 2 + (y + 3) ** 2 <= radius * radius}
+            self.assertEqual(cells, expected or {(5, -3)})
+
+            outline = circle_outline_points(5, -3, radius)
+            self.assertEqual(len(outline), len(set(outline)))
+            for x, y in outline:
+                self.assertLess(abs(((x - 5) ** 2 + (y + 3) ** 2) ** 0.5 - radius), 1)
+            self.assertEqual(_span_cells(circle_outline_spans(5, -3, radius)), set(outline))
+
+
+class SpanConversionTest(unittest.TestCase):
+
+    def test_points_spans_and_masks_round_trip(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            points = {(rng.randrange(-3, 12), rng.randrange(-3, 9)) for _ in range(rng.randrange(40))}
+            spans = points_to_spans(list(points) * 2)
+            self.assertEqual(_span_cells(spans), points)
+            self.assertEqual(spans_bounds(spans), (min(x for x, _ in points), min(y for _, y in points),
+                                                   max(x for x, _ in points), max(y for _, y in points))
+                             if points else None)
+            mask = spans_to_mask(spans, 10, 6, origin_x=-1, origin_y=1)
+            self.assertEqual({(i % 10 - 1, i // 10 + 1) for i, flag in enumerate(mask) if flag},
+                             {(x, y) for x, y in points if -1 <= x < 9 and 1 <= y < 7})
+
+    def test_fill_spans_matches_fill_mask(self):
+        rng = random.Random(5)
+        for layer_class in (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer):
+            with self.subTest(layer_class=layer_class.__name__):
+                spans_layer = layer_class(LayerType.TERRAIN, "Terrain", 25, 25)
+                mask_layer = layer_class(LayerType.TERRAIN, "Terrain", 25, 25)
+                for _ in range(30):
+                    spans = polygon_spans(_random_polygon(rng))
+                    tile_type = rng.choice([None, TileType.FLOOR, TileType.WALL])
+                    written = spans_layer.fill_spans(spans, tile_type)
+                    mask = spans_to_mask(spans, 25, 25)
+                    self.assertEqual(written, sum(mask))
+                    mask_layer.fill_mask(mask, tile_type)
+                    self.assertEqual(bytes(spans_layer.get_column("tile_type")),
+                                     bytes(mask_layer.get_column("tile_type")))
+                self.assertEqual(spans_layer.fill_spans([(30, 0, 5), (3, 40, 50)], TileType.FLOOR), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""Regression tests for room detection and its incremental updates."""
+
+import random
+import unittest
+
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import LayerType, RegionKind, TileType
+from model.map_data import MapData, MapLayer
+from model.rooms import CORRIDOR_CLASS, DOOR_CLASS, ROOM_CLASS, RoomMap, classify
+from model.tile import Tile
+
+
+TILE_TYPES = [TileType.FLOOR, TileType.FLOOR, TileType.FLOOR, TileType.WALL, TileType.DOOR, TileType.WATER]
+
+
+def _brute_classes(layer):
+    """Reference classify: a cell's class from its own tile and the 2x2 blocks around it."""
+    width, height = layer.width, layer.height
+
+    def is_open(x, y):
+        tile = layer.get_tile(x, y) if 0 <= x < width and 0 <= y < height else None
+        return tile is not None and tile.is_passable and tile.tile_type != TileType.DOOR
+
+    classes = bytearray(width * height)
+    for y in range(height):
+        for x in range(width):
+            tile = layer.get_tile(x, y)
+            if tile is not None and tile.tile_type == TileType.DOOR:
+                classes[y * width + x] = DOOR_CLASS
+            elif is_open(x, y):
+                in_block = any(all(is_open(bx + dx, by + dy) for dx in (0, 1) for dy in (0, 1))
+                               for bx in (x - 1, x) for by in (y - 1, y))
+                classes[y * width + x] = ROOM_CLASS if in_block else CORRIDOR_CLASS
+    return classes
+
+
+def _partition(room_map):
+    """The regions as {frozenset of cells: (kind, size, bounds)}."""
+    return {frozenset(room_map.cells(region.id)): (region.kind, region.size, region.bounds)
+            for region in room_map.regions()}
+
+
+def _flood_partition(layer):
+    """Reference regions: 4-connected flood fill over the brute-force classes."""
+    width, height = layer.width, layer.height
+    classes = _brute_classes(layer)
+    seen, regions = set(), []
+    for start in range(width * height):
+        if not classes[start] or start in seen:
+            continue
+        seen.add(start)
+        stack, cells = [start], set()
+        while stack:
+            index = stack.pop()
+            x, y = index % width, index // width
+            cells.add((x, y))
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                other = ny * width + nx
+                if (0 <= nx < width and 0 <= ny < height and other not in seen
+                        and classes[other] == classes[start]):
+                    seen.add(other)
+                    stack.append(other)
+        regions.append(frozenset(cells))
+    return set(regions)
+
+
+class RoomMapTest(unittest.TestCase):
+
+    def test_classify_matches_brute_force(self):
+        rng = random.Random(4)
+        for width, height in ((1, 1), (1, 7), (9, 1), (13, 11)):
+            layer = MapLayer(LayerType.TERRAIN, "Terrain", width, height)
+            for _ in range(width * height):
+                x, y = rng.randrange(width), rng.randrange(height)
+                layer.set_tile(x, y, Tile(x=x, y=y, tile_type=rng.choice(TILE_TYPES)))
+            self.assertEqual(classify(layer), _brute_classes(layer))
+
+    def test_incremental_updates_match_a_rebuild(self):
+        for layer_class in (MapLayer, ColumnarMapLayer, ChunkedMapLayer):
+            with self.subTest(layer_class=layer_class.__name__):
+                rng = random.Random(21)
+                map_data = MapData(30, 24, "rooms", layer_class=layer_class)
+                layer = map_data.get_layer("Terrain")
+                layer.fill_rect(2, 2, 27, 21, TileType.FLOOR)
+                room_map = RoomMap(map_data)
+                for step in range(400):
+                    x, y = rng.randrange(30), rng.randrange(24)
+                    operation = rng.random()
+                    if operation < 0.6:
+                        layer.set_tile(x, y, Tile(x=x, y=y, tile_type=rng.choice(TILE_TYPES)))
+                    elif operation < 0.8:
+                        layer.clear_tile(x, y)
+                    elif operation < 0.95:
+                        layer.fill_rect(x, y, x + rng.randrange(4), y + rng.randrange(4), rng.choice(TILE_TYPES))
+                    else:
+                        # In-place change announced with invalidate
+                        tile = layer.get_tile(x, y)
+                        if tile is not None:
+                            tile.is_passable = not tile.is_passable
+                            room_map.invalidate(x, y, x, y)
+
+                    if step % 20:
+                        continue
+                    rebuilt = RoomMap(map_data)
+                    partition = _partition(room_map)
+                    self.assertEqual(partition, _partition(rebuilt))
+                    self.assertEqual(set(partition), _flood_partition(layer))
+                    self.assertEqual(room_map.classes, rebuilt.classes)
+                    for region in room_map.regions():
+                        expected = {frozenset(rebuilt.cells(other))
+                                    for other in rebuilt.neighbors(rebuilt.region_id_at(*room_map.cells(region.id)[0]))}
+                        self.assertEqual({frozenset(room_map.cells(other)) for other in room_map.neighbors(region.id)},
+                                         expected)
+                    rebuilt.close()
+                room_map.close()
+
+    def test_split_and_merge_keep_ids(self):
+        map_data = MapData(12, 5, "rooms")
+        layer = map_data.get_layer("Terrain")
+        layer.fill_rect(0, 0, 11, 4, TileType.FLOOR)
+        room_map = RoomMap(map_data)
+        (room,) = room_map.rooms()
+        self.assertEqual((room.size, room.bounds), (60, (0, 0, 11, 4)))
+
+        # A wall with a door splits the room in two, joined by the door
+        layer.fill_rect(5, 0, 5, 4, TileType.WALL)
+        layer.set_tile(5, 2, Tile(x=5, y=2, tile_type=TileType.DOOR))
+        left, right = room_map.region_at(0, 0), room_map.region_at(11, 4)
+        self.assertNotEqual(left.id, right.id)
+        self.assertIn(room.id, (left.id, right.id))
+        door = room_map.region_at(5, 2)
+        self.assertEqual(door.kind, RegionKind.DOOR)
+        self.assertEqual([region.id for region in room_map.doors_of(left.id)], [door.id])
+        self.assertEqual(room_map.neighbors(door.id), {left.id, right.id})
+        self.assertFalse(room_map.same_region((0, 0), (11, 4)))
+
+        # Removing the wall merges them again, keeping the larger region's ID
+        self.assertEqual((left.size, right.size), (25, 30))
+        layer.fill_rect(5, 0, 5, 4, TileType.FLOOR)
+        self.assertTrue(room_map.same_region((0, 0), (11, 4)))
+        self.assertEqual(room_map.region_at(0, 0).id, right.id)
+        self.assertEqual(room_map.region_id_at(-1, 0), 0)
+        room_map.close()
+
+    def test_room_map_rejects_offset_layer(self):
+        layer = ChunkedMapLayer(LayerType.TERRAIN, "Terrain", 10, 10, origin_x=-10, origin_y=-5)
+        layer.fill_rect(-10, -5, -1, 4, TileType.FLOOR)
+        map_data = MapData(10, 10, "origin")
+        map_data.layers = [layer]
+        with self.assertRaises(ValueError):
+            RoomMap(map_data)
+        with self.assertRaises(ValueError):
+            RoomMap(map_data, "Missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
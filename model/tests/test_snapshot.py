@@ -0,0 +1,123 @@
+"""Regression tests for MapSnapshot serialization and copy-on-write."""
+
+import json
+import random
+import unittest
+
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer)
+
+
+def _cells(layer):
+    """{(x, y): tile dict} of every occupied cell of a layer or layer snapshot."""
+    # Through JSON, so the dicts don't share properties with the live tiles
+    return {(x, y): json.loads(json.dumps(tile.to_dict())) for x, y, tile in layer.get_all_tiles() if tile is not None}
+
+
+def _edit(rng, layer):
+    """Apply one random edit to a layer."""
+    x, y = rng.randrange(layer.width), rng.randrange(layer.height)
+    tile = layer.get_tile(x, y)
+    operation = rng.randrange(7)
+    if operation < 2:
+        layer.set_tile(x, y, Tile(x=x, y=y, tile_type=rng.choice([TileType.FLOOR, TileType.WALL]),
+                                  max_health=4.0))
+    elif operation == 2:
+        layer.clear_tile(x, y)
+    elif operation == 3 and tile is not None:
+        tile.damage(1.0)
+    elif operation == 4 and tile is not None:
+        tile.set_property("mark", rng.randrange(3))
+    elif operation == 5:
+        values = layer.get_column("is_discovered")
+        values[rng.randrange(len(values))] = 1
+        layer.set_column("is_discovered", values)
+    elif operation == 6 and rng.random() < 0.1:
+        layer.resize(layer.width + rng.choice([-7, 9]), layer.height + rng.choice([-5, 6]))
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def _map(self, layer_class):
+        map_data = MapData(80, 70, "snapshot", layer_class=layer_class)
+        layer = map_data.get_layer("Terrain")
+        for x, y in ((70, 1), (2, 3), (40, 40), (1, 65), (79, 69), (33, 3)):
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=TileType.FLOOR))
+        return map_data, layer
+
+    def test_to_dict_matches_unchanged_layer(self):
+        map_data, layer = self._map(MapLayer)
+        with map_data.snapshot() as snapshot:
+            frozen = snapshot.get_layer("Terrain")
+            self.assertEqual(json.dumps(frozen.to_dict()), json.dumps(layer.to_dict()))
+
+    def test_to_dict_is_row_major(self):
+        map_data, layer = self._map(ChunkedMapLayer)
+        with map_data.snapshot() as snapshot:
+            layer.set_tile(0, 0, Tile(x=0, y=0, tile_type=TileType.WALL))
+            tiles = snapshot.get_layer("Terrain").to_dict()["tiles"]
+            positions = [(tile["y"], tile["x"]) for tile in tiles]
+            self.assertEqual(positions, sorted(positions))
+            self.assertNotIn((0, 0), positions)
+
+    def test_snapshots_keep_their_state(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                rng = random.Random(18)
+                map_data = MapData(70, 50, "snapshot", layer_class=layer_class)
+                layer = map_data.get_layer("Terrain")
+                for _ in range(300):
+                    _edit(rng, layer)
+
+                # Overlapping snapshots, each compared with the state it was taken at
+                live = []
+                for _ in range(400):
+                    if rng.random() < 0.05:
+                        live.append((map_data.snapshot(), _cells(layer), (layer.width, layer.height)))
+                    if live and rng.random() < 0.02:
+                        live.pop(rng.randrange(len(live)))[0].release()
+                    _edit(rng, layer)
+                    if rng.random() < 0.1:
+                        for snapshot, cells, size in live:
+                            frozen = snapshot.get_layer("Terrain")
+                            self.assertEqual(_cells(frozen), cells)
+                            self.assertEqual((frozen.width, frozen.height), size)
+
+                for snapshot, cells, _size in live:
+                    copy = snapshot.to_map_data()
+                    self.assertEqual(_cells(copy.get_layer("Terrain")), cells)
+                    snapshot.release()
+                self.assertEqual(layer._snapshots, ())
+
+    def test_snapshot_tiles_are_detached(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                map_data, layer = self._map(layer_class)
+                with map_data.snapshot() as snapshot:
+                    tile = snapshot.get_tile(2, 3, "Terrain")
+                    tile.set_property("key", 1)
+                    tile.tile_type = TileType.WALL
+                    self.assertEqual(layer.get_tile(2, 3).properties, {})
+                    self.assertEqual(snapshot.get_tile(2, 3, "Terrain").tile_type, TileType.FLOOR)
+                    self.assertEqual(layer.version, 6)
+
+    def test_documented_direct_assignment(self):
+        map_data, layer = self._map(MapLayer)
+        with map_data.snapshot() as snapshot:
+            version = layer.version
+            layer.will_change(2, 3, 2, 3)
+            layer.get_tile(2, 3).is_discovered = True
+            layer.notify_changed(2, 3, 2, 3)
+            self.assertFalse(snapshot.get_layer("Terrain").get_tile(2, 3).is_discovered)
+            self.assertGreater(layer.version, version)
+
+
+if __name__ == "__main__":
+    unittest.main()
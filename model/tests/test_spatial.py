@@ -0,0 +1,123 @@
+"""Regression tests for the asset instance spatial indexes."""
+
+import math
+import random
+import unittest
+
+from model.assets import AssetDefinition, AssetInstance
+from model.spatial import GridSpatialIndex, QuadtreeSpatialIndex, SpatialIndex, instance_bounds
+
+
+DEFINITIONS = {
+    "crate": AssetDefinition(id="crate", name="Crate", asset_type="sprite",
+                             resource_path="crate.png", resource_format="png", width=32, height=32),
+    "banner": AssetDefinition(id="banner", name="Banner", asset_type="sprite",
+                              resource_path="banner.png", resource_format="png", width=16, height=96),
+    "sound": AssetDefinition(id="sound", name="Sound", asset_type="sound",
+                             resource_path="drip.ogg", resource_format="ogg"),
+}
+
+
+def _indexes():
+    """One index of each kind, sized for a 0..200 world in tile units."""
+    options = dict(definitions=DEFINITIONS, unit_scale=1 / 32, default_size=(0.5, 0.5))
+    return [GridSpatialIndex(cell_size=4.0, **options),
+            QuadtreeSpatialIndex((0.0, 0.0, 200.0, 200.0), max_items=4, **options)]
+
+
+def _random_instance(rng, instance_id):
+    """An instance with a random definition, position, rotation and scale."""
+    return AssetInstance(instance_id=instance_id, asset_definition_id=rng.choice(list(DEFINITIONS)),
+                         x=rng.uniform(-5, 205), y=rng.uniform(-5, 205),
+                         rotation=rng.choice([0.0, 45.0, 90.0, 200.0]),
+                         scale_x=rng.choice([1.0, 2.5, -1.0]), scale_y=rng.choice([1.0, 0.5]))
+
+
+def _intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _distance(x, y, bounds):
+    return math.hypot(max(bounds[0] - x, 0.0, x - bounds[2]), max(bounds[1] - y, 0.0, y - bounds[3]))
+
+
+class SpatialIndexTest(unittest.TestCase):
+
+    def test_queries_match_brute_force(self):
+        rng = random.Random(21)
+        indexes = _indexes()
+        instances = {}
+        for step in range(1500):
+            operation = rng.random()
+            if operation < 0.5 or not instances:
+                instance = _random_instance(rng, f"i{step}")
+                instances[instance.instance_id] = instance
+                for index in indexes:
+                    index.insert(instance)
+            elif operation < 0.8:
+                instance = instances[rng.choice(sorted(instances))]
+                instance.x, instance.y = rng.uniform(-5, 205), rng.uniform(-5, 205)
+                instance.rotation = rng.choice([0.0, 30.0])
+                for index in indexes:
+                    index.update(instance)
+            else:
+                instance_id = rng.choice(sorted(instances))
+                del instances[instance_id]
+                for index in indexes:
+                    self.assertTrue(index.remove(instance_id))
+                    self.assertFalse(index.remove(instance_id))
+
+            if step % 50:
+                continue
+            bounds = {instance_id: indexes[0].bounds_of(instance) for instance_id, instance in instances.items()}
+            x1, y1 = rng.uniform(-10, 200), rng.uniform(-10, 200)
+            query = (x1, y1, x1 + rng.uniform(0, 40), y1 + rng.uniform(0, 40))
+            px, py, radius = rng.uniform(0, 200), rng.uniform(0, 200), rng.uniform(0, 15)
+            for index in indexes:
+                self.assertEqual(len(index), len(instances))
+                self.assertEqual({i.instance_id for i in index.query_rect(*query)},
+                                 {i for i, b in bounds.items() if _intersects(b, query)})
+                self.assertEqual({i.instance_id for i in index.query_radius(px, py, radius)},
+                                 {i for i, b in bounds.items() if _distance(px, py, b) <= radius})
+                found = index.nearest(px, py, 5)
+                expected = sorted(_distance(px, py, b) for b in bounds.values())[:5]
+                self.assertEqual([_distance(px, py, bounds[i.instance_id]) for i in found], expected)
+
+        for index in indexes:
+            index.clear()
+            self.assertEqual((len(index), index.query_rect(-10, -10, 300, 300)), (0, []))
+
+    def test_bounds_follow_rotation_and_scale(self):
+        instance = AssetInstance(instance_id="b", asset_definition_id="banner", x=10.0, y=20.0)
+        self.assertEqual(instance_bounds(instance, 1.0, 3.0), (10.0, 20.0, 11.0, 23.0))
+        instance.rotation = 90.0
+        for value, expected in zip(instance_bounds(instance, 1.0, 3.0), (9.0, 21.0, 12.0, 22.0)):
+            self.assertAlmostEqual(value, expected)
+        instance.rotation, instance.scale_x = 0.0, -2.0
+        self.assertEqual(instance_bounds(instance, 1.0, 3.0), (9.5, 20.0, 11.5, 23.0))
+
+        index = _indexes()[0]
+        index.insert(instance)
+        self.assertEqual(index.get_bounds("b"), index.bounds_of(instance))
+        self.assertIsNone(index.get_bounds("missing"))
+        self.assertEqual(index.nearest(0, 0, 0), [])
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            SpatialIndex()
+
+    def test_incomplete_subclass_cannot_be_created(self):
+        class NoQuery(SpatialIndex):
+            def _add(self, instance_id, bounds):
+                pass
+
+            def _discard(self, instance_id, bounds):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoQuery()
+        self.assertEqual(len(GridSpatialIndex()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
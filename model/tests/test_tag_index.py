@@ -0,0 +1,101 @@
+"""Regression tests for the asset definition tag and property index."""
+
+import random
+import unittest
+
+from model.asset_manager import CachingAssetManager
+from model.assets import AssetDefinition
+from model.tag_index import AssetTagIndex
+
+
+TAGS = ["stone", "wood", "dungeon", "forest", "light", "door"]
+
+
+def _matches(tags, properties, query_tags, query_properties, any_tags, exclude_tags):
+    """Reference predicate for AssetTagIndex.query."""
+    def same(name, value):
+        if name not in properties:
+            return False
+        try:
+            hash(value)
+        except TypeError:
+            return False
+        return type(properties[name]) is type(value) and properties[name] == value
+
+    return (all(tag in tags for tag in query_tags)
+            and all(same(name, value) for name, value in query_properties.items())
+            and (not any_tags or any(tag in tags for tag in any_tags))
+            and not any(tag in tags for tag in exclude_tags))
+
+
+class AssetTagIndexTest(unittest.TestCase):
+
+    def test_queries_match_a_scan(self):
+        rng = random.Random(14)
+        index, definitions = AssetTagIndex(), {}
+        for step in range(1500):
+            definition_id = f"d{rng.randrange(200)}"
+            if rng.random() < 0.15:
+                self.assertEqual(index.remove(definition_id), definition_id in definitions)
+                definitions.pop(definition_id, None)
+            else:
+                tags = rng.sample(TAGS, rng.randrange(4))
+                properties = {"solid": rng.choice([True, False, 1]), "size": rng.randrange(3)}
+                if rng.random() < 0.2:
+                    properties["frames"] = [1, 2]
+                index.add(definition_id, tags, properties)
+                definitions[definition_id] = (tags, properties)
+            self.assertEqual(len(index), len(definitions))
+
+            if step % 25:
+                continue
+            query_tags = rng.sample(TAGS, rng.randrange(3))
+            any_tags = rng.sample(TAGS, rng.randrange(3))
+            exclude_tags = rng.sample(TAGS, rng.randrange(2))
+            query_properties = rng.choice([{}, {"solid": True}, {"solid": 1, "size": 2},
+                                           {"frames": [1, 2]}, {"missing": 0}])
+            expected = {definition_id for definition_id, (tags, properties) in definitions.items()
+                        if _matches(tags, properties, query_tags, query_properties, any_tags, exclude_tags)}
+            self.assertEqual(index.query(query_tags, query_properties, any_tags, exclude_tags), expected)
+
+        for tag, count in index.tags().items():
+            self.assertEqual(count, sum(1 for tags, _properties in definitions.values() if tag in tags))
+            self.assertEqual(index.with_tag(tag), {i for i, (tags, _p) in definitions.items() if tag in tags})
+
+    def test_add_definition_replaces_earlier_terms(self):
+        index = AssetTagIndex()
+        definition = AssetDefinition(id="door", name="Door", asset_type="sprite", resource_path="door.png",
+                                     resource_format="png", tags=["wood"], properties={"locked": False})
+        index.add_definition(definition)
+        self.assertEqual(index.query(["wood"], {"locked": False}), {"door"})
+        definition.tags, definition.properties = ["iron"], {"locked": True}
+        index.add_definition(definition)
+        self.assertEqual(index.query(["wood"]), set())
+        self.assertEqual(index.tags(), {"iron": 1})
+        self.assertEqual(index.query(properties={"locked": True}), {"door"})
+
+
+class FindDefinitionsTest(unittest.TestCase):
+
+    def test_manager_indexes_registered_entries(self):
+        manager = CachingAssetManager()
+        manager.register_entries([
+            {"id": "crate", "src": "crate.png", "category": "props", "tags": ["wood"],
+             "properties": {"solid": True}, "gridWidth": 1},
+            {"id": "torch", "src": "torch.png", "category": "lights", "gridWidth": 1},
+            {"id": "barrel", "src": "barrel.png", "category": "props", "tags": ["wood"]},
+        ])
+        self.assertEqual(manager.find_definitions(["props"]), ["barrel", "crate"])
+        self.assertEqual(manager.find_definitions(properties={"solid": True}), ["crate"])
+        self.assertEqual(manager.find_definitions(properties={"gridWidth": 1}, exclude_tags=["wood"]), ["torch"])
+        self.assertEqual(manager.get_asset_definition("crate").properties,
+                         {"category": "props", "gridWidth": 1, "solid": True})
+
+        # Re-registering an entry replaces its terms
+        manager.register_entries([{"id": "crate", "src": "crate.png", "tags": ["stone"]}])
+        self.assertEqual(manager.find_definitions(["wood"]), ["barrel"])
+        self.assertEqual(manager.find_definitions(["stone"]), ["crate"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""Regression tests for the procedural terrain generator."""
+
+import random
+import unittest
+
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.enums import BiomeType, LayerType, TerrainType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapLayer
+from model.terrain import (
+    TERRAIN_TILES, TerrainParams, classify_area, classify_parallel, generate_terrain, height_map, moisture_map,
+    terrain_tables, write_terrain,
+)
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer)
+
+# Field values this close to a level are left out of the float reference
+EPSILON = 1e-5
+
+
+def _reference_class(params, height, moisture):
+    """The editor's terrain class of a cell from its height and moisture."""
+    if height < params.water_level * 0.7:
+        return TerrainType.DEEP_WATER
+    if height < params.water_level:
+        return TerrainType.SHALLOW_WATER
+    if height < params.beach_level:
+        return TerrainType.BEACH
+    if height > params.snow_level:
+        return TerrainType.SNOW
+    if height > params.mountain_level:
+        return TerrainType.MOUNTAIN
+    if height > params.hill_level:
+        return TerrainType.HILLS
+    if moisture < params.dry_threshold:
+        return TerrainType.DESERT
+    if moisture > params.wet_threshold:
+        return TerrainType.FOREST
+    return TerrainType.GRASSLAND
+
+
+def _random_params(rng, width, height):
+    """Parameters with random noise settings and ascending levels."""
+    water, beach, hill, mountain, snow = sorted(rng.uniform(0.2, 0.9) for _ in range(5))
+    dry, wet = sorted(rng.uniform(0.2, 0.8) for _ in range(2))
+    return TerrainParams(
+        width=width, height=height, seed=rng.randrange(-2 ** 40, 2 ** 40),
+        height_octaves=rng.randrange(1, 6), height_frequency=rng.uniform(0.01, 0.3),
+        height_persistence=rng.uniform(0.3, 0.8),
+        moisture_octaves=rng.randrange(1, 5), moisture_frequency=rng.uniform(0.01, 0.3),
+        moisture_amplitude=rng.uniform(0.5, 2.0),
+        water_level=water, beach_level=beach, hill_level=hill, mountain_level=mountain, snow_level=snow,
+        dry_threshold=dry, wet_threshold=wet,
+    )
+
+
+class ClassifyTest(unittest.TestCase):
+
+    def test_classes_match_the_height_and_moisture_maps(self):
+        rng = random.Random(24)
+        for _ in range(30):
+            params = _random_params(rng, rng.randrange(1, 40), rng.randrange(1, 30))
+            x1, y1 = rng.randrange(-500, 500), rng.randrange(-500, 500)
+            codes = classify_area(params, x1, y1)
+            heights = height_map(params, x1, y1)
+            moisture = moisture_map(params, x1, y1)
+            self.assertEqual(len(codes), params.width * params.height)
+            levels = [params.water_level * 0.7, params.water_level, params.beach_level, params.hill_level,
+                      params.mountain_level, params.snow_level, params.dry_threshold, params.wet_threshold]
+            for code, height, wetness in zip(codes, heights, moisture):
+                self.assertTrue(0.0 <= height <= 1.0 and 0.0 <= wetness <= 1.0)
+                if any(abs(value - level) < EPSILON for value in (height, wetness) for level in levels):
+                    continue
+                self.assertEqual(TerrainType(code), _reference_class(params, height, wetness))
+
+    def test_any_rectangle_matches_the_same_cells_of_the_world(self):
+        rng = random.Random(7)
+        for _ in range(10):
+            params = _random_params(rng, rng.randrange(20, 60), rng.randrange(20, 60))
+            world = classify_area(params)
+            self.assertEqual(classify_area(params), world)
+            for _ in range(10):
+                x1, y1 = rng.randrange(params.width), rng.randrange(params.height)
+                width, height = rng.randrange(params.width - x1 + 1), rng.randrange(params.height - y1 + 1)
+                expected = b''.join(world[(y1 + row) * params.width + x1:(y1 + row) * params.width + x1 + width]
+                                    for row in range(height))
+                self.assertEqual(bytes(classify_area(params, x1, y1, width, height)), expected)
+
+    def test_seeds_and_levels_change_the_world(self):
+        params = TerrainParams(width=64, height=64, seed=1)
+        world = classify_area(params)
+        self.assertNotEqual(classify_area(TerrainParams(width=64, height=64, seed=2)), world)
+        self.assertGreater(len(set(world)), 3)
+        flooded = classify_area(TerrainParams(width=64, height=64, seed=1, water_level=0.6, beach_level=0.65,
+                                              hill_level=0.7))
+        self.assertGreater(flooded.count(TerrainType.SHALLOW_WATER.value) + flooded.count(TerrainType.DEEP_WATER.value),
+                           world.count(TerrainType.SHALLOW_WATER.value) + world.count(TerrainType.DEEP_WATER.value))
+
+    def test_empty_areas_and_invalid_params(self):
+        params = TerrainParams(width=0, height=5)
+        self.assertEqual(classify_area(params), bytearray())
+        self.assertEqual(len(height_map(params)), 0)
+        self.assertEqual(classify_area(TerrainParams(), 3, 3, 0, 4), bytearray())
+        with self.assertRaises(ValueError):
+            TerrainParams(beach_level=0.7, hill_level=0.6)
+        with self.assertRaises(ValueError):
+            TerrainParams(dry_threshold=0.8)
+        with self.assertRaises(ValueError):
+            TerrainParams(moisture_octaves=0)
+
+
+class GenerateTerrainTest(unittest.TestCase):
+
+    def test_layers_hold_the_tiles_of_the_classes(self):
+        params = TerrainParams(width=37, height=23, seed=99)
+        codes = bytes(classify_area(params))
+        tile_table, biome_table = terrain_tables()
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                map_data = generate_terrain(params, layer_class=layer_class)
+                self.assertEqual((map_data.width, map_data.height, map_data.map_id), (37, 23, "terrain-99"))
+                layer = map_data.get_layer("Terrain")
+                self.assertIsInstance(layer, layer_class)
+                self.assertEqual(bytes(layer.get_column("tile_type")), codes.translate(tile_table))
+                self.assertEqual(bytes(layer.get_column("biome_type")), codes.translate(biome_table))
+                x, y = 11, 7
+                tile_type, biome_type = TERRAIN_TILES[TerrainType(codes[y * 37 + x])]
+                tile = layer.get_tile(x, y)
+                self.assertEqual((tile.x, tile.y, tile.tile_type, tile.biome_type), (x, y, tile_type, biome_type))
+
+    def test_custom_tiles(self):
+        tiles = {terrain: (TileType.FLOOR, BiomeType.DUNGEON) for terrain in TerrainType}
+        tiles[TerrainType.DEEP_WATER] = (TileType.PIT, BiomeType.CAVE)
+        codes = bytes([TerrainType.DEEP_WATER.value, TerrainType.SNOW.value] * 3)
+        layer = ColumnarMapLayer.from_type_array(bytes(6), "Terrain", LayerType.TERRAIN, width=2)
+        write_terrain(layer, codes, tiles)
+        self.assertEqual([layer.get_tile(x, 1).tile_type for x in range(2)], [TileType.PIT, TileType.FLOOR])
+        self.assertEqual([layer.get_tile(x, 1).biome_type for x in range(2)], [BiomeType.CAVE, BiomeType.DUNGEON])
+
+
+class ClassifyParallelTest(unittest.TestCase):
+
+    def test_parallel_matches_classify_area(self):
+        rng = random.Random(25)
+        for _ in range(4):
+            params = _random_params(rng, rng.randrange(1, 50), rng.randrange(1, 70))
+            chunk_rows = rng.randrange(1, 20)
+            self.assertEqual(classify_parallel(params, workers=rng.randrange(1, 4), chunk_rows=chunk_rows),
+                             classify_area(params))
+
+    def test_parallel_generation(self):
+        params = TerrainParams(width=30, height=41, seed=5)
+        serial = generate_terrain(params).get_layer("Terrain")
+        parallel = generate_terrain(params, workers=2, chunk_rows=8).get_layer("Terrain")
+        for name in ("tile_type", "biome_type"):
+            self.assertEqual(bytes(parallel.get_column(name)), bytes(serial.get_column(name)))
+        self.assertEqual(classify_parallel(TerrainParams(width=0, height=3)), bytearray())
+        with self.assertRaises(ValueError):
+            classify_parallel(params, chunk_rows=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
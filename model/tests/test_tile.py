@@ -0,0 +1,146 @@
+"""Regression tests for copying and pickling stored tiles."""
+
+import copy
+import pickle
+import unittest
+
+from model.assets import AssetInstance
+from model.chunked import ChunkedMapLayer
+from model.columnar import ColumnarMapLayer
+from model.compact import CompactTile
+from model.enums import LayerType, TileType
+from model.flyweight import FlyweightMapLayer
+from model.map_data import MapData, MapLayer
+from model.tile import Tile
+
+
+LAYER_CLASSES = (MapLayer, ColumnarMapLayer, ChunkedMapLayer, FlyweightMapLayer)
+
+
+def _fill(layer, tile_type=TileType.FLOOR):
+    """Fill a whole layer with tiles of one type."""
+    for y in range(layer.height):
+        for x in range(layer.width):
+            layer.set_tile(x, y, Tile(x=x, y=y, tile_type=tile_type))
+
+
+class DetachedCopyTest(unittest.TestCase):
+
+    def _stored_tile(self, layer_class, tile_class=Tile):
+        map_data = MapData(64, 64, "pickle", layer_class=layer_class)
+        layer = map_data.get_layer("Terrain")
+        _fill(layer)
+        tile = tile_class(x=5, y=6, tile_type=TileType.WALL, max_health=10.0)
+        tile.set_property("key", [1])
+        layer.set_tile(5, 6, tile)
+        return layer, layer.get_tile(5, 6)
+
+    def _check_copy(self, layer, copied):
+        self.assertIsNone(copied._layer)
+        self.assertEqual((copied.x, copied.y, copied.tile_type), (5, 6, TileType.WALL))
+        self.assertEqual(copied.properties, {"key": [1]})
+        copied.set_property("other", 1)
+        copied.properties["key"].append(2)
+        self.assertEqual(layer.get_tile(5, 6).properties, {"key": [1]})
+
+    def test_pickle_excludes_layer(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                layer, tile = self._stored_tile(layer_class)
+                data = pickle.dumps(tile)
+                self.assertLess(len(data), 2000)
+                self._check_copy(layer, pickle.loads(data))
+
+    def test_deepcopy_excludes_layer(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                layer, tile = self._stored_tile(layer_class)
+                self._check_copy(layer, copy.deepcopy(tile))
+
+    def test_compact_tile_round_trip(self):
+        layer, tile = self._stored_tile(MapLayer, CompactTile)
+        tile.add_asset_instance(AssetInstance(instance_id="", asset_definition_id="torch"))
+        copied = pickle.loads(pickle.dumps(tile))
+        self.assertIsInstance(copied, CompactTile)
+        self.assertEqual(len(copied.asset_instances), 1)
+        self._check_copy(layer, copied)
+
+    def test_prototype_view_pickles(self):
+        layer, _tile = self._stored_tile(FlyweightMapLayer)
+        copied = pickle.loads(pickle.dumps(layer.get_tile(0, 0)))
+        self.assertEqual((type(copied), copied.tile_type), (Tile, TileType.FLOOR))
+
+    def test_copied_layer_reattaches_tiles(self):
+        layer, _tile = self._stored_tile(ChunkedMapLayer)
+        copied = copy.deepcopy(layer)
+        self.assertIs(copied.get_tile(5, 6)._layer, copied)
+        reported = []
+        copied.add_listener(lambda _layer, *rect: reported.append(rect))
+        copied.get_tile(5, 6).damage(1)
+        self.assertEqual(reported, [(5, 6, 5, 6)])
+
+
+class LayerBackReferenceTest(unittest.TestCase):
+
+    def test_in_place_edits_notify_the_layer(self):
+        for layer_class in LAYER_CLASSES:
+            with self.subTest(layer_class=layer_class.__name__):
+                layer = layer_class(LayerType.TERRAIN, "Terrain", 4, 4)
+                layer.set_tile(1, 2, Tile(x=1, y=2, tile_type=TileType.WALL, max_health=4.0))
+                reported = []
+                layer.add_listener(lambda _layer, *rect: reported.append(rect))
+
+                tile = layer.get_tile(1, 2)
+                self.assertFalse(tile.damage(1.0))
+                tile.heal(1.0)
+                self.assertTrue(tile.damage(4.0))
+                self.assertEqual(reported, [(1, 2, 1, 2)] * 3)
+                self.assertTrue(layer.get_tile(1, 2).is_passable)
+
+    def test_replaced_tile_is_detached(self):
+        layer = MapLayer(LayerType.TERRAIN, "Terrain", 2, 1)
+        old = Tile(x=0, y=0, tile_type=TileType.WALL, max_health=2.0)
+        layer.set_tile(0, 0, old)
+        layer.set_tile(0, 0, Tile(x=0, y=0, tile_type=TileType.FLOOR))
+        reported = []
+        layer.add_listener(lambda _layer, *rect: reported.append(rect))
+        old.damage(1.0)
+        self.assertIsNone(old._layer)
+        self.assertEqual(reported, [])
+
+
+class CrossLayerCopyTest(unittest.TestCase):
+
+    def test_views_are_stored_as_standalone_tiles(self):
+        for source_class in (ColumnarMapLayer, FlyweightMapLayer):
+            for target_class in (MapLayer, ChunkedMapLayer):
+                with self.subTest(source=source_class.__name__, target=target_class.__name__):
+                    source = source_class(LayerType.TERRAIN, "Source", 4, 4)
+                    _fill(source)
+                    source.get_tile(1, 1).damage(0)
+                    target = target_class(LayerType.TERRAIN, "Target", 4, 4)
+                    self.assertTrue(target.set_tile(2, 2, source.get_tile(0, 0)))
+
+                    tile = target.get_tile(2, 2)
+                    self.assertIs(type(tile), Tile)
+                    self.assertIs(tile._layer, target)
+                    self.assertEqual((tile.x, tile.y, tile.tile_type), (2, 2, TileType.FLOOR))
+                    tile.set_property("key", 1)
+                    tile.is_discovered = True
+                    self.assertEqual(target.get_tile(2, 2).properties, {"key": 1})
+                    self.assertEqual(source.get_tile(0, 0).properties, {})
+                    self.assertFalse(source.get_tile(0, 0).is_discovered)
+                    self.assertEqual((source.get_tile(0, 0).x, source.get_tile(0, 0).y), (0, 0))
+
+
+class CompactStorageTest(unittest.TestCase):
+
+    def test_fields_live_in_slots(self):
+        tile = CompactTile(x=1, y=2, tile_type=TileType.WALL, max_health=5.0)
+        tile.set_property("key", 1)
+        tile.add_asset_instance(AssetInstance(instance_id="a", asset_definition_id="torch"))
+        self.assertEqual(vars(tile), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -52,6 +52,14 @@ class Tile:
     max_health: Optional[float] = None
     current_health: Optional[float] = None
     
+    # Layer currently storing this tile (set by MapLayer; not a dataclass
+    # field, so it is never serialized or compared)
+    _layer = None
+    
+    # True for views onto another layer's storage (ColumnarTile, ...), which
+    # layers storing Tile objects replace by a standalone copy
+    _is_view = False
+    
     def __post_init__(self):
         """Initialize default values for mutable fields and validate state."""
         if self.asset_instances is None:
@@ -72,6 +80,29 @@ class Tile:
         if self.current_health is None and self.max_health is not None:
             self.current_health = self.max_health
     
+    def __getstate__(self) -> Any:
+        """
+        Pickle / copy the tile without the layer storing it.
+        
+        A copy is not stored in any layer, and pickling or deep-copying a
+        single tile must not drag its whole layer along.
+        """
+        state = {name: value for name, value in self.__dict__.items() if name != '_layer'}
+        slots = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if name == '_layer':
+                    slots[name] = None
+                elif hasattr(self, name):
+                    slots[name] = getattr(self, name)
+        return (state, slots) if slots else state
+    
+    def _standalone(self, x: int, y: int) -> 'Tile':
+        """A plain Tile at (x, y) holding a copy of this tile's state."""
+        data = self.to_dict()
+        data["x"], data["y"] = x, y
+        return Tile.from_dict(data)
+    
     def is_destroyed(self) -> bool:
         """Check if the tile is destroyed (health <= 0)."""
         return (self.current_health is not None and 
@@ -90,14 +121,16 @@ class Tile:
         if self.current_health is None:
             return False
         
+        self._before_change()
         self.current_health = max(0, self.current_health - amount)
         
         # If destroyed, might change tile properties
-        if self.is_destroyed():
+        destroyed = self.is_destroyed()
+        if destroyed:
             self._on_destroyed()
-            return True
         
-        return False
+        self._notify_layer()
+        return destroyed
     
     def heal(self, amount: float) -> None:
         """
@@ -107,7 +140,35 @@ class Tile:
             amount: Amount of health to restore
         """
         if self.current_health is not None and self.max_health is not None:
+            self._before_change()
             self.current_health = min(self.max_health, self.current_health + amount)
+            self._notify_layer()
+    
+    def _before_change(self) -> None:
+        """Let the layer storing this tile preserve it for snapshots before an in-place change."""
+        if self._layer is not None:
+            self._layer.will_change(self.x, self.y, self.x, self.y)
+    
+    def _notify_layer(self) -> None:
+        """Report an in-place change of this tile to the layer storing it."""
+        if self._layer is not None:
+            self._layer.notify_changed(self.x, self.y, self.x, self.y)
+    
+    def _instance_index(self):
+        """The AssetInstanceIndex kept by the layer storing this tile, if any."""
+        return self._layer._instance_index if self._layer is not None else None
+    
+    def _index_added(self, asset_instance: AssetInstance) -> None:
+        """Register an instance added to this tile with the layer's index."""
+        index = self._instance_index()
+        if index is not None:
+            index.add(self._layer, self.x, self.y, asset_instance)
+    
+    def _index_removed(self, instance_id: str) -> None:
+        """Drop an instance removed from this tile from the layer's index."""
+        index = self._instance_index()
+        if index is not None:
+            index.discard(self._layer, self.x, self.y, instance_id)
     
     def _on_destroyed(self) -> None:
         """Handle tile destruction effects."""
@@ -117,9 +178,18 @@ class Tile:
             self.is_transparent = True
             # Could change to debris or rubble tile type
     
+    def set_property(self, key: str, value: Any) -> None:
+        """Set a tile-specific property."""
+        self._before_change()
+        self.properties[key] = value
+        self._notify_layer()
+    
     def add_asset_instance(self, asset_instance: AssetInstance) -> None:
         """Add an asset instance to this tile."""
+        self._before_change()
         self.asset_instances.append(asset_instance)
+        self._index_added(asset_instance)
+        self._notify_layer()
     
     def remove_asset_instance(self, instance_id: str) -> bool:
         """
@@ -133,17 +203,78 @@ class Tile:
         """
         for i, instance in enumerate(self.asset_instances):
             if instance.instance_id == instance_id:
+                self._before_change()
                 self.asset_instances.pop(i)
+                self._index_removed(instance_id)
+                self._notify_layer()
                 return True
         return False
     
     def get_asset_instance(self, instance_id: str) -> Optional[AssetInstance]:
         """Get an asset instance by its ID."""
+        index = self._instance_index()
+        if index is not None:
+            location = index.get(instance_id)
+            if location is not None and location.is_at(self._layer, self.x, self.y):
+                return location.instance
+        
         for instance in self.asset_instances:
             if instance.instance_id == instance_id:
                 return instance
         return None
     
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the tile to a dictionary for serialization."""
+        return {
+            "x": self.x,
+            "y": self.y,
+            "tile_type": self.tile_type.name,
+            "biome_type": self.biome_type.name,
+            "asset_instances": [instance.to_dict() for instance in self.asset_instances],
+            "is_passable": self.is_passable,
+            "is_transparent": self.is_transparent,
+            "movement_cost": self.movement_cost,
+            "is_interactive": self.is_interactive,
+            "interaction_range": self.interaction_range,
+            "is_discovered": self.is_discovered,
+            "is_visible": self.is_visible,
+            "properties": self.properties,
+            "max_health": self.max_health,
+            "current_health": self.current_health,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Tile':
+        """Create a tile from a dictionary produced by to_dict."""
+        tile = cls(
+            x=data["x"],
+            y=data["y"],
+            tile_type=TileType[data["tile_type"]],
+            biome_type=BiomeType[data.get("biome_type", BiomeType.DUNGEON.name)],
+            asset_instances=[
+                AssetInstance.from_dict(instance)
+                for instance in data.get("asset_instances", [])
+            ],
+            movement_cost=data.get("movement_cost", 1.0),
+            is_interactive=data.get("is_interactive", False),
+            interaction_range=data.get("interaction_range", 1.0),
+            is_discovered=data.get("is_discovered", False),
+            is_visible=data.get("is_visible", False),
+            properties=dict(data.get("properties", {})),
+            max_health=data.get("max_health"),
+        )
+        
+        # Restore saved state over the type-derived defaults from __post_init__
+        # (e.g. a destroyed wall is passable)
+        if "is_passable" in data:
+            tile.is_passable = data["is_passable"]
+        if "is_transparent" in data:
+            tile.is_transparent = data["is_transparent"]
+        if "current_health" in data:
+            tile.current_health = data["current_health"]
+        
+        return tile
+    
     def copy(self) -> 'Tile':
         """Create a deep copy of this tile."""
         # Create a new tile with copied basic properties